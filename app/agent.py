@@ -1,9 +1,13 @@
 # app/agent.py
 
+import asyncio
+import json
 import os
 import sys
 import re
 import logging
+import time
+import threading
 from pathlib import Path
 from dotenv import load_dotenv
 from typing import Optional, List, Dict, Any
@@ -13,29 +17,21 @@ PROJECT_ROOT = Path(__file__).resolve().parent.parent
 if str(PROJECT_ROOT) not in sys.path:
     sys.path.insert(0, str(PROJECT_ROOT))
 
-from app.tools import search_imt, send_email
-
-# Tentative d'import Langfuse (observabilité)
-LANGFUSE_AVAILABLE = False
-langfuse_client = None
-
-if os.getenv("LANGFUSE_PUBLIC_KEY") and os.getenv("LANGFUSE_SECRET_KEY"):
-    try:
-        from langfuse import Langfuse
-        langfuse_client = Langfuse(
-            public_key=os.getenv("LANGFUSE_PUBLIC_KEY"),
-            secret_key=os.getenv("LANGFUSE_SECRET_KEY"),
-            host=os.getenv("LANGFUSE_HOST", "https://cloud.langfuse.com")
-        )
-        LANGFUSE_AVAILABLE = True
-        logger = logging.getLogger(__name__)
-        logger.info("Langfuse configuré avec succès")
-    except Exception as e:
-        logger = logging.getLogger(__name__)
-        logger.warning(f"Langfuse non disponible : {e}")
-else:
-    logger = logging.getLogger(__name__)
-    logger.debug("Langfuse désactivé (pas de clés configurées)")
+from app.http_client import get_async_http_client, get_http_client
+from app.metrics import counter, histogram
+from app.answer_cache import get_answer_cache
+from app.circuit_breaker import CircuitBreaker
+from app.context_packer import TOKEN_BUCKETS, pack_context
+from app.deadline import MIN_LLM_SECONDS, request_deadline, stage
+from app.deadline import allows as deadline_allows, remaining as deadline_remaining, timeout as deadline_timeout
+from app.guardrails import REFUSALS as GUARDRAIL_REFUSALS, detect as detect_guardrail
+from app.intent_classifier import classify, keyword_intent, load_classifier
+from app.llm_cache import cache_key, get_llm_cache
+from app.provider_health import ProviderHealth, http_check
+from app.rate_limiter import get_rate_limiter
+from app.telemetry import record_error, record_generation
+from app.tokens import count_tokens
+from app.tools import lookup_contact, search_imt, send_email
 
 load_dotenv()
 
@@ -54,193 +50,333 @@ logger = logging.getLogger(__name__)
 # 2) Si le SDK n'est pas présent ou si l'appel échoue, utiliser une heuristique simple
 #    pour décider entre deux actions : `SEARCH` (répondre) ou `EMAIL` (envoyer un e-mail).
 # 3) Les outils `search_imt` et `send_email` restent inchangés et sont appelés selon la décision.
+#
+# L'import de ce module ne fait aucun appel réseau : les flags *_AVAILABLE indiquent
+# seulement qu'une clé est configurée. Les clients (Grok, OpenAI) sont créés au premier
+# appel ; les traces Langfuse passent par la file de `app.telemetry` (envoi en arrière-plan). Chaque fournisseur a un disjoncteur (`app.circuit_breaker`) qui
+# l'écarte quand il échoue ou ralentit, et le réintègre après une sonde réussie
+# (`app.provider_health`) suivie d'un appel d'essai.
 
-# Tentative d'import du SDK Gemini (optionnelle)
-GENAI_AVAILABLE = False
-API_KEY = None
-
-try:
-    import requests
-    API_KEY = os.getenv("GEMINI_API_KEY") or os.getenv("GOOGLE_API_KEY")
-    if API_KEY:
-        # Test rapide de la clé
-        test_url = f"https://generativelanguage.googleapis.com/v1/models?key={API_KEY}"
-        response = requests.get(test_url, timeout=5)
-        if response.status_code == 200:
-            GENAI_AVAILABLE = True
-            logger.info("Gemini API REST configuré avec succès")
-        else:
-            logger.warning(f"Clé API Gemini invalide (status {response.status_code})")
-    else:
-        logger.warning("Clé API Gemini manquante - Fallback heuristique activé")
-except Exception as e:
-    logger.warning(f"Gemini non disponible : {e} - Fallback heuristique activé")
+# Gemini (API REST)
+API_KEY = os.getenv("GEMINI_API_KEY") or os.getenv("GOOGLE_API_KEY")
+GENAI_AVAILABLE = bool(API_KEY)
+GEMINI_API_BASE = os.getenv("GEMINI_API_BASE", "https://generativelanguage.googleapis.com")
+if not GENAI_AVAILABLE:
+    logger.warning("Clé API Gemini manquante - Fallback heuristique activé")
 
-# Tentative d'import Grok/xAI comme alternative
-GROK_AVAILABLE = False
+# Grok/xAI comme alternative (API compatible OpenAI)
+GROK_API_KEY = os.getenv("XAI_API_KEY") or os.getenv("GROK_API_KEY")
+GROK_AVAILABLE = bool(GROK_API_KEY)
 grok_client = None
-try:
-    import openai
-    GROK_API_KEY = os.getenv("XAI_API_KEY") or os.getenv("GROK_API_KEY")
-    if GROK_API_KEY:
-        grok_client = openai.OpenAI(
-            api_key=GROK_API_KEY,
-            base_url="https://api.x.ai/v1"
-        )
-        GROK_AVAILABLE = True
-        logger.info("Grok (xAI) configuré avec succès")
-except Exception as e:
-    logger.info(f"Grok non disponible : {e}")
+grok_async_client = None
 
 # Configuration OpenAI GPT (fallback économique)
-OPENAI_AVAILABLE = False
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+OPENAI_AVAILABLE = bool(OPENAI_API_KEY)
 openai_client = None
-try:
-    import openai
-    OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-    if OPENAI_API_KEY:
-        openai_client = openai.OpenAI(api_key=OPENAI_API_KEY)
-        OPENAI_AVAILABLE = True
-        logger.info("OpenAI GPT configuré avec succès")
-except Exception as e:
-    logger.info(f"OpenAI non disponible : {e}")
-
-# Flag global pour tracker si tous les LLMs ont échoué (éviter de les rappeler)
-_all_llms_failed = False
-
-def _call_grok(prompt: str, max_tokens: int = 150) -> Optional[str]:
+openai_async_client = None
+
+gemini_health = ProviderHealth(
+    "Gemini", http_check(f"{GEMINI_API_BASE}/v1/models", {"x-goog-api-key": API_KEY or ""})
+)
+grok_health = ProviderHealth(
+    "Grok", http_check("https://api.x.ai/v1/models", {"Authorization": f"Bearer {GROK_API_KEY}"})
+)
+openai_health = ProviderHealth(
+    "OpenAI", http_check("https://api.openai.com/v1/models", {"Authorization": f"Bearer {OPENAI_API_KEY}"})
+)
+gemini_breaker = CircuitBreaker("Gemini", gemini_health)
+grok_breaker = CircuitBreaker("Grok", grok_health)
+openai_breaker = CircuitBreaker("OpenAI", openai_health)
+
+# Routage des questions :
+#   llm    : décision SEARCH/EMAIL par un premier appel LLM, puis reformulation (2 appels)
+#   single : décision et réponse en un seul appel à sortie structurée (JSON)
+#   local  : décision par heuristique locale, LLM pour la seule rédaction de la réponse
+AGENT_ROUTING_MODE = os.getenv("AGENT_ROUTING_MODE", "llm").strip().lower()
+
+# Classifieur d'intention local (data/intent_model.json) : une prédiction confiante
+# décide du routage sans appel LLM, quel que soit le mode ; sinon le mode s'applique
+intent_classifier = load_classifier()
+
+# Couverture (hedging) des appels LLM asynchrones : si le fournisseur en cours n'a pas
+# répondu après le percentile LLM_HEDGE_PERCENTILE de ses latences récentes, le suivant
+# est lancé en parallèle ; la première réponse valide gagne, l'autre appel est annulé.
+LLM_HEDGING = os.getenv("LLM_HEDGING", "false").lower() == "true"
+HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "0.95"))
+# Délai utilisé tant qu'un fournisseur a moins de HEDGE_MIN_SAMPLES mesures
+HEDGE_DEFAULT_DELAY = float(os.getenv("LLM_HEDGE_DEFAULT_DELAY", "3"))
+HEDGE_MIN_DELAY = float(os.getenv("LLM_HEDGE_MIN_DELAY", "0.5"))
+HEDGE_MAX_DELAY = float(os.getenv("LLM_HEDGE_MAX_DELAY", "10"))
+HEDGE_MIN_SAMPLES = 20
+
+
+def _latency(provider: str):
+    """Histogramme des latences des réponses valides d'un fournisseur."""
+    return histogram("llm_latency_seconds", provider=provider)
+
+
+def hedge_delay(provider: str) -> float:
+    """Délai avant de couvrir un appel à `provider` par le fournisseur suivant."""
+    hist = _latency(provider)
+    if hist.samples() < HEDGE_MIN_SAMPLES:
+        return HEDGE_DEFAULT_DELAY
+    return min(HEDGE_MAX_DELAY, max(HEDGE_MIN_DELAY, hist.percentile(HEDGE_PERCENTILE)))
+
+
+_providers_warmed = threading.Event()
+
+
+def warm_up_providers():
+    """Lance en arrière-plan la vérification des fournisseurs configurés (non bloquant).
+
+    Une seule fois par processus : ensuite, l'état est tenu à jour par les appels
+    eux-mêmes (`mark_success`) et par les sondes des disjoncteurs.
+    """
+    if _providers_warmed.is_set():
+        return
+    _providers_warmed.set()
+    for configured, health in ((GENAI_AVAILABLE, gemini_health), (GROK_AVAILABLE, grok_health),
+                               (OPENAI_AVAILABLE, openai_health)):
+        if configured:
+            health.is_available()  # vérification en arrière-plan si aucune n'est valide
+
+
+def _get_grok_client():
+    """Client xAI (créé au premier appel), ou None."""
+    global grok_client, GROK_AVAILABLE
+    if grok_client is None and GROK_AVAILABLE:
+        try:
+            import openai
+            grok_client = openai.OpenAI(api_key=GROK_API_KEY, base_url="https://api.x.ai/v1")
+            logger.info("Grok (xAI) configuré avec succès")
+        except Exception as e:
+            logger.info(f"Grok non disponible : {e}")
+            GROK_AVAILABLE = False
+    return grok_client
+
+
+def _get_openai_client():
+    """Client OpenAI (créé au premier appel), ou None."""
+    global openai_client, OPENAI_AVAILABLE
+    if openai_client is None and OPENAI_AVAILABLE:
+        try:
+            import openai
+            openai_client = openai.OpenAI(api_key=OPENAI_API_KEY)
+            logger.info("OpenAI GPT configuré avec succès")
+        except Exception as e:
+            logger.info(f"OpenAI non disponible : {e}")
+            OPENAI_AVAILABLE = False
+    return openai_client
+
+
+def _get_grok_async_client():
+    """Client xAI asynchrone (créé au premier appel), ou None."""
+    global grok_async_client
+    if grok_async_client is None and GROK_AVAILABLE:
+        try:
+            import openai
+            grok_async_client = openai.AsyncOpenAI(api_key=GROK_API_KEY, base_url="https://api.x.ai/v1")
+        except Exception as e:
+            logger.info(f"Grok (async) non disponible : {e}")
+    return grok_async_client
+
+
+def _get_openai_async_client():
+    """Client OpenAI asynchrone (créé au premier appel), ou None."""
+    global openai_async_client
+    if openai_async_client is None and OPENAI_AVAILABLE:
+        try:
+            import openai
+            openai_async_client = openai.AsyncOpenAI(api_key=OPENAI_API_KEY)
+        except Exception as e:
+            logger.info(f"OpenAI (async) non disponible : {e}")
+    return openai_async_client
+
+# Sortie structurée du mode AGENT_ROUTING_MODE=single : intention et réponse en un appel
+STRUCTURED_ANSWER_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "intent": {"type": "STRING", "enum": ["SEARCH", "EMAIL"]},
+        "answer": {"type": "STRING"},
+    },
+    "required": ["intent", "answer"],
+}
+
+
+def _json_response_format(json_output: bool) -> dict:
+    """Paramètre `response_format` des API compatibles OpenAI (Grok, OpenAI)."""
+    return {"response_format": {"type": "json_object"}} if json_output else {}
+
+
+def _trace_chat_completion(name: str, model: str, prompt: str, result: str, usage, max_tokens: int):
+    """Trace (différée) d'une réponse chat.completions avec son usage en tokens."""
+    record_generation(name, model, prompt, result,
+                      input_tokens=int(getattr(usage, "prompt_tokens", 0) or 0),
+                      output_tokens=int(getattr(usage, "completion_tokens", 0) or 0),
+                      max_tokens=max_tokens)
+
+
+def _call_grok(prompt: str, max_tokens: int = 150, json_output: bool = False) -> Optional[str]:
     """Appelle Grok via l'API xAI avec traçabilité Langfuse.
     
     Args:
         prompt: Le prompt à envoyer
         max_tokens: Nombre max de tokens
+        json_output: Exiger un objet JSON en sortie
     
     Returns:
         La réponse ou None
     """
-    if not GROK_AVAILABLE or not grok_client:
+    client = _get_grok_client()
+    if not GROK_AVAILABLE or not client:
         return None
     
     try:
-        response = grok_client.chat.completions.create(
+        response = client.chat.completions.create(
             model="grok-beta",
             messages=[{"role": "user", "content": prompt}],
             max_tokens=max_tokens,
             temperature=0.3,
+            timeout=deadline_timeout(LLM_TIMEOUT),
+            **_json_response_format(json_output),
         )
         result = response.choices[0].message.content.strip()
-        
-        # Trace Langfuse 3.x avec usage tokens + coûts Grok
-        if LANGFUSE_AVAILABLE and False:  # Désactivé temporairement
-            try:
-                # Grok pricing : $5/1M input tokens, $15/1M output tokens
-                usage = response.usage
-                input_tokens = usage.prompt_tokens if usage else 0
-                output_tokens = usage.completion_tokens if usage else 0
-                cost = (input_tokens / 1_000_000 * 5.0) + (output_tokens / 1_000_000 * 15.0)
-                
-                trace = langfuse_client.trace(name="grok_generation")
-                trace.generation(
-                    name="grok_call",
-                    model="grok-beta",
-                    input=prompt,
-                    output=result,
-                    usage={
-                        "input": input_tokens,
-                        "output": output_tokens,
-                        "total": input_tokens + output_tokens
-                    },
-                    metadata={
-                        "max_tokens": max_tokens,
-                        "cost_usd": round(cost, 6)
-                    }
-                )
-            except Exception as trace_error:
-                logger.warning(f"Langfuse trace failed: {trace_error}")
-        
+        _trace_chat_completion("Grok", "grok-beta", prompt, result, getattr(response, "usage", None), max_tokens)
         return result
     except Exception as e:
         logger.error(f"Erreur Grok : {e}")
-        # Trace error in Langfuse
-        if LANGFUSE_AVAILABLE and False:  # Désactivé temporairement
-            try:
-                trace = langfuse_client.trace(name="grok_error")
-                trace.event(
-                    name="grok_call_error",
-                    metadata={"model": "grok-beta", "error": str(e)},
-                    input=prompt
-                )
-            except:
-                pass
+        record_error("Grok", "grok-beta", prompt, e)
         return None
 
-def _call_openai(prompt: str, max_tokens: int = 200) -> Optional[str]:
+def _call_openai(prompt: str, max_tokens: int = 200, json_output: bool = False) -> Optional[str]:
     """Appelle OpenAI GPT-4o-mini (économique et performant) avec traçabilité Langfuse.
     
     Args:
         prompt: Le prompt à envoyer
         max_tokens: Nombre max de tokens
+        json_output: Exiger un objet JSON en sortie
     
     Returns:
         La réponse ou None
     """
-    if not OPENAI_AVAILABLE or not openai_client:
+    client = _get_openai_client()
+    if not OPENAI_AVAILABLE or not client:
         return None
     
     try:
-        response = openai_client.chat.completions.create(
+        response = client.chat.completions.create(
             model="gpt-4o-mini",  # Le moins cher : 0.15$/1M tokens entrée, 0.6$/1M sortie
             messages=[{"role": "user", "content": prompt}],
             max_tokens=max_tokens,
             temperature=0.3,
+            timeout=deadline_timeout(LLM_TIMEOUT),
+            **_json_response_format(json_output),
         )
         result = response.choices[0].message.content.strip()
-        
-        # Trace Langfuse 3.x avec usage tokens + coûts OpenAI
-        if LANGFUSE_AVAILABLE and False:  # Désactivé temporairement
-            try:
-                # OpenAI GPT-4o-mini pricing : $0.15/1M input, $0.60/1M output
-                usage = response.usage
-                input_tokens = usage.prompt_tokens if usage else 0
-                output_tokens = usage.completion_tokens if usage else 0
-                cost = (input_tokens / 1_000_000 * 0.15) + (output_tokens / 1_000_000 * 0.60)
-                
-                trace = langfuse_client.trace(name="openai_generation")
-                trace.generation(
-                    name="openai_call",
-                    model="gpt-4o-mini",
-                    input=prompt,
-                    output=result,
-                    usage={
-                        "input": input_tokens,
-                        "output": output_tokens,
-                        "total": input_tokens + output_tokens
-                    },
-                    metadata={
-                        "max_tokens": max_tokens,
-                        "cost_usd": round(cost, 6)
-                    }
-                )
-            except Exception as trace_error:
-                logger.warning(f"Langfuse trace failed: {trace_error}")
-        
+        _trace_chat_completion("OpenAI", "gpt-4o-mini", prompt, result, getattr(response, "usage", None), max_tokens)
         return result
     except Exception as e:
         logger.error(f"Erreur OpenAI : {e}")
-        # Trace error in Langfuse
-        if LANGFUSE_AVAILABLE and False:  # Désactivé temporairement
-            try:
-                trace = langfuse_client.trace(name="openai_error")
-                trace.event(
-                    name="openai_call_error",
-                    metadata={"model": "gpt-4o-mini", "error": str(e)},
-                    input=prompt
-                )
-            except:
-                pass
+        record_error("OpenAI", "gpt-4o-mini", prompt, e)
+        return None
+
+# -------------------------
+# Cache des réponses LLM (app.llm_cache)
+# -------------------------
+
+def _configured_providers() -> list:
+    providers = (("Gemini", GENAI_AVAILABLE), ("Grok", GROK_AVAILABLE), ("OpenAI", OPENAI_AVAILABLE))
+    return [name for name, configured in providers if configured]
+
+
+def _llm_cache_key(provider: str, prompt: str, json_output: bool) -> str:
+    model, max_tokens = PROVIDER_MODELS[provider]
+    return cache_key(provider, model, {"temperature": 0.3, "max_tokens": max_tokens, "json": json_output}, prompt)
+
+
+def _cached_llm_response(prompt: str, json_output: bool = False) -> Optional[str]:
+    """Réponse en cache du premier fournisseur configuré (ordre de priorité), ou None."""
+    cache = get_llm_cache()
+    if cache is None:
+        return None
+    providers = _configured_providers()
+    hit = cache.get_first([_llm_cache_key(name, prompt, json_output) for name in providers])
+    if hit is None:
+        return None
+    index, response = hit
+    logger.info(f"Réponse {providers[index]} servie depuis le cache LLM")
+    return response
+
+
+def _cache_llm_response(provider: str, prompt: str, json_output: bool, response: Optional[str]):
+    cache = get_llm_cache()
+    if cache is not None and response:
+        cache.set(_llm_cache_key(provider, prompt, json_output), response)
+
+
+async def _cached_llm_response_async(prompt: str, json_output: bool = False) -> Optional[str]:
+    if get_llm_cache() is None:
         return None
+    return await asyncio.to_thread(_cached_llm_response, prompt, json_output)
+
+
+async def _cache_llm_response_async(provider: str, prompt: str, json_output: bool, response: Optional[str]):
+    if get_llm_cache() is not None and response:
+        await asyncio.to_thread(_cache_llm_response, provider, prompt, json_output, response)
+
+
+# -------------------------
+# Quotas des fournisseurs (app.rate_limiter)
+# -------------------------
+
+def _rate_limit_wait(name: str, breaker: CircuitBreaker) -> Optional[float]:
+    """Attente imposée par le quota de `name` ; None : quota atteint (essai du disjoncteur libéré)."""
+    limiter = get_rate_limiter()
+    if limiter is None:
+        return 0.0
+    # L'attente d'un jeton ne doit pas consommer le temps de l'appel lui-même
+    left = deadline_remaining()
+    max_wait = None if left is None else min(limiter.max_wait, max(0.0, left - MIN_LLM_SECONDS))
+    wait = limiter.reserve(name, PROVIDER_KEYS.get(name), max_wait=max_wait)
+    if wait is None:
+        breaker.release()
+    return wait
+
+
+def _deadline_allows_llm(name: str) -> bool:
+    if deadline_allows(MIN_LLM_SECONDS):
+        return True
+    counter("llm_deadline_skips_total", provider=name).inc()
+    logger.info(f"{name} sauté : moins de {MIN_LLM_SECONDS:g}s restantes")
+    return False
+
+
+def _admit(name: str, breaker: CircuitBreaker) -> bool:
+    """Temps restant suffisant, disjoncteur fermé et quota disponible ; attend son
+    tour dans la file si besoin."""
+    if not _deadline_allows_llm(name) or not breaker.allow_request():
+        return False
+    wait = _rate_limit_wait(name, breaker)
+    if wait is None:
+        return False
+    if wait:
+        logger.info(f"{name} : quota, attente de {wait:.2f}s")
+        time.sleep(wait)
+    return True
 
-def _call_gemini(prompt: str) -> Optional[str]:
+
+async def _admit_async(name: str, breaker: CircuitBreaker) -> Optional[float]:
+    """Attente avant l'appel à `name`, ou None (temps épuisé, disjoncteur ouvert ou quota atteint)."""
+    if not _deadline_allows_llm(name) or not breaker.allow_request():
+        return None
+    limiter = get_rate_limiter()
+    if limiter is not None and limiter.remote:
+        return await asyncio.to_thread(_rate_limit_wait, name, breaker)
+    return _rate_limit_wait(name, breaker)
+
+
+def _call_gemini(prompt: str, json_output: bool = False) -> Optional[str]:
     """Appelle les LLMs disponibles avec ordre de priorité intelligent.
     
     NOUVEL ORDRE : Gemini (gratuit) → Grok → OpenAI → None
@@ -255,43 +391,132 @@ def _call_gemini(prompt: str) -> Optional[str]:
     Si l'information est absente, ne l'invente pas, oriente vers l'administration. 
     Réponds en faisant des phrases complètes et polies.
 
+    Avec `json_output`, chaque fournisseur est contraint à répondre par un objet JSON
+    (sortie structurée, voir `STRUCTURED_ANSWER_SCHEMA`).
+
+    Un prompt déjà traité est servi par le cache LLM (LLM_CACHE_ENABLED), sauf dans
+    un bloc `app.llm_cache.bypass()`. Un fournisseur dont le quota est atteint
+    (RATE_LIMIT_ENABLED) est attendu au plus RATE_LIMIT_MAX_WAIT secondes, sinon sauté.
+
     Retourne la chaîne textuelle de la réponse, ou `None` en cas d'erreur.
     """
-    global _all_llms_failed
+    cached = _cached_llm_response(prompt, json_output)
+    if cached:
+        return cached
     
     # ⭐ PRIORITÉ 1 : Essayer Gemini (GRATUIT)
-    if GENAI_AVAILABLE:
+    if GENAI_AVAILABLE and _admit("Gemini", gemini_breaker):
         logger.debug("Tentative Gemini (priorité 1)...")
-        result = _call_gemini_direct(prompt)
+        start = time.perf_counter()
+        result = _call_gemini_direct(prompt, json_output)
+        elapsed = time.perf_counter() - start
         if result:
+            _latency("Gemini").observe(elapsed)
             logger.info("Gemini a répondu")
+            gemini_breaker.record_success(elapsed)
+            _cache_llm_response("Gemini", prompt, json_output, result)
             return result
+        gemini_breaker.record_failure(elapsed)
         logger.info("Gemini échoué, fallback vers Grok...")
     
     # Priorité 2 : Essayer Grok
-    if GROK_AVAILABLE:
+    if GROK_AVAILABLE and _admit("Grok", grok_breaker):
         logger.debug("Tentative Grok (priorité 2)...")
-        result = _call_grok(prompt, max_tokens=150)
+        start = time.perf_counter()
+        result = _call_grok(prompt, max_tokens=150, json_output=json_output)
+        elapsed = time.perf_counter() - start
         if result:
+            _latency("Grok").observe(elapsed)
             logger.info("Grok a répondu")
+            grok_breaker.record_success(elapsed)
+            _cache_llm_response("Grok", prompt, json_output, result)
             return result
+        grok_breaker.record_failure(elapsed)
         logger.info("Grok échoué, fallback vers OpenAI...")
     
     # Priorité 3 : Essayer OpenAI (économique mais payant)
-    if OPENAI_AVAILABLE:
+    if OPENAI_AVAILABLE and _admit("OpenAI", openai_breaker):
         logger.debug("Tentative OpenAI (priorité 3)...")
-        result = _call_openai(prompt, max_tokens=200)
+        start = time.perf_counter()
+        result = _call_openai(prompt, max_tokens=200, json_output=json_output)
+        elapsed = time.perf_counter() - start
         if result:
+            _latency("OpenAI").observe(elapsed)
             logger.info("OpenAI a répondu")
+            openai_breaker.record_success(elapsed)
+            _cache_llm_response("OpenAI", prompt, json_output, result)
             return result
+        openai_breaker.record_failure(elapsed)
         logger.info("OpenAI échoué, aucun LLM disponible")
     
-    # Tous les LLM ont échoué - setter le flag pour éviter de les rappeler
+    # Tous les LLM ont échoué (ou ont leur disjoncteur ouvert)
     logger.debug("Tous les LLM ont échoué, retour None")
-    _all_llms_failed = True
     return None
 
-def _call_gemini_direct(prompt: str) -> Optional[str]:
+GEMINI_MODEL = "gemini-2.5-flash"
+# Timeout d'un appel LLM, réduit au temps restant de la requête (app.deadline)
+LLM_TIMEOUT = 30
+# Modèle et longueur maximale de sortie par fournisseur (clés du cache LLM)
+PROVIDER_MODELS = {"Gemini": (GEMINI_MODEL, 1024), "Grok": ("grok-beta", 150), "OpenAI": ("gpt-4o-mini", 200)}
+# Clé d'API par fournisseur (les quotas sont comptés par clé)
+PROVIDER_KEYS = {"Gemini": API_KEY, "Grok": GROK_API_KEY, "OpenAI": OPENAI_API_KEY}
+
+
+def _gemini_request(prompt: str, json_output: bool = False, stream: bool = False) -> tuple:
+    """URL, corps et en-têtes d'un appel generateContent (streamGenerateContent en SSE)."""
+    if stream:
+        url = f"{GEMINI_API_BASE}/v1beta/models/{GEMINI_MODEL}:streamGenerateContent?alt=sse"
+    else:
+        url = f"{GEMINI_API_BASE}/v1beta/models/{GEMINI_MODEL}:generateContent"
+    payload = {
+        "contents": [{
+            "parts": [{"text": prompt}]
+        }],
+        "generationConfig": {
+            "temperature": 0.3,
+            "maxOutputTokens": 1024,
+        }
+    }
+    if json_output:
+        payload["generationConfig"]["responseMimeType"] = "application/json"
+        payload["generationConfig"]["responseSchema"] = STRUCTURED_ANSWER_SCHEMA
+    return url, payload, {"x-goog-api-key": API_KEY}
+
+
+def _gemini_result(prompt: str, response) -> Optional[str]:
+    """Texte d'une réponse generateContent (httpx, sync ou async), avec trace Langfuse."""
+    if response.status_code != 200:
+        logger.error(f"Gemini API error {response.status_code}: {response.text[:200]}")
+        return None
+    
+    data = response.json()
+    
+    # Extraction du texte de la réponse
+    if 'candidates' not in data or not data['candidates']:
+        logger.warning("Réponse Gemini vide ou malformée")
+        return None
+    
+    result = data['candidates'][0]['content']['parts'][0]['text'].strip()
+    logger.debug(f"Réponse Gemini: {result[:100]}...")
+    _trace_gemini(prompt, result, data.get('usageMetadata', {}))
+    return result
+
+
+def _trace_gemini(prompt: str, result: str, usage: dict):
+    """Trace Langfuse d'une réponse Gemini (complète ou reçue en flux), envoyée en arrière-plan."""
+    input_tokens = usage.get('promptTokenCount', 0)
+    output_tokens = usage.get('candidatesTokenCount', 0)
+    logger.info(f"Tokens: {input_tokens} input, {output_tokens} output")
+    record_generation("Gemini", GEMINI_MODEL, prompt, result, input_tokens=input_tokens,
+                      output_tokens=output_tokens, max_tokens=1024)
+
+
+def _gemini_error(prompt: str, error: Exception):
+    logger.error(f"Erreur lors de l'appel Gemini : {str(error)[:200]}")
+    record_error("Gemini", GEMINI_MODEL, prompt, error)
+
+
+def _call_gemini_direct(prompt: str, json_output: bool = False) -> Optional[str]:
     """Appel direct à Gemini via API REST (plus stable que le SDK).
     
     Returns:
@@ -301,79 +526,338 @@ def _call_gemini_direct(prompt: str) -> Optional[str]:
         return None
     
     try:
-        import requests
-        import json
-        
-        url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-flash:generateContent?key={API_KEY}"
-        
-        payload = {
-            "contents": [{
-                "parts": [{"text": prompt}]
-            }],
-            "generationConfig": {
-                "temperature": 0.3,
-                "maxOutputTokens": 1024,
-            }
-        }
-        
+        url, payload, headers = _gemini_request(prompt, json_output)
         logger.debug(f"Appel Gemini API REST avec prompt: {prompt[:50]}...")
-        response = requests.post(url, json=payload, timeout=30)
-        
-        if response.status_code != 200:
-            logger.error(f"Gemini API error {response.status_code}: {response.text[:200]}")
-            return None
-        
-        data = response.json()
-        
-        # Extraction du texte de la réponse
-        if 'candidates' not in data or not data['candidates']:
-            logger.warning("Réponse Gemini vide ou malformée")
-            return None
-        
-        result = data['candidates'][0]['content']['parts'][0]['text'].strip()
-        logger.debug(f"Réponse Gemini: {result[:100]}...")
-        
-        # Track dans Langfuse 3.7+ (méthode simple avec create_event)
-        if LANGFUSE_AVAILABLE:
-            try:
-                usage = data.get('usageMetadata', {})
-                input_tokens = usage.get('promptTokenCount', 0)
-                output_tokens = usage.get('candidatesTokenCount', 0)
-                
-                logger.info(f"Tokens: {input_tokens} input, {output_tokens} output")
-                
-                # Créer un événement simple
-                langfuse_client.create_event(
-                    name="gemini_response",
-                    metadata={
-                        "model": "gemini-2.5-flash",
-                        "temperature": 0.3,
-                        "max_tokens": 1024,
-                        "cost_usd": 0.0,  # Free tier
-                        "tokens_input": input_tokens,
-                        "tokens_output": output_tokens,
-                        "tokens_total": usage.get('totalTokenCount', input_tokens + output_tokens)
-                    },
-                    input=prompt[:500],
-                    output=result[:500]
-                )
-            except Exception as trace_error:
-                logger.debug(f"Langfuse trace skipped: {trace_error}")
-        
+        # Client partagé : connexion TLS réutilisée d'un appel à l'autre (keep-alive)
+        response = get_http_client().post(url, json=payload, headers=headers, timeout=deadline_timeout(LLM_TIMEOUT))
+        return _gemini_result(prompt, response)
+    except Exception as e:
+        _gemini_error(prompt, e)
+        return None
+
+
+# -------------------------
+# Chaîne de fournisseurs asynchrone
+# -------------------------
+# Les handlers Chainlit sont des coroutines : un appel LLM bloquant y fige la boucle
+# d'événements, donc toutes les conversations du worker. Les versions *_async ci-dessous
+# suivent le même ordre (Gemini → Grok → OpenAI) sans bloquer la boucle.
+
+async def _call_gemini_direct_async(prompt: str, json_output: bool = False) -> Optional[str]:
+    """Version asynchrone de `_call_gemini_direct` (httpx.AsyncClient partagé)."""
+    if not GENAI_AVAILABLE or not API_KEY:
+        return None
+    
+    try:
+        url, payload, headers = _gemini_request(prompt, json_output)
+        response = await get_async_http_client().post(url, json=payload, headers=headers,
+                                                      timeout=deadline_timeout(LLM_TIMEOUT))
+        return _gemini_result(prompt, response)
+    except Exception as e:
+        _gemini_error(prompt, e)
+        return None
+
+
+async def _chat_completion_async(client, name: str, model: str, prompt: str, max_tokens: int,
+                                 json_output: bool = False) -> Optional[str]:
+    """Appel chat.completions d'un client AsyncOpenAI (Grok, OpenAI), ou None."""
+    if client is None:
+        return None
+    try:
+        response = await client.chat.completions.create(
+            model=model,
+            messages=[{"role": "user", "content": prompt}],
+            max_tokens=max_tokens,
+            temperature=0.3,
+            timeout=deadline_timeout(LLM_TIMEOUT),
+            **_json_response_format(json_output),
+        )
+        result = response.choices[0].message.content.strip()
+        _trace_chat_completion(name, model, prompt, result, getattr(response, "usage", None), max_tokens)
         return result
     except Exception as e:
-        error_msg = str(e)
-        logger.error(f"Erreur lors de l'appel Gemini : {error_msg[:200]}")
-        if LANGFUSE_AVAILABLE:
-            try:
-                langfuse_client.event(
-                    name="gemini_call_error",
-                    metadata={"model": "gemini-2.5-flash", "error": error_msg[:500]},
-                    input=prompt[:200]
-                )
-            except:
-                pass
+        logger.error(f"Erreur {name} : {e}")
+        record_error(name, model, prompt, e)
+        return None
+
+
+async def _call_grok_async(prompt: str, max_tokens: int = 150, json_output: bool = False) -> Optional[str]:
+    """Version asynchrone de `_call_grok`."""
+    if not GROK_AVAILABLE:
+        return None
+    return await _chat_completion_async(_get_grok_async_client(), "Grok", "grok-beta", prompt, max_tokens,
+                                        json_output)
+
+
+async def _call_openai_async(prompt: str, max_tokens: int = 200, json_output: bool = False) -> Optional[str]:
+    """Version asynchrone de `_call_openai`."""
+    if not OPENAI_AVAILABLE:
+        return None
+    return await _chat_completion_async(_get_openai_async_client(), "OpenAI", "gpt-4o-mini", prompt, max_tokens,
+                                        json_output)
+
+
+def _async_chain(prompt: str, json_output: bool = False) -> list:
+    """Fournisseurs configurés, par ordre de priorité : (nom, disjoncteur, appel).
+
+    Le disjoncteur n'est consulté qu'au moment de lancer l'appel (un essai en
+    semi-ouverture ne doit pas être réservé pour un fournisseur jamais appelé).
+    """
+    def cached(name, call):
+        # Réponse mise en cache dès réception (un perdant annulé n'écrit rien)
+        async def run():
+            result = await call()
+            await _cache_llm_response_async(name, prompt, json_output, result)
+            return result
+        return run
+
+    chain = (
+        ("Gemini", GENAI_AVAILABLE, gemini_breaker, lambda: _call_gemini_direct_async(prompt, json_output)),
+        ("Grok", GROK_AVAILABLE, grok_breaker, lambda: _call_grok_async(prompt, 150, json_output)),
+        ("OpenAI", OPENAI_AVAILABLE, openai_breaker, lambda: _call_openai_async(prompt, 200, json_output)),
+    )
+    return [(name, breaker, cached(name, call)) for name, configured, breaker, call in chain if configured]
+
+
+async def _timed_call(name: str, breaker: CircuitBreaker, call, delay: float = 0.0) -> Optional[str]:
+    """Appel d'un fournisseur (après `delay`, attente de quota), avec latence et
+    résultat reportés au disjoncteur."""
+    try:
+        if delay:
+            await asyncio.sleep(delay)
+        start = time.perf_counter()
+        result = await call()
+    except asyncio.CancelledError:
+        # Perdant d'un appel couvert : ni succès ni échec
+        breaker.release()
+        raise
+    elapsed = time.perf_counter() - start
+    if result:
+        _latency(name).observe(elapsed)
+        breaker.record_success(elapsed)
+    else:
+        breaker.record_failure(elapsed)
+    return result
+
+
+async def _run_sequential(chain: list) -> Optional[str]:
+    for name, breaker, call in chain:
+        delay = await _admit_async(name, breaker)
+        if delay is None:
+            continue
+        result = await _timed_call(name, breaker, call, delay)
+        if result:
+            logger.info(f"{name} a répondu")
+            return result
+        logger.info(f"{name} échoué, fournisseur suivant...")
+    return None
+
+
+async def _run_hedged(chain: list) -> Optional[str]:
+    """Appels couverts : le fournisseur suivant part si le précédent tarde ou échoue."""
+    remaining = list(chain)
+    pending: Dict[asyncio.Task, str] = {}
+
+    async def launch() -> Optional[str]:
+        while remaining:
+            name, breaker, call = remaining.pop(0)
+            delay = await _admit_async(name, breaker)
+            if delay is not None:
+                pending[asyncio.ensure_future(_timed_call(name, breaker, call, delay))] = name
+                return name
+        return None
+
+    newest = await launch()
+    try:
+        while pending:
+            timeout = hedge_delay(newest) if remaining else None
+            done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                following = await launch()
+                if following:
+                    logger.info(f"{newest} sans réponse après {timeout:.2f}s, appel couvert par {following}")
+                    newest = following
+                continue
+            for task in done:
+                name = pending.pop(task)
+                result = task.result()
+                if result:
+                    logger.info(f"{name} a répondu")
+                    return result
+                logger.info(f"{name} échoué")
+            # Un échec libère sa place : le fournisseur suivant part tout de suite
+            newest = await launch() or newest
         return None
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+async def _call_gemini_async(prompt: str, json_output: bool = False) -> Optional[str]:
+    """Version asynchrone de `_call_gemini` : même ordre de priorité, mêmes disjoncteurs.
+
+    Avec LLM_HEDGING=true, un fournisseur lent est couvert par le suivant (voir
+    `hedge_delay`) au lieu d'attendre son timeout de 30 s.
+    """
+    cached = await _cached_llm_response_async(prompt, json_output)
+    if cached:
+        return cached
+    
+    chain = _async_chain(prompt, json_output)
+    result = await (_run_hedged(chain) if LLM_HEDGING else _run_sequential(chain))
+    if result:
+        return result
+    
+    logger.debug("Tous les LLM ont échoué, retour None")
+    return None
+
+
+# -------------------------
+# Réponses en flux (streaming)
+# -------------------------
+# Les tokens sont transmis à l'interface dès leur arrivée au lieu d'attendre la
+# réponse complète. Le temps jusqu'au premier token est exporté par fournisseur
+# (llm_ttft_seconds).
+
+async def _stream_gemini_async(prompt: str):
+    """Texte de Gemini au fil de l'eau (streamGenerateContent, Server-Sent Events)."""
+    url, payload, headers = _gemini_request(prompt, stream=True)
+    parts, usage = [], {}
+    async with get_async_http_client().stream("POST", url, json=payload, headers=headers,
+                                              timeout=deadline_timeout(LLM_TIMEOUT)) as response:
+        if response.status_code != 200:
+            body = await response.aread()
+            raise RuntimeError(f"Gemini API error {response.status_code}: {body[:200]!r}")
+        async for line in response.aiter_lines():
+            if not line.startswith("data:"):
+                continue
+            data = json.loads(line[5:])
+            usage = data.get("usageMetadata", usage)
+            for candidate in data.get("candidates", [])[:1]:
+                for part in candidate.get("content", {}).get("parts", []):
+                    if part.get("text"):
+                        parts.append(part["text"])
+                        yield part["text"]
+    _trace_gemini(prompt, "".join(parts), usage)
+
+
+async def _stream_chat_completion_async(client, name: str, model: str, prompt: str, max_tokens: int):
+    """Texte d'un client AsyncOpenAI (Grok, OpenAI) au fil de l'eau."""
+    if client is None:
+        raise RuntimeError("client indisponible")
+    stream = await client.chat.completions.create(
+        model=model,
+        messages=[{"role": "user", "content": prompt}],
+        max_tokens=max_tokens,
+        temperature=0.3,
+        stream=True,
+        stream_options={"include_usage": True},
+        timeout=deadline_timeout(LLM_TIMEOUT),
+    )
+    parts, usage = [], None
+    async for chunk in stream:
+        usage = getattr(chunk, "usage", None) or usage
+        if chunk.choices and chunk.choices[0].delta.content:
+            parts.append(chunk.choices[0].delta.content)
+            yield chunk.choices[0].delta.content
+    _trace_chat_completion(name, model, prompt, "".join(parts), usage, max_tokens)
+
+
+def _stream_chain(prompt: str) -> list:
+    """Fournisseurs configurés en flux, par ordre de priorité : (nom, disjoncteur, flux)."""
+    chain = (
+        ("Gemini", GENAI_AVAILABLE, gemini_breaker, lambda: _stream_gemini_async(prompt)),
+        ("Grok", GROK_AVAILABLE, grok_breaker,
+         lambda: _stream_chat_completion_async(_get_grok_async_client(), "Grok", "grok-beta", prompt, 150)),
+        ("OpenAI", OPENAI_AVAILABLE, openai_breaker,
+         lambda: _stream_chat_completion_async(_get_openai_async_client(), "OpenAI", "gpt-4o-mini", prompt, 200)),
+    )
+    return [(name, breaker, stream) for name, configured, breaker, stream in chain if configured]
+
+
+async def _stream_llm(prompt: str):
+    """Tokens du premier fournisseur qui répond (Gemini → Grok → OpenAI).
+
+    Un fournisseur en échec avant son premier token est remplacé par le suivant ;
+    après le premier token, le texte est déjà affiché : l'erreur d'un flux interrompu
+    est propagée. Une réponse du cache LLM est transmise en un seul fragment.
+    """
+    cached = await _cached_llm_response_async(prompt)
+    if cached:
+        yield cached
+        return
+    
+    for name, breaker, stream in _stream_chain(prompt):
+        delay = await _admit_async(name, breaker)
+        if delay is None:
+            continue
+        received = False
+        parts = []
+        try:
+            if delay:
+                await asyncio.sleep(delay)
+            start = time.perf_counter()
+            async for token in stream():
+                parts.append(token)
+                if not received:
+                    ttft = time.perf_counter() - start
+                    histogram("llm_ttft_seconds", provider=name).observe(ttft)
+                    logger.info(f"{name} : premier token après {ttft:.2f}s")
+                    received = True
+                yield token
+        except (asyncio.CancelledError, GeneratorExit):
+            # Flux abandonné par l'appelant : ni succès ni échec
+            breaker.release()
+            raise
+        except Exception as e:
+            breaker.record_failure(time.perf_counter() - start)
+            if received:
+                logger.error(f"{name} : flux interrompu ({e})")
+                raise
+            logger.info(f"{name} échoué avant le premier token ({e}), fournisseur suivant...")
+            continue
+        elapsed = time.perf_counter() - start
+        if not received:
+            breaker.record_failure(elapsed)
+            logger.info(f"{name} : flux vide, fournisseur suivant...")
+            continue
+        _latency(name).observe(elapsed)
+        breaker.record_success(elapsed)
+        await _cache_llm_response_async(name, prompt, False, "".join(parts).strip())
+        return
+
+
+# Informations personnelles : motifs compilés une fois. Un message ne passe par les
+# motifs que s'il contient l'un des déclencheurs, absents de la grande majorité des
+# messages (questions sur les formations, les inscriptions...).
+_QUESTION_WORDS = ('comment', 'qui', 'quoi', 'quel', 'quelle', 'où', 'pourquoi', 'quand')
+_NAME = r"([A-ZÀ-Ÿa-zéèêàâîôûç]+(?:\s+[A-ZÀ-Ÿa-zéèêàâîôûç]+)?)"
+# "je m'appelle X" ou "mon nom est X" (première lettre majuscule ou pas, on normalise après)
+_NAME_RES = (
+    re.compile(r"(?:je m['']appelle|retiens que je m['']appelle)\s+" + _NAME, re.IGNORECASE),
+    re.compile(r"mon nom (?:est|c'est)\s+" + _NAME, re.IGNORECASE),
+)
+# "je suis un/une X" (genre, profil, etc.)
+_PROFILE_RE = re.compile(r"je suis (?:un|une)\s+(.+?)(?:\.|$|,)")
+# "mon email est X" ou "mon adresse est X"
+_EMAIL_RE = re.compile(r"mon (?:email|e-mail|adresse|mail) (?:est|c'est)\s+([a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,})")
+# "mon téléphone/numéro est X"
+_PHONE_RE = re.compile(r"mon (?:téléphone|numéro|tel) (?:est|c'est)\s+([+]?[0-9\s]+)")
+# Chaque motif ci-dessus contient l'un de ces déclencheurs (message en minuscules)
+_PERSONAL_INFO_TRIGGER_RE = re.compile(r"appelle|mon nom |je suis un|mon (?:email|e-mail|adresse|mail|téléphone|numéro|tel) ")
+# Questions sur les informations mémorisées (voir `_answer_personal_question`)
+_PERSONAL_QUESTION_TRIGGERS = {
+    'name': ("je m'appelle", "mon nom", "comment je", "qui suis-je", "appelle comment"),
+    'profile': ("qui suis-je", "je suis qui", "mon profil", "c'est quoi mon profil"),
+    'email': ("email", "e-mail", "adresse mail"),
+    'phone': ("téléphone", "numéro", "tel"),
+}
+_PERSONAL_QUESTION_RES = {
+    topic: re.compile("|".join(re.escape(p) for p in phrases)) for topic, phrases in _PERSONAL_QUESTION_TRIGGERS.items()
+}
+_PERSONAL_QUESTION_TRIGGER_RE = re.compile(
+    "|".join(re.escape(p) for phrases in _PERSONAL_QUESTION_TRIGGERS.values() for p in phrases)
+)
 
 
 def _extract_personal_info(question: str) -> dict:
@@ -382,65 +866,59 @@ def _extract_personal_info(question: str) -> dict:
     Returns:
         dict: {entity_type: value} ex: {'name': 'Maliki'}
     """
-    import re
     entities = {}
     q_lower = question.lower().strip()
     
-    # Ignorer les questions (ne pas extraire de nom)
-    question_words = ['comment', 'qui', 'quoi', 'quel', 'quelle', 'où', 'pourquoi', 'quand']
-    if any(q_lower.startswith(word) for word in question_words):
+    # Pré-filtre : aucun déclencheur, aucun motif ne peut correspondre
+    if not _PERSONAL_INFO_TRIGGER_RE.search(q_lower):
         return entities
     
-    # Pattern : "je m'appelle X" ou "mon nom est X"
-    # Capturer le nom (première lettre majuscule ou pas, on normalisera après)
-    name_patterns = [
-        r"(?:je m['']appelle|retiens que je m['']appelle)\s+([A-ZÀ-Ÿa-zéèêàâîôûç]+(?:\s+[A-ZÀ-Ÿa-zéèêàâîôûç]+)?)",
-        r"mon nom (?:est|c'est)\s+([A-ZÀ-Ÿa-zéèêàâîôûç]+(?:\s+[A-ZÀ-Ÿa-zéèêàâîôûç]+)?)",
-    ]
+    # Ignorer les questions (ne pas extraire de nom)
+    if q_lower.startswith(_QUESTION_WORDS):
+        return entities
     
-    for pattern in name_patterns:
-        match = re.search(pattern, question, re.IGNORECASE)
+    for pattern in _NAME_RES:
+        match = pattern.search(question)
         if match:
             name = match.group(1).strip()
             # Vérifier que ce n'est pas un mot de question
-            if name.lower() not in question_words:
+            if name.lower() not in _QUESTION_WORDS:
                 # Capitaliser le nom proprement
                 entities['name'] = ' '.join(word.capitalize() for word in name.split())
                 break
-    # Pattern : "je suis un/une X" (genre, profil, etc.)
-    profile_pattern = r"je suis (?:un|une)\s+(.+?)(?:\.|$|,)"
-    profile_match = re.search(profile_pattern, q_lower)
+    profile_match = _PROFILE_RE.search(q_lower)
     if profile_match:
         entities['profile'] = profile_match.group(1).strip()
     
-    # Pattern email : "mon email est X" ou "mon adresse est X"
-    email_pattern = r"mon (?:email|e-mail|adresse|mail) (?:est|c'est)\s+([a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,})"
-    email_match = re.search(email_pattern, q_lower)
+    email_match = _EMAIL_RE.search(q_lower)
     if email_match:
         entities['email'] = email_match.group(1)
     
-    # Pattern téléphone : "mon téléphone/numéro est X"
-    phone_pattern = r"mon (?:téléphone|numéro|tel) (?:est|c'est)\s+([+]?[0-9\s]+)"
-    phone_match = re.search(phone_pattern, q_lower)
+    phone_match = _PHONE_RE.search(q_lower)
     if phone_match:
         entities['phone'] = phone_match.group(1).strip()
     
     return entities
 
 
+def _asks_personal_info(question: str) -> bool:
+    """Vrai si `_answer_personal_question` peut répondre (évite de charger les entités)."""
+    return _PERSONAL_QUESTION_TRIGGER_RE.search(question.lower()) is not None
+
+
 def _answer_personal_question(question: str, entities: dict) -> str:
     """Répond aux questions personnelles en utilisant les entités stockées."""
     q_lower = question.lower().strip()
     
     # Questions sur le nom
-    if any(phrase in q_lower for phrase in ["je m'appelle", "mon nom", "comment je", "qui suis-je", "appelle comment"]):
+    if _PERSONAL_QUESTION_RES['name'].search(q_lower):
         if 'name' in entities:
             return f"Vous vous appelez **{entities['name']}**."
         else:
             return "Je ne connais pas encore votre nom. Vous pouvez me le dire en disant 'Je m'appelle [votre nom]'."
     
     # Questions sur le profil
-    if any(phrase in q_lower for phrase in ["qui suis-je", "je suis qui", "mon profil", "c'est quoi mon profil"]):
+    if _PERSONAL_QUESTION_RES['profile'].search(q_lower):
         if 'profile' in entities:
             response = f"Vous êtes **{entities['profile']}**."
             if 'name' in entities:
@@ -448,14 +926,14 @@ def _answer_personal_question(question: str, entities: dict) -> str:
             return response
     
     # Questions sur l'email
-    if any(word in q_lower for word in ["email", "e-mail", "adresse mail"]):
+    if _PERSONAL_QUESTION_RES['email'].search(q_lower):
         if 'email' in entities:
             return f"Votre email est **{entities['email']}**."
         else:
             return "Je ne connais pas votre email."
     
     # Questions sur le téléphone
-    if any(word in q_lower for word in ["téléphone", "numéro", "tel"]):
+    if _PERSONAL_QUESTION_RES['phone'].search(q_lower):
         if 'phone' in entities:
             return f"Votre numéro est **{entities['phone']}**."
         else:
@@ -464,7 +942,7 @@ def _answer_personal_question(question: str, entities: dict) -> str:
     return None
 
 def _detect_inappropriate_content(question: str) -> Optional[str]:
-    """Détecte les comparaisons, insultes et propos interdits.
+    """Détecte les comparaisons, insultes et propos interdits (règles de `app.guardrails`).
     
     Args:
         question: La question de l'utilisateur
@@ -472,200 +950,287 @@ def _detect_inappropriate_content(question: str) -> Optional[str]:
     Returns:
         Un message de refus poli si contenu inapproprié détecté, None sinon
     """
-    q_lower = question.lower().strip()
-    
-    # 1. Détection des comparaisons avec d'autres établissements
-    comparison_patterns = [
-        # Comparaisons directes
-        r'imt.*(?:meilleur|mieux|supérieur|plus|vs|versus|contre).*(?:esp|ucad|ept|enstp|polytechnique|autre|école)',
-        r'(?:esp|ucad|ept|enstp|polytechnique|autre|école).*(?:meilleur|mieux|supérieur|plus|vs|versus|contre).*imt',
-        r'compar.*(?:imt|école)',
-        # Questions "quelle école est..."
-        r'quelle.*école.*(?:meilleur|mieux|nul|mauvais)',
-        r'(?:esp|ucad|ept|enstp).*(?:ou|vs).*imt',
-        # Expressions négatives comparatives
-        r'imt.*(?:pas|moins|pire).*(?:esp|ucad|ept|enstp)',
-    ]
-    
-    for pattern in comparison_patterns:
-        if re.search(pattern, q_lower, re.IGNORECASE):
-            logger.warning(f"Comparaison détectée : {question[:50]}...")
-            return (
-                "**IMT Dakar - Politique de neutralité**\n\n"
-                "Je ne peux pas comparer l'Institut Mines-Télécom Dakar avec d'autres établissements. "
-                "Chaque école a ses propres atouts et spécificités.\n\n"
-                "**Je peux vous informer sur :**\n"
-                "• Les programmes et formations de l'IMT Dakar\n"
-                "• Les admissions et modalités d'inscription\n"
-                "• Les infrastructures et services disponibles\n"
-                "• Les contacts de l'administration\n\n"
-                "Comment puis-je vous aider à mieux connaître l'IMT Dakar ?"
-            )
-    
-    # 2. Détection des insultes et dénigrement
-    insult_keywords = [
-        # Insultes directes (avec espaces pour éviter faux positifs)
-        ' nul ', ' nulle ', ' nul.', ' nulle.', ' nul!', ' nulle!', ' nul?', ' nulle?',
-        ' pourri ', ' pourrie ', ' merde ', ' con ', ' connard ', ' idiot ', ' débile ',
-        ' stupide ', ' crétin ', ' imbécile ', ' abruti ', ' incompétent ',
-        # Expressions avec "est"
-        ' est nul', ' est nulle', ' est pourri', ' est pourrie',
-        "c'est nul", "c'est nulle", "c'est pourri",
-        "vous êtes nul", "tu es nul",
-        # Expressions négatives fortes
-        'école de merde', 'pire école', 'mauvaise école', ' zéro ',
-        # Dénigrement ciblé
-        'imt nul', 'professeur nul', 'formation nulle', 'formation pourrie',
-        'arnaque', 'escroquerie', 'foutaise',
-    ]
-    
-    for keyword in insult_keywords:
-        if keyword in q_lower:
-            logger.warning(f"Insulte/dénigrement détecté : {question[:50]}...")
-            return (
-                "**Message important**\n\n"
-                "Je ne peux pas répondre à ce type de message. "
-                "Je suis ici pour vous aider de manière constructive et respectueuse.\n\n"
-                "**Je suis à votre disposition pour :**\n"
-                "• Répondre à vos questions sur l'IMT Dakar\n"
-                "• Vous orienter vers les bons interlocuteurs\n"
-                "• Vous fournir des informations fiables\n\n"
-                "Reformulez votre demande de manière respectueuse, je serai ravi de vous aider !"
-            )
-    
-    # 3. Détection de propos offensants généraux
-    offensive_patterns = [
-        r'ferme.*(?:ta gueule|bouche)',
-        r'va te faire',
-        r'\btg\b',  # "ta gueule" en abrégé
-        r'\bftg\b',  # "ferme ta gueule"
-        r'\bntm\b',  # insulte courante
-        r'fils de',
-        r'pd\b',
-        r'salope',
-        r'pute',
-    ]
-    
-    for pattern in offensive_patterns:
-        if re.search(pattern, q_lower, re.IGNORECASE):
-            logger.warning(f"Propos offensant détecté : {question[:50]}...")
-            return (
-                "**Contenu inapproprié**\n\n"
-                "Je ne peux pas répondre à ce type de message. "
-                "Restons dans un échange respectueux et constructif.\n\n"
-                "Je suis un assistant virtuel conçu pour vous aider avec des informations sur l'IMT Dakar. "
-                "Reformulez votre question de manière polie et je serai heureux de vous assister."
-            )
-    
-    return None
+    found = detect_guardrail(question)
+    if found is None:
+        return None
+    category, rule = found
+    counter("guardrail_refusals_total", category=category).inc()
+    logger.warning(f"Contenu refusé ({category}/{rule}) : {question[:50]}...")
+    return GUARDRAIL_REFUSALS[category]
 
-def agent(question: str, history: list = None, memory_manager=None, session_id: str = None) -> str:
-    """Fonction principale de l'agent.
+def _prepare_question(question: str, memory_manager=None, session_id: str = None) -> tuple:
+    """Étapes locales de l'agent (sans LLM), communes aux versions sync et async.
 
-    - Construit un prompt simple demandant `SEARCH` ou `EMAIL`.
-    - Tente d'obtenir la décision via Gemini (_call_gemini).
-    - Si échec, applique une heuristique de mots-clés.
-    - Exécute ensuite l'outil approprié et retourne son résultat.
+    Returns:
+        (réponse immédiate ou None, question enrichie)
     """
     if not question or not question.strip():
         logger.warning("Question vide reçue")
-        return "Désolé, je n'ai pas compris votre question. Pouvez-vous reformuler ?"
+        return "Désolé, je n'ai pas compris votre question. Pouvez-vous reformuler ?", question
     
     # 1. Vérifier les comparaisons, insultes et propos interdits
-    inappropriate_response = _detect_inappropriate_content(question)
+    with stage("guardrail"):
+        inappropriate_response = _detect_inappropriate_content(question)
     if inappropriate_response:
-        return inappropriate_response
+        return inappropriate_response, question
     
     # 2. Extraire et stocker les informations personnelles
     if memory_manager and session_id:
         personal_info = _extract_personal_info(question)
         if personal_info:
-            for entity_type, value in personal_info.items():
-                memory_manager.set_entity(session_id, entity_type, value)
-                logger.info(f"Entité stockée : {entity_type} = {value}")
+            with stage("memory"):
+                for entity_type, value in personal_info.items():
+                    memory_manager.set_entity(session_id, entity_type, value)
+                    logger.info(f"Entité stockée : {entity_type} = {value}")
             
             # Répondre à la confirmation
             if 'name' in personal_info:
-                return f"Enchanté **{personal_info['name']}** ! Je vais me souvenir de votre nom."
+                return f"Enchanté **{personal_info['name']}** ! Je vais me souvenir de votre nom.", question
             elif 'profile' in personal_info:
-                return f"J'ai bien noté : vous êtes **{personal_info['profile']}**."
+                return f"J'ai bien noté : vous êtes **{personal_info['profile']}**.", question
             elif 'email' in personal_info:
-                return f"J'ai bien noté votre email : **{personal_info['email']}**"
+                return f"J'ai bien noté votre email : **{personal_info['email']}**", question
             elif 'phone' in personal_info:
-                return f"J'ai bien noté votre numéro : **{personal_info['phone']}**"
+                return f"J'ai bien noté votre numéro : **{personal_info['phone']}**", question
     
-    # 3. Vérifier si c'est une question personnelle
-    if memory_manager and session_id:
-        entities = memory_manager.get_all_entities(session_id)
+    # 3. Coordonnées de l'école (téléphone, email, adresse) : réponse directe depuis la
+    #    table des contacts, sans recherche ni LLM
+    with stage("search"):
+        contact_answer = lookup_contact(question)
+    if contact_answer:
+        return contact_answer, question
+    
+    # 4. Vérifier si c'est une question personnelle (entités chargées seulement si
+    #    le message en a l'air)
+    if memory_manager and session_id and _asks_personal_info(question):
+        with stage("memory"):
+            entities = memory_manager.get_all_entities(session_id)
         personal_answer = _answer_personal_question(question, entities)
         if personal_answer:
-            return personal_answer
+            return personal_answer, question
     
     logger.info(f"Question reçue : {question}")
     
-    # 4. Enrichir les questions courtes avec le contexte de la conversation
+    # 5. Enrichir les questions courtes avec le contexte de la conversation
     enriched_question = question
     if memory_manager and session_id and len(question.split()) <= 3:
-        recent_history = _get_recent_history(memory_manager, session_id, limit=2)
+        with stage("memory"):
+            recent_history = _get_recent_history(memory_manager, session_id, limit=2)
         last_context = _extract_user_context(recent_history)
         if last_context:
             enriched_question = f"{last_context}. {question}"
             logger.info(f"Question enrichie: {enriched_question}")
     
-    try:
-        prompt = (
-            "Tu es un agent pour l'IMT. Réponds UNIQUEMENT par SEARCH ou EMAIL.\n"
-            f"Question : {enriched_question}\n"
-        )
+    return None, enriched_question
 
-        decision = _call_gemini(prompt)
-
-        # Si LLM absent ou problème, heuristique simple basée sur mots-clés
-        if not decision:
-            logger.info("Utilisation du fallback heuristique")
-            q = enriched_question.lower()
-            # Mots-clés enrichis pour EMAIL
-            email_keywords = [
-                "directeur", "email", "envoyer", "envoye", "envoi", 
-                "contact", "contacter", "écrire", "message", "demande officielle"
-            ]
-            if any(k in q for k in email_keywords):
-                decision = "EMAIL"
-            else:
-                decision = "SEARCH"
 
-        decision = decision.strip().upper()
-        logger.info(f"Décision prise : {decision}")
+def _decision_prompt(enriched_question: str) -> str:
+    return (
+        "Tu es un agent pour l'IMT. Réponds UNIQUEMENT par SEARCH ou EMAIL.\n"
+        f"Question : {enriched_question}\n"
+    )
 
-        if "EMAIL" in decision:
-            # Appel de l'outil d'envoi d'email
-            logger.info("Exécution : Envoi d'email")
-            
-            # Extraire le sujet et le message avec les nouvelles regex améliorées
-            import re
-            subject_match = re.search(r'(?:avec|pour)\s+(?:comme\s+)?(?:pour\s+)?objet\s+["\']([^"\']+)["\']', question, re.IGNORECASE)
-            subject = subject_match.group(1) if subject_match else "Demande d'informations"
-            
-            # Extraire le vrai message si format "envoie un mail avec message X"
-            message_match = re.search(r'(?:disant que|avec (?:comme )?message|message)\s+["\']?([^"\']+?)["\']\s*(?:avec|pour|$)', question, re.IGNORECASE)
-            if not message_match:
-                message_match = re.search(r'(?:disant que|message[\s:]+)(.+?)(?:\s+avec|\s+pour|$)', question, re.IGNORECASE)
-            
-            content = message_match.group(1).strip() if message_match else question
+
+def classify_intent(question: str) -> Optional[str]:
+    """Intention (SEARCH, EMAIL, FORM, SMALLTALK) du classifieur local, ou None s'il est
+    absent ou peu sûr."""
+    intent, confidence = classify(question, intent_classifier)
+    if intent:
+        logger.info(f"Intention locale : {intent} ({confidence:.2f})")
+    elif intent_classifier is not None:
+        logger.info(f"Classifieur peu sûr ({confidence:.2f}) - décision déléguée")
+    counter("intent_decisions_total", source="classifier" if intent else "fallback").inc()
+    return intent
+
+
+def _resolve_decision(decision: Optional[str], enriched_question: str) -> str:
+    """Décision du LLM normalisée, ou heuristique de mots-clés si le LLM n'a pas répondu."""
+    # Si LLM absent ou problème, heuristique de mots-clés (partagée avec chainlit_app)
+    if not decision:
+        logger.info("Utilisation du fallback heuristique")
+        decision = keyword_intent(enriched_question)
+
+    decision = decision.strip().upper()
+    # Le formulaire web n'est rempli que par chainlit_app : l'agent l'envoie par email
+    if decision == "FORM":
+        decision = "EMAIL"
+    logger.info(f"Décision prise : {decision}")
+    return decision
+
+
+def smalltalk_answer(question: str) -> str:
+    """Réponse aux salutations et remerciements, sans recherche ni LLM."""
+    q = question.lower()
+    if "merci" in q:
+        return "Avec plaisir ! N'hésitez pas si vous avez d'autres questions sur l'IMT Dakar."
+    if any(k in q for k in ("au revoir", "bonne journée", "bonne soirée", "bonne nuit", "bye", "à bientôt", "à plus")):
+        return "Au revoir et à bientôt ! Bonne continuation dans votre projet de formation."
+    return (
+        "Bonjour ! Je suis l'assistant virtuel de l'IMT Dakar. Je peux vous renseigner sur les "
+        "formations, les admissions et les frais, ou transmettre un message à l'école."
+    )
+
+
+def _email_fields(question: str) -> tuple:
+    """Sujet et contenu de l'email demandé dans la question."""
+    # Extraire le sujet et le message avec les nouvelles regex améliorées
+    subject_match = re.search(r'(?:avec|pour)\s+(?:comme\s+)?(?:pour\s+)?objet\s+["\']([^"\']+)["\']', question, re.IGNORECASE)
+    subject = subject_match.group(1) if subject_match else "Demande d'informations"
+    
+    # Extraire le vrai message si format "envoie un mail avec message X"
+    message_match = re.search(r'(?:disant que|avec (?:comme )?message|message)\s+["\']?([^"\']+?)["\']\s*(?:avec|pour|$)', question, re.IGNORECASE)
+    if not message_match:
+        message_match = re.search(r'(?:disant que|message[\s:]+)(.+?)(?:\s+avec|\s+pour|$)', question, re.IGNORECASE)
+    
+    content = message_match.group(1).strip() if message_match else question
+    
+    # Nettoyer le contenu (enlever "avec pour objet..." s'il y est)
+    content = re.sub(r'\s*avec\s+pour\s+objet.+$', '', content, flags=re.IGNORECASE)
+    return subject, content
+
+
+def _single_call_outcome(response: Optional[str], enriched_question: str, context: str) -> tuple:
+    """(décision, réponse) tirées de la sortie JSON du mode single.
+
+    Sortie absente ou illisible : heuristique locale et réponse extractive, sans
+    rappeler le LLM.
+    """
+    parsed = _parse_structured_answer(response)
+    if parsed is None:
+        if response:
+            logger.warning(f"Sortie structurée illisible : {response[:100]}")
+        decision = _resolve_decision(None, enriched_question)
+        intent, answer = decision, ""
+    else:
+        intent, answer = parsed
+        decision = _resolve_decision(intent, enriched_question)
+    if "EMAIL" in decision or decision == "SMALLTALK":
+        return decision, None
+    if not answer:
+        answer = _extractive_answer(_pack_context(context)) if context and context.strip() else EMPTY_CONTEXT_ANSWER
+    return decision, answer
+
+
+def agent(question: str, history: list = None, memory_manager=None, session_id: str = None,
+          deadline=None) -> str:
+    """Fonction principale de l'agent.
+
+    - Décide entre `SEARCH` et `EMAIL` par le classifieur local ; s'il est peu sûr,
+      selon AGENT_ROUTING_MODE : appel LLM dédié (llm), même appel que la réponse
+      (single) ou heuristique locale (local).
+    - Si le LLM ne répond pas, applique une heuristique de mots-clés.
+    - Exécute ensuite l'outil approprié et retourne son résultat.
+
+    `deadline` (secondes ou `app.deadline.Deadline`, défaut REQUEST_DEADLINE_SECONDS)
+    borne la requête entière : chaque étape prend son timeout dans le temps restant,
+    et les appels LLM sont sautés (heuristique, réponse extractive) s'il n'en reste
+    plus assez.
+    """
+    with request_deadline(deadline):
+        immediate, enriched_question = _prepare_question(question, memory_manager, session_id)
+        if immediate:
+            return immediate
+        
+        try:
+            raw_context, answer = None, None
+            intent = classify_intent(question)
+            if intent:
+                decision = _resolve_decision(intent, enriched_question)
+            elif AGENT_ROUTING_MODE == "single" and _llms_enabled():
+                # Un seul aller-retour : la recherche (locale) précède l'appel
+                with stage("search"):
+                    raw_context = search_imt(enriched_question)
+                with stage("routing"):
+                    prompt = _single_call_prompt(enriched_question, raw_context)
+                    _record_prompt_tokens(prompt, "single")
+                    response = _call_gemini(prompt, json_output=True)
+                decision, answer = _single_call_outcome(response, enriched_question, raw_context)
+            elif AGENT_ROUTING_MODE == "local":
+                decision = _resolve_decision(None, enriched_question)
+            else:
+                with stage("routing"):
+                    decision = _resolve_decision(_call_gemini(_decision_prompt(enriched_question)), enriched_question)
+
+            if decision == "SMALLTALK":
+                return smalltalk_answer(question)
+            if "EMAIL" in decision:
+                # Appel de l'outil d'envoi d'email
+                logger.info("Exécution : Envoi d'email")
+                subject, content = _email_fields(question)
+                with stage("tool"):
+                    return send_email(subject=subject, content=content)
+            if answer is not None:
+                return answer
             
-            # Nettoyer le contenu (enlever "avec pour objet..." s'il y est)
-            content = re.sub(r'\s*avec\s+pour\s+objet.+$', '', content, flags=re.IGNORECASE)
+            # Par défaut, on appelle la recherche
+            logger.info("Exécution : Recherche IMT")
+            with stage("search"):
+                raw_context = search_imt(enriched_question)
+            with stage("reformulation"):
+                return reformulate_answer(enriched_question, raw_context)
+        
+        except Exception as e:
+            logger.error(f"Erreur critique dans l'agent : {e}", exc_info=True)
+            return "Désolé, une erreur s'est produite. Veuillez réessayer ou reformuler votre question."
+
+
+async def agent_async(question: str, history: list = None, memory_manager=None, session_id: str = None,
+                      on_token=None, deadline=None) -> str:
+    """Version asynchrone de `agent` pour les handlers Chainlit.
+
+    Les appels LLM passent par la chaîne asynchrone ; la recherche, l'envoi d'email et
+    les étapes locales (lectures/écritures Redis de la mémoire) tournent dans un thread,
+    pour ne jamais figer la boucle d'événements.
+    Avec `on_token`, la réponse reformulée est transmise token par token (le mode
+    single, à sortie JSON, n'est pas diffusé en flux). `deadline` : comme `agent`.
+    """
+    with request_deadline(deadline):
+        immediate, enriched_question = await asyncio.to_thread(
+            _prepare_question, question, memory_manager, session_id)
+        if immediate:
+            return immediate
+        
+        try:
+            raw_context, answer = None, None
+            intent = classify_intent(question)
+            if intent:
+                decision = _resolve_decision(intent, enriched_question)
+            elif AGENT_ROUTING_MODE == "single" and _llms_enabled():
+                with stage("search"):
+                    raw_context = await asyncio.to_thread(search_imt, enriched_question)
+                with stage("routing"):
+                    prompt = _single_call_prompt(enriched_question, raw_context)
+                    _record_prompt_tokens(prompt, "single")
+                    response = await _call_gemini_async(prompt, json_output=True)
+                decision, answer = _single_call_outcome(response, enriched_question, raw_context)
+            elif AGENT_ROUTING_MODE == "local":
+                decision = _resolve_decision(None, enriched_question)
+            else:
+                with stage("routing"):
+                    response = await _call_gemini_async(_decision_prompt(enriched_question))
+                decision = _resolve_decision(response, enriched_question)
+
+            if decision == "SMALLTALK":
+                return smalltalk_answer(question)
+            if "EMAIL" in decision:
+                logger.info("Exécution : Envoi d'email")
+                subject, content = _email_fields(question)
+                with stage("tool"):
+                    return await asyncio.to_thread(send_email, subject=subject, content=content)
+            if answer is not None:
+                return answer
             
-            return send_email(subject=subject, content=content)
+            logger.info("Exécution : Recherche IMT")
+            with stage("search"):
+                raw_context = await asyncio.to_thread(search_imt, enriched_question)
+            with stage("reformulation"):
+                if on_token is not None:
+                    return await reformulate_answer_stream(enriched_question, raw_context, on_token)
+                return await reformulate_answer_async(enriched_question, raw_context)
         
-        # Par défaut, on appelle la recherche
-        logger.info("Exécution : Recherche IMT")
-        raw_context = search_imt(enriched_question)
-        return reformulate_answer(enriched_question, raw_context)
-    
-    except Exception as e:
-        logger.error(f"Erreur critique dans l'agent : {e}", exc_info=True)
-        return "Désolé, une erreur s'est produite. Veuillez réessayer ou reformuler votre question."
+        except Exception as e:
+            logger.error(f"Erreur critique dans l'agent : {e}", exc_info=True)
+            return "Désolé, une erreur s'est produite. Veuillez réessayer ou reformuler votre question."
 
 def _deduplicate_lines(text: str) -> str:
     """Supprime les lignes dupliquées consécutives."""  
@@ -703,22 +1268,43 @@ def _extract_user_context(history: List[Any]) -> str:
                 user_msgs.append(msg.split(":", 1)[1].strip())
     return " ".join([m for m in user_msgs if m])
 
-def reformulate_answer(question: str, context: str) -> str:
-    """Reformule la réponse en utilisant Grok/Gemini avec des instructions claires."""
-    global _all_llms_failed
-    
-    if not context or context.strip() == "":
-        logger.warning("Contexte vide pour reformulation")
-        return "Désolé, je n'ai pas trouvé d'information pertinente sur cette question."
-    
-    # Nettoyer le contexte
+def _clean_context(context: str) -> str:
     context = _deduplicate_lines(context.strip())
-    context = context.replace('===', '').replace('[', '').replace(']', '')
-    
-    # Ne PAS essayer les LLMs s'ils ont tous échoué (évite le segfault avec Gemini SDK)
-    if not _all_llms_failed and (GENAI_AVAILABLE or GROK_AVAILABLE or OPENAI_AVAILABLE):
-        try:
-            prompt = f"""Tu es un assistant expert de l'Institut Mines-Télécom (IMT) à Dakar.
+    return context.replace('===', '').replace('[', '').replace(']', '')
+
+
+def _primary_model() -> Optional[str]:
+    providers = _configured_providers()
+    return PROVIDER_MODELS[providers[0]][0] if providers else None
+
+
+def _pack_context(context: str) -> str:
+    """Chunks triés par score et bornés à CONTEXT_TOKEN_BUDGET tokens (app.context_packer)."""
+    return _clean_context(pack_context(context, model=_primary_model()).text)
+
+
+def _record_prompt_tokens(prompt: str, kind: str):
+    """Tokens d'entrée effectivement envoyés au LLM pour cette requête."""
+    tokens = count_tokens(prompt, _primary_model())
+    histogram("llm_prompt_tokens", buckets=TOKEN_BUCKETS, kind=kind).observe(tokens)
+    counter("llm_prompt_tokens_total", kind=kind).inc(tokens)
+
+
+def _llms_enabled() -> bool:
+    # Les fournisseurs en panne sont écartés par leur disjoncteur, pas ici
+    return GENAI_AVAILABLE or GROK_AVAILABLE or OPENAI_AVAILABLE
+
+
+ANSWER_INSTRUCTIONS = """- Réponds en français de manière claire, concise et professionnelle
+- Utilise UNIQUEMENT les informations présentes dans le contexte documentaire
+- Si l'information est absente, ne l'invente pas - oriente vers l'administration
+- Ne mentionne PAS que tu utilises un contexte ou des documents
+- Sois naturel, direct et accueillant comme un conseiller d'études
+- Réponds en phrases complètes et polies"""
+
+
+def _reformulation_prompt(question: str, context: str) -> str:
+    return f"""Tu es un assistant expert de l'Institut Mines-Télécom (IMT) à Dakar.
 
 CONTEXTE DOCUMENTAIRE :
 {context}
@@ -727,22 +1313,51 @@ QUESTION DE L'UTILISATEUR :
 {question}
 
 INSTRUCTIONS IMPORTANTES :
-- Réponds en français de manière claire, concise et professionnelle
-- Utilise UNIQUEMENT les informations présentes dans le contexte documentaire
-- Si l'information est absente, ne l'invente pas - oriente vers l'administration
-- Ne mentionne PAS que tu utilises un contexte ou des documents
-- Sois naturel, direct et accueillant comme un conseiller d'études
-- Réponds en phrases complètes et polies
+{ANSWER_INSTRUCTIONS}
 
 RÉPONSE :"""
-            
-            llm_response = _call_gemini(prompt)
-            if llm_response:
-                return llm_response
-        except Exception as e:
-            logger.debug(f"LLM reformulation failed: {e}")
-    
-    # Fallback intelligent : extraire le meilleur paragraphe du contexte
+
+
+def _single_call_prompt(question: str, context: str) -> str:
+    """Prompt du mode single : intention et réponse dans le même appel (sortie JSON)."""
+    return f"""Tu es un assistant expert de l'Institut Mines-Télécom (IMT) à Dakar.
+
+CONTEXTE DOCUMENTAIRE :
+{_pack_context(context) if context else ""}
+
+MESSAGE DE L'UTILISATEUR :
+{question}
+
+1. INTENTION :
+- EMAIL si l'utilisateur demande d'envoyer un email ou un message à l'IMT ou à l'un de ses responsables
+- SEARCH pour toute autre demande
+
+2. RÉPONSE (si SEARCH ; chaîne vide si EMAIL) :
+{ANSWER_INSTRUCTIONS}
+
+Réponds UNIQUEMENT par un objet JSON : {{"intent": "SEARCH" ou "EMAIL", "answer": "..."}}"""
+
+
+def _parse_structured_answer(text: Optional[str]) -> Optional[tuple]:
+    """(intention, réponse) d'une sortie JSON du mode single, ou None si illisible."""
+    if not text:
+        return None
+    # Certains modèles entourent le JSON d'un bloc ```json ... ```
+    match = re.search(r"\{.*\}", text, re.DOTALL)
+    if not match:
+        return None
+    try:
+        data = json.loads(match.group(0))
+    except ValueError:
+        return None
+    intent = str(data.get("intent", "")).strip().upper() if isinstance(data, dict) else ""
+    if intent not in ("SEARCH", "EMAIL"):
+        return None
+    return intent, str(data.get("answer") or "").strip()
+
+
+def _extractive_answer(context: str) -> str:
+    """Fallback intelligent : extraire le meilleur paragraphe du contexte."""
     logger.info("Utilisation du fallback intelligent (extraction directe)")
     lines = [l.strip() for l in context.split('\n') if l.strip() and len(l.strip()) > 40]
     if lines:
@@ -751,21 +1366,180 @@ RÉPONSE :"""
         return f"D'après nos documents :\n\n{result}\n\nPour plus d'informations, contactez l'administration de l'IMT Dakar."
     return f"Voici ce que j'ai trouvé :\n\n{context[:500]}\n\nPour plus d'informations, contactez l'administration."
 
+
+EMPTY_CONTEXT_ANSWER = "Désolé, je n'ai pas trouvé d'information pertinente sur cette question."
+
+
+def _cache_lookup(question: str, context: str):
+    """Recherche dans le cache sémantique des réponses (None : cache désactivé ou en erreur)."""
+    cache = get_answer_cache()
+    if cache is None:
+        return None
+    try:
+        return cache.lookup(question, context)
+    except Exception as e:
+        logger.warning(f"Cache des réponses indisponible : {e}")
+        return None
+
+
+def _cache_store(lookup, question: str, answer: str):
+    """Garde une réponse du LLM (jamais la réponse extractive de secours)."""
+    cache = get_answer_cache()
+    if cache is not None and lookup is not None:
+        cache.store(lookup, question, answer)
+
+
+def reformulate_answer(question: str, context: str) -> str:
+    """Reformule la réponse en utilisant Grok/Gemini avec des instructions claires."""
+    if not context or context.strip() == "":
+        logger.warning("Contexte vide pour reformulation")
+        return EMPTY_CONTEXT_ANSWER
+    
+    context = _pack_context(context)
+    cached = _cache_lookup(question, context)
+    if cached is not None and cached.answer:
+        return cached.answer
+    
+    if _llms_enabled():
+        try:
+            prompt = _reformulation_prompt(question, context)
+            _record_prompt_tokens(prompt, "reformulation")
+            llm_response = _call_gemini(prompt)
+            if llm_response:
+                _cache_store(cached, question, llm_response)
+                return llm_response
+        except Exception as e:
+            logger.debug(f"LLM reformulation failed: {e}")
+    
+    return _extractive_answer(context)
+
+
+async def reformulate_answer_async(question: str, context: str) -> str:
+    """Version asynchrone de `reformulate_answer`."""
+    if not context or context.strip() == "":
+        logger.warning("Contexte vide pour reformulation")
+        return EMPTY_CONTEXT_ANSWER
+    
+    context = _pack_context(context)
+    # Embedding de la question hors de la boucle d'événements
+    cached = await asyncio.to_thread(_cache_lookup, question, context)
+    if cached is not None and cached.answer:
+        return cached.answer
+    
+    if _llms_enabled():
+        try:
+            prompt = _reformulation_prompt(question, context)
+            _record_prompt_tokens(prompt, "reformulation")
+            llm_response = await _call_gemini_async(prompt)
+            if llm_response:
+                _cache_store(cached, question, llm_response)
+                return llm_response
+        except Exception as e:
+            logger.debug(f"LLM reformulation failed: {e}")
+    
+    return _extractive_answer(context)
+
+async def reformulate_answer_stream(question: str, context: str, on_token) -> str:
+    """Comme `reformulate_answer_async`, en transmettant chaque token à `on_token`
+    (coroutine, p. ex. `cl.Message.stream_token`) dès son arrivée.
+
+    Si aucun fournisseur n'a produit de token, ou si la réponse vient du cache, rien
+    n'a été transmis : l'appelant affiche lui-même la réponse retournée.
+    """
+    if not context or context.strip() == "":
+        logger.warning("Contexte vide pour reformulation")
+        return EMPTY_CONTEXT_ANSWER
+    
+    context = _pack_context(context)
+    cached = await asyncio.to_thread(_cache_lookup, question, context)
+    if cached is not None and cached.answer:
+        return cached.answer
+    
+    if _llms_enabled():
+        tokens, complete = [], False
+        prompt = _reformulation_prompt(question, context)
+        _record_prompt_tokens(prompt, "reformulation")
+        try:
+            async for token in _stream_llm(prompt):
+                tokens.append(token)
+                await on_token(token)
+            complete = True
+        except Exception as e:
+            logger.debug(f"LLM reformulation stream failed: {e}")
+        if tokens:
+            answer = "".join(tokens).strip()
+            # Une réponse tronquée reste affichée mais n'entre pas dans le cache
+            if complete:
+                _cache_store(cached, question, answer)
+            return answer
+    
+    return _extractive_answer(context)
+
 import chainlit as cl
 import uuid
+from chainlit.server import app as chainlit_server
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import cookie_parser
+from app.metrics import register_metrics_route
 from memory.redis_memory import RedisMemory
 from app.mysql_data_layer import MySQLDataLayer
 
-_memory = RedisMemory()
+# Latences et disjoncteurs des fournisseurs LLM (format Prometheus)
+register_metrics_route(chainlit_server)
+
+# Visiteur anonyme : identifiant persistant (cookie) pour que quota et historique de
+# sessions survivent au rechargement de la page (l'id de session Chainlit change à
+# chaque connexion websocket)
+VISITOR_COOKIE = "imt_visitor"
+VISITOR_COOKIE_MAX_AGE = 365 * 24 * 3600
+
+
+async def _visitor_cookie(request, call_next):
+    response = await call_next(request)
+    if VISITOR_COOKIE not in request.cookies:
+        response.set_cookie(VISITOR_COOKIE, uuid.uuid4().hex, max_age=VISITOR_COOKIE_MAX_AGE,
+                            httponly=True, samesite="lax")
+    return response
+
+
+try:
+    chainlit_server.add_middleware(BaseHTTPMiddleware, dispatch=_visitor_cookie)
+except RuntimeError as e:  # application déjà démarrée (rechargement à chaud)
+    logger.warning(f"Cookie visiteur non installé : {e}")
+
+# Connexion Redis ouverte au premier message, pas à l'import
+_memory = None
+
+
+def _get_memory() -> RedisMemory:
+    global _memory
+    if _memory is None:
+        _memory = RedisMemory()
+    return _memory
+
 
 @cl.data_layer
 def get_data_layer():
     return MySQLDataLayer.from_env()
 
+def _memory_user_id():
+    """Locataire des sessions mémoire (quota, mémoire) : l'utilisateur authentifié ou,
+    sans authentification configurée, le visiteur (cookie VISITOR_COOKIE ; à défaut,
+    la connexion Chainlit, qui ne survit pas au rechargement de la page)."""
+    user = cl.user_session.get("user")
+    identifier = getattr(user, "identifier", None)
+    if identifier:
+        return identifier
+    environ = getattr(cl.context.session, "environ", None) or {}
+    visitor_id = cookie_parser(environ.get("HTTP_COOKIE", "")).get(VISITOR_COOKIE) or cl.user_session.get("id")
+    return f"visiteur:{visitor_id}" if visitor_id else None
+
+
 @cl.on_chat_start
 async def _on_chat_start():
+    warm_up_providers()
     session_id = str(uuid.uuid4())
-    _memory.create_session(session_id)
+    await asyncio.to_thread(_get_memory().create_session, session_id, user_id=_memory_user_id())
     cl.user_session.set("session_id", session_id)
     if not os.getenv("DATABASE_URL"):
         await cl.Message(
@@ -779,15 +1553,21 @@ async def _on_chat_start():
 async def _on_message(message: cl.Message):
     user_message = message.content.strip()
     session_id = cl.user_session.get("session_id")
+    memory = _get_memory()
     if not session_id:
         session_id = str(uuid.uuid4())
-        _memory.create_session(session_id)
+        await asyncio.to_thread(memory.create_session, session_id, user_id=_memory_user_id())
         cl.user_session.set("session_id", session_id)
 
-    _memory.add_message(session_id, "user", user_message)
-    response = agent(user_message, memory_manager=_memory, session_id=session_id)
-    _memory.add_message(session_id, "assistant", response)
-    await cl.Message(content=response).send()
+    # Appels Redis bloquants : hors de la boucle d'événements
+    await asyncio.to_thread(memory.add_message, session_id, "user", user_message)
+    # Réponse affichée token par token ; send() termine le flux et la persiste
+    msg = cl.Message(content="")
+    response = await agent_async(user_message, memory_manager=memory, session_id=session_id,
+                                 on_token=msg.stream_token)
+    await asyncio.to_thread(memory.add_message, session_id, "assistant", response)
+    msg.content = response
+    await msg.send()
 
 if __name__ == "__main__":
     print("Agent IMT prêt\n")
@@ -0,0 +1,280 @@
+# app/answer_cache.py
+"""
+Cache sémantique des réponses reformulées par le LLM.
+
+Une bonne part du trafic est faite de paraphrases des mêmes questions, qui paient
+chacune une reformulation complète sur les mêmes passages. Une entrée est indexée par :
+- l'empreinte (SHA-256) du contexte récupéré : une réponse n'est réutilisée que si
+  la recherche a renvoyé exactement les mêmes passages ;
+- l'embedding de la question : la réponse est servie si une question en cache, de
+  même contexte, a une similarité cosinus >= ANSWER_CACHE_THRESHOLD.
+
+Les entrées expirent après ANSWER_CACHE_TTL secondes et tout le cache est vidé quand
+la version d'index publiée (`app.index_store.current_version`) change.
+
+Embeddings : paraphrase-multilingual-MiniLM-L12-v2 (celui de la recherche vectorielle)
+si sentence-transformers est installé, sinon vecteurs creux de mots et trigrammes de
+caractères (Python pur, moins sémantiques : seuil par défaut plus haut).
+
+Statistiques (`app.metrics`) : answer_cache_requests_total{result=hit|miss},
+answer_cache_hit_similarity, answer_cache_invalidations_total. Une fraction
+ANSWER_CACHE_REVIEW_RATE des réponses servies est journalisée dans
+data/answer_cache_review.jsonl pour relecture humaine ; les faux positifs annotés
+s'analysent avec scripts/review_answer_cache.py.
+"""
+import hashlib
+import importlib.util
+import json
+import logging
+import math
+import os
+import random
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Optional
+
+from app import metrics
+from app.index_store import current_version
+from app.intent_classifier import features
+
+logger = logging.getLogger(__name__)
+
+SENTENCE_TRANSFORMERS_AVAILABLE = importlib.util.find_spec("sentence_transformers") is not None
+
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "false").lower() == "true"
+# auto : sentence-transformers si installé, sinon hashed
+ANSWER_CACHE_EMBEDDINGS = os.getenv("ANSWER_CACHE_EMBEDDINGS", "auto").strip().lower()
+ANSWER_CACHE_THRESHOLD = os.getenv("ANSWER_CACHE_THRESHOLD")
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", str(6 * 3600)))
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "2000"))
+ANSWER_CACHE_REVIEW_RATE = float(os.getenv("ANSWER_CACHE_REVIEW_RATE", "0.05"))
+
+DATA_DIR = Path("data")
+REVIEW_FILE = DATA_DIR / "answer_cache_review.jsonl"
+
+EMBEDDING_MODEL_NAME = "paraphrase-multilingual-MiniLM-L12-v2"
+# Seaux de similarité des réponses servies (les faux positifs se concentrent près du seuil)
+SIMILARITY_BUCKETS = (0.8, 0.85, 0.88, 0.9, 0.92, 0.94, 0.96, 0.98, 0.99, 1.0)
+
+
+class HashedEmbedder:
+    """Vecteur creux normalisé de mots, bigrammes et trigrammes de caractères."""
+
+    name = "hashed"
+    # « frais de la formation data » / « ... web » : 0,89 ; seules les quasi-copies passent
+    default_threshold = 0.93
+
+    def embed(self, text: str) -> dict:
+        vector = {f: 1 + math.log(n) for f, n in features(text).items()}
+        norm = math.sqrt(sum(v * v for v in vector.values()))
+        return {f: v / norm for f, v in vector.items()} if norm else {}
+
+    @staticmethod
+    def similarity(a: dict, b: dict) -> float:
+        if len(a) > len(b):
+            a, b = b, a
+        return sum(v * b.get(f, 0.0) for f, v in a.items())
+
+
+class SentenceTransformerEmbedder:
+    """Embeddings denses normalisés (modèle chargé au premier appel)."""
+
+    name = "sentence-transformers"
+    default_threshold = 0.9
+
+    def __init__(self, model_name: str = EMBEDDING_MODEL_NAME):
+        self.model_name = model_name
+        self._model = None
+        self._lock = threading.Lock()
+
+    def embed(self, text: str) -> tuple:
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    from sentence_transformers import SentenceTransformer
+                    logger.info(f"Chargement du modèle d'embeddings du cache ({self.model_name})")
+                    self._model = SentenceTransformer(self.model_name, device="cpu")
+        vector = self._model.encode(text, normalize_embeddings=True, show_progress_bar=False)
+        return tuple(float(x) for x in vector)
+
+    @staticmethod
+    def similarity(a: tuple, b: tuple) -> float:
+        return sum(x * y for x, y in zip(a, b))
+
+
+def make_embedder(kind: str = ANSWER_CACHE_EMBEDDINGS):
+    if kind == "sentence-transformers" or (kind == "auto" and SENTENCE_TRANSFORMERS_AVAILABLE):
+        return SentenceTransformerEmbedder()
+    return HashedEmbedder()
+
+
+class CacheLookup:
+    """Résultat d'une recherche dans le cache, réutilisé par `store` (pas de second embedding)."""
+
+    __slots__ = ("answer", "vector", "context_hash", "similarity", "cached_question")
+
+    def __init__(self, answer, vector, context_hash, similarity=0.0, cached_question=None):
+        self.answer = answer
+        self.vector = vector
+        self.context_hash = context_hash
+        self.similarity = similarity
+        self.cached_question = cached_question
+
+
+class _Entry:
+    __slots__ = ("question", "vector", "answer", "context_hash", "expires_at")
+
+    def __init__(self, question, vector, answer, context_hash, expires_at):
+        self.question = question
+        self.vector = vector
+        self.answer = answer
+        self.context_hash = context_hash
+        self.expires_at = expires_at
+
+
+def context_hash(context: str) -> str:
+    return hashlib.sha256(context.encode("utf-8")).hexdigest()
+
+
+class AnswerCache:
+    """Cache LRU de réponses, sûr entre threads."""
+
+    def __init__(self, embedder=None, threshold: Optional[float] = None, ttl: float = ANSWER_CACHE_TTL,
+                 max_entries: int = ANSWER_CACHE_MAX_ENTRIES, review_rate: float = ANSWER_CACHE_REVIEW_RATE,
+                 review_file: Path = REVIEW_FILE, version_fn: Callable[[], Optional[str]] = current_version,
+                 clock: Callable[[], float] = time.monotonic):
+        self.embedder = embedder or make_embedder()
+        self.threshold = threshold if threshold is not None else self.embedder.default_threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.review_rate = review_rate
+        self.review_file = review_file
+        self.version_fn = version_fn
+        self.clock = clock
+        self._entries: "OrderedDict[int, _Entry]" = OrderedDict()
+        # Empreinte du contexte -> identifiants des entrées (seules candidates d'une recherche)
+        self._by_context = {}
+        self._next_id = 0
+        self._version = version_fn()
+        self._lock = threading.Lock()
+        self._review_lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_context.clear()
+            metrics.gauge("answer_cache_entries").set(0)
+
+    def _check_version(self):
+        version = self.version_fn()
+        if version != self._version:
+            if self._entries:
+                logger.info(f"Index {self._version} -> {version} : cache des réponses vidé ({len(self._entries)})")
+                metrics.counter("answer_cache_invalidations_total").inc()
+            self._entries.clear()
+            self._by_context.clear()
+            self._version = version
+
+    def _remove(self, entry_id: int):
+        entry = self._entries.pop(entry_id)
+        ids = self._by_context[entry.context_hash]
+        ids.discard(entry_id)
+        if not ids:
+            del self._by_context[entry.context_hash]
+
+    def lookup(self, question: str, context: str) -> CacheLookup:
+        """Réponse en cache pour cette question (ou une paraphrase) et ce contexte."""
+        digest = context_hash(context)
+        vector = self.embedder.embed(question)
+        best_id, best = None, -1.0
+        with self._lock:
+            self._check_version()
+            now = self.clock()
+            for entry_id in list(self._by_context.get(digest, ())):
+                entry = self._entries[entry_id]
+                if entry.expires_at <= now:
+                    self._remove(entry_id)
+                    continue
+                similarity = self.embedder.similarity(vector, entry.vector)
+                if similarity > best:
+                    best_id, best = entry_id, similarity
+            if best_id is None or best < self.threshold:
+                metrics.counter("answer_cache_requests_total", result="miss").inc()
+                metrics.gauge("answer_cache_entries").set(len(self._entries))
+                return CacheLookup(None, vector, digest, max(best, 0.0))
+            self._entries.move_to_end(best_id)
+            entry = self._entries[best_id]
+        metrics.counter("answer_cache_requests_total", result="hit").inc()
+        metrics.histogram("answer_cache_hit_similarity", buckets=SIMILARITY_BUCKETS).observe(best)
+        logger.info(f"Réponse servie depuis le cache (similarité {best:.3f} avec « {entry.question[:60]} »)")
+        if self.review_rate and random.random() < self.review_rate:
+            self._sample_for_review(question, entry, best)
+        return CacheLookup(entry.answer, vector, digest, best, entry.question)
+
+    def store(self, lookup: CacheLookup, question: str, answer: str):
+        """Ajoute la réponse produite par le LLM après un `lookup` infructueux."""
+        if not answer or lookup is None or lookup.answer is not None:
+            return
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = _Entry(question, lookup.vector, answer, lookup.context_hash,
+                                             self.clock() + self.ttl)
+            self._by_context.setdefault(lookup.context_hash, set()).add(entry_id)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+            metrics.gauge("answer_cache_entries").set(len(self._entries))
+
+    def _sample_for_review(self, question: str, entry: _Entry, similarity: float):
+        """Journalise une réponse servie pour relecture (champ `correct` à annoter)."""
+        row = {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "question": question,
+            "cached_question": entry.question,
+            "similarity": round(similarity, 4),
+            "embeddings": self.embedder.name,
+            "answer": entry.answer[:500],
+            "correct": None,
+        }
+        try:
+            with self._review_lock, open(self.review_file, "a", encoding="utf-8") as f:
+                f.write(json.dumps(row, ensure_ascii=False) + "\n")
+            metrics.counter("answer_cache_review_samples_total").inc()
+        except OSError as e:
+            logger.warning(f"Échantillon de relecture non écrit : {e}")
+
+    def stats(self) -> dict:
+        hits = metrics.counter("answer_cache_requests_total", result="hit").value
+        misses = metrics.counter("answer_cache_requests_total", result="miss").value
+        total = hits + misses
+        return {
+            "entries": len(self._entries),
+            "hits": int(hits),
+            "misses": int(misses),
+            "hit_rate": hits / total if total else 0.0,
+            "threshold": self.threshold,
+            "embeddings": self.embedder.name,
+        }
+
+
+_cache: Optional[AnswerCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_answer_cache() -> Optional[AnswerCache]:
+    """Cache partagé du processus, ou None si ANSWER_CACHE_ENABLED=false."""
+    global _cache
+    if not ANSWER_CACHE_ENABLED:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                threshold = float(ANSWER_CACHE_THRESHOLD) if ANSWER_CACHE_THRESHOLD else None
+                _cache = AnswerCache(threshold=threshold)
+                logger.info(f"Cache sémantique des réponses : {_cache.embedder.name}, seuil {_cache.threshold}")
+    return _cache
@@ -0,0 +1,152 @@
+# app/chunking.py
+"""
+Découpage des documents en chunks de taille contrôlée (en tokens).
+
+Contrairement au découpage par paragraphes (`split_into_paragraphs`,
+`extract_paragraphs`) qui produit aussi bien des fragments de 30 caractères que des
+murs de texte, ce chunker vise une taille cible en tokens avec recouvrement :
+- un chunk ne traverse jamais un titre de section (le titre est répété en tête) ;
+- les coupures se font entre phrases, jamais au milieu (sauf phrase plus longue que la cible) ;
+- les dernières phrases d'un chunk sont reprises au début du suivant (overlap).
+Chaque chunk porte son nombre de tokens pour que la recherche puisse remplir un
+budget de contexte exact.
+"""
+import re
+from typing import Dict, List
+
+from app.tokens import count_tokens
+
+DEFAULT_TARGET_TOKENS = 96
+DEFAULT_OVERLAP_TOKENS = 16
+# Les chunks plus petits (titres orphelins, boutons...) sont ignorés
+DEFAULT_MIN_TOKENS = 8
+
+# Un titre : bloc court sans ponctuation finale
+HEADING_MAX_CHARS = 90
+HEADING_MAX_WORDS = 12
+_TERMINAL_PUNCT = tuple(".!?:;…»\"”)")
+
+_BLOCK_SPLIT_RE = re.compile(r"\n\s*\n")
+_SENTENCE_SPLIT_RE = re.compile(r"(?<=[.!?…])\s+(?=[A-ZÀ-ÖØ-Þ0-9«\"“(])")
+_SPACES_RE = re.compile(r"\s+")
+
+
+def split_sentences(text: str) -> List[str]:
+    """Découpe un paragraphe en phrases."""
+    text = _SPACES_RE.sub(" ", text).strip()
+    if not text:
+        return []
+    return [s.strip() for s in _SENTENCE_SPLIT_RE.split(text) if s.strip()]
+
+
+def _is_short_line(block: str) -> bool:
+    return (
+        len(block) <= HEADING_MAX_CHARS
+        and len(block.split()) <= HEADING_MAX_WORDS
+        and not block.endswith(_TERMINAL_PUNCT)
+    )
+
+
+def is_heading(blocks: List[str], i: int) -> bool:
+    """Devine si le bloc `i` est un titre de section.
+
+    Un titre est court, sans ponctuation finale, suivi d'un vrai paragraphe et ne
+    termine pas une liste (phrase d'introduction en « : » ou au moins deux lignes
+    courtes juste avant lui).
+    """
+    if not _is_short_line(blocks[i]):
+        return False
+    if i >= 1 and blocks[i - 1].endswith(":"):
+        return False
+    if i + 1 >= len(blocks) or _is_short_line(blocks[i + 1]):
+        return False
+    if i >= 2 and _is_short_line(blocks[i - 1]) and _is_short_line(blocks[i - 2]):
+        return False
+    return True
+
+
+def _split_long_sentence(sentence: str, target_tokens: int) -> List[str]:
+    """Coupe par mots une phrase plus longue que la cible."""
+    pieces, current, current_tokens = [], [], 0
+    for word in sentence.split():
+        word_tokens = count_tokens(word)
+        if current and current_tokens + word_tokens > target_tokens:
+            pieces.append(" ".join(current))
+            current, current_tokens = [], 0
+        current.append(word)
+        current_tokens += word_tokens
+    if current:
+        pieces.append(" ".join(current))
+    return pieces
+
+
+def _sections(text: str) -> List[Dict]:
+    """Regroupe les blocs du texte en sections {heading, sentences}.
+
+    Chaque phrase est un couple (texte, début_de_bloc) pour conserver les retours à la
+    ligne entre paragraphes et éléments de liste.
+    """
+    blocks = [b.strip() for b in _BLOCK_SPLIT_RE.split(text) if b.strip()]
+    sections = [{"heading": None, "sentences": []}]
+    for i, block in enumerate(blocks):
+        if is_heading(blocks, i):
+            sections.append({"heading": _SPACES_RE.sub(" ", block), "sentences": []})
+        else:
+            for j, sentence in enumerate(split_sentences(block)):
+                sections[-1]["sentences"].append((sentence, j == 0))
+    return [s for s in sections if s["sentences"]]
+
+
+def chunk_text(
+    text: str,
+    target_tokens: int = DEFAULT_TARGET_TOKENS,
+    overlap_tokens: int = DEFAULT_OVERLAP_TOKENS,
+    min_tokens: int = DEFAULT_MIN_TOKENS,
+) -> List[Dict]:
+    """Découpe un texte en chunks d'environ `target_tokens` tokens.
+
+    Returns:
+        Liste de {content, tokens, heading}
+    """
+    if overlap_tokens >= target_tokens:
+        raise ValueError("overlap_tokens doit être inférieur à target_tokens")
+
+    chunks = []
+    for section in _sections(text):
+        heading = section["heading"]
+        heading_tokens = count_tokens(heading) if heading else 0
+        budget = max(target_tokens - heading_tokens, 1)
+
+        sentences, block_starts = [], []
+        for sentence, starts_block in section["sentences"]:
+            pieces = _split_long_sentence(sentence, budget) if count_tokens(sentence) > budget else [sentence]
+            for k, piece in enumerate(pieces):
+                sentences.append(piece)
+                block_starts.append(starts_block and k == 0)
+        sizes = [count_tokens(s) for s in sentences]
+
+        start = 0
+        while start < len(sentences):
+            end, used = start, 0
+            while end < len(sentences) and (end == start or used + sizes[end] <= budget):
+                used += sizes[end]
+                end += 1
+
+            body = sentences[start]
+            for i in range(start + 1, end):
+                body += ("\n" if block_starts[i] else " ") + sentences[i]
+            content = f"{heading}\n{body}" if heading else body
+            tokens = count_tokens(content)
+            if tokens >= min_tokens:
+                chunks.append({"content": content, "tokens": tokens, "heading": heading})
+
+            if end >= len(sentences):
+                break
+            # Recouvrement : reprendre les dernières phrases qui tiennent dans l'overlap
+            next_start, carried = end, 0
+            while next_start - 1 > start and carried + sizes[next_start - 1] <= overlap_tokens:
+                next_start -= 1
+                carried += sizes[next_start]
+            start = next_start
+
+    return chunks
@@ -0,0 +1,176 @@
+# app/circuit_breaker.py
+"""
+Disjoncteur (circuit breaker) par fournisseur LLM.
+
+Remplace le verrou global `_all_llms_failed` de `app.agent`, qui coupait tous les LLM
+pour la vie du processus après un seul tour d'échecs, et laissait à l'inverse un
+fournisseur instable être rappelé (timeout complet) à chaque requête.
+
+États :
+- CLOSED : les appels passent ; chaque résultat entre dans une fenêtre glissante.
+  Le disjoncteur s'ouvre si, sur au moins CB_MIN_CALLS appels, le taux d'échecs
+  dépasse CB_FAILURE_RATE ou le taux d'appels lents (> CB_SLOW_CALL_SECONDS)
+  dépasse CB_SLOW_CALL_RATE.
+  Une vérification de `ProviderHealth` en échec (et non expirée) y compte comme
+  un appel en échec ; un appel réussi vaut vérification réussie.
+- OPEN : les appels sont refusés sans attendre. Après CB_OPEN_SECONDS, une sonde
+  (requête légère de `ProviderHealth`, en arrière-plan) vérifie le fournisseur :
+  en échec, le disjoncteur reste ouvert pour une nouvelle période.
+- HALF_OPEN : la sonde a réussi ; un appel réel d'essai passe. Réussi, le disjoncteur
+  se referme (fenêtre remise à zéro) ; en échec, il se rouvre.
+
+L'état est exporté dans `app.metrics` : llm_circuit_state{provider} (0 fermé,
+1 semi-ouvert, 2 ouvert), llm_circuit_transitions_total{provider,state} et
+llm_circuit_rejected_total{provider}.
+"""
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional
+
+from app import metrics
+from app.provider_health import ProviderHealth
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+HALF_OPEN = "half_open"
+OPEN = "open"
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+CB_WINDOW = int(os.getenv("CB_WINDOW", "20"))
+CB_MIN_CALLS = int(os.getenv("CB_MIN_CALLS", "5"))
+CB_FAILURE_RATE = float(os.getenv("CB_FAILURE_RATE", "0.5"))
+CB_SLOW_CALL_SECONDS = float(os.getenv("CB_SLOW_CALL_SECONDS", "10"))
+CB_SLOW_CALL_RATE = float(os.getenv("CB_SLOW_CALL_RATE", "0.8"))
+CB_OPEN_SECONDS = float(os.getenv("CB_OPEN_SECONDS", "30"))
+
+
+class CircuitBreaker:
+    """Disjoncteur d'un fournisseur, sûr entre threads et coroutines."""
+
+    def __init__(self, name: str, health: Optional[ProviderHealth] = None, window: int = CB_WINDOW,
+                 min_calls: int = CB_MIN_CALLS, failure_rate: float = CB_FAILURE_RATE,
+                 slow_call_seconds: float = CB_SLOW_CALL_SECONDS, slow_call_rate: float = CB_SLOW_CALL_RATE,
+                 open_seconds: float = CB_OPEN_SECONDS):
+        self.name = name
+        # Sonde du fournisseur (sans sonde : essai réel dès la fin de la période ouverte)
+        self.health = health
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_call_rate = slow_call_rate
+        self.open_seconds = open_seconds
+        # Fenêtre glissante : (échec, lent) par appel
+        self._calls = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+        # Horodatage de la dernière vérification en échec déjà comptée
+        self._probe_counted_at = 0.0
+        self._set_state(CLOSED, reason=None)
+
+    def _set_state(self, state: str, reason: Optional[str]):
+        previous, self.state = self.state, state
+        metrics.gauge("llm_circuit_state", provider=self.name).set(STATE_VALUES[state])
+        if reason is None:
+            return
+        metrics.counter("llm_circuit_transitions_total", provider=self.name, state=state).inc()
+        log = logger.info if state != OPEN else logger.warning
+        log(f"Disjoncteur {self.name} : {previous} -> {state} ({reason})")
+
+    def _open(self, reason: str):
+        self.opened_at = time.monotonic()
+        self._trial_in_flight = False
+        self._set_state(OPEN, reason)
+
+    def _probe_result(self) -> Optional[bool]:
+        """Résultat de la sonde lancée après la période ouverte (None : en attente)."""
+        probe_from = self.opened_at + self.open_seconds
+        if self.health.checked_at >= probe_from and self.health.available is not None:
+            return self.health.available
+        self.health.refresh_async()
+        return None
+
+    def allow_request(self) -> bool:
+        """True si un appel peut partir maintenant (ne bloque jamais)."""
+        with self._lock:
+            if self.state == CLOSED:
+                # Vérification en échec encore valide (FAILURE_TTL) : comptée une fois
+                # dans la fenêtre comme un appel en échec, sans ouvrir à elle seule
+                if (self.health is not None and self.health.recent_failure()
+                        and self.health.checked_at > self._probe_counted_at):
+                    self._probe_counted_at = self.health.checked_at
+                    self._record(True, 0.0)
+                if self.state == CLOSED:
+                    return True
+                return self._reject()
+            if self.state == OPEN:
+                if time.monotonic() - self.opened_at < self.open_seconds:
+                    return self._reject()
+                if self.health is not None:
+                    probe = self._probe_result()
+                    if probe is None:
+                        return self._reject()
+                    if probe is False:
+                        self._open("sonde en échec")
+                        return self._reject()
+                self._set_state(HALF_OPEN, "sonde réussie" if self.health else "fin de la période ouverte")
+            # HALF_OPEN : un seul appel d'essai à la fois
+            if self._trial_in_flight:
+                return self._reject()
+            self._trial_in_flight = True
+            return True
+
+    def _reject(self) -> bool:
+        metrics.counter("llm_circuit_rejected_total", provider=self.name).inc()
+        return False
+
+    def record_success(self, duration: float = 0.0):
+        if self.health is not None:
+            self.health.mark_success()
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._calls.clear()
+                self._trial_in_flight = False
+                self._set_state(CLOSED, "appel d'essai réussi")
+                return
+            self._record(False, duration)
+
+    def record_failure(self, duration: float = 0.0):
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._open("appel d'essai échoué")
+                return
+            self._record(True, duration)
+
+    def release(self):
+        """Appel abandonné (annulé) : ni succès ni échec, libère l'essai éventuel."""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def _record(self, failed: bool, duration: float):
+        if self.state != CLOSED:
+            return
+        self._calls.append((failed, duration >= self.slow_call_seconds))
+        if len(self._calls) < self.min_calls:
+            return
+        total = len(self._calls)
+        failures = sum(1 for f, _ in self._calls if f)
+        slow = sum(1 for _, s in self._calls if s)
+        if failures / total >= self.failure_rate:
+            self._open(f"{failures}/{total} échecs")
+        elif slow / total >= self.slow_call_rate:
+            self._open(f"{slow}/{total} appels > {self.slow_call_seconds:g}s")
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {
+                "state": self.state,
+                "calls": len(self._calls),
+                "failures": sum(1 for f, _ in self._calls if f),
+                "slow_calls": sum(1 for _, s in self._calls if s),
+            }
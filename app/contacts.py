@@ -0,0 +1,193 @@
+# app/contacts.py
+"""
+Table des coordonnées de l'IMT Dakar (téléphones, emails, adresses).
+
+Le scraping repère emails, téléphones et adresses dans chaque page, mais les
+aplatissait en lignes de texte bruitées (noms d'images « logo@2x.png »,
+identifiants numériques pris pour des numéros...). Ce module les valide, les
+normalise et les dédoublonne dans une table typée, avec les pages d'origine :
+
+    data/contact_entities.json
+    [{"type": "phone", "value": "+221774959685", "display": "+221 77 495 96 85",
+      "sources": ["contact"]}, ...]
+
+La table est écrite au scraping (scripts/scrape_imt.py, scripts/ingest_pipeline.py)
+et lue par `app.tools.lookup_contact` pour répondre sans recherche ni LLM.
+"""
+import json
+import re
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from app.html_extract import ADDRESS_RES, EMAIL_RE, PHONE_RE
+from app.index_store import current_index_dir
+
+DATA_DIR = Path("data")
+CONTACTS_FILE = DATA_DIR / "contact_entities.json"
+
+ENTITY_TYPES = ("phone", "email", "address")
+
+# Extensions de fichiers prises à tort pour des domaines d'email (logo@2x.png)
+FILE_EXTENSIONS = frozenset({
+    "png", "jpg", "jpeg", "gif", "webp", "svg", "ico", "bmp", "avif",
+    "css", "js", "pdf", "zip", "mp4", "mp3", "woff", "woff2", "ttf",
+})
+
+# Plan de numérotation du Sénégal (9 chiffres) : mobiles et fixes Sonatel
+SENEGAL_COUNTRY_CODE = "221"
+SENEGAL_MOBILE_PREFIXES = ("70", "75", "76", "77", "78")
+SENEGAL_LANDLINE_PREFIXES = ("338", "339")
+
+# Phrase décrivant un emplacement : « L'EduLab se situe Avenue Cheikh Anta Diop, ... »
+LOCATION_SENTENCE_RE = re.compile(
+    r"(?i)(?:se\s+(?:situe|trouve)|situ[ée]e?s?|adresse\s*:)\s+(?:à\s+|au\s+|sur\s+)?"
+    r"((?:avenue|rue|boulevard|route|km\s*\d+|immeuble|quartier)[^.\n]{5,120})"
+)
+STRUCTURED_LINE_RE = re.compile(r"^(📧|📞|📍)\s*[^:]*:\s*(.+)$", re.MULTILINE)
+
+
+def normalize_phone(raw: str, require_prefix: bool = False) -> Optional[str]:
+    """Numéro au format E.164 (+221XXXXXXXXX), ou None s'il n'est pas valide.
+
+    Args:
+        raw: Numéro tel qu'extrait de la page
+        require_prefix: N'accepter que les numéros écrits avec l'indicatif +221/00221
+            (les lignes « 📞 » historiques mélangent des identifiants du balisage)
+    """
+    digits = re.sub(r"\D", "", raw)
+    has_prefix = raw.strip().startswith(("+221", "00221"))
+    if has_prefix:
+        digits = digits[len("00221"):] if raw.strip().startswith("00") else digits[len("221"):]
+    elif require_prefix:
+        return None
+    if len(digits) != 9:
+        return None
+    if not digits.startswith(SENEGAL_MOBILE_PREFIXES + SENEGAL_LANDLINE_PREFIXES):
+        return None
+    return f"+{SENEGAL_COUNTRY_CODE}{digits}"
+
+
+def format_phone(value: str) -> str:
+    """+221774959685 -> +221 77 495 96 85"""
+    d = value[len(SENEGAL_COUNTRY_CODE) + 1:]
+    return f"+{SENEGAL_COUNTRY_CODE} {d[:2]} {d[2:5]} {d[5:7]} {d[7:]}"
+
+
+def normalize_email(raw: str) -> Optional[str]:
+    """Email en minuscules, ou None si c'est un nom de fichier (logo@2x.png)."""
+    email = raw.strip().strip(".").lower()
+    if not EMAIL_RE.fullmatch(email):
+        return None
+    if email.rsplit(".", 1)[-1] in FILE_EXTENSIONS:
+        return None
+    return email
+
+
+def normalize_address(raw: str) -> Optional[str]:
+    """Adresse nettoyée (espaces, ponctuation finale), ou None si trop courte."""
+    address = re.sub(r"\s+", " ", raw).strip(" ,;.")
+    if len(address) < 10 or len(address) > 160:
+        return None
+    return address[0].upper() + address[1:]
+
+
+def page_contacts(page: Dict) -> Dict[str, List[str]]:
+    """Champs de contact bruts d'une page analysée par `extract_page` (sérialisables).
+
+    Les phrases de localisation (« se situe Avenue ... ») des blocs s'ajoutent aux adresses.
+    """
+    addresses = list(page.get("addresses", []))
+    for block in page.get("blocks", []):
+        addresses.extend(m.group(1) for m in LOCATION_SENTENCE_RE.finditer(block))
+    return {"emails": list(page.get("emails", [])), "phones": list(page.get("phones", [])),
+            "addresses": addresses}
+
+
+class ContactTable:
+    """Entités de contact dédoublonnées, avec les pages où elles apparaissent."""
+
+    def __init__(self):
+        self._entities: Dict[tuple, Dict] = {}
+
+    def add(self, entity_type: str, value: Optional[str], source: str, display: str = None):
+        if not value:
+            return
+        key = (entity_type, value.lower())
+        entity = self._entities.get(key)
+        if entity is None:
+            entity = {"type": entity_type, "value": value, "display": display or value, "sources": []}
+            self._entities[key] = entity
+        if source not in entity["sources"]:
+            entity["sources"].append(source)
+
+    def add_phone(self, raw: str, source: str, require_prefix: bool = False):
+        value = normalize_phone(raw, require_prefix)
+        self.add("phone", value, source, format_phone(value) if value else None)
+
+    def add_page(self, source: str, emails: Iterable[str] = (), phones: Iterable[str] = (),
+                 addresses: Iterable[str] = ()):
+        """Ajoute les champs extraits d'une page (voir `page_contacts`)."""
+        for raw in emails:
+            self.add("email", normalize_email(raw), source)
+        for raw in phones:
+            self.add_phone(raw, source)
+        for raw in addresses:
+            self.add("address", normalize_address(raw), source)
+
+    def add_text(self, source: str, text: str):
+        """Ajoute les entités d'une page déjà convertie en texte (data/*.txt).
+
+        Les lignes « 📧/📞/📍 » écrites par l'ancien scraper sont relues avec une
+        validation stricte (numéros avec indicatif uniquement) ; le reste du texte est
+        parcouru avec les mêmes motifs que le HTML.
+        """
+        body = STRUCTURED_LINE_RE.sub("", text)
+        for icon, values in STRUCTURED_LINE_RE.findall(text):
+            for raw in values.split(","):
+                if icon == "📧":
+                    self.add("email", normalize_email(raw), source)
+                elif icon == "📞":
+                    self.add_phone(raw, source, require_prefix=True)
+                else:
+                    self.add("address", normalize_address(raw), source)
+        addresses = [m.group(0) for pattern in ADDRESS_RES for m in pattern.finditer(body)]
+        addresses += [m.group(1) for m in LOCATION_SENTENCE_RE.finditer(body)]
+        self.add_page(source, EMAIL_RE.findall(body), PHONE_RE.findall(body), addresses)
+
+    def entities(self) -> List[Dict]:
+        order = {t: i for i, t in enumerate(ENTITY_TYPES)}
+        return sorted(self._entities.values(), key=lambda e: (order[e["type"]], e["value"]))
+
+    def save(self, path: Path = CONTACTS_FILE):
+        path.write_text(json.dumps(self.entities(), ensure_ascii=False, indent=2), encoding="utf-8")
+        return path
+
+
+# Cache de la table : chemin -> ((inode, mtime_ns), entités)
+_cache: Dict[str, tuple] = {}
+
+
+def load_contacts(path: Path = None) -> List[Dict]:
+    """Entités de la version d'index courante, sinon de data/ ([] si absentes).
+
+    Le fichier n'est relu que s'il a changé (un `stat` par appel).
+    """
+    if path is None:
+        version_dir = current_index_dir()
+        path = CONTACTS_FILE
+        if version_dir is not None and (version_dir / CONTACTS_FILE.name).exists():
+            path = version_dir / CONTACTS_FILE.name
+    try:
+        st = path.stat()
+    except OSError:
+        return []
+    stamp = (st.st_ino, st.st_mtime_ns)
+    cached = _cache.get(str(path))
+    if cached and cached[0] == stamp:
+        return cached[1]
+    try:
+        entities = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        entities = []
+    _cache[str(path)] = (stamp, entities)
+    return entities
@@ -0,0 +1,170 @@
+# app/context_packer.py
+"""
+Mise en forme du contexte documentaire sous un budget de tokens.
+
+`search_imt` renvoie ses chunks tels quels (`[Source: ..., Score: ...]` puis le texte,
+séparés par `===`) : sans limite, de longs chunks gonflent les tokens d'entrée et la
+latence du LLM. Le packer :
+- trie les chunks par score et écarte ceux très en dessous du meilleur
+  (CONTEXT_MIN_RELATIVE_SCORE) ;
+- retire les phrases déjà envoyées (recouvrement entre chunks voisins) ;
+- remplit le budget (CONTEXT_TOKEN_BUDGET, en tokens du modèle visé) ; le chunk qui
+  déborde est coupé entre deux phrases s'il reste assez de place, sinon abandonné.
+"""
+import logging
+import os
+import re
+from typing import List, Optional
+
+from app import metrics
+from app.chunking import split_sentences
+from app.tokens import count_tokens
+
+logger = logging.getLogger(__name__)
+
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "800"))
+CONTEXT_MIN_RELATIVE_SCORE = float(os.getenv("CONTEXT_MIN_RELATIVE_SCORE", "0.3"))
+# En dessous, un morceau de chunk coupé n'apporte rien : il est abandonné
+MIN_TRIMMED_TOKENS = int(os.getenv("CONTEXT_MIN_TRIMMED_TOKENS", "24"))
+
+TOKEN_BUCKETS = (50, 100, 200, 400, 800, 1200, 1600, 2400, 3200, 4800)
+
+_SEPARATOR_RE = re.compile(r"\n\s*===\s*\n")
+_HEADER_RE = re.compile(r"^\[Source:\s*(?P<source>[^\]]*?),\s*Score:\s*(?P<score>-?[\d.]+)\]\s*\n?")
+_WORD_RE = re.compile(r"\S+")
+
+
+class Chunk:
+    __slots__ = ("content", "source", "score", "position")
+
+    def __init__(self, content: str, source: Optional[str], score: Optional[float], position: int):
+        self.content = content
+        self.source = source
+        self.score = score
+        self.position = position
+
+
+class PackedContext:
+    """Résultat du packing : texte envoyé au LLM et bilan en tokens."""
+    __slots__ = ("text", "tokens", "retrieved_tokens", "used", "dropped", "trimmed")
+
+    def __init__(self, text: str, tokens: int, retrieved_tokens: int, used: int, dropped: int, trimmed: int):
+        self.text = text
+        self.tokens = tokens
+        self.retrieved_tokens = retrieved_tokens
+        self.used = used
+        self.dropped = dropped
+        self.trimmed = trimmed
+
+
+def parse_context(context: str) -> List[Chunk]:
+    """Chunks d'un contexte `search_imt` ; un texte sans en-têtes donne des chunks sans score."""
+    chunks = []
+    for part in _SEPARATOR_RE.split(context.strip()):
+        part = part.strip().strip("=").strip()
+        if not part:
+            continue
+        match = _HEADER_RE.match(part)
+        if match:
+            chunks.append(Chunk(part[match.end():].strip(), match.group("source").strip(),
+                                float(match.group("score")), len(chunks)))
+        else:
+            chunks.append(Chunk(part, None, None, len(chunks)))
+    return chunks
+
+
+def _normalize(sentence: str) -> str:
+    return " ".join(sentence.lower().split())
+
+
+def _new_sentences(content: str, seen: set) -> List[List[str]]:
+    """Phrases pas encore envoyées, regroupées par ligne (la mise en forme est gardée)."""
+    lines = []
+    for line in content.split("\n"):
+        kept = []
+        for sentence in split_sentences(line):
+            key = _normalize(sentence)
+            if key not in seen:
+                seen.add(key)
+                kept.append(sentence)
+        if kept:
+            lines.append(kept)
+    return lines
+
+
+def _render(lines: List[List[str]]) -> str:
+    return "\n".join(" ".join(line) for line in lines)
+
+
+def _trim(lines: List[List[str]], budget: int, model: Optional[str]) -> str:
+    """Plus long préfixe de phrases tenant dans `budget` ; à défaut, première phrase coupée au mot."""
+    kept: List[List[str]] = []
+    for line in lines:
+        current: List[str] = []
+        kept.append(current)
+        for sentence in line:
+            current.append(sentence)
+            if count_tokens(_render(kept), model) > budget:
+                current.pop()
+                return _render([l for l in kept if l]) or _truncate_words(sentence, budget, model)
+    return _render(kept)
+
+
+def _truncate_words(sentence: str, budget: int, model: Optional[str]) -> str:
+    words = _WORD_RE.findall(sentence)
+    low, high = 0, len(words)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if count_tokens(" ".join(words[:middle]) + " …", model) <= budget:
+            low = middle
+        else:
+            high = middle - 1
+    return " ".join(words[:low]) + " …" if low else ""
+
+
+def pack_context(context: str, budget: int = None, model: Optional[str] = None,
+                 min_relative_score: float = None) -> PackedContext:
+    """Contexte trié par pertinence et borné à `budget` tokens de `model`."""
+    budget = CONTEXT_TOKEN_BUDGET if budget is None else budget
+    min_relative_score = CONTEXT_MIN_RELATIVE_SCORE if min_relative_score is None else min_relative_score
+    chunks = parse_context(context or "")
+    if all(c.score is not None for c in chunks):
+        chunks.sort(key=lambda c: (-c.score, c.position))
+    best = chunks[0].score if chunks else None
+
+    seen: set = set()
+    parts: List[str] = []
+    used_tokens = dropped = trimmed = 0
+    for chunk in chunks:
+        if best is not None and best > 0 and chunk.score is not None and chunk.score < best * min_relative_score:
+            dropped += 1
+            continue
+        lines = _new_sentences(chunk.content, seen)
+        if not lines:
+            dropped += 1
+            continue
+        text = _render(lines)
+        tokens = count_tokens(text, model)
+        remaining = budget - used_tokens
+        if tokens > remaining:
+            text = _trim(lines, remaining, model) if remaining >= MIN_TRIMMED_TOKENS else ""
+            if not text:
+                dropped += 1
+                continue
+            tokens = count_tokens(text, model)
+            trimmed += 1
+        parts.append(text)
+        used_tokens += tokens
+
+    packed_text = "\n\n".join(parts)
+    packed = PackedContext(packed_text, count_tokens(packed_text, model), count_tokens(context or "", model),
+                           len(parts), dropped, trimmed)
+    metrics.histogram("llm_context_tokens", buckets=TOKEN_BUCKETS, stage="retrieved").observe(packed.retrieved_tokens)
+    metrics.histogram("llm_context_tokens", buckets=TOKEN_BUCKETS, stage="packed").observe(packed.tokens)
+    if dropped:
+        metrics.counter("llm_context_chunks_total", outcome="dropped").inc(dropped)
+    if trimmed:
+        metrics.counter("llm_context_chunks_total", outcome="trimmed").inc(trimmed)
+    logger.debug(f"Contexte : {packed.retrieved_tokens} -> {packed.tokens} tokens "
+                 f"({packed.used} chunks, {dropped} écartés, {trimmed} coupés)")
+    return packed
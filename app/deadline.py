@@ -0,0 +1,135 @@
+# app/deadline.py
+"""
+Budget de temps d'une requête, de la réception du message à la réponse.
+
+Les timeouts étaient fixes par appel (30 s pour Gemini, 20 s pour SMTP, 30 s + 10 s
+pour Playwright) et s'additionnaient : un message pouvait attendre plus d'une minute.
+Une requête reçoit désormais une échéance (REQUEST_DEADLINE_SECONDS) ; chaque étape
+(guardrail, memory, routing, search, reformulation, tool) lit le temps restant et en
+tire son timeout, ou saute l'appel LLM (repli extractif) s'il reste moins de
+DEADLINE_MIN_LLM_SECONDS.
+
+L'échéance suit la requête dans un ContextVar (propagé aux tâches asyncio et aux
+threads de `asyncio.to_thread`) : les fonctions appelées en profondeur utilisent
+`timeout(défaut)` sans paramètre supplémentaire. Sans échéance active, `timeout`
+retourne le défaut.
+
+En fin de requête, le temps passé par étape est journalisé et exporté
+(request_stage_seconds{stage}, request_deadline_exceeded_total).
+"""
+import logging
+import os
+import time
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from typing import List, Optional, Tuple, Union
+
+from app import metrics
+
+logger = logging.getLogger(__name__)
+
+# 0 : pas d'échéance
+REQUEST_DEADLINE_SECONDS = float(os.getenv("REQUEST_DEADLINE_SECONDS", "25"))
+# En dessous, un appel LLM n'a plus le temps d'aboutir : repli extractif
+MIN_LLM_SECONDS = float(os.getenv("DEADLINE_MIN_LLM_SECONDS", "2"))
+# Timeout minimal accordé à un appel réseau déjà engagé
+MIN_TIMEOUT = 0.1
+
+
+class Deadline:
+    """Échéance d'une requête et temps passé par étape."""
+
+    def __init__(self, seconds: float = None, clock=time.monotonic):
+        self.clock = clock
+        self.budget = REQUEST_DEADLINE_SECONDS if seconds is None else seconds
+        self.started_at = clock()
+        self.expires_at = self.started_at + self.budget
+        self.stages: List[Tuple[str, float]] = []
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - self.clock())
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def allows(self, seconds: float) -> bool:
+        """Vrai s'il reste au moins `seconds` secondes."""
+        return self.remaining() >= seconds
+
+    def timeout(self, default: float) -> float:
+        """Timeout d'un appel : son défaut, borné par le temps restant."""
+        return max(MIN_TIMEOUT, min(default, self.remaining()))
+
+    @contextmanager
+    def stage(self, name: str):
+        start = self.clock()
+        try:
+            yield
+        finally:
+            elapsed = self.clock() - start
+            self.stages.append((name, elapsed))
+            metrics.histogram("request_stage_seconds", stage=name).observe(elapsed)
+
+    def report(self) -> str:
+        spent = {}
+        for name, elapsed in self.stages:
+            spent[name] = spent.get(name, 0.0) + elapsed
+        parts = ", ".join(f"{name} {elapsed:.2f}s" for name, elapsed in spent.items())
+        return f"{self.clock() - self.started_at:.2f}s sur {self.budget:g}s ({parts or 'aucune étape'})"
+
+
+_current: ContextVar[Optional[Deadline]] = ContextVar("request_deadline", default=None)
+
+
+def current() -> Optional[Deadline]:
+    return _current.get()
+
+
+@contextmanager
+def request_deadline(deadline: Union[Deadline, float, None] = None):
+    """Échéance active pour la requête en cours (secondes, `Deadline`, ou défaut).
+
+    Imbriqué dans une requête qui a déjà son échéance (agent appelé depuis un handler),
+    l'échéance existante est conservée.
+    """
+    active = _current.get()
+    if active is not None:
+        yield active
+        return
+    if not isinstance(deadline, Deadline):
+        deadline = Deadline(deadline)
+    if deadline.budget <= 0:
+        yield deadline
+        return
+    token = _current.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current.reset(token)
+        if deadline.expired():
+            metrics.counter("request_deadline_exceeded_total").inc()
+            logger.warning(f"Échéance dépassée : {deadline.report()}")
+        else:
+            logger.info(f"Budget de la requête : {deadline.report()}")
+
+
+def stage(name: str):
+    """Mesure une étape de la requête en cours (sans échéance active : sans effet)."""
+    deadline = _current.get()
+    return deadline.stage(name) if deadline is not None else nullcontext()
+
+
+def timeout(default: float) -> float:
+    """Timeout à utiliser pour un appel dont le timeout habituel est `default`."""
+    deadline = _current.get()
+    return default if deadline is None else deadline.timeout(default)
+
+
+def allows(seconds: float) -> bool:
+    deadline = _current.get()
+    return deadline is None or deadline.allows(seconds)
+
+
+def remaining() -> Optional[float]:
+    deadline = _current.get()
+    return None if deadline is None else deadline.remaining()
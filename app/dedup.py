@@ -0,0 +1,254 @@
+# app/dedup.py
+"""
+Détection de quasi-doublons de texte.
+
+- SimHash : utilisé par le crawler (`scripts/scrape_imt.py`) pour ne pas stocker deux
+  fois la même page sous des URLs différentes (pages d'archives, pagination, boilerplate).
+- MinHash + LSH : utilisé par `scripts/build_index.py` pour fusionner les chunks
+  quasi-identiques répétés d'un fichier à l'autre.
+"""
+import hashlib
+import random
+import re
+from typing import Dict, Iterable, List, Optional
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+SIMHASH_BITS = 64
+# Distance de Hamming max pour considérer deux textes comme quasi-identiques
+# (deux textes sans rapport sont en moyenne à 32 bits l'un de l'autre)
+SIMHASH_MAX_DISTANCE = 6
+
+
+def _tokens(text: str) -> List[str]:
+    """Mots normalisés (minuscules) d'un texte."""
+    return _WORD_RE.findall(text.lower())
+
+
+def shingles(text: str, size: int = 3) -> List[str]:
+    """Découpe le texte en n-grammes de mots (shingles).
+
+    Un texte plus court que `size` mots donne un unique shingle.
+    """
+    words = _tokens(text)
+    if len(words) <= size:
+        return [" ".join(words)] if words else []
+    return [" ".join(words[i:i + size]) for i in range(len(words) - size + 1)]
+
+
+def _hash64(value: str) -> int:
+    """Hash 64 bits stable entre processus (contrairement à `hash()`)."""
+    return int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def simhash(text: str, shingle_size: int = 3) -> int:
+    """Calcule l'empreinte SimHash 64 bits d'un texte."""
+    weights = [0] * SIMHASH_BITS
+    for shingle in shingles(text, shingle_size):
+        h = _hash64(shingle)
+        for bit in range(SIMHASH_BITS):
+            if h >> bit & 1:
+                weights[bit] += 1
+            else:
+                weights[bit] -= 1
+
+    fingerprint = 0
+    for bit, weight in enumerate(weights):
+        if weight > 0:
+            fingerprint |= 1 << bit
+    return fingerprint
+
+
+def hamming_distance(a: int, b: int) -> int:
+    """Nombre de bits différents entre deux empreintes."""
+    return bin(a ^ b).count("1")
+
+
+class SimHashIndex:
+    """Index d'empreintes SimHash pour retrouver un quasi-doublon sans tout comparer.
+
+    Les 64 bits sont découpés en `max_distance + 1` bandes : deux empreintes à
+    distance <= max_distance ont forcément au moins une bande identique
+    (principe des tiroirs), on ne compare donc que les candidats d'une même bande.
+    """
+
+    def __init__(self, max_distance: int = SIMHASH_MAX_DISTANCE):
+        self.max_distance = max_distance
+        self.num_bands = max_distance + 1
+        self.band_bits = SIMHASH_BITS // self.num_bands
+        self.fingerprints: Dict[str, int] = {}
+        self._buckets: Dict[tuple, List[str]] = {}
+
+    def _bands(self, fingerprint: int) -> Iterable[tuple]:
+        mask = (1 << self.band_bits) - 1
+        for band in range(self.num_bands):
+            yield band, (fingerprint >> (band * self.band_bits)) & mask
+
+    def add(self, key: str, fingerprint: int):
+        """Ajoute une empreinte associée à une clé (URL, id de chunk...)."""
+        if key in self.fingerprints:
+            self.remove(key)
+        self.fingerprints[key] = fingerprint
+        for band in self._bands(fingerprint):
+            self._buckets.setdefault(band, []).append(key)
+
+    def remove(self, key: str):
+        """Retire une clé (page recrawlée dont le contenu a changé)."""
+        fingerprint = self.fingerprints.pop(key, None)
+        if fingerprint is None:
+            return
+        for band in self._bands(fingerprint):
+            bucket = self._buckets.get(band)
+            if bucket and key in bucket:
+                bucket.remove(key)
+
+    def find_near_duplicate(self, fingerprint: int, exclude: Optional[str] = None) -> Optional[str]:
+        """Retourne la clé d'une empreinte proche, ou None."""
+        for band in self._bands(fingerprint):
+            for key in self._buckets.get(band, []):
+                if key == exclude:
+                    continue
+                if hamming_distance(fingerprint, self.fingerprints[key]) <= self.max_distance:
+                    return key
+        return None
+
+    def __len__(self) -> int:
+        return len(self.fingerprints)
+
+
+# =========================================================
+# MinHash + LSH (quasi-doublons entre chunks de l'index)
+# =========================================================
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+MINHASH_PERMUTATIONS = 128
+# 16 bandes de 8 lignes : seuil implicite ~ (1/16)^(1/8) ≈ 0.71 de similarité Jaccard
+LSH_BANDS = 16
+# Similarité Jaccard estimée au-delà de laquelle deux chunks sont fusionnés
+NEAR_DUPLICATE_THRESHOLD = 0.8
+
+
+def char_shingles(text: str, size: int = 5) -> set:
+    """N-grammes de caractères du texte normalisé (robuste pour les textes courts)."""
+    normalized = " ".join(_tokens(text))
+    if len(normalized) <= size:
+        return {normalized} if normalized else set()
+    return {normalized[i:i + size] for i in range(len(normalized) - size + 1)}
+
+
+class MinHasher:
+    """Calcule des signatures MinHash avec des permutations universelles fixes."""
+
+    def __init__(self, num_perm: int = MINHASH_PERMUTATIONS, seed: int = 42):
+        rng = random.Random(seed)
+        self.num_perm = num_perm
+        self._params = [
+            (rng.randint(1, _MERSENNE_PRIME - 1), rng.randint(0, _MERSENNE_PRIME - 1))
+            for _ in range(num_perm)
+        ]
+
+    def signature(self, shingle_set: set) -> List[int]:
+        """Signature MinHash d'un ensemble de shingles."""
+        if not shingle_set:
+            return [_MAX_HASH] * self.num_perm
+        hashes = [_hash64(s) & _MAX_HASH for s in shingle_set]
+        return [
+            min(((a * h + b) % _MERSENNE_PRIME) & _MAX_HASH for h in hashes)
+            for a, b in self._params
+        ]
+
+
+def estimated_jaccard(sig_a: List[int], sig_b: List[int]) -> float:
+    """Similarité Jaccard estimée à partir de deux signatures MinHash."""
+    if not sig_a:
+        return 0.0
+    return sum(1 for a, b in zip(sig_a, sig_b) if a == b) / len(sig_a)
+
+
+class MinHashLSH:
+    """Index LSH par bandes sur des signatures MinHash."""
+
+    def __init__(self, num_perm: int = MINHASH_PERMUTATIONS, bands: int = LSH_BANDS):
+        if num_perm % bands:
+            raise ValueError("num_perm doit être un multiple du nombre de bandes")
+        self.bands = bands
+        self.rows = num_perm // bands
+        self._buckets: Dict[tuple, List[int]] = {}
+
+    def _band_keys(self, signature: List[int]) -> Iterable[tuple]:
+        for band in range(self.bands):
+            yield (band,) + tuple(signature[band * self.rows:(band + 1) * self.rows])
+
+    def insert(self, key: int, signature: List[int]):
+        for band_key in self._band_keys(signature):
+            self._buckets.setdefault(band_key, []).append(key)
+
+    def candidates(self, signature: List[int]) -> List[int]:
+        """Clés partageant au moins une bande (ordre d'insertion, sans doublons)."""
+        seen = set()
+        result = []
+        for band_key in self._band_keys(signature):
+            for key in self._buckets.get(band_key, []):
+                if key not in seen:
+                    seen.add(key)
+                    result.append(key)
+        return sorted(result)
+
+
+class ChunkDeduplicator:
+    """Dédoublonnage incrémental : les chunks arrivent un par un (pipeline en flux).
+
+    `add()` retourne le chunk s'il est nouveau, ou None s'il a été fusionné avec un
+    chunk déjà vu (dont la liste `sources` est alors complétée).
+    """
+
+    def __init__(self, threshold: float = NEAR_DUPLICATE_THRESHOLD, hasher: Optional[MinHasher] = None,
+                 keep_longest: bool = True):
+        self.threshold = threshold
+        self.hasher = hasher or MinHasher()
+        self.keep_longest = keep_longest
+        self.lsh = MinHashLSH(num_perm=self.hasher.num_perm)
+        self.kept: List[Dict] = []
+        self._signatures: List[List[int]] = []
+        self.merged = 0
+
+    def add(self, chunk: Dict) -> Optional[Dict]:
+        signature = self.hasher.signature(char_shingles(chunk["content"]))
+        for idx in self.lsh.candidates(signature):
+            if estimated_jaccard(signature, self._signatures[idx]) >= self.threshold:
+                target = self.kept[idx]
+                if chunk["source"] not in target["sources"]:
+                    target["sources"].append(chunk["source"])
+                if self.keep_longest and len(chunk["content"]) > len(target["content"]):
+                    # Le chunk conservé devient celui-ci (contenu, source, tokens...) ;
+                    # les suivants sont comparés à sa signature, indexée en plus
+                    target.update((k, v) for k, v in chunk.items() if k != "sources")
+                    self._signatures[idx] = signature
+                    self.lsh.insert(idx, signature)
+                self.merged += 1
+                return None
+
+        kept = dict(chunk)
+        kept["sources"] = [chunk["source"]]
+        self.lsh.insert(len(self.kept), signature)
+        self.kept.append(kept)
+        self._signatures.append(signature)
+        return kept
+
+
+def deduplicate_chunks(chunks: List[Dict], threshold: float = NEAR_DUPLICATE_THRESHOLD,
+                       hasher: Optional[MinHasher] = None) -> List[Dict]:
+    """Fusionne les chunks quasi-identiques (tous fichiers confondus).
+
+    Le chunk conservé est le plus long du groupe (il contient le plus d'information),
+    avec son champ `source` ; il reçoit `sources`, la liste ordonnée de tous les
+    fichiers où le texte apparaissait.
+    Les bandes LSH ne remontent fiablement que les paires au-delà de ~0.7 : un
+    `threshold` plus bas ne fusionnera qu'une partie des paires concernées.
+    """
+    dedup = ChunkDeduplicator(threshold=threshold, hasher=hasher)
+    for chunk in chunks:
+        dedup.add(chunk)
+    return dedup.kept
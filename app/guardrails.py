@@ -0,0 +1,174 @@
+# app/guardrails.py
+"""
+Filtre des messages inappropriés (comparaisons, insultes, propos offensants).
+
+Les règles sont compilées une fois, à l'import, en une expression par catégorie :
+- les mots-clés d'une catégorie forment une seule alternative à groupes nommés ;
+- les règles « A.*B.*C » (comparaisons) ne passent plus par `.*`, qui sur un long
+  texte collé (fichier, log) reculait à chaque occurrence de A puis de B (temps
+  cubique) : chaque étape est cherchée à partir de la fin de la précédente, au plus
+  tôt, ce qui donne le même résultat en un passage linéaire par ligne (`.` ne
+  traverse pas les retours à la ligne).
+
+Les catégories sont testées par ordre de priorité (comparaison, insulte, propos
+offensant) et les messages de plus de GUARDRAIL_MAX_CHARS caractères sont refusés
+sans analyse.
+"""
+import os
+import re
+from typing import List, Optional, Sequence, Tuple
+
+GUARDRAIL_MAX_CHARS = int(os.getenv("GUARDRAIL_MAX_CHARS", "4000"))
+
+TOO_LONG = "too_long"
+COMPARISON = "comparison"
+INSULT = "insult"
+OFFENSIVE = "offensive"
+
+_RIVAL = r"(?:esp|ucad|ept|enstp)"
+_OTHER_SCHOOL = r"(?:esp|ucad|ept|enstp|polytechnique|autre|école)"
+_COMPARATIVE = r"(?:meilleur|mieux|supérieur|plus|vs|versus|contre)"
+
+# Suites d'étapes séparées par n'importe quel texte de la même ligne.
+# Aucune alternative d'une étape n'est contenue au milieu d'une autre : la
+# correspondance la plus à gauche est aussi celle qui finit le plus tôt.
+COMPARISON_RULES = {
+    # Comparaisons directes
+    "imt_vs_autre": ("imt", _COMPARATIVE, _OTHER_SCHOOL),
+    "autre_vs_imt": (_OTHER_SCHOOL, _COMPARATIVE, "imt"),
+    "comparaison": ("compar", r"(?:imt|école)"),
+    # Questions "quelle école est..."
+    "quelle_ecole": ("quelle", "école", r"(?:meilleur|mieux|nul|mauvais)"),
+    "rival_ou_imt": (_RIVAL, r"(?:ou|vs)", "imt"),
+    # Expressions négatives comparatives
+    "imt_moins_bien": ("imt", r"(?:pas|moins|pire)", _RIVAL),
+}
+
+INSULT_KEYWORDS = {
+    # Insultes directes (avec espaces pour éviter faux positifs)
+    "insulte": [' nul ', ' nulle ', ' nul.', ' nulle.', ' nul!', ' nulle!', ' nul?', ' nulle?',
+                ' pourri ', ' pourrie ', ' merde ', ' con ', ' connard ', ' idiot ', ' débile ',
+                ' stupide ', ' crétin ', ' imbécile ', ' abruti ', ' incompétent '],
+    # Expressions avec "est"
+    "jugement": [' est nul', ' est nulle', ' est pourri', ' est pourrie',
+                 "c'est nul", "c'est nulle", "c'est pourri", "vous êtes nul", "tu es nul"],
+    # Expressions négatives fortes
+    "negatif": ['école de merde', 'pire école', 'mauvaise école', ' zéro '],
+    # Dénigrement ciblé
+    "denigrement": ['imt nul', 'professeur nul', 'formation nulle', 'formation pourrie',
+                    'arnaque', 'escroquerie', 'foutaise'],
+}
+
+OFFENSIVE_PATTERNS = {
+    "va_te_faire": r"va te faire",
+    "abreviation": r"\btg\b|\bftg\b|\bntm\b",  # "ta gueule", "ferme ta gueule", insulte courante
+    "fils_de": r"fils de",
+    "pd": r"pd\b",
+    "injure": r"salope|pute",
+}
+OFFENSIVE_RULES = {
+    "ferme": ("ferme", r"(?:ta gueule|bouche)"),
+}
+
+REFUSALS = {
+    TOO_LONG: (
+        "**Message trop long**\n\n"
+        f"Votre message dépasse {GUARDRAIL_MAX_CHARS} caractères. "
+        "Posez votre question en quelques phrases et je vous répondrai avec plaisir."
+    ),
+    COMPARISON: (
+        "**IMT Dakar - Politique de neutralité**\n\n"
+        "Je ne peux pas comparer l'Institut Mines-Télécom Dakar avec d'autres établissements. "
+        "Chaque école a ses propres atouts et spécificités.\n\n"
+        "**Je peux vous informer sur :**\n"
+        "• Les programmes et formations de l'IMT Dakar\n"
+        "• Les admissions et modalités d'inscription\n"
+        "• Les infrastructures et services disponibles\n"
+        "• Les contacts de l'administration\n\n"
+        "Comment puis-je vous aider à mieux connaître l'IMT Dakar ?"
+    ),
+    INSULT: (
+        "**Message important**\n\n"
+        "Je ne peux pas répondre à ce type de message. "
+        "Je suis ici pour vous aider de manière constructive et respectueuse.\n\n"
+        "**Je suis à votre disposition pour :**\n"
+        "• Répondre à vos questions sur l'IMT Dakar\n"
+        "• Vous orienter vers les bons interlocuteurs\n"
+        "• Vous fournir des informations fiables\n\n"
+        "Reformulez votre demande de manière respectueuse, je serai ravi de vous aider !"
+    ),
+    OFFENSIVE: (
+        "**Contenu inapproprié**\n\n"
+        "Je ne peux pas répondre à ce type de message. "
+        "Restons dans un échange respectueux et constructif.\n\n"
+        "Je suis un assistant virtuel conçu pour vous aider avec des informations sur l'IMT Dakar. "
+        "Reformulez votre question de manière polie et je serai heureux de vous assister."
+    ),
+}
+
+
+def _named_alternation(patterns: dict) -> "re.Pattern":
+    return re.compile("|".join(f"(?P<{name}>{pattern})" for name, pattern in patterns.items()))
+
+
+def _compile_rules(rules: dict) -> List[Tuple[str, List["re.Pattern"]]]:
+    return [(name, [re.compile(step) for step in steps]) for name, steps in rules.items()]
+
+
+def _match_steps(steps: Sequence["re.Pattern"], line: str) -> bool:
+    """Vrai si les étapes apparaissent dans l'ordre dans `line` (équivaut à `A.*B.*C`)."""
+    pos = 0
+    for step in steps:
+        match = step.search(line, pos)
+        if match is None:
+            return False
+        pos = match.end()
+    return True
+
+
+class GuardrailEngine:
+    """Règles compilées ; `check` retourne (catégorie, règle) ou None."""
+
+    def __init__(self, max_chars: int = GUARDRAIL_MAX_CHARS):
+        self.max_chars = max_chars
+        self.comparison_rules = _compile_rules(COMPARISON_RULES)
+        self.insult_re = _named_alternation(
+            {name: "|".join(re.escape(k) for k in keywords) for name, keywords in INSULT_KEYWORDS.items()}
+        )
+        self.offensive_re = _named_alternation(OFFENSIVE_PATTERNS)
+        self.offensive_rules = _compile_rules(OFFENSIVE_RULES)
+
+    @staticmethod
+    def _sequences(rules, lines: List[str]) -> Optional[str]:
+        for line in lines:
+            for name, steps in rules:
+                if _match_steps(steps, line):
+                    return name
+        return None
+
+    def check(self, text: str) -> Optional[Tuple[str, str]]:
+        if len(text) > self.max_chars:
+            return TOO_LONG, "longueur"
+        text = text.lower().strip()
+        lines = text.split("\n")
+        rule = self._sequences(self.comparison_rules, lines)
+        if rule:
+            return COMPARISON, rule
+        match = self.insult_re.search(text)
+        if match:
+            return INSULT, match.lastgroup
+        match = self.offensive_re.search(text)
+        if match:
+            return OFFENSIVE, match.lastgroup
+        rule = self._sequences(self.offensive_rules, lines)
+        if rule:
+            return OFFENSIVE, rule
+        return None
+
+
+engine = GuardrailEngine()
+
+
+def detect(text: str) -> Optional[Tuple[str, str]]:
+    """(catégorie, règle) du premier motif de refus trouvé dans `text`, ou None."""
+    return engine.check(text)
@@ -0,0 +1,236 @@
+# app/html_extract.py
+"""
+Extraction du contenu des pages HTML du site IMT (scraping et crawl).
+
+L'ancienne extraction (BeautifulSoup + html.parser) construisait l'arbre complet,
+le resérialisait avec `str(soup)` pour chaque regex (emails, téléphones, adresses)
+puis parcourait `find_all` y compris les `span`, dont le texte est déjà contenu
+dans les paragraphes parents.
+
+Ici le document est lu en un seul passage, sans construire d'arbre : le parseur
+(lxml si installé, sinon `html.parser` de la bibliothèque standard) appelle un
+collecteur à chaque balise ouvrante/fermante et à chaque nœud texte. Le collecteur
+accumule en même temps les blocs de texte et le texte visible, sur lequel les
+motifs précompilés (emails, téléphones, adresses) tournent une seule fois.
+"""
+import re
+from html.parser import HTMLParser
+from typing import Dict, List
+
+try:
+    from lxml import etree
+    LXML_AVAILABLE = True
+except ImportError:
+    LXML_AVAILABLE = False
+
+# Blacklist du bruit critique (cookies, captcha, mentions légales...)
+BLACKLIST = [
+    "accepter les cookies", "refuser les cookies", "politique de confidentialité",
+    "google analytics", "google recaptcha", "combien font", "captcha",
+    "pistage dans votre navigateur", "réglages des polices google",
+    "intégrations de vidéo", "page mentions légales", "cookies et paramètres",
+    "nous utilisons des cookies", "bloquer les cookies", "effacer les cookies",
+    "services externes", "google webfonts", "google maps", "hébergeurs de vidéo",
+    "adresse ip", "fai sont susceptibles", "rechargement de la page"
+]
+
+# Éléments parasites dont le contenu est ignoré
+SKIPPED_TAGS = frozenset({"script", "style", "nav", "footer", "header", "aside", "noscript", "template"})
+# Éléments dont le texte forme un bloc
+BLOCK_TAGS = frozenset({"h1", "h2", "h3", "h4", "p", "li", "address"})
+# Les span ne forment un bloc que hors d'un élément bloc (sinon texte en double)
+INLINE_BLOCK_TAGS = frozenset({"span"})
+# Balises sans fermeture (html.parser ne les referme pas)
+VOID_TAGS = frozenset({"br", "img", "hr", "input", "meta", "link", "source", "wbr", "area", "base", "col"})
+
+MIN_BLOCK_CHARS = 10
+MIN_KEPT_CHARS = 15
+
+EMAIL_RE = re.compile(r"[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}")
+PHONE_RE = re.compile(r"(?:\+221|00221)?\s*\d{2}[\s.-]?\d{3}[\s.-]?\d{2}[\s.-]?\d{2}")
+ADDRESS_RES = (
+    re.compile(r"(?i)(rue|avenue|boulevard|route|quartier|zone|immeuble)[^\n]{5,100}(?:dakar|sénégal|senegal)"),
+    re.compile(r"(?i)(?:dakar|sénégal|senegal)[^\n]{5,100}(?:rue|avenue|boulevard|quartier)"),
+)
+_SPACES_RE = re.compile(r"\s+")
+_BLACKLIST_RE = re.compile("|".join(re.escape(word) for word in BLACKLIST))
+
+
+class _Collector:
+    """Reçoit les événements du parseur et accumule blocs et texte visible.
+
+    Interface « target » de lxml (start/end/data/close), réutilisée telle quelle par
+    l'adaptateur html.parser.
+    """
+
+    def __init__(self):
+        self.skip_depth = 0
+        # Pile des éléments ouverts : (balise, index du bloc ou None)
+        self.stack = []
+        # Blocs dans l'ordre des balises ouvrantes (comme find_all) : liste de fragments
+        self.blocks: List[List[str]] = []
+        self.open_blocks: List[int] = []
+        self.visible: List[str] = []
+        # Liens mailto:/tel: du contenu, et href de toutes les ancres (menus compris, pour le crawl)
+        self.links: List[str] = []
+        self.anchors: List[str] = []
+
+    def start(self, tag, attrs):
+        tag = tag.lower() if isinstance(tag, str) else ""
+        if tag in VOID_TAGS:
+            return
+        href = attrs.get("href") if tag == "a" and attrs else None
+        if href and "nofollow" not in (attrs.get("rel") or ""):
+            self.anchors.append(href)
+        if self.skip_depth or tag in SKIPPED_TAGS:
+            self.skip_depth += 1
+            self.stack.append((tag, None))
+            return
+        if href and href.startswith(("mailto:", "tel:")):
+            self.links.append(href.split(":", 1)[1].split("?", 1)[0])
+        block = None
+        if tag in BLOCK_TAGS or (tag in INLINE_BLOCK_TAGS and not self.open_blocks):
+            block = len(self.blocks)
+            self.blocks.append([])
+            self.open_blocks.append(block)
+        self.stack.append((tag, block))
+
+    def end(self, tag):
+        tag = tag.lower() if isinstance(tag, str) else ""
+        if tag in VOID_TAGS or not any(t == tag for t, _ in self.stack):
+            return
+        # Referme aussi les éléments laissés ouverts (HTML mal formé)
+        while self.stack:
+            open_tag, block = self.stack.pop()
+            if self.skip_depth:
+                self.skip_depth -= 1
+            elif block is not None:
+                self.open_blocks.pop()
+            if open_tag == tag:
+                break
+
+    def data(self, text):
+        if self.skip_depth or not text:
+            return
+        self.visible.append(text)
+        for block in self.open_blocks:
+            self.blocks[block].append(text)
+
+    def close(self):
+        return self
+
+
+class _StdlibParser(HTMLParser):
+    """Adaptateur html.parser → _Collector (repli sans lxml)."""
+
+    def __init__(self, collector: _Collector):
+        super().__init__(convert_charrefs=True)
+        self.collector = collector
+
+    def handle_starttag(self, tag, attrs):
+        self.collector.start(tag, dict(attrs))
+
+    def handle_startendtag(self, tag, attrs):
+        self.collector.start(tag, dict(attrs))
+        self.collector.end(tag)
+
+    def handle_endtag(self, tag):
+        self.collector.end(tag)
+
+    def handle_data(self, data):
+        self.collector.data(data)
+
+
+def _collect(html: str, parser: str) -> _Collector:
+    collector = _Collector()
+    if parser == "lxml":
+        lxml_parser = etree.HTMLParser(target=collector, encoding="utf-8", remove_comments=True, remove_pis=True)
+        etree.fromstring(html.encode("utf-8"), lxml_parser)
+    else:
+        stdlib_parser = _StdlibParser(collector)
+        stdlib_parser.feed(html)
+        stdlib_parser.close()
+    return collector
+
+
+def _unique(values) -> List[str]:
+    seen, result = set(), []
+    for value in values:
+        value = value.strip()
+        if value and value not in seen:
+            seen.add(value)
+            result.append(value)
+    return result
+
+
+def extract_structured(text: str, links: List[str] = ()) -> Dict[str, List[str]]:
+    """Emails, téléphones et adresse trouvés dans le texte visible (et les liens mailto:/tel:)."""
+    haystack = text + "\n" + "\n".join(links)
+    addresses = []
+    for pattern in ADDRESS_RES:
+        match = pattern.search(text)
+        if match:
+            addresses.append(match.group(0))
+            break
+    return {
+        "emails": _unique(EMAIL_RE.findall(haystack)),
+        "phones": _unique(PHONE_RE.findall(haystack)),
+        "addresses": addresses,
+    }
+
+
+def extract_page(html: str, parser: str = None) -> Dict:
+    """Analyse une page en un seul passage.
+
+    Args:
+        html: Contenu HTML de la page
+        parser: "lxml" ou "html.parser" (défaut : lxml si disponible)
+
+    Returns:
+        {blocks, emails, phones, addresses, anchors}
+    """
+    parser = parser or ("lxml" if LXML_AVAILABLE else "html.parser")
+    collector = _collect(html, parser)
+
+    blocks = []
+    for fragments in collector.blocks:
+        text = "".join(fragments).strip()
+        if len(text) > MIN_BLOCK_CHARS:
+            blocks.append(text)
+
+    fields = extract_structured("\n".join(collector.visible), collector.links)
+    fields["blocks"] = blocks
+    fields["anchors"] = collector.anchors
+    return fields
+
+
+def is_noise(line: str) -> bool:
+    """Bloc parasite (cookies, captcha...) ou trop court."""
+    return len(line) < MIN_KEPT_CHARS or _BLACKLIST_RE.search(line.lower()) is not None
+
+
+def format_content(page: Dict) -> list:
+    """Données structurées puis blocs de texte uniques d'une page analysée (`extract_page`)."""
+    structured_data = []
+    if page["emails"]:
+        structured_data.append(f"📧 Contact : {', '.join(page['emails'])}")
+    if page["phones"]:
+        structured_data.append(f"📞 Téléphone : {', '.join(page['phones'])}")
+    if page["addresses"]:
+        structured_data.append(f"📍 Adresse : {page['addresses'][0]}")
+
+    unique_blocks, seen = [], set()
+    for block in page["blocks"]:
+        if is_noise(block):
+            continue
+        normalized = _SPACES_RE.sub(" ", block.lower())
+        if normalized not in seen:
+            seen.add(normalized)
+            unique_blocks.append(block)
+
+    return structured_data + unique_blocks
+
+
+def extract_content(html: str, parser: str = None) -> list:
+    """Extrait d'une page HTML les données structurées puis les blocs de texte uniques."""
+    return format_content(extract_page(html, parser))
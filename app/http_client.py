@@ -0,0 +1,114 @@
+# app/http_client.py
+"""
+Client HTTP partagé (keep-alive) pour les appels REST aux LLM.
+
+Un `requests.post` isolé ouvre une nouvelle connexion TCP + TLS à chaque appel ; avec
+deux appels LLM par message utilisateur, la poignée de main TLS vers
+generativelanguage.googleapis.com se payait deux fois par message. Le client
+httpx ci-dessous vit aussi longtemps que le processus et garde ses connexions
+ouvertes (pool borné, HTTP/2 si le paquet `h2` est installé).
+
+Réglages (variables d'environnement) :
+    HTTP_POOL_MAX_CONNECTIONS   connexions simultanées max (défaut 20)
+    HTTP_POOL_MAX_KEEPALIVE     connexions inactives conservées (défaut 10)
+    HTTP_KEEPALIVE_EXPIRY       durée de vie d'une connexion inactive, en s (défaut 60)
+    HTTP_HTTP2                  "false" pour forcer HTTP/1.1
+"""
+import asyncio
+import logging
+import os
+import threading
+import weakref
+from typing import Optional
+
+import httpx
+
+try:
+    import h2  # noqa: F401  (active le support HTTP/2 de httpx)
+    H2_AVAILABLE = True
+except ImportError:
+    H2_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+HTTP_POOL_MAX_CONNECTIONS = int(os.getenv("HTTP_POOL_MAX_CONNECTIONS", "20"))
+HTTP_POOL_MAX_KEEPALIVE = int(os.getenv("HTTP_POOL_MAX_KEEPALIVE", "10"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "60"))
+HTTP_HTTP2 = os.getenv("HTTP_HTTP2", "true").lower() != "false"
+DEFAULT_TIMEOUT = 30.0
+
+_client: Optional[httpx.Client] = None
+_client_lock = threading.Lock()
+# Clients asynchrones : un par boucle d'événements (un pool httpx est lié à sa boucle)
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def pool_limits() -> httpx.Limits:
+    """Limites du pool de connexions (voir les variables HTTP_POOL_*)."""
+    return httpx.Limits(
+        max_connections=HTTP_POOL_MAX_CONNECTIONS,
+        max_keepalive_connections=HTTP_POOL_MAX_KEEPALIVE,
+        keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+    )
+
+
+def build_http_client(verify=True, timeout: float = DEFAULT_TIMEOUT) -> httpx.Client:
+    """Crée un client avec la configuration du pool partagé (utile aux benchmarks)."""
+    return httpx.Client(
+        http2=HTTP_HTTP2 and H2_AVAILABLE,
+        limits=pool_limits(),
+        timeout=timeout,
+        verify=verify,
+    )
+
+
+def build_async_http_client(verify=True, timeout: float = DEFAULT_TIMEOUT) -> httpx.AsyncClient:
+    """Version asynchrone de `build_http_client` (même pool, mêmes réglages)."""
+    return httpx.AsyncClient(
+        http2=HTTP_HTTP2 and H2_AVAILABLE,
+        limits=pool_limits(),
+        timeout=timeout,
+        verify=verify,
+    )
+
+
+def get_http_client() -> httpx.Client:
+    """Client partagé par tout le processus (créé au premier appel, thread-safe)."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = build_http_client()
+                logger.info(
+                    f"Client HTTP partagé créé (HTTP/2 : {'oui' if HTTP_HTTP2 and H2_AVAILABLE else 'non'}, "
+                    f"pool {HTTP_POOL_MAX_CONNECTIONS}/{HTTP_POOL_MAX_KEEPALIVE})"
+                )
+    return _client
+
+
+def close_http_client():
+    """Ferme le client partagé (arrêt du processus, tests)."""
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+            _client = None
+
+
+def get_async_http_client() -> httpx.AsyncClient:
+    """Client asynchrone partagé par les coroutines de la boucle courante."""
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None or client.is_closed:
+        client = build_async_http_client()
+        _async_clients[loop] = client
+    return client
+
+
+async def aclose_async_http_client():
+    """Ferme le client asynchrone de la boucle courante."""
+    client = _async_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
@@ -0,0 +1,120 @@
+# app/index_store.py
+"""
+Stockage versionné des index de recherche.
+
+Chaque exécution de `scripts/ingest_pipeline.py` écrit un répertoire complet
+`data/index/<version>/` (pages nettoyées, chunks.json, faiss.index, embeddings.pkl,
+manifest.json) puis bascule le pointeur `data/index/CURRENT` par un `os.replace`
+atomique. Un lecteur voit donc soit l'ancienne version complète, soit la nouvelle,
+jamais un fichier à moitié écrit.
+
+Sans version publiée, les modules de recherche retombent sur les fichiers
+historiques de `data/` (build_index.py / build_vector_index.py).
+"""
+import json
+import os
+import shutil
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional
+
+DATA_DIR = Path("data")
+INDEX_ROOT = DATA_DIR / "index"
+CURRENT_POINTER = "CURRENT"
+MANIFEST_FILE = "manifest.json"
+PAGES_DIR = "pages"
+
+# Nombre de versions conservées sur disque (la version courante comprise)
+KEEP_VERSIONS = 3
+
+# Cache du pointeur : (chemin, mtime_ns) -> version
+_pointer_cache: Dict[str, tuple] = {}
+
+
+def _pointer_path(root: Path) -> Path:
+    return root / CURRENT_POINTER
+
+
+def current_version(root: Optional[Path] = None) -> Optional[str]:
+    """Version actuellement publiée, ou None.
+
+    Le fichier pointeur n'est relu que si son inode/mtime a changé (chaque publication
+    crée un nouveau fichier) : l'appel coûte un `stat` et peut donc être fait à chaque
+    requête de recherche.
+    """
+    root = root or INDEX_ROOT
+    pointer = _pointer_path(root)
+    try:
+        st = pointer.stat()
+    except OSError:
+        return None
+    stamp = (st.st_ino, st.st_mtime_ns)
+    cached = _pointer_cache.get(str(pointer))
+    if cached and cached[0] == stamp:
+        return cached[1]
+    version = pointer.read_text(encoding="utf-8").strip() or None
+    if version and not (root / version).is_dir():
+        version = None
+    _pointer_cache[str(pointer)] = (stamp, version)
+    return version
+
+
+def current_index_dir(root: Optional[Path] = None) -> Optional[Path]:
+    """Répertoire de la version publiée, ou None."""
+    root = root or INDEX_ROOT
+    version = current_version(root)
+    return root / version if version else None
+
+
+def new_version_dir(root: Optional[Path] = None) -> Path:
+    """Crée un répertoire vide pour une nouvelle version (nom horodaté, unique)."""
+    root = root or INDEX_ROOT
+    root.mkdir(parents=True, exist_ok=True)
+    # Horodatage à la microseconde : l'ordre alphabétique est l'ordre de création
+    version = datetime.now().strftime("v%Y%m%d-%H%M%S-%f")
+    while (root / version).exists():
+        time.sleep(0.000001)
+        version = datetime.now().strftime("v%Y%m%d-%H%M%S-%f")
+    path = root / version
+    (path / PAGES_DIR).mkdir(parents=True)
+    return path
+
+
+def write_manifest(version_dir: Path, manifest: dict):
+    """Écrit le manifest d'une version (avant publication)."""
+    (version_dir / MANIFEST_FILE).write_text(
+        json.dumps(manifest, ensure_ascii=False, indent=2), encoding="utf-8"
+    )
+
+
+def read_manifest(version_dir: Path) -> dict:
+    """Lit le manifest d'une version ({} si absent)."""
+    try:
+        return json.loads((version_dir / MANIFEST_FILE).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def publish(version_dir: Path, root: Optional[Path] = None, keep: int = KEEP_VERSIONS):
+    """Bascule atomiquement le pointeur CURRENT vers `version_dir`."""
+    root = root or INDEX_ROOT
+    if not (version_dir / MANIFEST_FILE).exists():
+        raise FileNotFoundError(f"Manifest absent dans {version_dir}, publication refusée")
+    tmp = root / f".{CURRENT_POINTER}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(version_dir.name)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, _pointer_path(root))
+    prune(root, keep)
+
+
+def prune(root: Optional[Path] = None, keep: int = KEEP_VERSIONS):
+    """Supprime les versions les plus anciennes (jamais la version courante)."""
+    root = root or INDEX_ROOT
+    current = current_version(root)
+    versions = sorted(p for p in root.iterdir() if p.is_dir() and p.name.startswith("v"))
+    for path in versions[:-keep] if keep > 0 else versions:
+        if path.name != current:
+            shutil.rmtree(path, ignore_errors=True)
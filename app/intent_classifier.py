@@ -0,0 +1,201 @@
+# app/intent_classifier.py
+"""
+Classifieur local d'intention : SEARCH, EMAIL, FORM ou SMALLTALK.
+
+Le routage dépensait un appel Gemini complet pour obtenir un seul mot, et les deux
+points d'entrée avaient chacun leur heuristique de mots-clés (`agent()` et
+`chainlit_app.main`), incohérentes entre elles. Ici :
+
+- un modèle TF-IDF (mots, bigrammes, trigrammes de caractères) + régression
+  logistique multinomiale, en Python pur, entraîné par
+  `scripts/train_intent_classifier.py` sur les questions journalisées dans la table
+  MySQL `Step` et sur data/intent_seed.jsonl ;
+- le modèle (data/intent_model.json) est chargé au démarrage ; une prédiction coûte
+  quelques dizaines de microsecondes ;
+- sous le seuil de confiance INTENT_CONFIDENCE_THRESHOLD, l'appelant se rabat sur le
+  LLM (agent) ou sur `keyword_intent`, l'heuristique unique partagée par les deux
+  points d'entrée.
+"""
+import json
+import logging
+import math
+import os
+import random
+import re
+import unicodedata
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+INTENTS = ("SEARCH", "EMAIL", "FORM", "SMALLTALK")
+
+DATA_DIR = Path("data")
+MODEL_FILE = DATA_DIR / "intent_model.json"
+SEED_FILE = DATA_DIR / "intent_seed.jsonl"
+
+CONFIDENCE_THRESHOLD = float(os.getenv("INTENT_CONFIDENCE_THRESHOLD", "0.7"))
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+# Heuristique de repli (mots-clés normalisés, sans accents)
+SMALLTALK_RE = re.compile(
+    r"^(?:bonjour|bonsoir|salut|hello|coucou|hey|merci(?: beaucoup| bien)?|au revoir|bonne (?:journee|soiree)"
+    r"|ok|d'accord|super|parfait|ca va|comment (?:ca va|vas-tu|allez-vous)|qui es-tu|tu es qui)"
+    r"(?:\s+\w+)?[\s!?.,]*$"
+)
+QUESTION_PATTERNS = ("comment contacter", "ou contacter", "quel est le contact", "comment envoyer")
+FORM_KEYWORDS = ("formulaire", "remplis", "remplir")
+EMAIL_KEYWORDS = (
+    "directeur", "email", "mail", "envoyer", "envoye", "envoie", "envoi", "contact",
+    "ecrire", "ecris", "transmet", "message", "demande officielle",
+)
+
+
+def normalize(text: str) -> str:
+    """Minuscules, sans accents ni apostrophes typographiques."""
+    text = unicodedata.normalize("NFKD", text.lower().replace("’", "'"))
+    return "".join(c for c in text if not unicodedata.combining(c))
+
+
+def keyword_intent(text: str) -> str:
+    """Heuristique de mots-clés (repli quand le modèle est absent ou peu sûr)."""
+    q = normalize(text).strip()
+    if SMALLTALK_RE.match(q):
+        return "SMALLTALK"
+    if any(p in q for p in QUESTION_PATTERNS):
+        return "SEARCH"
+    if any(k in q for k in FORM_KEYWORDS):
+        return "FORM"
+    if any(k in q for k in EMAIL_KEYWORDS):
+        return "EMAIL"
+    return "SEARCH"
+
+
+def features(text: str) -> Counter:
+    """Mots, bigrammes de mots et trigrammes de caractères (bornés par les mots)."""
+    words = _WORD_RE.findall(normalize(text))
+    counts = Counter(f"w:{w}" for w in words)
+    counts.update(f"b:{a}_{b}" for a, b in zip(words, words[1:]))
+    for word in words:
+        padded = f"<{word}>"
+        counts.update(f"c:{padded[i:i + 3]}" for i in range(len(padded) - 2))
+    return counts
+
+
+class IntentClassifier:
+    """TF-IDF + régression logistique multinomiale, sur vecteurs creux (dict)."""
+
+    def __init__(self, labels: Iterable[str], idf: Dict[str, float], weights: Dict[str, Dict[str, float]],
+                 bias: Dict[str, float]):
+        self.labels = tuple(labels)
+        self.idf = idf
+        self.weights = weights
+        self.bias = bias
+
+    def vectorize(self, text: str) -> Dict[str, float]:
+        vector = {f: (1 + math.log(n)) * self.idf[f] for f, n in features(text).items() if f in self.idf}
+        norm = math.sqrt(sum(v * v for v in vector.values()))
+        return {f: v / norm for f, v in vector.items()} if norm else {}
+
+    def probabilities(self, text: str) -> Dict[str, float]:
+        vector = self.vectorize(text)
+        scores = {}
+        for label in self.labels:
+            w = self.weights[label]
+            scores[label] = self.bias[label] + sum(w.get(f, 0.0) * v for f, v in vector.items())
+        top = max(scores.values())
+        exp = {label: math.exp(s - top) for label, s in scores.items()}
+        total = sum(exp.values())
+        return {label: e / total for label, e in exp.items()}
+
+    def predict(self, text: str) -> Tuple[str, float]:
+        """(intention, confiance)"""
+        probs = self.probabilities(text)
+        label = max(probs, key=probs.get)
+        return label, probs[label]
+
+    # -- entraînement / persistance --
+
+    @classmethod
+    def train(cls, examples: List[Tuple[str, str]], epochs: int = 40, learning_rate: float = 0.5,
+              l2: float = 1e-4, seed: int = 13) -> "IntentClassifier":
+        """Entraîne sur des paires (texte, intention)."""
+        labels = tuple(label for label in INTENTS if any(y == label for _, y in examples))
+        doc_freq = Counter()
+        for text, _ in examples:
+            doc_freq.update(features(text).keys())
+        n_docs = len(examples)
+        idf = {f: math.log((1 + n_docs) / (1 + df)) + 1 for f, df in doc_freq.items()}
+        model = cls(labels, idf, {label: {} for label in labels}, {label: 0.0 for label in labels})
+
+        data = [(model.vectorize(text), label) for text, label in examples]
+        rng = random.Random(seed)
+        for epoch in range(epochs):
+            rng.shuffle(data)
+            rate = learning_rate / (1 + epoch * 0.1)
+            for vector, target in data:
+                scores = {label: model.bias[label] + sum(model.weights[label].get(f, 0.0) * v
+                                                         for f, v in vector.items())
+                          for label in labels}
+                top = max(scores.values())
+                exp = {label: math.exp(s - top) for label, s in scores.items()}
+                total = sum(exp.values())
+                for label in labels:
+                    gradient = exp[label] / total - (1.0 if label == target else 0.0)
+                    w = model.weights[label]
+                    for f, v in vector.items():
+                        w[f] = w.get(f, 0.0) * (1 - rate * l2) - rate * gradient * v
+                    model.bias[label] -= rate * gradient
+        # Poids négligeables retirés (modèle plus petit, prédiction plus rapide)
+        for label in labels:
+            model.weights[label] = {f: round(w, 5) for f, w in model.weights[label].items() if abs(w) >= 1e-4}
+        return model
+
+    def to_dict(self) -> Dict:
+        return {"labels": list(self.labels), "idf": self.idf, "weights": self.weights, "bias": self.bias}
+
+    def save(self, path: Path = MODEL_FILE) -> Path:
+        path.write_text(json.dumps(self.to_dict(), ensure_ascii=False), encoding="utf-8")
+        return path
+
+    @classmethod
+    def load(cls, path: Path = MODEL_FILE) -> "IntentClassifier":
+        data = json.loads(path.read_text(encoding="utf-8"))
+        return cls(data["labels"], data["idf"], data["weights"], data["bias"])
+
+
+def load_classifier(path: Path = MODEL_FILE) -> Optional[IntentClassifier]:
+    """Modèle entraîné, ou None s'il n'existe pas encore (repli sur l'heuristique)."""
+    if not path.exists():
+        logger.info(f"Pas de modèle d'intention ({path}) - heuristique de mots-clés")
+        return None
+    try:
+        model = IntentClassifier.load(path)
+        logger.info(f"Classifieur d'intention chargé ({len(model.idf)} features)")
+        return model
+    except (OSError, ValueError, KeyError) as e:
+        logger.warning(f"Modèle d'intention illisible ({e}) - heuristique de mots-clés")
+        return None
+
+
+def classify(text: str, model: Optional[IntentClassifier],
+             threshold: float = CONFIDENCE_THRESHOLD) -> Tuple[Optional[str], float]:
+    """(intention, confiance) du modèle, ou (None, confiance) sous le seuil / sans modèle."""
+    if model is None or not text.strip():
+        return None, 0.0
+    label, confidence = model.predict(text)
+    if confidence < threshold:
+        return None, confidence
+    return label, confidence
+
+
+def load_seed(path: Path = SEED_FILE) -> List[Tuple[str, str]]:
+    """Exemples annotés à la main : une ligne JSON {"text", "intent"} par exemple."""
+    examples = []
+    for line in path.read_text(encoding="utf-8").splitlines():
+        if line.strip():
+            row = json.loads(line)
+            examples.append((row["text"], row["intent"]))
+    return examples
@@ -0,0 +1,224 @@
+# app/llm_cache.py
+"""
+Cache persistant des réponses LLM, à correspondance exacte.
+
+Les prompts déterministes reviennent souvent à l'identique (décision de routage pour
+une même question, reformulation sur un même contexte) et repartaient chaque fois
+vers Gemini, Grok ou OpenAI. Une réponse est indexée par
+    (fournisseur, modèle, paramètres de génération, SHA-256 du prompt)
+et stockée dans SQLite (fichier partagé par les workers, mode WAL) ou Redis : les
+répétitions sont servies localement, y compris après un redémarrage.
+
+- LLM_CACHE_TTL : durée de vie d'une entrée (secondes) ;
+- LLM_CACHE_MAX_ENTRIES : au-delà, les entrées les moins récemment lues sont évincées ;
+- contournement : `with bypass(): ...` (ou LLM_CACHE_BYPASS=true) ignore le cache en
+  lecture ; la nouvelle génération remplace l'entrée existante.
+
+Le cache n'est jamais bloquant : une erreur du stockage vaut un défaut de cache.
+"""
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from app import metrics
+
+logger = logging.getLogger(__name__)
+
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "false").lower() == "true"
+LLM_CACHE_BACKEND = os.getenv("LLM_CACHE_BACKEND", "sqlite").strip().lower()
+LLM_CACHE_PATH = Path(os.getenv("LLM_CACHE_PATH", "data/llm_cache.sqlite3"))
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", "86400"))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "10000"))
+LLM_CACHE_BYPASS = os.getenv("LLM_CACHE_BYPASS", "false").lower() == "true"
+
+# L'éviction (comptage + suppression) n'est faite que toutes les PRUNE_EVERY écritures
+PRUNE_EVERY = 50
+
+_bypass: ContextVar[bool] = ContextVar("llm_cache_bypass", default=False)
+
+
+@contextmanager
+def bypass():
+    """Générations fraîches dans ce contexte (suivi par les tâches et threads lancés dedans)."""
+    token = _bypass.set(True)
+    try:
+        yield
+    finally:
+        _bypass.reset(token)
+
+
+def bypassed() -> bool:
+    return LLM_CACHE_BYPASS or _bypass.get()
+
+
+def cache_key(provider: str, model: str, config: Dict, prompt: str) -> str:
+    prompt_hash = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+    raw = json.dumps([provider, model, config, prompt_hash], sort_keys=True)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class SQLiteBackend:
+    """Table clé/valeur avec expiration et date de dernière lecture (LRU)."""
+
+    def __init__(self, path: Path = LLM_CACHE_PATH, max_entries: int = LLM_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(path), timeout=5, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS llm_cache_accessed ON llm_cache(accessed_at)")
+        self._lock = threading.Lock()
+        self._writes = 0
+
+    def get_many(self, keys: List[str]) -> Dict[str, str]:
+        now = time.time()
+        placeholders = ",".join("?" * len(keys))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT key, value FROM llm_cache WHERE key IN ({placeholders}) AND expires_at > ?",
+                (*keys, now),
+            ).fetchall()
+            if rows:
+                self._conn.executemany("UPDATE llm_cache SET accessed_at=? WHERE key=?",
+                                       [(now, key) for key, _ in rows])
+        return dict(rows)
+
+    def set(self, key: str, value: str, ttl: float):
+        now = time.time()
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO llm_cache VALUES (?, ?, ?, ?)", (key, value, now + ttl, now))
+            self._writes += 1
+            if self._writes % PRUNE_EVERY == 0:
+                self._prune(now)
+
+    def _prune(self, now: float):
+        self._conn.execute("DELETE FROM llm_cache WHERE expires_at <= ?", (now,))
+        excess = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0] - self.max_entries
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM llm_cache WHERE key IN (SELECT key FROM llm_cache ORDER BY accessed_at LIMIT ?)",
+                (excess,),
+            )
+            metrics.counter("llm_cache_evictions_total").inc(excess)
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+
+
+class RedisBackend:
+    """Chaînes avec TTL natif ; un ZSET (clé -> dernière lecture) borne le nombre d'entrées."""
+
+    def __init__(self, client, max_entries: int = LLM_CACHE_MAX_ENTRIES, prefix: str = "llm_cache:"):
+        self.r = client
+        self.max_entries = max_entries
+        self.prefix = prefix
+        self.lru_key = prefix + "lru"
+
+    def get_many(self, keys: List[str]) -> Dict[str, str]:
+        values = self.r.mget([self.prefix + k for k in keys])
+        hits = {k: v for k, v in zip(keys, values) if v is not None}
+        if hits:
+            self.r.zadd(self.lru_key, {k: time.time() for k in hits})
+        return hits
+
+    def set(self, key: str, value: str, ttl: float):
+        now = time.time()
+        pipe = self.r.pipeline()
+        pipe.set(self.prefix + key, value, ex=max(1, int(ttl)))
+        pipe.zadd(self.lru_key, {key: now})
+        # Entrées expirées (non relues depuis plus d'un TTL) retirées de l'index
+        pipe.zremrangebyscore(self.lru_key, "-inf", now - ttl)
+        pipe.zcard(self.lru_key)
+        size = pipe.execute()[-1]
+        if size > self.max_entries:
+            oldest = self.r.zrange(self.lru_key, 0, size - self.max_entries - 1)
+            if oldest:
+                pipe = self.r.pipeline()
+                pipe.delete(*[self.prefix + k for k in oldest])
+                pipe.zrem(self.lru_key, *oldest)
+                pipe.execute()
+                metrics.counter("llm_cache_evictions_total").inc(len(oldest))
+
+    def __len__(self):
+        return self.r.zcard(self.lru_key)
+
+
+class LLMCache:
+    def __init__(self, backend, ttl: float = LLM_CACHE_TTL):
+        self.backend = backend
+        self.ttl = ttl
+
+    def get_first(self, keys: List[str]) -> Optional[tuple]:
+        """(indice, réponse) de la première clé présente (ordre de priorité), ou None."""
+        if not keys or bypassed():
+            return None
+        try:
+            hits = self.backend.get_many(keys)
+        except Exception as e:
+            logger.warning(f"Cache LLM illisible : {e}")
+            return None
+        for i, key in enumerate(keys):
+            if key in hits:
+                metrics.counter("llm_cache_requests_total", result="hit").inc()
+                return i, hits[key]
+        metrics.counter("llm_cache_requests_total", result="miss").inc()
+        return None
+
+    def set(self, key: str, value: str):
+        try:
+            self.backend.set(key, value, self.ttl)
+        except Exception as e:
+            logger.warning(f"Réponse LLM non mise en cache : {e}")
+
+
+def _make_backend():
+    if LLM_CACHE_BACKEND == "redis" and REDIS_AVAILABLE:
+        client = redis.Redis(host=os.getenv("REDIS_HOST", "localhost"), port=int(os.getenv("REDIS_PORT", "6379")),
+                             decode_responses=True, socket_timeout=0.5)
+        try:
+            client.ping()
+            return RedisBackend(client)
+        except Exception as e:
+            logger.warning(f"Redis indisponible pour le cache LLM ({e}), repli sur SQLite")
+    return SQLiteBackend()
+
+
+_cache: Optional[LLMCache] = None
+_cache_failed = False
+_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> Optional[LLMCache]:
+    """Cache partagé du processus, ou None si LLM_CACHE_ENABLED=false ou stockage indisponible."""
+    global _cache, _cache_failed
+    if not LLM_CACHE_ENABLED or _cache_failed:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None and not _cache_failed:
+                try:
+                    _cache = LLMCache(_make_backend())
+                    logger.info(f"Cache LLM : {type(_cache.backend).__name__}, TTL {LLM_CACHE_TTL:g}s")
+                except Exception as e:
+                    logger.warning(f"Cache LLM désactivé : {e}")
+                    _cache_failed = True
+    return _cache
@@ -0,0 +1,186 @@
+# app/metrics.py
+"""
+Métriques de l'agent en mémoire du processus (latences des fournisseurs LLM, état
+des disjoncteurs...), exportées au format Prometheus sur /metrics.
+
+Un histogramme garde à la fois :
+- des compteurs cumulés par seau (format Prometheus, pour l'export) ;
+- une fenêtre des dernières mesures, pour des percentiles exacts qui suivent
+  l'état récent du fournisseur (utilisés pour régler le délai de couverture des
+  requêtes LLM, voir `app.agent`).
+
+    from app.metrics import histogram
+    histogram("llm_latency_seconds", provider="Gemini").observe(0.84)
+    histogram("llm_latency_seconds", provider="Gemini").percentile(0.95)
+"""
+import bisect
+import math
+import threading
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+# Seaux (secondes) adaptés aux appels LLM : de 50 ms à 30 s (timeout des appels)
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0, 5.0, 7.5, 10.0, 15.0, 20.0, 30.0)
+DEFAULT_WINDOW = 500
+
+
+class Histogram:
+    """Histogramme de durées, sûr entre threads."""
+
+    def __init__(self, name: str, labels: Dict[str, str] = None, buckets=DEFAULT_BUCKETS,
+                 window: int = DEFAULT_WINDOW):
+        self.name = name
+        self.labels = dict(labels or {})
+        self.buckets = tuple(sorted(buckets))
+        # Dernier compteur = seau +Inf
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self._recent = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        with self._lock:
+            self.counts[bisect.bisect_left(self.buckets, value)] += 1
+            self.count += 1
+            self.sum += value
+            self._recent.append(value)
+
+    def samples(self) -> int:
+        """Nombre de mesures dans la fenêtre récente."""
+        return len(self._recent)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Percentile `q` (0-1) des mesures récentes, ou None sans mesure."""
+        with self._lock:
+            values = sorted(self._recent)
+        if not values:
+            return None
+        index = min(len(values) - 1, max(0, math.ceil(q * len(values)) - 1))
+        return values[index]
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {
+                "count": self.count,
+                "sum": self.sum,
+                "buckets": dict(zip(self.buckets + (math.inf,), self.counts)),
+            }
+
+
+class Gauge:
+    """Valeur instantanée (état d'un disjoncteur...)."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, labels: Dict[str, str] = None):
+        self.name = name
+        self.labels = dict(labels or {})
+        self.value = 0.0
+
+    def set(self, value: float):
+        self.value = value
+
+
+class Counter(Gauge):
+    """Compteur croissant (transitions, appels refusés...)."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, labels: Dict[str, str] = None):
+        super().__init__(name, labels)
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1):
+        with self._lock:
+            self.value += amount
+
+
+_histograms: Dict[Tuple[str, Tuple], Histogram] = {}
+_scalars: Dict[Tuple[str, Tuple], Gauge] = {}
+_registry_lock = threading.Lock()
+
+
+def histogram(name: str, buckets=DEFAULT_BUCKETS, **labels) -> Histogram:
+    """Histogramme `name` pour ces labels (créé à la première utilisation).
+
+    `buckets` ne sert qu'à la création : durées LLM par défaut.
+    """
+    key = (name, tuple(sorted(labels.items())))
+    hist = _histograms.get(key)
+    if hist is None:
+        with _registry_lock:
+            hist = _histograms.setdefault(key, Histogram(name, labels, buckets))
+    return hist
+
+
+def _scalar(cls, name: str, labels: Dict[str, str]):
+    key = (name, tuple(sorted(labels.items())))
+    metric = _scalars.get(key)
+    if metric is None:
+        with _registry_lock:
+            metric = _scalars.setdefault(key, cls(name, labels))
+    return metric
+
+
+def gauge(name: str, **labels) -> Gauge:
+    return _scalar(Gauge, name, labels)
+
+
+def counter(name: str, **labels) -> Counter:
+    return _scalar(Counter, name, labels)
+
+
+def _format_labels(labels: Dict[str, str], extra: Dict[str, str] = None) -> str:
+    items = {**labels, **(extra or {})}
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in items.items()) + "}"
+
+
+def render_prometheus() -> str:
+    """Toutes les métriques au format texte Prometheus."""
+    lines: List[str] = []
+    seen_types = set()
+    for (name, _), hist in sorted(_histograms.items()):
+        if name not in seen_types:
+            lines.append(f"# TYPE {name} histogram")
+            seen_types.add(name)
+        snap = hist.snapshot()
+        cumulative = 0
+        for bound, count in snap["buckets"].items():
+            cumulative += count
+            le = "+Inf" if bound == math.inf else f"{bound:g}"
+            lines.append(f"{name}_bucket{_format_labels(hist.labels, {'le': le})} {cumulative}")
+        lines.append(f"{name}_sum{_format_labels(hist.labels)} {snap['sum']:.6f}")
+        lines.append(f"{name}_count{_format_labels(hist.labels)} {snap['count']}")
+    for (name, _), metric in sorted(_scalars.items()):
+        if name not in seen_types:
+            lines.append(f"# TYPE {name} {metric.kind}")
+            seen_types.add(name)
+        lines.append(f"{name}{_format_labels(metric.labels)} {metric.value:g}")
+    return "\n".join(lines) + "\n"
+
+
+def register_metrics_route(app, path: str = "/metrics"):
+    """Expose `render_prometheus` sur `path` dans une application Starlette/FastAPI.
+
+    La route est placée en tête : Chainlit sert son interface sur toutes les autres URL.
+    """
+    from starlette.responses import PlainTextResponse
+    from starlette.routing import Route
+
+    if any(getattr(route, "path", None) == path for route in app.router.routes):
+        return
+
+    def endpoint(request):
+        return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4")
+
+    app.router.routes.insert(0, Route(path, endpoint, methods=["GET"]))
+
+
+def reset():
+    """Vide le registre (tests)."""
+    with _registry_lock:
+        _histograms.clear()
+        _scalars.clear()
@@ -7,10 +7,17 @@ import os
 from typing import Optional
 from playwright.sync_api import sync_playwright, TimeoutError as PlaywrightTimeout
 
+from app.deadline import timeout as deadline_timeout
+
 logger = logging.getLogger(__name__)
 
 CONTACT_URL = "https://www.imt.sn/contact/"
 
+
+def _timeout_ms(default_seconds: float) -> float:
+    """Timeout Playwright (ms), borné par le temps restant de la requête."""
+    return deadline_timeout(default_seconds) * 1000
+
 def fill_contact_form(
     name: str,
     email: str,
@@ -41,11 +48,11 @@ def fill_contact_form(
             page = context.new_page()
             
             # Naviguer vers la page de contact
-            page.goto(CONTACT_URL, wait_until="domcontentloaded", timeout=30000)
+            page.goto(CONTACT_URL, wait_until="domcontentloaded", timeout=_timeout_ms(30))
             logger.info("Page chargée")
             
             # Attendre que le formulaire soit visible
-            page.wait_for_selector("form, input[type='text'], input[type='email']", timeout=10000)
+            page.wait_for_selector("form, input[type='text'], input[type='email']", timeout=_timeout_ms(10))
             
             # Remplir les champs (sélecteurs adaptables selon la structure réelle)
             # Essayer plusieurs patterns de sélecteurs
@@ -145,7 +152,7 @@ def fill_contact_form(
             try:
                 page.wait_for_selector(
                     "text=/merci|thank you|envoyé|succès|success/i",
-                    timeout=5000
+                    timeout=_timeout_ms(5)
                 )
                 logger.info("Confirmation reçue")
             except PlaywrightTimeout:
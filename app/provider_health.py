@@ -0,0 +1,113 @@
+# app/provider_health.py
+"""
+Disponibilité des fournisseurs LLM (Gemini, Grok, OpenAI), vérifiée en arrière-plan.
+
+Auparavant, l'import de `app.agent` faisait un `requests.get` bloquant (timeout 5 s)
+vers l'API Gemini et figeait le résultat dans `GENAI_AVAILABLE` pour toute la vie du
+processus. Ici :
+- rien n'est vérifié à l'import ; `warm_up_providers` lance une première
+  vérification dans un thread, une fois par processus ;
+- le résultat est gardé HEALTH_TTL secondes (FAILURE_TTL s'il est en échec) ;
+  `is_available()` ne bloque jamais : il retourne le dernier état connu (optimiste
+  tant qu'aucune vérification n'a abouti, ou quand un échec a expiré) et relance une
+  vérification dans un thread si le résultat a expiré ;
+- un appel réussi (`mark_success`) vaut vérification réussie ;
+- le disjoncteur (`app.circuit_breaker`) compte un échec encore valide
+  (`recent_failure`) dans sa fenêtre et relance une vérification comme sonde avant de réintégrer un
+  fournisseur écarté.
+"""
+import logging
+import os
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Durée de validité d'une vérification réussie / en échec (secondes)
+HEALTH_TTL = float(os.getenv("PROVIDER_HEALTH_TTL", "300"))
+FAILURE_TTL = float(os.getenv("PROVIDER_HEALTH_FAILURE_TTL", "30"))
+CHECK_TIMEOUT = 5
+
+
+class ProviderHealth:
+    """État de santé d'un fournisseur, rafraîchi en arrière-plan."""
+
+    def __init__(self, name: str, check: Callable[[], bool], ttl: float = HEALTH_TTL,
+                 failure_ttl: float = FAILURE_TTL):
+        self.name = name
+        self._check = check
+        self.ttl = ttl
+        self.failure_ttl = failure_ttl
+        # None = jamais vérifié
+        self.available: Optional[bool] = None
+        self.checked_at = 0.0
+        self._lock = threading.Lock()
+        self._refreshing = False
+
+    def _expired(self, now: float) -> bool:
+        if self.available is None:
+            return True
+        ttl = self.ttl if self.available else self.failure_ttl
+        return now - self.checked_at >= ttl
+
+    def is_available(self) -> bool:
+        """Dernier état connu (sans bloquer) ; relance une vérification s'il a expiré.
+
+        Un échec plus vieux que FAILURE_TTL n'est plus pris en compte.
+        """
+        if self._expired(time.monotonic()):
+            self.refresh_async()
+            return True
+        return self.available is not False
+
+    def recent_failure(self) -> bool:
+        """Dernière vérification en échec et encore valide (ne relance rien)."""
+        return self.available is False and not self._expired(time.monotonic())
+
+    def refresh(self) -> bool:
+        """Vérifie le fournisseur maintenant (bloquant)."""
+        try:
+            ok = bool(self._check())
+        except Exception as e:
+            logger.warning(f"{self.name} : vérification échouée ({e})")
+            ok = False
+        if ok != self.available:
+            log = logger.info if ok else logger.warning
+            log(f"{self.name} {'disponible' if ok else 'indisponible'}")
+        # Horodatage d'abord : un lecteur qui voit le nouvel état le voit aussi frais
+        self.checked_at = time.monotonic()
+        self.available = ok
+        return ok
+
+    def refresh_async(self):
+        """Lance une vérification dans un thread (une seule à la fois)."""
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+
+        def run():
+            try:
+                self.refresh()
+            finally:
+                with self._lock:
+                    self._refreshing = False
+
+        threading.Thread(target=run, name=f"health-{self.name}", daemon=True).start()
+
+    def mark_success(self):
+        """Un appel vient de réussir : le fournisseur est disponible."""
+        self.checked_at = time.monotonic()
+        self.available = True
+
+
+def http_check(url: str, headers: Dict[str, str] = None, timeout: float = CHECK_TIMEOUT) -> Callable[[], bool]:
+    """Vérification par GET : disponible si la réponse est 200."""
+    def check() -> bool:
+        import requests
+        response = requests.get(url, headers=headers or {}, timeout=timeout)
+        if response.status_code != 200:
+            logger.warning(f"{url.split('?')[0]} : status {response.status_code}")
+        return response.status_code == 200
+    return check
@@ -0,0 +1,206 @@
+# app/rate_limiter.py
+"""
+Limitation de débit des fournisseurs LLM, partagée entre workers.
+
+Chaque worker appelait Gemini sans savoir ce que faisaient les autres : le quota du
+free tier (15 requêtes/minute, 1500/jour par clé) était dépassé par rafales, et
+chaque 429 coûtait un timeout avant le repli sur Grok/OpenAI.
+
+Un seau à jetons (token bucket) par fournisseur, par clé et par période (minute,
+jour) est tenu dans Redis et mis à jour atomiquement par un script Lua, commun à
+tous les workers. Un appel réserve un jeton dans chaque seau :
+- jeton disponible : l'appel part tout de suite ;
+- sinon, la réservation est placée en file (le seau passe en négatif) et l'appelant
+  attend son tour, tant que l'attente reste sous RATE_LIMIT_MAX_WAIT secondes ;
+- au-delà, rien n'est réservé : l'appel bascule sur le fournisseur suivant.
+
+Backends : redis (partagé) ou local (en mémoire, par processus ; utilisé pour les
+tests et en repli si Redis est injoignable).
+
+Métriques : llm_rate_limit_waits_total{provider}, llm_rate_limit_wait_seconds{provider}
+et llm_rate_limit_spills_total{provider}.
+"""
+import hashlib
+import logging
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from app import metrics
+
+logger = logging.getLogger(__name__)
+
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "false").lower() == "true"
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "redis").strip().lower()
+RATE_LIMIT_MAX_WAIT = float(os.getenv("RATE_LIMIT_MAX_WAIT", "2"))
+
+# Quotas par défaut (requêtes par minute, par jour ; 0 = pas de limite)
+DEFAULT_QUOTAS = {"Gemini": (15, 1500), "Grok": (60, 0), "OpenAI": (500, 0)}
+MINUTE, DAY = 60, 86400
+
+WAIT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10)
+
+
+def quotas_from_env(provider: str) -> List[Tuple[float, float]]:
+    """Seaux (capacité, période en secondes) d'un fournisseur : {PROVIDER}_RPM, {PROVIDER}_RPD."""
+    rpm, rpd = DEFAULT_QUOTAS.get(provider, (0, 0))
+    rpm = float(os.getenv(f"{provider.upper()}_RPM", rpm))
+    rpd = float(os.getenv(f"{provider.upper()}_RPD", rpd))
+    return [(capacity, period) for capacity, period in ((rpm, MINUTE), (rpd, DAY)) if capacity > 0]
+
+
+def bucket_id(provider: str, api_key: Optional[str], period: float) -> str:
+    """Identifiant d'un seau ; la clé d'API n'apparaît que sous forme d'empreinte."""
+    fingerprint = hashlib.sha256((api_key or "").encode("utf-8")).hexdigest()[:12]
+    return f"{provider}:{fingerprint}:{int(period)}"
+
+
+class LocalBackend:
+    """Seaux en mémoire, sûrs entre threads (un seul processus)."""
+    remote = False
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+        self._lock = threading.Lock()
+
+    def reserve(self, buckets: List[Tuple[str, float, float]], max_wait: float) -> Optional[float]:
+        """Attente avant l'appel (0 : immédiat), ou None si elle dépasserait `max_wait`."""
+        with self._lock:
+            now = self.clock()
+            states, wait = [], 0.0
+            for name, capacity, period in buckets:
+                rate = capacity / period
+                tokens, updated = self._buckets.get(name, (capacity, now))
+                tokens = min(capacity, tokens + (now - updated) * rate)
+                states.append((name, tokens))
+                if tokens < 1:
+                    wait = max(wait, (1 - tokens) / rate)
+            if wait > max_wait:
+                return None
+            for name, tokens in states:
+                self._buckets[name] = (tokens - 1, now)
+            return wait
+
+
+# Même algorithme que LocalBackend, atomique côté Redis, sur l'horloge du serveur
+# (commune à tous les workers). KEYS : seaux ; ARGV : max_wait, puis capacité et
+# période de chaque seau. Retourne l'attente en microsecondes, ou -1 (refus).
+RESERVE_SCRIPT = """
+if redis.replicate_commands then redis.replicate_commands() end
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local max_wait = tonumber(ARGV[1])
+local tokens = {}
+local wait = 0
+for i, key in ipairs(KEYS) do
+    local capacity = tonumber(ARGV[2 * i])
+    local period = tonumber(ARGV[2 * i + 1])
+    local rate = capacity / period
+    local state = redis.call('HMGET', key, 'tokens', 'ts')
+    local available = capacity
+    if state[1] then
+        available = math.min(capacity, tonumber(state[1]) + (now - tonumber(state[2])) * rate)
+    end
+    tokens[i] = available
+    if available < 1 then
+        wait = math.max(wait, (1 - available) / rate)
+    end
+end
+if wait > max_wait then
+    return -1
+end
+for i, key in ipairs(KEYS) do
+    local period = tonumber(ARGV[2 * i + 1])
+    redis.call('HSET', key, 'tokens', tostring(tokens[i] - 1), 'ts', tostring(now))
+    redis.call('EXPIRE', key, math.ceil(period * 2))
+end
+return math.floor(wait * 1000000)
+"""
+
+
+class RedisBackend:
+    """Seaux partagés par tous les workers (script Lua, un aller-retour par réservation)."""
+    remote = True
+
+    def __init__(self, client, prefix: str = "rate_limit:"):
+        self.r = client
+        self.prefix = prefix
+        self._script = client.register_script(RESERVE_SCRIPT)
+
+    def reserve(self, buckets: List[Tuple[str, float, float]], max_wait: float) -> Optional[float]:
+        args = [max_wait]
+        for _, capacity, period in buckets:
+            args += [capacity, period]
+        micros = int(self._script(keys=[self.prefix + name for name, _, _ in buckets], args=args))
+        return None if micros < 0 else micros / 1e6
+
+
+class RateLimiter:
+    def __init__(self, backend, quotas: Dict[str, List[Tuple[float, float]]] = None,
+                 max_wait: float = RATE_LIMIT_MAX_WAIT):
+        self.backend = backend
+        self.quotas = quotas if quotas is not None else {name: quotas_from_env(name) for name in DEFAULT_QUOTAS}
+        self.max_wait = max_wait
+
+    @property
+    def remote(self) -> bool:
+        return self.backend.remote
+
+    def reserve(self, provider: str, api_key: Optional[str] = None, max_wait: float = None) -> Optional[float]:
+        """Réserve un appel à `provider` : attente en secondes, ou None (basculer sur le suivant).
+
+        Le limiteur n'est jamais bloquant : une erreur du stockage laisse passer l'appel.
+        """
+        quotas = self.quotas.get(provider)
+        if not quotas:
+            return 0.0
+        buckets = [(bucket_id(provider, api_key, period), capacity, period) for capacity, period in quotas]
+        try:
+            wait = self.backend.reserve(buckets, self.max_wait if max_wait is None else max_wait)
+        except Exception as e:
+            logger.warning(f"Limiteur de débit indisponible : {e}")
+            return 0.0
+        if wait is None:
+            metrics.counter("llm_rate_limit_spills_total", provider=provider).inc()
+            logger.info(f"{provider} : quota atteint, bascule sur le fournisseur suivant")
+        elif wait > 0:
+            metrics.counter("llm_rate_limit_waits_total", provider=provider).inc()
+            metrics.histogram("llm_rate_limit_wait_seconds", buckets=WAIT_BUCKETS, provider=provider).observe(wait)
+        return wait
+
+
+def _make_backend():
+    if RATE_LIMIT_BACKEND == "redis" and REDIS_AVAILABLE:
+        client = redis.Redis(host=os.getenv("REDIS_HOST", "localhost"), port=int(os.getenv("REDIS_PORT", "6379")),
+                             decode_responses=True, socket_timeout=0.5)
+        try:
+            client.ping()
+            return RedisBackend(client)
+        except Exception as e:
+            logger.warning(f"Redis indisponible pour le limiteur de débit ({e}), quotas locaux au processus")
+    return LocalBackend()
+
+
+_limiter: Optional[RateLimiter] = None
+_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter() -> Optional[RateLimiter]:
+    """Limiteur partagé du processus, ou None si RATE_LIMIT_ENABLED=false."""
+    global _limiter
+    if not RATE_LIMIT_ENABLED:
+        return None
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                _limiter = RateLimiter(_make_backend())
+                logger.info(f"Limiteur de débit LLM : {type(_limiter.backend).__name__}")
+    return _limiter
@@ -5,14 +5,27 @@ Utilise regex et scoring basique pour trouver les meilleurs paragraphes.
 """
 import os
 import re
+from functools import lru_cache
 from pathlib import Path
 from typing import List, Dict, Tuple
 import logging
 
+from app.chunking import DEFAULT_OVERLAP_TOKENS, DEFAULT_TARGET_TOKENS, chunk_text
+from app.index_store import PAGES_DIR, current_index_dir
+from app.tokens import count_tokens
+
 logger = logging.getLogger(__name__)
 
 DATA_DIR = Path("data")
 
+# Découpage des documents : "tokens" (fenêtre glissante de SEARCH_CHUNK_TOKENS tokens,
+# voir app/chunking.py) ou "paragraph" (historique, par lignes vides)
+SEARCH_CHUNKER = os.getenv("SEARCH_CHUNKER", "tokens")
+SEARCH_CHUNK_TOKENS = int(os.getenv("SEARCH_CHUNK_TOKENS", str(DEFAULT_TARGET_TOKENS)))
+SEARCH_CHUNK_OVERLAP = int(os.getenv("SEARCH_CHUNK_OVERLAP", str(DEFAULT_OVERLAP_TOKENS)))
+# Découpages gardés en mémoire (un par contenu de document et réglage du chunker)
+SEARCH_CHUNK_CACHE_SIZE = int(os.getenv("SEARCH_CHUNK_CACHE_SIZE", "128"))
+
 # Mots-clés pour router les questions vers les bons fichiers
 ROUTING_KEYWORDS = {
     "formations.txt": [
@@ -45,11 +58,19 @@ ROUTING_KEYWORDS = {
 }
 
 
+def documents_dir() -> Path:
+    """Répertoire des pages : version publiée par le pipeline d'ingestion, sinon data/."""
+    version_dir = current_index_dir()
+    if version_dir is not None and (version_dir / PAGES_DIR).is_dir():
+        return version_dir / PAGES_DIR
+    return DATA_DIR
+
+
 def load_documents() -> Dict[str, str]:
-    """Charge tous les documents texte depuis data/."""
+    """Charge tous les documents texte (version d'index courante ou data/)."""
     documents = {}
     
-    for file in DATA_DIR.glob("*.txt"):
+    for file in documents_dir().glob("*.txt"):
         try:
             with open(file, 'r', encoding='utf-8') as f:
                 documents[file.name] = f.read()
@@ -88,14 +109,15 @@ def route_query(query: str) -> List[str]:
     return result
 
 
+# Mots à ignorer (bruit, cookies, etc.)
+IGNORE_KEYWORDS = ['cookie', 'rgpd', 'données personnelles', 'consentement', 'tracking']
+
+
 def extract_paragraphs(text: str) -> List[str]:
     """Découpe le texte en paragraphes pertinents."""
     # Séparer par double saut de ligne
     paragraphs = re.split(r'\n\s*\n', text)
     
-    # Mots à ignorer (bruit, cookies, etc.)
-    ignore_keywords = ['cookie', 'rgpd', 'données personnelles', 'consentement', 'tracking']
-    
     # Nettoyer et filtrer
     cleaned = []
     for p in paragraphs:
@@ -103,7 +125,7 @@ def extract_paragraphs(text: str) -> List[str]:
         p_lower = p.lower()
         
         # Skip si contient trop de mots à ignorer
-        if any(kw in p_lower for kw in ignore_keywords):
+        if any(kw in p_lower for kw in IGNORE_KEYWORDS):
             continue
         
         # Garder seulement si > 50 caractères
@@ -113,6 +135,36 @@ def extract_paragraphs(text: str) -> List[str]:
     return cleaned
 
 
+def extract_chunks(text: str, chunker: str = None) -> List[Dict]:
+    """Découpe le texte selon le chunker configuré.
+
+    Le découpage est mis en cache par (contenu du texte, chunker, taille, recouvrement) :
+    les documents ne changent qu'à la publication d'une version d'index, une question
+    ne paie donc plus le découpage de chaque document lu.
+
+    Returns:
+        Liste de {content, tokens}
+    """
+    chunker = chunker or SEARCH_CHUNKER
+    chunks = _cached_chunks(text, chunker, SEARCH_CHUNK_TOKENS, SEARCH_CHUNK_OVERLAP)
+    return [dict(c) for c in chunks]
+
+
+@lru_cache(maxsize=SEARCH_CHUNK_CACHE_SIZE)
+def _cached_chunks(text: str, chunker: str, target_tokens: int, overlap_tokens: int) -> Tuple[Dict, ...]:
+    # Clé : hash du texte (calculé une fois par chaîne) et réglages du découpage
+    if chunker == "tokens":
+        # Retirer le bruit bloc par bloc AVANT de découper, sinon un chunk mêlant
+        # contenu utile et bandeau cookies serait entièrement écarté
+        blocks = re.split(r'\n\s*\n', text)
+        text = "\n\n".join(b for b in blocks if not any(kw in b.lower() for kw in IGNORE_KEYWORDS))
+        return tuple(
+            {'content': c['content'], 'tokens': c['tokens']}
+            for c in chunk_text(text, target_tokens, overlap_tokens)
+        )
+    return tuple({'content': p, 'tokens': count_tokens(p)} for p in extract_paragraphs(text))
+
+
 def score_paragraph(paragraph: str, query: str) -> float:
     """
     Score un paragraphe par rapport à la question.
@@ -167,12 +219,12 @@ def score_paragraph(paragraph: str, query: str) -> float:
     return min(score, 1.0)
 
 
-def search_documents(query: str, documents: Dict[str, str], top_k: int = 3) -> List[Dict]:
+def search_documents(query: str, documents: Dict[str, str], top_k: int = 3, chunker: str = None) -> List[Dict]:
     """
     Recherche dans les documents.
     
     Returns:
-        Liste de {content, source, score}
+        Liste de {content, source, score, tokens}
     """
     # Router la question
     target_files = route_query(query)
@@ -184,15 +236,15 @@ def search_documents(query: str, documents: Dict[str, str], top_k: int = 3) -> L
             continue
         
         text = documents[filename]
-        paragraphs = extract_paragraphs(text)
         
-        for para in paragraphs:
-            score = score_paragraph(para, query)
+        for chunk in extract_chunks(text, chunker):
+            score = score_paragraph(chunk['content'], query)
             if score >= 0.1:  # Accepter score = 0.1 (bonus paragraphe court)
                 results.append({
-                    'content': para,
+                    'content': chunk['content'],
                     'source': filename,
-                    'score': score
+                    'score': score,
+                    'tokens': chunk['tokens']
                 })
     
     # Trier par score décroissant
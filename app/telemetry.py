@@ -0,0 +1,186 @@
+# app/telemetry.py
+"""
+Télémétrie LLM (Langfuse) hors du chemin des requêtes.
+
+`_call_gemini_direct` appelait `langfuse_client.create_event` pendant la requête, et
+les traces Grok/OpenAI étaient désactivées (`and False`) pour leur coût en latence.
+Les événements (générations avec usage et coût, erreurs) sont désormais déposés dans
+une file bornée en mémoire, sans attente ; un thread d'arrière-plan les envoie par
+lots (TELEMETRY_BATCH_SIZE événements, ou toutes les TELEMETRY_FLUSH_INTERVAL s).
+
+- TELEMETRY_SAMPLE_RATE : fraction des générations tracées (les erreurs le sont toutes) ;
+- TELEMETRY_QUEUE_SIZE : file pleine, l'événement est abandonné (jamais d'attente) ;
+- le client Langfuse est créé par le thread d'envoi, au premier lot.
+
+Métriques : telemetry_events_total{outcome} (queued, sampled_out, dropped, sent,
+failed) et telemetry_queue_size.
+"""
+import atexit
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from app import metrics
+
+logger = logging.getLogger(__name__)
+
+LANGFUSE_AVAILABLE = bool(os.getenv("LANGFUSE_PUBLIC_KEY") and os.getenv("LANGFUSE_SECRET_KEY"))
+TELEMETRY_SAMPLE_RATE = float(os.getenv("TELEMETRY_SAMPLE_RATE", "1.0"))
+TELEMETRY_QUEUE_SIZE = int(os.getenv("TELEMETRY_QUEUE_SIZE", "1000"))
+TELEMETRY_BATCH_SIZE = int(os.getenv("TELEMETRY_BATCH_SIZE", "50"))
+TELEMETRY_FLUSH_INTERVAL = float(os.getenv("TELEMETRY_FLUSH_INTERVAL", "2"))
+
+# Tarifs (USD par million de tokens : entrée, sortie)
+PRICING = {"Gemini": (0.0, 0.0), "Grok": (5.0, 15.0), "OpenAI": (0.15, 0.60)}
+
+
+class TelemetrySink:
+    """File bornée vidée par lots dans un thread d'arrière-plan."""
+
+    def __init__(self, send_batch: Callable[[List[Dict]], None], queue_size: int = TELEMETRY_QUEUE_SIZE,
+                 batch_size: int = TELEMETRY_BATCH_SIZE, flush_interval: float = TELEMETRY_FLUSH_INTERVAL,
+                 sample_rate: float = TELEMETRY_SAMPLE_RATE, rng: Callable[[], float] = random.random):
+        self.send_batch = send_batch
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.sample_rate = sample_rate
+        self.rng = rng
+        self._queue: "queue.Queue[Dict]" = queue.Queue(maxsize=queue_size)
+        self._worker: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def record(self, event: Dict, sampled: bool = True) -> bool:
+        """Dépose un événement sans jamais bloquer ; False s'il est écarté ou abandonné."""
+        if sampled and self.rng() >= self.sample_rate:
+            metrics.counter("telemetry_events_total", outcome="sampled_out").inc()
+            return False
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            metrics.counter("telemetry_events_total", outcome="dropped").inc()
+            return False
+        metrics.counter("telemetry_events_total", outcome="queued").inc()
+        metrics.gauge("telemetry_queue_size").set(self._queue.qsize())
+        self._ensure_worker()
+        return True
+
+    def _ensure_worker(self):
+        if self._worker is None:
+            with self._lock:
+                if self._worker is None:
+                    self._worker = threading.Thread(target=self._run, name="telemetry", daemon=True)
+                    self._worker.start()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._send(batch)
+
+    def _send(self, batch: List[Dict]):
+        try:
+            self.send_batch(batch)
+            metrics.counter("telemetry_events_total", outcome="sent").inc(len(batch))
+        except Exception as e:
+            metrics.counter("telemetry_events_total", outcome="failed").inc(len(batch))
+            logger.debug(f"Lot de télémétrie non envoyé ({len(batch)} événements) : {e}")
+        finally:
+            for _ in batch:
+                self._queue.task_done()
+            metrics.gauge("telemetry_queue_size").set(self._queue.qsize())
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Attend l'envoi des événements en file (arrêt du processus, tests)."""
+        end = time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if time.monotonic() >= end:
+                return False
+            time.sleep(0.01)
+        return True
+
+
+class LangfuseSender:
+    """Envoi d'un lot vers Langfuse ; client créé au premier lot (dans le thread d'envoi)."""
+
+    def __init__(self):
+        self._client = None
+
+    def __call__(self, batch: List[Dict]):
+        if self._client is None:
+            from langfuse import Langfuse
+            self._client = Langfuse(
+                public_key=os.getenv("LANGFUSE_PUBLIC_KEY"),
+                secret_key=os.getenv("LANGFUSE_SECRET_KEY"),
+                host=os.getenv("LANGFUSE_HOST", "https://cloud.langfuse.com"),
+            )
+            logger.info("Langfuse configuré avec succès")
+        for event in batch:
+            self._client.create_event(**event)
+        self._client.flush()
+
+
+_sink: Optional[TelemetrySink] = None
+_sink_lock = threading.Lock()
+
+
+def get_telemetry() -> Optional[TelemetrySink]:
+    """File de télémétrie du processus, ou None si Langfuse n'est pas configuré."""
+    global _sink
+    if not LANGFUSE_AVAILABLE:
+        return None
+    if _sink is None:
+        with _sink_lock:
+            if _sink is None:
+                _sink = TelemetrySink(LangfuseSender())
+                atexit.register(_sink.flush)
+    return _sink
+
+
+def record_generation(provider: str, model: str, prompt: str, output: str, input_tokens: int = 0,
+                      output_tokens: int = 0, max_tokens: int = None, **metadata):
+    """Génération d'un fournisseur : modèle, usage en tokens et coût estimé."""
+    sink = get_telemetry()
+    if sink is None:
+        return
+    price_in, price_out = PRICING.get(provider, (0.0, 0.0))
+    cost = input_tokens / 1_000_000 * price_in + output_tokens / 1_000_000 * price_out
+    sink.record({
+        "name": f"{provider.lower()}_response",
+        "input": prompt[:500],
+        "output": (output or "")[:500],
+        "metadata": {
+            "provider": provider,
+            "model": model,
+            "temperature": 0.3,
+            "max_tokens": max_tokens,
+            "cost_usd": round(cost, 6),
+            "tokens_input": input_tokens,
+            "tokens_output": output_tokens,
+            "tokens_total": input_tokens + output_tokens,
+            **metadata,
+        },
+    })
+
+
+def record_error(provider: str, model: str, prompt: str, error: Exception):
+    """Erreur d'appel d'un fournisseur (toujours tracée, hors échantillonnage)."""
+    sink = get_telemetry()
+    if sink is None:
+        return
+    sink.record({
+        "name": f"{provider.lower()}_call_error",
+        "input": prompt[:200],
+        "metadata": {"provider": provider, "model": model, "error": str(error)[:500]},
+    }, sampled=False)
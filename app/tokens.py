@@ -0,0 +1,42 @@
+# app/tokens.py
+"""
+Estimation du nombre de tokens d'un texte.
+
+Le tokenizer SentencePiece de Gemini n'est pas disponible hors ligne : on utilise
+une approximation déterministe (~4 caractères par token pour le français, chaque
+ponctuation compte pour un token), suffisante pour dimensionner chunks et prompts.
+Pour les modèles OpenAI (gpt-*), le décompte est exact si tiktoken est installé.
+"""
+import re
+from functools import lru_cache
+
+try:
+    import tiktoken
+    TIKTOKEN_AVAILABLE = True
+except ImportError:
+    TIKTOKEN_AVAILABLE = False
+
+_PIECE_RE = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+
+# Longueur moyenne (en caractères) d'un token pour un mot
+CHARS_PER_TOKEN = 4
+
+
+@lru_cache(maxsize=8)
+def _tiktoken_encoding(model: str):
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("o200k_base")
+
+
+def count_tokens(text: str, model: str = None) -> int:
+    """Nombre de tokens d'un texte (approximatif, sauf modèle OpenAI avec tiktoken)."""
+    if not text:
+        return 0
+    if model and TIKTOKEN_AVAILABLE and model.startswith("gpt-"):
+        return len(_tiktoken_encoding(model).encode(text))
+    total = 0
+    for piece in _PIECE_RE.findall(text):
+        total += max(1, -(-len(piece) // CHARS_PER_TOKEN))
+    return total
@@ -10,6 +10,9 @@ from typing import Optional
 from datetime import datetime, timedelta
 from pathlib import Path
 
+from app.contacts import load_contacts
+from app.deadline import timeout as deadline_timeout
+
 # Import de la recherche SIMPLE (sans FAISS pour éviter segfault)
 try:
     from app.simple_search import simple_search_imt as _simple_search
@@ -24,6 +27,8 @@ except ImportError as e:
 # Configuration du logging
 logger = logging.getLogger(__name__)
 
+SMTP_TIMEOUT = 20
+
 
 def search_imt(query: str) -> str:
     """Recherche des informations dans la base de données IMT.
@@ -59,6 +64,102 @@ def search_imt(query: str) -> str:
     return "Service de recherche indisponible."
 
 
+# Intentions de contact : réponses directes depuis data/contact_entities.json.
+# Chaque intention exige un nom de coordonnée explicite (« téléphone », « numéro de
+# l'IMT », « adresse »...) : « un tel diplôme », « le numéro d'inscription » ou
+# « situées à Dakar » relèvent de la recherche documentaire.
+_CONTACT_INTENTS = {
+    "email": re.compile(r"\b(?:e-?mail|mail|courriel|adresse (?:e-?mail|mail|électronique|electronique))\b"),
+    "phone": re.compile(
+        r"\b(?:t[ée]l[ée]phone|appeler|whatsapp)\b"
+        r"|\b(?:votre|vos)\s+num[ée]ros?\b"
+        r"|\bnum[ée]ros?\s+(?:de\s+t[ée]l|d['’]\s*appel|de\s+l['’]\s*(?:imt|[ée]cole|institut)\b)"
+    ),
+    "address": re.compile(
+        r"\boù\s+(?:se\s+(?:trouve|situe)n?t?|est(?!-ce)|sont|[êe]tes)\b|\b(?:adresse|localisation|locaux)\b"
+    ),
+}
+_ALL_CONTACTS_RE = re.compile(r"\b(?:coordonn[ée]es|contacts?)\b|\bcomment\s+(?:contacter|joindre)\b")
+# Cible de la question : l'école elle-même (ou une page nommée, cf. `lookup_contact`)
+_SCHOOL_TARGET_RE = re.compile(r"\b(?:imt|[ée]cole|institut|vous|vos|votre|locaux)\b")
+# Demande des coordonnées elles-mêmes : « quel est / donne-moi le numéro », « où se
+# trouve... », « comment vous joindre », ou question télégraphique (« Téléphone de l'IMT ? »)
+_REQUEST_RE = re.compile(
+    r"\b(?:quel(?:le)?s?\s+(?:est|sont)|donne[rz]?|indique[rz]?|communique[rz]?|conna[iî]tre|avoir|obtenir)\b"
+    r"|\boù\s|\bcomment\s+(?:\S+\s+){0,2}?(?:contacter|joindre|appeler)\b"
+)
+_TELEGRAPHIC_RE = re.compile(
+    r"^(?:(?:le|la|les|vos|votre|l['’])\s*)?(?:num[ée]ros?|t[ée]l[ée]phone|e-?mail|mail|courriel|adresse"
+    r"|coordonn[ée]es|contacts?)\b"
+)
+# Question sur l'utilisateur (« mon numéro »), sur une personne, demande d'envoi ou
+# question fermée (« peut-on appeler... », « ... a-t-il changé ? », « est-ce que ») :
+# pas une demande des coordonnées de l'école
+_NOT_CONTACT_RE = re.compile(
+    r"\b(?:mon|ma|mes|envoi|envoie|envoyer|[ée]cri[st]|[ée]crire|transmet|transmets|formulaire|remplis|objet"
+    r"|directeur|directrice|qui)\b"
+    r"|-t-(?:il|elle|on)\b|\b\w+-(?:il|elle|on|ils|elles)\b|\best-ce\b"
+)
+_CONTACT_MAX_WORDS = 20
+_CONTACT_LABELS = {"phone": "📞 **Téléphone**", "email": "📧 **Email**", "address": "📍 **Adresse**"}
+# Page du site dont les coordonnées sont celles de l'école (les autres pages, comme
+# l'Edulab, ne sont citées que si la question les nomme)
+SCHOOL_CONTACT_SOURCE = "contact"
+
+
+def lookup_contact(query: str) -> Optional[str]:
+    """Répond directement aux questions de coordonnées (téléphone, email, adresse).
+
+    Consulte la table validée au scraping (`app.contacts`), sans recherche documentaire
+    ni appel LLM. Il faut un nom de coordonnée et une demande de cette coordonnée
+    (« quel est le numéro... », « où se trouve... ») ; une question fermée à son sujet
+    (« peut-on appeler... ? ») relève du flux normal. Une adresse n'est donnée que
+    pour une cible explicite (l'école, une page nommée). Seules les entrées de la page contact sont présentées comme coordonnées
+    de l'IMT Dakar. Retourne None si la question n'est pas une demande de contact ou
+    si la table ne contient pas l'information (le flux normal prend alors le relais).
+    """
+    if not query:
+        return None
+    q = query.lower()
+    if len(q.split()) > _CONTACT_MAX_WORDS or _NOT_CONTACT_RE.search(q):
+        return None
+
+    table = load_contacts()
+    # Question sur un lieu précis (« où se trouve l'Edulab ») : pages nommées
+    pages = sorted({s for e in table for s in e["sources"]
+                    if s != SCHOOL_CONTACT_SOURCE and re.search(rf"\b{re.escape(s.lower())}\b", q)})
+    targeted = bool(pages) or bool(_SCHOOL_TARGET_RE.search(q))
+    requested = bool(_REQUEST_RE.search(q) or _TELEGRAPHIC_RE.match(q.strip()))
+
+    wanted = [t for t, pattern in _CONTACT_INTENTS.items() if pattern.search(q)]
+    if "email" in wanted and "address" in wanted and not re.search(r"\boù\b", q):
+        wanted.remove("address")  # « adresse mail »
+    if "address" in wanted and not targeted:
+        wanted.remove("address")  # « où est-ce... », « où sont les salles »
+    if not wanted and targeted and _ALL_CONTACTS_RE.search(q):
+        wanted = list(_CONTACT_LABELS)
+    if not wanted or not requested:
+        return None
+
+    if pages:
+        entities = [e for e in table if e["type"] in wanted and set(e["sources"]) & set(pages)]
+        header = f"Voici les coordonnées indiquées sur la page {', '.join(pages)} :"
+    else:
+        entities = [e for e in table if e["type"] in wanted and SCHOOL_CONTACT_SOURCE in e["sources"]]
+        pages = [SCHOOL_CONTACT_SOURCE]
+        header = "Voici les coordonnées de l'IMT Dakar :"
+    if not entities:
+        return None
+
+    lines = []
+    for entity_type in _CONTACT_LABELS:
+        for entity in (e for e in entities if e["type"] == entity_type):
+            lines.append(f"{_CONTACT_LABELS[entity_type]} : {entity['display']} "
+                         f"_(page {', '.join(s for s in entity['sources'] if s in pages)})_")
+    logger.info(f"Réponse directe depuis la table des contacts ({', '.join(wanted)})")
+    return header + "\n\n" + "\n".join(lines)
+
+
 def _validate_email(email: str) -> bool:
     """Valide le format d'une adresse email.
     
@@ -219,7 +320,8 @@ def send_email(
     # Envoi de l'email
     try:
         logger.debug(f"Connexion à {smtp_host}:{smtp_port}...")
-        server = smtplib.SMTP(smtp_host, smtp_port, timeout=20)
+        # Timeout borné par le temps restant de la requête (app.deadline)
+        server = smtplib.SMTP(smtp_host, smtp_port, timeout=deadline_timeout(SMTP_TIMEOUT))
         server.ehlo()
         logger.debug("EHLO envoyé")
         
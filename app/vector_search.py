@@ -5,12 +5,15 @@ Remplace le scoring manuel basique par une recherche sémantique optimisée.
 """
 from pathlib import Path
 import pickle
+import threading
 import numpy as np
 import faiss
 from sentence_transformers import SentenceTransformer
 from typing import List, Dict
 import logging
 
+from app.index_store import current_index_dir, current_version
+
 logger = logging.getLogger(__name__)
 
 DATA_DIR = Path("data")
@@ -42,40 +45,69 @@ class VectorSearch:
         self.model = None
         self.chunks = []
         self.index = None
+        self.version = None
+        # Dernière valeur vue du pointeur CURRENT (la version publiée peut ne pas avoir de FAISS)
+        self._seen_version = None
+        self._reload_lock = threading.Lock()
         self._load_index()
     
+    @staticmethod
+    def _index_files() -> tuple:
+        """Fichiers de la version publiée (data/index/CURRENT), sinon fichiers historiques."""
+        version_dir = current_index_dir()
+        if version_dir is not None and (version_dir / "faiss.index").exists():
+            return version_dir / "faiss.index", version_dir / "embeddings.pkl", version_dir.name
+        return FAISS_INDEX_FILE, EMBEDDINGS_FILE, None
+    
     def _load_index(self):
         """Charge l'index FAISS et les métadonnées."""
+        self._seen_version = current_version()
+        faiss_file, embeddings_file, version = self._index_files()
+        
         # Vérifier les fichiers
-        if not FAISS_INDEX_FILE.exists():
+        if not faiss_file.exists():
             raise FileNotFoundError(
-                f"Index FAISS introuvable : {FAISS_INDEX_FILE}\n"
-                "Exécutez d'abord : python scripts/build_vector_index.py"
+                f"Index FAISS introuvable : {faiss_file}\n"
+                "Exécutez d'abord : python scripts/ingest_pipeline.py"
             )
         
-        if not EMBEDDINGS_FILE.exists():
+        if not embeddings_file.exists():
             raise FileNotFoundError(
-                f"Métadonnées introuvables : {EMBEDDINGS_FILE}\n"
-                "Exécutez d'abord : python scripts/build_vector_index.py"
+                f"Métadonnées introuvables : {embeddings_file}\n"
+                "Exécutez d'abord : python scripts/ingest_pipeline.py"
             )
         
         # Charger l'index FAISS (avec protection)
         try:
-            self.index = faiss.read_index(str(FAISS_INDEX_FILE))
+            index = faiss.read_index(str(faiss_file))
         except Exception as e:
             logger.error(f"Erreur chargement FAISS: {e}")
             raise
         
         # Charger les métadonnées
-        with open(EMBEDDINGS_FILE, 'rb') as f:
+        with open(embeddings_file, 'rb') as f:
             metadata = pickle.load(f)
         
-        self.chunks = metadata['chunks']
+        # Remplacement en bloc : une recherche en cours garde l'ancien couple index/chunks
+        self.index, self.chunks, self.version = index, metadata['chunks'], version
         
         # Utiliser le modèle global (pas de recréation)
         self.model = get_embedding_model()
         
-        print(f"Index FAISS chargé : {len(self.chunks)} chunks (IndexFlatIP)")
+        print(f"Index FAISS chargé : {len(self.chunks)} chunks (IndexFlatIP, version {version or 'data/'})")
+    
+    def _maybe_reload(self):
+        """Recharge l'index si une nouvelle version a été publiée depuis le chargement."""
+        if current_version() == self._seen_version:
+            return
+        with self._reload_lock:
+            if current_version() == self._seen_version:
+                return
+            try:
+                self._load_index()
+            except Exception as e:
+                # On garde la version déjà chargée plutôt que de casser la recherche
+                logger.error(f"Rechargement de l'index impossible: {e}")
     
     def search(self, query: str, top_k: int = 3) -> List[Dict]:
         """
@@ -88,6 +120,7 @@ class VectorSearch:
         Returns:
             Liste de chunks pertinents avec scores de similarité
         """
+        self._maybe_reload()
         try:
             # Générer embedding de la requête
             query_embedding = self.model.encode([query], show_progress_bar=False, convert_to_numpy=True)
@@ -96,15 +129,16 @@ class VectorSearch:
             faiss.normalize_L2(query_embedding)
             
             # Recherche FAISS (retourne distances et indices)
-            distances, indices = self.index.search(query_embedding.astype('float32'), top_k)
+            index, chunks = self.index, self.chunks
+            distances, indices = index.search(query_embedding.astype('float32'), top_k)
             
             # Construire les résultats
             results = []
             for idx, score in zip(indices[0], distances[0]):
-                if idx < len(self.chunks):  # Vérification sécurité
+                if 0 <= idx < len(chunks):  # Vérification sécurité
                     results.append({
-                        'content': self.chunks[idx]['content'],
-                        'source': self.chunks[idx]['source'],
+                        'content': chunks[idx]['content'],
+                        'source': chunks[idx]['source'],
                         'score': float(score)  # Score = similarité cosinus (0-1)
                     })
             
@@ -1,11 +1,16 @@
+import asyncio
 import chainlit as cl
 import os
 import logging
 import re
 import uuid
 from dotenv import load_dotenv
-from app.tools import search_imt, send_email
-from app.agent import reformulate_answer  # Import de la fonction Gemini
+from app.tools import lookup_contact, search_imt, send_email
+from app.agent import reformulate_answer_stream  # Chaîne LLM asynchrone en flux (Gemini → Grok → OpenAI)
+from app.agent import classify_intent, smalltalk_answer
+from app.agent import _memory_user_id  # locataire des sessions (utilisateur ou visiteur)
+from app.deadline import request_deadline, stage
+from app.intent_classifier import keyword_intent
 from memory.redis_memory import RedisMemory
 from app.mysql_data_layer import MySQLDataLayer
 
@@ -51,7 +56,8 @@ def format_response(question: str, context: str) -> str:
 async def start():
     # Créer un ID unique pour la session Redis (backend)
     session_id = str(uuid.uuid4())
-    memory.create_session(session_id)
+    # Appel Redis bloquant : hors de la boucle d'événements
+    await asyncio.to_thread(memory.create_session, session_id, user_id=_memory_user_id())
     cl.user_session.set("session_id", session_id)
     cl.user_session.set("messages", [])
 
@@ -85,7 +91,14 @@ async def on_chat_resume():
     pass
 
 @cl.on_message
-async def main(message: cl.Message):
+async def main(message: cl.Message, deadline=None):
+    """Réponse à un message, dans le budget de temps de la requête
+    (`deadline` : secondes ou `app.deadline.Deadline`, défaut REQUEST_DEADLINE_SECONDS)."""
+    with request_deadline(deadline):
+        await _handle_message(message)
+
+
+async def _handle_message(message: cl.Message):
     user_message = message.content.strip()
     
     # Gérer les fichiers uploadés
@@ -122,11 +135,18 @@ async def main(message: cl.Message):
     
     # Commande pour afficher l'historique des sessions
     if user_message.lower() in ["historique", "mes discussions", "sessions", "liste sessions"]:
-        sessions = memory.list_sessions()
+        user_id = _memory_user_id()
         current_session = cl.user_session.get("session_id")
+        # Jamais les sessions ni la mémoire des autres visiteurs : seulement celles
+        # de l'utilisateur ou du visiteur (cookie persistant)
+        sessions = await asyncio.to_thread(memory.list_sessions, user_id=user_id, limit=10) if user_id else []
         
         response = "## 📊 Sessions actives (Backend Redis)\n\n"
-        response += f"**Limite** : {memory.MAX_SESSIONS} sessions simultanées\n"
+        response += f"**Limite** : {memory.SESSIONS_PER_USER} sessions par utilisateur\n"
+        response += f"**Capacité** : {memory.MAX_SESSIONS} sessions simultanées\n"
+        if user_id:
+            usage = await asyncio.to_thread(memory.memory_usage, user_id=user_id)
+            response += f"**Mémoire** : {usage['bytes'] / 1024:.1f} Ko ({usage['sessions']} sessions)\n"
         response += f"**TTL** : {memory.SESSION_TTL // 60} minutes\n\n"
         
         if not sessions:
@@ -158,22 +178,28 @@ async def main(message: cl.Message):
 
     # Ajout Redis
     if session_id:
-        memory.add_message(session_id, "user", user_message)
+        with stage("memory"):
+            await asyncio.to_thread(memory.add_message, session_id, "user", user_message)
     
-    # Détecter si c'est une demande d'envoi (email OU formulaire)
-    query_lower = user_message.lower()
+    # Détecter si c'est une demande d'envoi (email OU formulaire) : classifieur local,
+    # heuristique de mots-clés (la même que l'agent) s'il est peu sûr
+    with stage("routing"):
+        intent = classify_intent(user_message) or keyword_intent(user_message)
+    is_send_request = intent in ("EMAIL", "FORM")
+    is_form_request = intent == "FORM"
     
-    # Mots-clés forts indiquant une action d'envoi
-    send_keywords = ["contacte", "envoie", "envoyer", "écris", "ecris", "transmet", "transmets", "mail", "email", "formulaire", "remplis", "remplir"]
-    # Mots-clés de questions (pas d'action)
-    question_keywords = ["comment contacter", "où contacter", "quel est le contact", "comment envoyer"]
+    # Message de réponse : rempli token par token sur le chemin de recherche
+    msg = cl.Message(content="")
     
-    # Vérifier si c'est une vraie demande d'action
-    is_send_request = any(kw in query_lower for kw in send_keywords)
-    is_question = any(kw in query_lower for kw in question_keywords)
-    is_form_request = any(kw in query_lower for kw in ["formulaire", "remplis", "remplir"])
+    # Coordonnées de l'école : réponse directe depuis la table des contacts (sans LLM)
+    with stage("search"):
+        contact_answer = lookup_contact(user_message)
     
-    if is_send_request and not is_question:
+    if contact_answer:
+        response = contact_answer
+    elif intent == "SMALLTALK":
+        response = smalltalk_answer(user_message)
+    elif is_send_request:
         # Extraire l'objet personnalisé (après "objet:", "sujet:", ou entre guillemets)
         subject = "Demande d'informations - IMT Dakar"  # Par défaut
         content = user_message  # Par défaut
@@ -218,44 +244,53 @@ async def main(message: cl.Message):
         
         # Décider entre formulaire ou email
         if is_form_request and email_user:
-            # Utiliser Playwright pour remplir le formulaire
+            # Utiliser Playwright pour remplir le formulaire (bloquant : hors de la boucle d'événements)
             logger.info("🌐 Utilisation du formulaire web Playwright")
             from app.playwright_form import fill_contact_form
-            response = fill_contact_form(
-                name=name,
-                email=email_user,
-                subject=subject,
-                message=content,
-                phone=phone
-            )
+            with stage("tool"):
+                response = await asyncio.to_thread(
+                    fill_contact_form,
+                    name=name,
+                    email=email_user,
+                    subject=subject,
+                    message=content,
+                    phone=phone
+                )
         else:
-            # Utiliser l'envoi d'email classique
+            # Utiliser l'envoi d'email classique (SMTP bloquant : hors de la boucle d'événements)
             logger.info("📧 Utilisation de l'envoi d'email SMTP")
             email_body = f"{content}\n\n"
             if user_info:
                 email_body += "--- Informations du visiteur ---\n" + "\n".join(user_info)
             
-            response = send_email(
+            with stage("tool"):
+                response = await asyncio.to_thread(
+                    send_email,
+                    subject=subject,
+                    content=email_body,
+                    recipient=os.getenv("EMAIL_TO", "contact@imt.sn")
+                )
+            email_body += "--- Informations du visiteur ---\n" + "\n".join(user_info)
+        
+        with stage("tool"):
+            response = await asyncio.to_thread(
+                send_email,
                 subject=subject,
                 content=email_body,
                 recipient=os.getenv("EMAIL_TO", "contact@imt.sn")
             )
-            email_body += "--- Informations du visiteur ---\n" + "\n".join(user_info)
-        
-        response = send_email(
-            subject=subject,
-            content=email_body,
-            recipient=os.getenv("EMAIL_TO", "contact@imt.sn")
-        )
     else:
-        # Rechercher le contexte
-        context = search_imt(user_message)
+        # Rechercher le contexte (bloquant : hors de la boucle d'événements)
+        with stage("search"):
+            context = await asyncio.to_thread(search_imt, user_message)
         
-        # Utiliser Gemini pour générer une réponse intelligente
+        # Utiliser Gemini pour générer une réponse intelligente, affichée au fil de l'eau,
+        # sans bloquer les autres sessions
         logger.info("🤖 Utilisation de Gemini 2.5 Flash pour la réponse...")
-        response = reformulate_answer(user_message, context)
+        with stage("reformulation"):
+            response = await reformulate_answer_stream(user_message, context, msg.stream_token)
         
-        # Fallback si Gemini échoue
+        # Fallback si Gemini échoue ou si le temps restant ne permettait plus d'appel LLM
         if not response or response == context:
             response = format_response(user_message, context)
     
@@ -264,6 +299,9 @@ async def main(message: cl.Message):
 
     # Ajout Redis
     if session_id:
-        memory.add_message(session_id, "assistant", response)
+        with stage("memory"):
+            await asyncio.to_thread(memory.add_message, session_id, "assistant", response)
     
-    await cl.Message(content=response).send()
\ No newline at end of file
+    # Termine le flux éventuel et persiste la réponse complète
+    msg.content = response
+    await msg.send()
\ No newline at end of file
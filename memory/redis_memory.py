@@ -1,112 +1,449 @@
+import os
 import redis
 import time
+from collections import OrderedDict
 from typing import Optional, List, Dict
 
+# Index des sessions : ZSET scoré par la dernière activité (timestamp), mis à jour
+# dans la même opération atomique que chaque écriture. La session la moins récemment
+# active est le premier élément, les sessions inactives depuis plus d'un TTL forment
+# le début de l'index (ZRANGEBYSCORE) : éviction et purge en O(log n).
+#
+# Limites :
+# - par utilisateur (SESSIONS_PER_USER) : un utilisateur identifié qui ouvre une
+#   session de trop perd sa propre session la moins récemment active ;
+# - globale (MAX_SESSIONS sessions, SESSION_MEMORY_LIMIT_MB de messages et entités) :
+#   au-delà, les sessions les moins récemment actives, tous utilisateurs confondus,
+#   sont évincées (LRU). Un visiteur n'évince donc plus la conversation d'un autre
+#   tant que la capacité n'est pas atteinte.
+#
+# La taille des messages et entités est comptée par session et par locataire
+# (utilisateur, ou "anonymous") : `memory_usage` en fait le rapport.
+#
+# Scripts Lua : chaque méthode publique qui écrit s'exécute côté serveur,
+# atomiquement, en un seul aller-retour (EVALSHA).
+#
+# Déploiement sur un seul nœud Redis (ou un primaire et ses réplicas) uniquement :
+# les scripts déclarent dans KEYS l'index et les compteurs, mais construisent à
+# partir de préfixes les clés des sessions qu'ils purgent ou évincent (HISTORY .. sid,
+# ENTITIES .. sid, USER_SESSIONS .. owner), inconnues de l'appelant avant
+# l'exécution. Redis Cluster refuserait ces accès à des clés non déclarées
+# (potentiellement sur un autre slot).
+
+# Sessions expirées purgées au plus par appel
+PURGE_BATCH = 100
+# Locataire des sessions sans utilisateur identifié (pas de quota par utilisateur)
+ANONYMOUS_TENANT = "anonymous"
+
+# Prélude commun aux scripts.
+# KEYS : index (ZSET), propriétaires (HASH), octets par session (HASH),
+#        octets par locataire (HASH), octets au total (STRING)
+# ARGV[1..7] : préfixes historique, entités, sessions d'un utilisateur ; maintenant,
+#              TTL, capacité (sessions), limite en octets (0 : aucune)
+# ARGV[8..] : paramètres propres au script
+_PRELUDE = """
+local INDEX, OWNERS, SESSION_BYTES, TENANT_BYTES, TOTAL_BYTES = KEYS[1], KEYS[2], KEYS[3], KEYS[4], KEYS[5]
+local HISTORY, ENTITIES, USER_SESSIONS = ARGV[1], ARGV[2], ARGV[3]
+local NOW, TTL = tonumber(ARGV[4]), tonumber(ARGV[5])
+local CAPACITY, MAX_BYTES = tonumber(ARGV[6]), tonumber(ARGV[7])
+
+local function indexed(sid)
+    return redis.call('ZSCORE', INDEX, sid)
+end
+
+local function account(sid, delta)
+    local owner = redis.call('HGET', OWNERS, sid)
+    if delta == 0 or not owner then
+        return
+    end
+    redis.call('HINCRBY', SESSION_BYTES, sid, delta)
+    redis.call('HINCRBY', TENANT_BYTES, owner, delta)
+    redis.call('INCRBY', TOTAL_BYTES, delta)
+end
+
+local function drop(sid)
+    local owner = redis.call('HGET', OWNERS, sid)
+    local bytes = tonumber(redis.call('HGET', SESSION_BYTES, sid) or '0')
+    redis.call('DEL', HISTORY .. sid, ENTITIES .. sid)
+    redis.call('ZREM', INDEX, sid)
+    redis.call('HDEL', OWNERS, sid)
+    redis.call('HDEL', SESSION_BYTES, sid)
+    redis.call('DECRBY', TOTAL_BYTES, bytes)
+    if owner then
+        redis.call('SREM', USER_SESSIONS .. owner, sid)
+        if redis.call('HINCRBY', TENANT_BYTES, owner, -bytes) <= 0 then
+            redis.call('HDEL', TENANT_BYTES, owner)
+        end
+    end
+end
+
+local function touch(sid)
+    redis.call('ZADD', INDEX, 'XX', NOW, sid)
+    redis.call('EXPIRE', HISTORY .. sid, TTL)
+    redis.call('EXPIRE', ENTITIES .. sid, TTL)
+end
+
+local function purge_expired()
+    local expired = redis.call('ZRANGEBYSCORE', INDEX, '-inf', NOW - TTL, 'LIMIT', 0, %d)
+    for _, sid in ipairs(expired) do
+        drop(sid)
+    end
+    return expired
+end
+
+-- Évince les sessions les moins récemment actives tant que la capacité est dépassée
+-- (`incoming` : session sur le point d'être ajoutée ; `keep` n'est jamais évincée)
+local function evict_lru(keep, incoming, evicted)
+    while redis.call('ZCARD', INDEX) + incoming > CAPACITY
+            or (MAX_BYTES > 0 and tonumber(redis.call('GET', TOTAL_BYTES) or '0') > MAX_BYTES) do
+        local oldest = redis.call('ZRANGE', INDEX, 0, 0)[1]
+        if not oldest or oldest == keep then
+            break
+        end
+        drop(oldest)
+        table.insert(evicted, oldest)
+    end
+    return evicted
+end
+""" % PURGE_BATCH
+
+# ARGV : quota de l'utilisateur (0 : anonyme), session, propriétaire, message initial
+# Retourne {sessions évincées, sessions actives, sessions de l'utilisateur}
+CREATE_SESSION_SCRIPT = _PRELUDE + """
+local quota, sid, owner = tonumber(ARGV[8]), ARGV[9], ARGV[10]
+local user_key = USER_SESSIONS .. owner
+local evicted = {}
+if indexed(sid) then
+    drop(sid)
+end
+purge_expired()
+-- Quota de l'utilisateur : ses sessions les moins récemment actives
+if quota > 0 then
+    local live = {}
+    for _, s in ipairs(redis.call('SMEMBERS', user_key)) do
+        local score = indexed(s)
+        if score then
+            table.insert(live, {s, tonumber(score)})
+        else
+            redis.call('SREM', user_key, s)
+        end
+    end
+    table.sort(live, function(a, b) return a[2] < b[2] end)
+    for i = 1, #live - quota + 1 do
+        drop(live[i][1])
+        table.insert(evicted, live[i][1])
+    end
+end
+evict_lru(sid, 1, evicted)
+redis.call('ZADD', INDEX, NOW, sid)
+redis.call('HSET', OWNERS, sid, owner)
+if quota > 0 then
+    redis.call('SADD', user_key, sid)
+end
+redis.call('RPUSH', HISTORY .. sid, ARGV[11])
+redis.call('EXPIRE', HISTORY .. sid, TTL)
+account(sid, #ARGV[11])
+local user_count = 0
+if quota > 0 then
+    user_count = redis.call('SCARD', user_key)
+end
+return {evicted, redis.call('ZCARD', INDEX), user_count}
+"""
+
+# ARGV : session, entrée ; retourne les sessions évincées
+ADD_MESSAGE_SCRIPT = _PRELUDE + """
+local sid = ARGV[8]
+redis.call('RPUSH', HISTORY .. sid, ARGV[9])
+if not indexed(sid) then
+    redis.call('EXPIRE', HISTORY .. sid, TTL)
+    return {}
+end
+touch(sid)
+account(sid, #ARGV[9])
+return evict_lru(sid, 0, {})
+"""
+
+# ARGV : session, type d'entité, valeur ; retourne les sessions évincées
+SET_ENTITY_SCRIPT = _PRELUDE + """
+local sid = ARGV[8]
+local previous = redis.call('HSTRLEN', ENTITIES .. sid, ARGV[9])
+redis.call('HSET', ENTITIES .. sid, ARGV[9], ARGV[10])
+if not indexed(sid) then
+    redis.call('EXPIRE', ENTITIES .. sid, TTL)
+    return {}
+end
+touch(sid)
+account(sid, #ARGV[10] - previous)
+return evict_lru(sid, 0, {})
+"""
+
+# ARGV : session, entrée qui remplace l'historique
+CLEAR_HISTORY_SCRIPT = _PRELUDE + """
+local sid = ARGV[8]
+local previous = 0
+for _, entry in ipairs(redis.call('LRANGE', HISTORY .. sid, 0, -1)) do
+    previous = previous + #entry
+end
+redis.call('DEL', HISTORY .. sid)
+redis.call('RPUSH', HISTORY .. sid, ARGV[9])
+if not indexed(sid) then
+    redis.call('EXPIRE', HISTORY .. sid, TTL)
+    return 0
+end
+touch(sid)
+account(sid, #ARGV[9] - previous)
+return 1
+"""
+
+# ARGV : session
+DELETE_SESSION_SCRIPT = _PRELUDE + """
+drop(ARGV[8])
+return 1
+"""
+
+# ARGV : session
+# Retourne {-1} (inconnue), {0} (expirée, supprimée) ou {TTL restant, nombre de messages}
+SWITCH_SESSION_SCRIPT = _PRELUDE + """
+local sid = ARGV[8]
+local score = indexed(sid)
+if not score then
+    return {-1}
+end
+local remaining = math.floor(tonumber(score) + TTL - NOW)
+if remaining <= 0 or redis.call('EXISTS', HISTORY .. sid) == 0 then
+    drop(sid)
+    return {0}
+end
+return {remaining, redis.call('LLEN', HISTORY .. sid)}
+"""
+
+# ARGV : limite (0 : toutes), utilisateur ('' : toutes les sessions)
+# Retourne {session, TTL restant, nombre de messages, ...} (plus récente d'abord)
+# et {sessions expirées supprimées}
+LIST_SESSIONS_SCRIPT = _PRELUDE + """
+local limit, owner = tonumber(ARGV[8]), ARGV[9]
+local expired = purge_expired()
+local recent = {}
+if owner == '' then
+    local ranked = redis.call('ZREVRANGE', INDEX, 0, limit - 1, 'WITHSCORES')
+    for i = 1, #ranked, 2 do
+        table.insert(recent, {ranked[i], tonumber(ranked[i + 1])})
+    end
+else
+    for _, s in ipairs(redis.call('SMEMBERS', USER_SESSIONS .. owner)) do
+        local score = indexed(s)
+        if score then
+            table.insert(recent, {s, tonumber(score)})
+        end
+    end
+    table.sort(recent, function(a, b) return a[2] > b[2] end)
+end
+local live = {}
+for i, entry in ipairs(recent) do
+    if limit > 0 and i > limit then
+        break
+    end
+    table.insert(live, entry[1])
+    table.insert(live, math.floor(entry[2] + TTL - NOW))
+    table.insert(live, redis.call('LLEN', HISTORY .. entry[1]))
+end
+return {live, expired}
+"""
+
+
 class RedisMemory:
     """
     Memory management class with Redis backend and RAM fallback.
     Stores conversation history per session with:
-    - Max 3 simultaneous active sessions
-    - 1 hour TTL per session (auto-cleanup)
+    - Per-user quota (SESSIONS_PER_USER, identified users only)
+    - Global capacity (MAX_SESSIONS sessions, SESSION_MEMORY_LIMIT_MB of stored
+      messages and entities), least recently active sessions evicted first
+    - TTL per session (SESSION_TTL, 1h), refreshed on activity (auto-cleanup)
+    - Per-tenant memory usage report (`memory_usage`)
     - Ability to switch between sessions
+    
+    Each public method costs a single Redis round trip (Lua scripts above).
     """
     
-    MAX_SESSIONS = 3
+    SESSIONS_PER_USER = 3
+    MAX_SESSIONS = 50000
+    SESSION_MEMORY_LIMIT_MB = 512  # 0 : pas de limite en mémoire
     SESSION_TTL = 3600  # 1 heure en secondes
     
     def __init__(self, host='localhost', port=6379, db=0):
+        # Limites configurables (lues à la construction, après load_dotenv)
+        self.SESSIONS_PER_USER = int(os.getenv("SESSIONS_PER_USER", self.SESSIONS_PER_USER))
+        self.MAX_SESSIONS = int(os.getenv("MAX_SESSIONS", self.MAX_SESSIONS))
+        self.SESSION_MEMORY_LIMIT_MB = float(os.getenv("SESSION_MEMORY_LIMIT_MB", self.SESSION_MEMORY_LIMIT_MB))
+        self.SESSION_TTL = int(os.getenv("SESSION_TTL", self.SESSION_TTL))
         try:
             self.r = redis.Redis(host=host, port=port, db=db, decode_responses=True)
             self.r.ping()  # Test connection
             self.redis_available = True
+            self._create_session = self.r.register_script(CREATE_SESSION_SCRIPT)
+            self._add_message = self.r.register_script(ADD_MESSAGE_SCRIPT)
+            self._set_entity = self.r.register_script(SET_ENTITY_SCRIPT)
+            self._clear_history = self.r.register_script(CLEAR_HISTORY_SCRIPT)
+            self._delete_session = self.r.register_script(DELETE_SESSION_SCRIPT)
+            self._switch_session = self.r.register_script(SWITCH_SESSION_SCRIPT)
+            self._list_sessions = self.r.register_script(LIST_SESSIONS_SCRIPT)
             self.current_session = None
-            print("Redis connecté - Multi-sessions avec TTL 1h disponible")
+            print(f"Redis connecté - Multi-sessions avec TTL {self.SESSION_TTL // 60} min disponible")
         except Exception as e:
             print(f" Redis non disponible ({e}), utilisation de la mémoire en RAM.")
             self.redis_available = False
             self.memory = {}  # Fallback in-memory dict
-            self.sessions_meta = {}  # Métadonnées des sessions en RAM
+            # Métadonnées des sessions en RAM, de la moins à la plus récemment active
+            self.sessions_meta = OrderedDict()
+            self.user_sessions = {}  # Sessions de chaque utilisateur identifié
+            self.tenant_bytes = {}  # Octets stockés par locataire
+            self.total_bytes = 0
             self.current_session = None
     
     def _get_sessions_key(self) -> str:
-        """Clé Redis pour stocker la liste des sessions actives."""
-        return "active_sessions"
+        """Clé Redis de l'index des sessions actives (ZSET scoré par dernière activité)."""
+        return "session_activity"
     
     def _get_session_key(self, session_id: str, key_type: str) -> str:
         """Génère une clé Redis pour une session donnée."""
         return f"{key_type}:{session_id}"
     
-    def create_session(self, session_id: str) -> Dict[str, any]:
-        """Crée une nouvelle session de chat avec TTL de 1h.
+    def _max_bytes(self) -> int:
+        return int(self.SESSION_MEMORY_LIMIT_MB * 1024 * 1024)
+    
+    def _run(self, script, *args):
+        """Exécute un script de session avec les clés et paramètres communs."""
+        return script(
+            keys=[self._get_sessions_key(), "session_owner", "session_bytes", "tenant_bytes", "sessions_total_bytes"],
+            args=[self._get_session_key("", "chat_history"), self._get_session_key("", "entities"),
+                  self._get_session_key("", "user_sessions"), time.time(), self.SESSION_TTL,
+                  self.MAX_SESSIONS, self._max_bytes(), *args],
+        )
+    
+    def _log_evicted(self, evicted: List[str]):
+        for oldest in evicted:
+            if self.current_session == oldest:
+                self.current_session = None
+            print(f" Session {oldest} supprimée (quota ou capacité atteint)")
+    
+    # -------------------------
+    # Mode RAM
+    # -------------------------
+    
+    def _touch_ram(self, session_id: str):
+        meta = self.sessions_meta.get(session_id)
+        if meta:
+            meta["last_activity"] = time.time()
+            self.sessions_meta.move_to_end(session_id)
+    
+    def _account_ram(self, session_id: str, delta: int):
+        meta = self.sessions_meta.get(session_id)
+        if meta and delta:
+            meta["bytes"] += delta
+            self.tenant_bytes[meta["owner"]] = self.tenant_bytes.get(meta["owner"], 0) + delta
+            self.total_bytes += delta
+    
+    def _ram_ttl_remaining(self, session_id: str) -> int:
+        meta = self.sessions_meta.get(session_id)
+        if not meta:
+            return 0
+        return max(0, meta["ttl"] - int(time.time() - meta["last_activity"]))
+    
+    def _drop_ram_session(self, session_id: str):
+        self.memory.pop(session_id, None)
+        self.memory.pop(f"entities:{session_id}", None)
+        meta = self.sessions_meta.pop(session_id, None)
+        if meta:
+            self.total_bytes -= meta["bytes"]
+            self.user_sessions.get(meta["owner"], set()).discard(session_id)
+            left = self.tenant_bytes.get(meta["owner"], 0) - meta["bytes"]
+            if left > 0:
+                self.tenant_bytes[meta["owner"]] = left
+            else:
+                self.tenant_bytes.pop(meta["owner"], None)
+    
+    def _evict_lru_ram(self, keep: str = None, incoming: int = 0) -> List[str]:
+        evicted = []
+        max_bytes = self._max_bytes()
+        while self.sessions_meta and (
+                len(self.sessions_meta) + incoming > self.MAX_SESSIONS
+                or (max_bytes > 0 and self.total_bytes > max_bytes)):
+            # Moins récemment active : début de l'OrderedDict
+            oldest = next(iter(self.sessions_meta))
+            if oldest == keep:
+                break
+            self._drop_ram_session(oldest)
+            evicted.append(oldest)
+        return evicted
+    
+    # -------------------------
+    # Sessions
+    # -------------------------
+    
+    def create_session(self, session_id: str, user_id: Optional[str] = None) -> Dict[str, any]:
+        """Crée une nouvelle session de chat (TTL SESSION_TTL).
         
-        Limite à MAX_SESSIONS (3) simultanées. Si dépassé, supprime la plus ancienne.
+        Un utilisateur identifié (`user_id`) garde au plus SESSIONS_PER_USER sessions :
+        au-delà, sa session la moins récemment active est supprimée. Sans `user_id`,
+        la session est comptée pour le locataire "anonymous", sans quota. Si la
+        capacité globale est atteinte, les sessions les moins récemment actives
+        (tous utilisateurs) sont supprimées.
         
         Returns:
             dict avec status (success/error) et message
         """
+        owner = user_id or ANONYMOUS_TENANT
+        quota = self.SESSIONS_PER_USER if user_id else 0
+        initial = f"system: Session {session_id} créée"
+        
         if self.redis_available:
-            # Récupérer les sessions actives
-            active_sessions = self.r.smembers(self._get_sessions_key())
-            
-            # Si max atteint, supprimer la plus ancienne
-            if len(active_sessions) >= self.MAX_SESSIONS:
-                # Trouver la plus ancienne (TTL le plus court restant)
-                oldest = None
-                min_ttl = float('inf')
-                
-                for sess_id in active_sessions:
-                    ttl = self.r.ttl(self._get_session_key(sess_id, "chat_history"))
-                    if ttl < min_ttl:
-                        min_ttl = ttl
-                        oldest = sess_id
-                
-                if oldest:
-                    self.delete_session(oldest)
-                    print(f" Session {oldest} supprimée (limite de {self.MAX_SESSIONS} atteinte)")
-            
-            # Créer la nouvelle session
-            self.r.sadd(self._get_sessions_key(), session_id)
-            
-            # Définir le TTL sur toutes les clés de cette session
-            history_key = self._get_session_key(session_id, "chat_history")
-            entities_key = self._get_session_key(session_id, "entities")
-            
-            # Initialiser avec des listes vides
-            self.r.delete(history_key)  # S'assurer que c'est vide
-            self.r.rpush(history_key, f"system: Session {session_id} créée")
-            self.r.expire(history_key, self.SESSION_TTL)
-            self.r.expire(entities_key, self.SESSION_TTL)
+            # Purge, quota, éviction LRU et création, atomiques
+            evicted, active_count, user_count = self._run(self._create_session, quota, session_id, owner, initial)
+            self._log_evicted(evicted)
             
             self.current_session = session_id
             
             return {
                 "status": "success",
-                "message": f"Session '{session_id}' créée avec succès (TTL: 1h)",
+                "message": f"Session '{session_id}' créée avec succès (TTL: {self.SESSION_TTL // 60} min)",
                 "session_id": session_id,
-                "active_sessions": len(active_sessions) + 1
+                "active_sessions": active_count,
+                "user_sessions": user_count
             }
         
         else:
             # Mode RAM
-            if len(self.sessions_meta) >= self.MAX_SESSIONS:
-                # Supprimer la plus ancienne
-                oldest = min(self.sessions_meta.keys(), key=lambda s: self.sessions_meta[s]["created_at"])
-                del self.memory[oldest]
-                del self.sessions_meta[oldest]
-                print(f" Session {oldest} supprimée (limite RAM de {self.MAX_SESSIONS} atteinte)")
+            self._drop_ram_session(session_id)
+            evicted = []
+            if quota:
+                owned = self.user_sessions.setdefault(owner, set())
+                while len(owned) >= quota:
+                    oldest = min(owned, key=lambda s: self.sessions_meta[s]["last_activity"])
+                    self._drop_ram_session(oldest)
+                    evicted.append(oldest)
+            evicted += self._evict_lru_ram(incoming=1)
+            self._log_evicted(evicted)
             
-            self.memory[session_id] = []
+            self.memory[session_id] = [initial]
+            now = time.time()
             self.sessions_meta[session_id] = {
-                "created_at": time.time(),
-                "ttl": self.SESSION_TTL
+                "created_at": now,
+                "last_activity": now,
+                "ttl": self.SESSION_TTL,
+                "owner": owner,
+                "bytes": 0
             }
+            if quota:
+                self.user_sessions[owner].add(session_id)
+            self._account_ram(session_id, len(initial.encode()))
             self.current_session = session_id
             
             return {
                 "status": "success",
-                "message": f"Session '{session_id}' créée en RAM (TTL: 1h)",
+                "message": f"Session '{session_id}' créée en RAM (TTL: {self.SESSION_TTL // 60} min)",
                 "session_id": session_id,
-                "active_sessions": len(self.sessions_meta)
+                "active_sessions": len(self.sessions_meta),
+                "user_sessions": len(self.user_sessions[owner]) if quota else 0
             }
     
     def switch_session(self, session_id: str) -> Dict[str, any]:
@@ -116,34 +453,32 @@ class RedisMemory:
             dict avec status et informations de la session
         """
         if self.redis_available:
-            # Vérifier si la session existe
-            if not self.r.sismember(self._get_sessions_key(), session_id):
+            # Existence, TTL restant et taille de l'historique en un appel
+            result = self._run(self._switch_session, session_id)
+            if result[0] == -1:
                 return {
                     "status": "error",
                     "message": f"Session '{session_id}' n'existe pas. Créez-la d'abord."
                 }
             
-            # Récupérer le TTL restant
-            history_key = self._get_session_key(session_id, "chat_history")
-            ttl_remaining = self.r.ttl(history_key)
-            
-            if ttl_remaining <= 0:
-                # Session expirée
-                self.delete_session(session_id)
+            if result[0] == 0:
+                # Session expirée (supprimée par le script)
+                if self.current_session == session_id:
+                    self.current_session = None
                 return {
                     "status": "error",
                     "message": f"Session '{session_id}' a expiré (TTL dépassé)."
                 }
             
+            ttl_remaining, message_count = result
             self.current_session = session_id
-            history = self.get_history(session_id)
             
             return {
                 "status": "success",
                 "message": f"Basculé vers session '{session_id}'",
                 "session_id": session_id,
                 "ttl_remaining": ttl_remaining,
-                "message_count": len(history)
+                "message_count": message_count
             }
         
         else:
@@ -155,17 +490,13 @@ class RedisMemory:
                 }
             
             # Vérifier TTL
-            meta = self.sessions_meta.get(session_id)
-            if meta:
-                elapsed = time.time() - meta["created_at"]
-                if elapsed > meta["ttl"]:
-                    # Expirée
-                    del self.memory[session_id]
-                    del self.sessions_meta[session_id]
-                    return {
-                        "status": "error",
-                        "message": f"Session '{session_id}' a expiré (TTL RAM dépassé)."
-                    }
+            if session_id in self.sessions_meta and self._ram_ttl_remaining(session_id) <= 0:
+                # Expirée
+                self._drop_ram_session(session_id)
+                return {
+                    "status": "error",
+                    "message": f"Session '{session_id}' a expiré (TTL RAM dépassé)."
+                }
             
             self.current_session = session_id
             return {
@@ -175,8 +506,12 @@ class RedisMemory:
                 "message_count": len(self.memory[session_id])
             }
     
-    def list_sessions(self) -> List[Dict[str, any]]:
-        """Liste toutes les sessions actives avec leurs métadonnées.
+    def list_sessions(self, user_id: Optional[str] = None, limit: int = 0) -> List[Dict[str, any]]:
+        """Liste les sessions actives, de la plus à la moins récemment active.
+        
+        Args:
+            user_id: Sessions de cet utilisateur seulement (None : toutes)
+            limit: Nombre maximal de sessions retournées (0 : toutes)
         
         Returns:
             Liste de dict avec session_id, message_count, ttl_remaining
@@ -184,41 +519,77 @@ class RedisMemory:
         sessions = []
         
         if self.redis_available:
-            active_sessions = self.r.smembers(self._get_sessions_key())
+            # Purge des expirées puis sessions les plus récentes, en un appel
+            live, expired = self._run(self._list_sessions, limit, user_id or "")
+            if self.current_session in expired:
+                self.current_session = None
             
-            for sess_id in active_sessions:
-                history_key = self._get_session_key(sess_id, "chat_history")
-                ttl = self.r.ttl(history_key)
-                
-                if ttl > 0:
-                    msg_count = self.r.llen(history_key)
-                    sessions.append({
-                        "session_id": sess_id,
-                        "message_count": msg_count,
-                        "ttl_remaining": ttl,
-                        "is_current": (sess_id == self.current_session)
-                    })
-                else:
-                    # Session expirée, la supprimer
-                    self.delete_session(sess_id)
+            for i in range(0, len(live), 3):
+                sess_id, ttl, msg_count = live[i:i + 3]
+                sessions.append({
+                    "session_id": sess_id,
+                    "message_count": msg_count,
+                    "ttl_remaining": ttl,
+                    "is_current": (sess_id == self.current_session)
+                })
         
         else:
             # Mode RAM
-            for sess_id, messages in self.memory.items():
-                meta = self.sessions_meta.get(sess_id, {})
-                elapsed = time.time() - meta.get("created_at", 0)
-                ttl_remaining = max(0, meta.get("ttl", 0) - int(elapsed))
-                
+            owned = self.user_sessions.get(user_id, set()) if user_id else None
+            for sess_id in reversed(self.sessions_meta):
+                if owned is not None and sess_id not in owned:
+                    continue
+                ttl_remaining = self._ram_ttl_remaining(sess_id)
                 if ttl_remaining > 0:
                     sessions.append({
                         "session_id": sess_id,
-                        "message_count": len(messages),
+                        "message_count": len(self.memory.get(sess_id, [])),
                         "ttl_remaining": ttl_remaining,
                         "is_current": (sess_id == self.current_session)
                     })
+                    if len(sessions) == limit:
+                        break
         
         return sessions
     
+    def memory_usage(self, user_id: Optional[str] = None, top: int = 10) -> Dict[str, any]:
+        """Mémoire occupée par les sessions (octets des messages et entités stockés).
+        
+        Args:
+            user_id: Rapport pour ce seul locataire (None : global)
+            top: Nombre de locataires les plus gourmands détaillés (rapport global)
+        
+        Returns:
+            dict avec sessions, bytes, limit_bytes et, en global, tenants
+            ({locataire: octets}, du plus au moins gourmand)
+        """
+        tenants = None
+        if self.redis_available:
+            pipe = self.r.pipeline(transaction=False)
+            if user_id:
+                pipe.scard(self._get_session_key(user_id, "user_sessions"))
+                pipe.hget("tenant_bytes", user_id)
+                sessions, used = pipe.execute()
+            else:
+                pipe.zcard(self._get_sessions_key())
+                pipe.get("sessions_total_bytes")
+                pipe.hgetall("tenant_bytes")
+                sessions, used, tenants = pipe.execute()
+        else:
+            if user_id:
+                sessions = len(self.user_sessions.get(user_id, ()))
+                used = self.tenant_bytes.get(user_id, 0)
+            else:
+                sessions = len(self.sessions_meta)
+                used = self.total_bytes
+                tenants = self.tenant_bytes
+        
+        usage = {"sessions": sessions, "bytes": int(used or 0), "limit_bytes": self._max_bytes()}
+        if tenants is not None:
+            ranked = sorted(((tenant, int(b)) for tenant, b in tenants.items()), key=lambda t: t[1], reverse=True)
+            usage["tenants"] = dict(ranked[:top])
+        return usage
+    
     def delete_session(self, session_id: str) -> Dict[str, any]:
         """Supprime complètement une session et ses données.
         
@@ -226,15 +597,8 @@ class RedisMemory:
             dict avec status et message
         """
         if self.redis_available:
-            # Supprimer de la liste des sessions actives
-            self.r.srem(self._get_sessions_key(), session_id)
-            
-            # Supprimer toutes les clés associées
-            history_key = self._get_session_key(session_id, "chat_history")
-            entities_key = self._get_session_key(session_id, "entities")
-            
-            self.r.delete(history_key)
-            self.r.delete(entities_key)
+            # Retirer de l'index et des comptes, supprimer ses clés
+            self._run(self._delete_session, session_id)
             
             if self.current_session == session_id:
                 self.current_session = None
@@ -246,10 +610,7 @@ class RedisMemory:
         
         else:
             # Mode RAM
-            if session_id in self.memory:
-                del self.memory[session_id]
-            if session_id in self.sessions_meta:
-                del self.sessions_meta[session_id]
+            self._drop_ram_session(session_id)
             
             if self.current_session == session_id:
                 self.current_session = None
@@ -258,19 +619,21 @@ class RedisMemory:
                 "status": "success",
                 "message": f"Session '{session_id}' supprimée (RAM)"
             }
-
+    
     def add_message(self, session_id: str, role: str, content: str):
         """Add a message to the chat history for a specific session."""
+        entry = f"{role}: {content}"
         if self.redis_available:
-            key = self._get_session_key(session_id, "chat_history")
-            self.r.rpush(key, f"{role}: {content}")
-            # Renouveler le TTL à chaque message
-            self.r.expire(key, self.SESSION_TTL)
+            # Renouveler le TTL et l'activité à chaque message
+            self._log_evicted(self._run(self._add_message, session_id, entry))
         else:
             if session_id not in self.memory:
                 self.memory[session_id] = []
-            self.memory[session_id].append(f"{role}: {content}")
-
+            self.memory[session_id].append(entry)
+            self._touch_ram(session_id)
+            self._account_ram(session_id, len(entry.encode()))
+            self._log_evicted(self._evict_lru_ram(keep=session_id))
+    
     def get_history(self, session_id: str) -> list:
         """Retrieve the full chat history for a specific session."""
         if self.redis_available:
@@ -278,31 +641,33 @@ class RedisMemory:
             return self.r.lrange(key, 0, -1)
         else:
             return self.memory.get(session_id, [])
-
+    
     def clear_history(self, session_id: str):
         """Clear the chat history for a specific session."""
         if self.redis_available:
-            key = self._get_session_key(session_id, "chat_history")
-            self.r.delete(key)
             # Recréer avec TTL
-            self.r.rpush(key, f"system: Historique effacé")
-            self.r.expire(key, self.SESSION_TTL)
+            self._run(self._clear_history, session_id, "system: Historique effacé")
         else:
             if session_id in self.memory:
+                previous = sum(len(entry.encode()) for entry in self.memory[session_id])
                 self.memory[session_id] = []
+                self._account_ram(session_id, -previous)
+            self._touch_ram(session_id)
     
     def set_entity(self, session_id: str, entity_type: str, value: str):
         """Store a personal entity (name, email, etc.) for a session."""
         if self.redis_available:
-            key = self._get_session_key(session_id, "entities")
-            self.r.hset(key, entity_type, value)
-            # Renouveler le TTL
-            self.r.expire(key, self.SESSION_TTL)
+            # Renouveler le TTL et l'activité
+            self._log_evicted(self._run(self._set_entity, session_id, entity_type, value))
         else:
             entities_key = f"entities:{session_id}"
             if entities_key not in self.memory:
                 self.memory[entities_key] = {}
+            previous = len(self.memory[entities_key].get(entity_type, "").encode())
             self.memory[entities_key][entity_type] = value
+            self._touch_ram(session_id)
+            self._account_ram(session_id, len(value.encode()) - previous)
+            self._log_evicted(self._evict_lru_ram(keep=session_id))
     
     def get_entity(self, session_id: str, entity_type: str) -> Optional[str]:
         """Retrieve a personal entity for a session."""
@@ -322,4 +687,4 @@ class RedisMemory:
             return self.r.hgetall(key)
         else:
             entities_key = f"entities:{session_id}"
-            return self.memory.get(entities_key, {})
\ No newline at end of file
+            return self.memory.get(entities_key, {})
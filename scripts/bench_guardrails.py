@@ -0,0 +1,125 @@
+# scripts/bench_guardrails.py
+"""
+Compare le filtre de contenu compilé (app/guardrails.py) à l'ancienne implémentation
+de `_detect_inappropriate_content` (règles réinterprétées par `re.search`, `.*`
+entre les termes, mots-clés testés un par un) :
+
+- concordance : même catégorie de refus sur un corpus de messages et sur des
+  messages aléatoires construits à partir des termes des règles ;
+- message courant : temps médian par message ;
+- pire cas : textes collés de taille croissante répétant le début d'une règle de
+  comparaison sans jamais la compléter (« imt plus imt plus ... »), où l'ancienne
+  version recule à chaque occurrence.
+
+Usage :
+    python scripts/bench_guardrails.py [--fuzz 20000] [--sizes 250,500,1000,2000]
+"""
+import argparse
+import random
+import re
+import statistics
+import sys
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from app.guardrails import COMPARISON, INSULT, OFFENSIVE, GuardrailEngine
+
+LEGACY_COMPARISON = [
+    r'imt.*(?:meilleur|mieux|supérieur|plus|vs|versus|contre).*(?:esp|ucad|ept|enstp|polytechnique|autre|école)',
+    r'(?:esp|ucad|ept|enstp|polytechnique|autre|école).*(?:meilleur|mieux|supérieur|plus|vs|versus|contre).*imt',
+    r'compar.*(?:imt|école)',
+    r'quelle.*école.*(?:meilleur|mieux|nul|mauvais)',
+    r'(?:esp|ucad|ept|enstp).*(?:ou|vs).*imt',
+    r'imt.*(?:pas|moins|pire).*(?:esp|ucad|ept|enstp)',
+]
+LEGACY_INSULTS = [
+    ' nul ', ' nulle ', ' nul.', ' nulle.', ' nul!', ' nulle!', ' nul?', ' nulle?',
+    ' pourri ', ' pourrie ', ' merde ', ' con ', ' connard ', ' idiot ', ' débile ',
+    ' stupide ', ' crétin ', ' imbécile ', ' abruti ', ' incompétent ',
+    ' est nul', ' est nulle', ' est pourri', ' est pourrie',
+    "c'est nul", "c'est nulle", "c'est pourri", "vous êtes nul", "tu es nul",
+    'école de merde', 'pire école', 'mauvaise école', ' zéro ',
+    'imt nul', 'professeur nul', 'formation nulle', 'formation pourrie',
+    'arnaque', 'escroquerie', 'foutaise',
+]
+LEGACY_OFFENSIVE = [
+    r'ferme.*(?:ta gueule|bouche)', r'va te faire', r'\btg\b', r'\bftg\b', r'\bntm\b',
+    r'fils de', r'pd\b', r'salope', r'pute',
+]
+
+CORPUS = [
+    "IMT est meilleure que ESP", "Quelle école choisir entre IMT et UCAD?", "Comparez IMT avec l'EPT",
+    "Votre école est nulle", "IMT c'est nul", "C'est une arnaque votre formation", "ferme ta gueule",
+    "va te faire", "Quelles sont les formations disponibles?", "Comment s'inscrire à l'IMT?",
+    "Quel est le contact du directeur?", "Je m'appelle Maliki", "L'ESP ou l'IMT ?",
+    "imt\nplus esp", "tg", "Le campus est-il ouvert le samedi ?", "Quelle école est la meilleure ?",
+]
+
+FUZZ_WORDS = [
+    "imt", "esp", "ucad", "ept", "école", "autre", "plus", "vs", "ou", "pas", "pire", "compar",
+    "quelle", "nul", "nulle", "mauvais", "mauvaise", "ferme", "ta gueule", "tg", "pd", "de", "fils",
+    "est", "c'est", "formation", "merde", "zéro", "la", "et", "?", ".", "!", "\n", "MIEUX", "Imt",
+]
+
+
+def legacy_category(question: str):
+    q_lower = question.lower().strip()
+    if any(re.search(p, q_lower, re.IGNORECASE) for p in LEGACY_COMPARISON):
+        return COMPARISON
+    if any(k in q_lower for k in LEGACY_INSULTS):
+        return INSULT
+    if any(re.search(p, q_lower, re.IGNORECASE) for p in LEGACY_OFFENSIVE):
+        return OFFENSIVE
+    return None
+
+
+def fuzz_message(rng: random.Random) -> str:
+    words = rng.choices(FUZZ_WORDS, k=rng.randint(1, 10))
+    return "".join(w + rng.choice([" ", " ", "", "\n"]) for w in words)
+
+
+def per_call_us(fn, text: str, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(text)
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Filtre de contenu : concordance et temps, ancien vs compilé")
+    parser.add_argument("--fuzz", type=int, default=20000)
+    parser.add_argument("--sizes", default="250,500,1000,2000", help="tailles (caractères) du pire cas")
+    args = parser.parse_args()
+
+    engine = GuardrailEngine(max_chars=10 ** 9)
+
+    def category(text):
+        found = engine.check(text)
+        return found[0] if found else None
+
+    rng = random.Random(0)
+    messages = CORPUS + [fuzz_message(rng) for _ in range(args.fuzz)]
+    mismatches = [m for m in messages if legacy_category(m) != category(m)]
+    print(f"Concordance : {len(messages) - len(mismatches)}/{len(messages)} messages")
+    for m in mismatches[:5]:
+        print(f"  {m!r} : ancien={legacy_category(m)} compilé={category(m)}")
+
+    legacy_us = statistics.median(per_call_us(legacy_category, m, 200) for m in CORPUS)
+    compiled_us = statistics.median(per_call_us(category, m, 200) for m in CORPUS)
+    print(f"Message courant (médiane) : ancien {legacy_us:.1f} µs, compilé {compiled_us:.1f} µs")
+
+    print("Pire cas (« imt plus » répété, sans école) :")
+    print(f"  {'caractères':>10}{'ancien':>12}{'compilé':>12}")
+    for size in (int(s) for s in args.sizes.split(",")):
+        text = ("imt plus " * (size // 9 + 1))[:size]
+        legacy_ms = per_call_us(legacy_category, text, 1) / 1000
+        compiled_ms = per_call_us(category, text, 20) / 1000
+        print(f"  {size:>10}{legacy_ms:>10.1f}ms{compiled_ms:>10.3f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+# scripts/bench_html_extract.py
+"""
+Benchmark de l'extraction HTML (app/html_extract.py) sur des pages sauvegardées.
+
+Compare l'ancienne extraction BeautifulSoup (arbre complet, `str(soup)` resérialisé
+pour chaque regex, `find_all` sur les span) à l'extraction en un seul passage, avec
+html.parser et avec lxml si installé. Affiche le débit (pages/s, Mo/s) et le nombre
+de blocs extraits par chaque méthode.
+
+Usage :
+    python scripts/bench_html_extract.py [--dir tests/fixtures/html] [--repeat 50]
+"""
+import argparse
+import re
+import sys
+import time
+from pathlib import Path
+
+from bs4 import BeautifulSoup
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from app.html_extract import BLACKLIST, LXML_AVAILABLE, extract_content
+
+FIXTURES_DIR = PROJECT_ROOT / "tests" / "fixtures" / "html"
+
+
+def extract_content_bs4(html: str) -> list:
+    """Ancienne implémentation de scrape_imt.extract_content (référence)."""
+    soup = BeautifulSoup(html, "html.parser")
+    for tag in soup(["script", "style", "nav", "footer", "header", "aside", "noscript"]):
+        tag.decompose()
+
+    structured_data = []
+    emails = re.findall(r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}', str(soup))
+    if emails:
+        structured_data.append(f"📧 Contact : {', '.join(set(emails))}")
+    phones = re.findall(r'(?:\+221|00221)?\s*\d{2}[\s.-]?\d{3}[\s.-]?\d{2}[\s.-]?\d{2}', str(soup))
+    if phones:
+        structured_data.append(f"📞 Téléphone : {', '.join(set(phones))}")
+    address_patterns = [
+        r'(?i)(rue|avenue|boulevard|route|quartier|zone|immeuble)[^<>]{5,100}(?:dakar|sénégal|senegal)',
+        r'(?i)(?:dakar|sénégal|senegal)[^<>]{5,100}(?:rue|avenue|boulevard|quartier)',
+    ]
+    for pattern in address_patterns:
+        addresses = re.findall(pattern, str(soup))
+        if addresses:
+            structured_data.append(f"📍 Adresse : {addresses[0]}")
+            break
+
+    text_blocks = []
+    for tag in soup.find_all(['h1', 'h2', 'h3', 'h4', 'p', 'li', 'address', 'span']):
+        text = tag.get_text().strip()
+        if len(text) > 10:
+            text_blocks.append(text)
+
+    cleaned = [b for b in text_blocks if not (any(w in b.lower() for w in BLACKLIST) or len(b) < 15)]
+    unique_blocks, seen = [], set()
+    for block in cleaned:
+        normalized = re.sub(r'\s+', ' ', block.lower())
+        if normalized not in seen:
+            seen.add(normalized)
+            unique_blocks.append(block)
+    return structured_data + unique_blocks
+
+
+def bench(func, pages: list, repeat: int) -> dict:
+    func(pages[0])  # Préchauffage
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for html in pages:
+            func(html)
+    elapsed = time.perf_counter() - start
+    total_pages = repeat * len(pages)
+    total_bytes = repeat * sum(len(p.encode("utf-8")) for p in pages)
+    return {
+        "pages_s": total_pages / elapsed,
+        "mb_s": total_bytes / elapsed / 1e6,
+        "blocks": sum(len(func(html)) for html in pages),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de l'extraction HTML")
+    parser.add_argument("--dir", type=Path, default=FIXTURES_DIR, help="Répertoire de pages .html")
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    pages = [p.read_text(encoding="utf-8") for p in sorted(args.dir.glob("*.html"))]
+    if not pages:
+        print(f"❌ Aucune page .html dans {args.dir}")
+        return
+    size_kb = sum(len(p.encode("utf-8")) for p in pages) / 1024
+    print(f"📄 {len(pages)} pages ({size_kb:.0f} Ko), {args.repeat} répétitions\n")
+
+    methods = [
+        ("bs4 (ancien)", extract_content_bs4),
+        ("1 passage html.parser", lambda html: extract_content(html, parser="html.parser")),
+    ]
+    if LXML_AVAILABLE:
+        methods.append(("1 passage lxml", lambda html: extract_content(html, parser="lxml")))
+    else:
+        print("⚠️ lxml non installé : pip install lxml pour le parseur rapide\n")
+
+    print(f"{'méthode':<24} {'pages/s':>9} {'Mo/s':>7} {'blocs':>6} {'gain':>6}")
+    baseline = None
+    for name, func in methods:
+        r = bench(func, pages, args.repeat)
+        baseline = baseline or r["pages_s"]
+        print(f"{name:<24} {r['pages_s']:>9.0f} {r['mb_s']:>7.2f} {r['blocks']:>6} {r['pages_s'] / baseline:>5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
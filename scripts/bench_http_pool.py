@@ -0,0 +1,154 @@
+# scripts/bench_http_pool.py
+"""
+Compare un `requests.post` neuf par appel (ancien `_call_gemini_direct`) au client
+partagé de `app.http_client` (connexions conservées entre les appels).
+
+Le serveur est un faux Gemini local en HTTPS (certificat auto-signé généré au
+lancement) : il répond au format generateContent. `--rtt-ms` simule la latence
+réseau vers Google en retardant chaque nouvelle connexion TCP (le coût que le
+keep-alive évite : connexion + poignée de main TLS).
+
+Usage :
+    python scripts/bench_http_pool.py [--calls 50] [--rtt-ms 40]
+"""
+import argparse
+import datetime
+import ipaddress
+import json
+import ssl
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import requests
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from app.http_client import build_http_client
+
+FAKE_RESPONSE = json.dumps({
+    "candidates": [{"content": {"parts": [{"text": "EMAIL"}]}}],
+    "usageMetadata": {"promptTokenCount": 42, "candidatesTokenCount": 1},
+}).encode("utf-8")
+
+
+def write_self_signed_cert(directory: Path) -> tuple:
+    """Certificat auto-signé pour 127.0.0.1 (retourne les chemins cert, clé)."""
+    from cryptography import x509
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import ec
+    from cryptography.x509.oid import NameOID
+
+    key = ec.generate_private_key(ec.SECP256R1())
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "127.0.0.1")])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(name).issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now - datetime.timedelta(minutes=1))
+        .not_valid_after(now + datetime.timedelta(days=1))
+        .add_extension(x509.SubjectAlternativeName([x509.IPAddress(ipaddress.ip_address("127.0.0.1"))]), False)
+        .add_extension(x509.BasicConstraints(ca=True, path_length=None), True)
+        .sign(key, hashes.SHA256())
+    )
+    cert_path, key_path = directory / "cert.pem", directory / "key.pem"
+    cert_path.write_bytes(cert.public_bytes(serialization.Encoding.PEM))
+    key_path.write_bytes(key.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+    ))
+    return cert_path, key_path
+
+
+class FakeGeminiHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(FAKE_RESPONSE)))
+        self.end_headers()
+        self.wfile.write(FAKE_RESPONSE)
+
+    def log_message(self, *args):
+        pass
+
+
+class FakeGeminiServer(ThreadingHTTPServer):
+    """Serveur TLS ; chaque nouvelle connexion coûte `rtt` secondes avant la poignée de main."""
+
+    daemon_threads = True
+
+    def __init__(self, context: ssl.SSLContext, rtt: float):
+        super().__init__(("127.0.0.1", 0), FakeGeminiHandler)
+        self.context = context
+        self.rtt = rtt
+        self.connections = 0
+
+    def get_request(self):
+        sock, addr = super().get_request()
+        self.connections += 1
+        time.sleep(self.rtt)
+        return self.context.wrap_socket(sock, server_side=True), addr
+
+
+def run_calls(post, url: str, calls: int) -> list:
+    """Durées (ms) de `calls` appels successifs."""
+    durations = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        response = post(url)
+        response.raise_for_status()
+        response.json()
+        durations.append((time.perf_counter() - start) * 1000)
+    return durations
+
+
+def report(label: str, durations: list, connections: int):
+    print(f"  {label:<22} médiane {statistics.median(durations):7.2f} ms   "
+          f"moyenne {statistics.mean(durations):7.2f} ms   connexions ouvertes : {connections}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="requests.post neuf vs client HTTP partagé")
+    parser.add_argument("--calls", type=int, default=50)
+    parser.add_argument("--rtt-ms", type=float, default=40, help="latence simulée par nouvelle connexion")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cert, key = write_self_signed_cert(Path(tmp))
+        context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+        context.load_cert_chain(cert, key)
+        server = FakeGeminiServer(context, args.rtt_ms / 1000)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"https://127.0.0.1:{server.server_port}/v1beta/models/gemini-2.5-flash:generateContent"
+        payload = {"contents": [{"parts": [{"text": "Classifie : Comment contacter l'IMT ?"}]}]}
+
+        print(f"{args.calls} appels generateContent, latence simulée {args.rtt_ms:.0f} ms par connexion")
+
+        fresh = run_calls(lambda u: requests.post(u, json=payload, timeout=30, verify=str(cert)), url, args.calls)
+        report("requests.post (neuf)", fresh, server.connections)
+
+        server.connections = 0
+        client = build_http_client(verify=str(cert))
+        pooled = run_calls(lambda u: client.post(u, json=payload), url, args.calls)
+        client.close()
+        report("client partagé", pooled, server.connections)
+
+        server.shutdown()
+
+    saved = statistics.median(fresh) - statistics.median(pooled)
+    print(f"  gain par appel : {saved:.2f} ms (x2 appels LLM par message : {2 * saved:.2f} ms)")
+
+
+if __name__ == "__main__":
+    main()
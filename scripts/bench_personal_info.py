@@ -0,0 +1,128 @@
+# scripts/bench_personal_info.py
+"""
+Microbenchmark de l'extraction des informations personnelles, exécutée à chaque
+message avant la recherche.
+
+Compare l'ancienne version de `_extract_personal_info` (import de `re` et motifs
+réinterprétés à chaque appel) et de la détection des questions personnelles
+(série de tests `in`) à la version compilée avec pré-filtre de `app.agent`, sur un
+mélange de messages courants et de messages contenant des informations
+personnelles (--personal-ratio). Vérifie aussi que les deux versions extraient
+les mêmes entités.
+
+Usage :
+    python scripts/bench_personal_info.py [--messages 20000] [--personal-ratio 0.05]
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from app import agent as agent_module
+
+COMMON = [
+    "Quelles formations propose l'IMT Dakar ?",
+    "Comment s'inscrire au bootcamp développement web ?",
+    "Quels sont les frais de scolarité ?",
+    "Y a-t-il des formations en cybersécurité ?",
+    "Bonjour, je voudrais des informations sur la formation data",
+    "Envoyer un email au directeur pour un stage",
+    "Les cours ont-ils lieu le samedi ?",
+    "Merci beaucoup pour votre aide",
+    "Je suis intéressé par le parcours réseaux et télécoms",
+    "Quel est le numéro de la scolarité ?",
+]
+PERSONAL = [
+    "Je m'appelle Maliki",
+    "retiens que je m'appelle awa diop",
+    "Mon nom est Fatou",
+    "Je suis une étudiante en master.",
+    "mon email est awa@example.com",
+    "Mon numéro est +221 77 123 45 67",
+    "Qui suis-je ?",
+    "C'est quoi mon profil",
+]
+
+
+def legacy_extract(question: str) -> dict:
+    import re
+    entities = {}
+    q_lower = question.lower().strip()
+    question_words = ['comment', 'qui', 'quoi', 'quel', 'quelle', 'où', 'pourquoi', 'quand']
+    if any(q_lower.startswith(word) for word in question_words):
+        return entities
+    name_patterns = [
+        r"(?:je m['']appelle|retiens que je m['']appelle)\s+([A-ZÀ-Ÿa-zéèêàâîôûç]+(?:\s+[A-ZÀ-Ÿa-zéèêàâîôûç]+)?)",
+        r"mon nom (?:est|c'est)\s+([A-ZÀ-Ÿa-zéèêàâîôûç]+(?:\s+[A-ZÀ-Ÿa-zéèêàâîôûç]+)?)",
+    ]
+    for pattern in name_patterns:
+        match = re.search(pattern, question, re.IGNORECASE)
+        if match:
+            name = match.group(1).strip()
+            if name.lower() not in question_words:
+                entities['name'] = ' '.join(word.capitalize() for word in name.split())
+                break
+    profile_match = re.search(r"je suis (?:un|une)\s+(.+?)(?:\.|$|,)", q_lower)
+    if profile_match:
+        entities['profile'] = profile_match.group(1).strip()
+    email_match = re.search(
+        r"mon (?:email|e-mail|adresse|mail) (?:est|c'est)\s+([a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,})", q_lower)
+    if email_match:
+        entities['email'] = email_match.group(1)
+    phone_match = re.search(r"mon (?:téléphone|numéro|tel) (?:est|c'est)\s+([+]?[0-9\s]+)", q_lower)
+    if phone_match:
+        entities['phone'] = phone_match.group(1).strip()
+    return entities
+
+
+def legacy_asks(question: str) -> bool:
+    q_lower = question.lower().strip()
+    phrases = ["je m'appelle", "mon nom", "comment je", "qui suis-je", "appelle comment", "je suis qui",
+               "mon profil", "c'est quoi mon profil", "email", "e-mail", "adresse mail", "téléphone", "numéro", "tel"]
+    return any(phrase in q_lower for phrase in phrases)
+
+
+def new_turn(question: str):
+    return agent_module._extract_personal_info(question), agent_module._asks_personal_info(question)
+
+
+def legacy_turn(question: str):
+    return legacy_extract(question), legacy_asks(question)
+
+
+def per_message_us(fn, messages) -> float:
+    start = time.perf_counter()
+    for m in messages:
+        fn(m)
+    return (time.perf_counter() - start) / len(messages) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Extraction des informations personnelles : ancien vs compilé")
+    parser.add_argument("--messages", type=int, default=20000)
+    parser.add_argument("--personal-ratio", type=float, default=0.05)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    messages = [rng.choice(PERSONAL if rng.random() < args.personal_ratio else COMMON)
+                for _ in range(args.messages)]
+
+    mismatches = [m for m in COMMON + PERSONAL if legacy_turn(m) != new_turn(m)]
+    print(f"Concordance : {len(COMMON + PERSONAL) - len(mismatches)}/{len(COMMON + PERSONAL)} messages")
+    for m in mismatches:
+        print(f"  {m!r} : ancien={legacy_turn(m)} compilé={new_turn(m)}")
+
+    for label, sample in (("mélange", messages), ("courants", COMMON * 200), ("personnels", PERSONAL * 200)):
+        legacy_us = min(per_message_us(legacy_turn, sample) for _ in range(3))
+        new_us = min(per_message_us(new_turn, sample) for _ in range(3))
+        print(f"  {label:<11} ancien {legacy_us:6.2f} µs/message, compilé {new_us:6.2f} µs/message "
+              f"({legacy_us / new_us:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+# scripts/bench_redis_memory.py
+"""
+Débit (ops/s) et allers-retours par appel de RedisMemory contre un redis-server,
+comparés à l'ancienne implémentation (une commande Redis par étape) :
+
+- create_session : SMEMBERS, un TTL par session, SADD, DELETE, RPUSH, deux EXPIRE
+  (avant) ; un script Lua (après) ;
+- add_message / set_entity : écriture + EXPIRE (avant) ; un script Lua (après) ;
+- switch_session / list_sessions : SISMEMBER/SMEMBERS puis TTL, LRANGE/LLEN (avant) ;
+  un script Lua (après).
+
+Avec `--sessions N`, l'index est ensuite rempli de N sessions vivantes
+(MAX_SESSIONS = N) : create_session doit évincer à chaque appel, en parcourant tout
+le SET avec un TTL par session (avant) ou en prenant le premier élément de l'index
+trié par activité (après).
+
+Les allers-retours sont comptés sur la connexion (un envoi = un aller-retour).
+La base `--db` (15 par défaut) est vidée au début et à la fin.
+
+Usage :
+    python scripts/bench_redis_memory.py [--host localhost] [--port 6379] [--db 15] [-n 2000] [--sessions 5000]
+"""
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from redis.connection import Connection
+
+from memory.redis_memory import RedisMemory
+
+SENDS = [0]
+_send_packed_command = Connection.send_packed_command
+
+
+def _counting_send(self, command, check_health=True):
+    SENDS[0] += 1
+    return _send_packed_command(self, command, check_health)
+
+
+Connection.send_packed_command = _counting_send
+
+
+class LegacyMemory:
+    """Chemins Redis de l'ancienne RedisMemory (une commande par étape)."""
+
+    def __init__(self, memory: RedisMemory):
+        self.r = memory.r
+        self.max_sessions = 3  # ancienne limite globale
+        self.ttl = memory.SESSION_TTL
+
+    def create_session(self, session_id):
+        active = self.r.smembers("active_sessions")
+        if len(active) >= self.max_sessions:
+            oldest, min_ttl = None, float("inf")
+            for sid in active:
+                ttl = self.r.ttl(f"chat_history:{sid}")
+                if ttl < min_ttl:
+                    min_ttl, oldest = ttl, sid
+            if oldest:
+                self.delete_session(oldest)
+        self.r.sadd("active_sessions", session_id)
+        self.r.delete(f"chat_history:{session_id}")
+        self.r.rpush(f"chat_history:{session_id}", f"system: Session {session_id} créée")
+        self.r.expire(f"chat_history:{session_id}", self.ttl)
+        self.r.expire(f"entities:{session_id}", self.ttl)
+
+    def delete_session(self, session_id):
+        self.r.srem("active_sessions", session_id)
+        self.r.delete(f"chat_history:{session_id}")
+        self.r.delete(f"entities:{session_id}")
+
+    def add_message(self, session_id, role, content):
+        self.r.rpush(f"chat_history:{session_id}", f"{role}: {content}")
+        self.r.expire(f"chat_history:{session_id}", self.ttl)
+
+    def set_entity(self, session_id, entity_type, value):
+        self.r.hset(f"entities:{session_id}", entity_type, value)
+        self.r.expire(f"entities:{session_id}", self.ttl)
+
+    def switch_session(self, session_id):
+        if not self.r.sismember("active_sessions", session_id):
+            return
+        if self.r.ttl(f"chat_history:{session_id}") > 0:
+            self.r.lrange(f"chat_history:{session_id}", 0, -1)
+
+    def list_sessions(self):
+        for sid in self.r.smembers("active_sessions"):
+            if self.r.ttl(f"chat_history:{sid}") > 0:
+                self.r.llen(f"chat_history:{sid}")
+
+
+def measure(fn, n: int):
+    """(ops/s, allers-retours par appel)"""
+    SENDS[0] = 0
+    start = time.perf_counter()
+    for i in range(n):
+        fn(i)
+    elapsed = time.perf_counter() - start
+    return n / elapsed, SENDS[0] / n
+
+
+def scenarios(impl, session_id):
+    return [
+        ("create_session", lambda i: impl.create_session(f"bench-{i % 50}")),
+        ("add_message", lambda i: impl.add_message(session_id, "user", "Quelles sont les formations ?")),
+        ("set_entity", lambda i: impl.set_entity(session_id, "name", "Awa")),
+        ("switch_session", lambda i: impl.switch_session(session_id)),
+        ("list_sessions", lambda i: impl.list_sessions()),
+    ]
+
+
+def populate(memory: RedisMemory, count: int):
+    """`count` sessions vivantes dans l'ancien index (SET) et le nouveau (ZSET)."""
+    now = time.time()
+    pipe = memory.r.pipeline(transaction=False)
+    for i in range(count):
+        sess_id = f"live-{i}"
+        pipe.sadd("active_sessions", sess_id)
+        pipe.zadd(memory._get_sessions_key(), {sess_id: now - (count - i) * 1e-3})
+        pipe.rpush(f"chat_history:{sess_id}", "user: Bonjour")
+        pipe.expire(f"chat_history:{sess_id}", memory.SESSION_TTL)
+    pipe.execute()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="RedisMemory : ops/s et allers-retours, ancien vs pipeline/Lua")
+    parser.add_argument("--host", default=os.getenv("REDIS_HOST", "localhost"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("REDIS_PORT", "6379")))
+    parser.add_argument("--db", type=int, default=15)
+    parser.add_argument("-n", type=int, default=2000, help="appels par opération")
+    parser.add_argument("--sessions", type=int, default=5000, help="sessions vivantes (éviction à grande échelle)")
+    args = parser.parse_args()
+
+    memory = RedisMemory(host=args.host, port=args.port, db=args.db)
+    if not memory.redis_available:
+        sys.exit("redis-server injoignable")
+    memory.r.flushdb()
+    legacy = LegacyMemory(memory)
+
+    print(f"{'opération':<16}{'ancien ops/s':>14}{'a/r':>6}{'nouveau ops/s':>16}{'a/r':>6}")
+    for (name, old), (_, new) in zip(scenarios(legacy, "bench-old"), scenarios(memory, "bench-new")):
+        memory.r.flushdb()
+        memory.create_session("bench-old")
+        memory.create_session("bench-new")
+        old_ops, old_rt = measure(old, args.n)
+        new_ops, new_rt = measure(new, args.n)
+        print(f"{name:<16}{old_ops:>14.0f}{old_rt:>6.1f}{new_ops:>16.0f}{new_rt:>6.1f}")
+
+    if args.sessions:
+        memory.r.flushdb()
+        populate(memory, args.sessions)
+        memory.MAX_SESSIONS = legacy.max_sessions = args.sessions
+        n = max(1, min(args.n, 50))
+        print(f"\nÉviction avec {args.sessions} sessions vivantes ({n} appels)")
+        old_ops, old_rt = measure(lambda i: legacy.create_session(f"old-{i}"), n)
+        new_ops, new_rt = measure(lambda i: memory.create_session(f"new-{i}"), n)
+        print(f"{'create_session':<16}{old_ops:>14.0f}{old_rt:>6.1f}{new_ops:>16.0f}{new_rt:>6.1f}")
+    memory.r.flushdb()
+
+
+if __name__ == "__main__":
+    main()
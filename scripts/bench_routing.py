@@ -0,0 +1,144 @@
+# scripts/bench_routing.py
+"""
+Compare les modes de routage de l'agent (AGENT_ROUTING_MODE) : appels LLM, tokens et
+latence par question.
+
+    llm    : décision SEARCH/EMAIL par un appel, puis reformulation (flux historique)
+    single : décision et réponse en un seul appel à sortie JSON
+    local  : décision par heuristique locale, un appel pour la réponse
+    classifieur : mode llm précédé du classifieur d'intention local (data/intent_model.json) ;
+                  le LLM ne décide que lorsque le classifieur est peu sûr
+
+Gemini est remplacé par un modèle simulé : il compte les tokens des prompts
+(`app.tokens.count_tokens`) et estime la latence de chaque appel par
+    aller-retour + tokens_entrée x coût_entrée + tokens_sortie x coût_sortie
+(défauts proches de gemini-2.5-flash depuis Dakar). La recherche locale est réelle ;
+l'envoi d'email est neutralisé.
+
+Usage :
+    python scripts/bench_routing.py [--rtt-ms 450] [--decode-ms 6] [--answer-tokens 120]
+"""
+import argparse
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from app import agent as agent_module
+from app.circuit_breaker import CircuitBreaker
+from app.intent_classifier import load_classifier
+from app.tokens import count_tokens
+
+QUESTIONS = [
+    "Quelles formations propose l'IMT Dakar ?",
+    "Comment s'inscrire au bootcamp développement web ?",
+    "Quels sont les frais de scolarité ?",
+    "Quels métiers vise la formation en data ?",
+    "Quelles certifications sont proposées ?",
+    "Quels partenaires travaillent avec l'IMT ?",
+    "Y a-t-il des formations en cybersécurité ?",
+    "Quelle est la durée des formations courtes ?",
+    "Envoyer un email au directeur pour un stage",
+    "Je veux écrire un message à la scolarité",
+]
+
+ANSWER = (
+    "L'IMT Dakar propose des formations courtes et certifiantes dans le numérique : "
+    "développement web, data, cybersécurité et réseaux. Les inscriptions se font en ligne "
+    "et l'équipe pédagogique accompagne chaque candidat. "
+)
+
+
+class SimulatedGemini:
+    """Remplace `_call_gemini_direct` : compte les tokens et modélise la latence."""
+
+    def __init__(self, rtt_ms: float, prefill_ms: float, decode_ms: float, answer_tokens: int):
+        self.rtt_ms = rtt_ms
+        self.prefill_ms = prefill_ms
+        self.decode_ms = decode_ms
+        repeats = max(1, round(answer_tokens / count_tokens(ANSWER)))
+        self.answer = (ANSWER * repeats).strip()
+        self.reset()
+
+    def reset(self):
+        self.calls = 0
+        self.tokens_in = 0
+        self.tokens_out = 0
+        self.latency_ms = 0.0
+
+    def __call__(self, prompt: str, json_output: bool = False):
+        if "UNIQUEMENT par SEARCH ou EMAIL" in prompt:
+            question = prompt.split("Question :", 1)[1]
+            output = agent_module._resolve_decision(None, question)
+        elif json_output:
+            question = prompt.split("MESSAGE DE L'UTILISATEUR :", 1)[1].split("1. INTENTION", 1)[0]
+            intent = agent_module._resolve_decision(None, question)
+            output = json.dumps({"intent": intent, "answer": self.answer if intent == "SEARCH" else ""},
+                                ensure_ascii=False)
+        else:
+            output = self.answer
+        tokens_in, tokens_out = count_tokens(prompt), count_tokens(output)
+        self.calls += 1
+        self.tokens_in += tokens_in
+        self.tokens_out += tokens_out
+        self.latency_ms += self.rtt_ms + tokens_in * self.prefill_ms + tokens_out * self.decode_ms
+        return output
+
+
+def run_mode(mode: str, model: SimulatedGemini, classifier=None) -> dict:
+    per_question = []
+    for question in QUESTIONS:
+        model.reset()
+        start = time.perf_counter()
+        with patch.object(agent_module, "AGENT_ROUTING_MODE", mode), \
+                patch.object(agent_module, "intent_classifier", classifier):
+            agent_module.agent(question)
+        local_ms = (time.perf_counter() - start) * 1000
+        per_question.append({
+            "calls": model.calls, "tokens_in": model.tokens_in, "tokens_out": model.tokens_out,
+            "latency_ms": model.latency_ms + local_ms,
+        })
+    return {
+        "calls": sum(q["calls"] for q in per_question) / len(QUESTIONS),
+        "tokens_in": sum(q["tokens_in"] for q in per_question) / len(QUESTIONS),
+        "tokens_out": sum(q["tokens_out"] for q in per_question) / len(QUESTIONS),
+        "median_ms": statistics.median(q["latency_ms"] for q in per_question),
+        "mean_ms": statistics.mean(q["latency_ms"] for q in per_question),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Appels, tokens et latence par mode de routage")
+    parser.add_argument("--rtt-ms", type=float, default=450, help="aller-retour + premier token")
+    parser.add_argument("--prefill-ms", type=float, default=0.05, help="coût par token d'entrée")
+    parser.add_argument("--decode-ms", type=float, default=6, help="coût par token de sortie")
+    parser.add_argument("--answer-tokens", type=int, default=120)
+    args = parser.parse_args()
+
+    model = SimulatedGemini(args.rtt_ms, args.prefill_ms, args.decode_ms, args.answer_tokens)
+    with patch.object(agent_module, "_call_gemini_direct", model), \
+            patch.object(agent_module, "GENAI_AVAILABLE", True), \
+            patch.object(agent_module, "GROK_AVAILABLE", False), \
+            patch.object(agent_module, "OPENAI_AVAILABLE", False), \
+            patch.object(agent_module, "gemini_breaker", CircuitBreaker("bench-gemini")), \
+            patch.object(agent_module, "send_email", lambda **kwargs: "Email envoyé"):
+        results = {mode: run_mode(mode, model) for mode in ("llm", "single", "local")}
+        results["classifieur"] = run_mode("llm", model, load_classifier())
+
+    baseline = results["llm"]
+    print(f"{len(QUESTIONS)} questions, aller-retour {args.rtt_ms:.0f} ms, {args.decode_ms:g} ms/token de sortie")
+    print(f"  {'mode':<12}{'appels':>8}{'tok. entrée':>13}{'tok. sortie':>13}{'médiane':>11}{'moyenne':>11}{'gain':>9}")
+    for mode, r in results.items():
+        saved = 1 - r["mean_ms"] / baseline["mean_ms"]
+        print(f"  {mode:<12}{r['calls']:>8.1f}{r['tokens_in']:>13.0f}{r['tokens_out']:>13.0f}"
+              f"{r['median_ms']:>9.0f}ms{r['mean_ms']:>9.0f}ms{saved:>8.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+# scripts/bench_startup.py
+"""
+Mesure le temps d'import de `app.agent` (démarrage d'un worker Chainlit) et compte
+les appels réseau faits pendant l'import.
+
+Chaque mesure tourne dans un processus Python neuf, avec des clés d'API factices
+(pour que les fournisseurs soient « configurés ») et des sondes sur `socket` :
+tout `connect` / `getaddrinfo` pendant l'import est compté puis refusé, si bien
+qu'un import qui dépendrait du réseau le montre immédiatement.
+
+Usage :
+    python scripts/bench_startup.py [--module app.agent] [--runs 5]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+# Exécuté dans le sous-processus : sondes réseau puis import chronométré
+PROBE = """
+import json, socket, sys, time
+calls = []
+def _blocked(name):
+    def wrapper(*args, **kwargs):
+        calls.append(f"{name}{args[1:2] if name == 'connect' else args[:2]}")
+        raise OSError("réseau interdit pendant l'import")
+    return wrapper
+socket.socket.connect = _blocked("connect")
+socket.socket.connect_ex = _blocked("connect")
+socket.getaddrinfo = _blocked("getaddrinfo")
+socket.create_connection = _blocked("create_connection")
+start = time.perf_counter()
+__import__(sys.argv[1])
+elapsed = time.perf_counter() - start
+print(json.dumps({"seconds": elapsed, "network_calls": calls}))
+"""
+
+FAKE_KEYS = {
+    "GEMINI_API_KEY": "bench-gemini",
+    "XAI_API_KEY": "bench-xai",
+    "OPENAI_API_KEY": "bench-openai",
+    "LANGFUSE_PUBLIC_KEY": "pk-bench",
+    "LANGFUSE_SECRET_KEY": "sk-bench",
+}
+
+
+def measure_import(module: str = "app.agent") -> dict:
+    """Importe `module` dans un processus neuf et retourne {seconds, network_calls}."""
+    env = {**os.environ, **FAKE_KEYS}
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE, module],
+        cwd=PROJECT_ROOT, env=env, capture_output=True, text=True, timeout=120,
+    )
+    lines = [line for line in result.stdout.splitlines() if line.startswith("{")]
+    if result.returncode != 0 or not lines:
+        raise RuntimeError(f"Import de {module} impossible :\n{result.stderr[-2000:]}")
+    return json.loads(lines[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Temps d'import et appels réseau au démarrage")
+    parser.add_argument("--module", default="app.agent")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    runs = [measure_import(args.module) for _ in range(args.runs)]
+    times = [r["seconds"] * 1000 for r in runs]
+    calls = runs[-1]["network_calls"]
+    print(f"import {args.module} ({args.runs} processus neufs)")
+    print(f"  médiane : {statistics.median(times):.0f} ms   min : {min(times):.0f} ms   max : {max(times):.0f} ms")
+    print(f"  appels réseau pendant l'import : {len(calls)}")
+    for call in calls:
+        print(f"    - {call}")
+
+
+if __name__ == "__main__":
+    main()
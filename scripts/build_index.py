@@ -3,10 +3,21 @@
 Script pour créer l'index JSON des chunks à partir des fichiers .txt
 Ce script est obsolète - utilisez build_vector_index.py à la place pour FAISS
 """
+import argparse
+import sys
 from pathlib import Path
 import json
 import re
 
+# Permet `from app...` quand le script est lancé depuis la racine du projet
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from app.chunking import DEFAULT_OVERLAP_TOKENS, DEFAULT_TARGET_TOKENS, chunk_text
+from app.dedup import NEAR_DUPLICATE_THRESHOLD, deduplicate_chunks
+from app.tokens import count_tokens
+
 DATA_DIR = Path("data")
 INDEX_FILE = DATA_DIR / "chunks.json"
 
@@ -29,28 +40,69 @@ def split_into_paragraphs(text):
     
     return valid_paragraphs
 
-def build_index():
-    """Construit l'index de recherche avec découpage intelligent par paragraphes."""
+def deduplicate(chunks, threshold=NEAR_DUPLICATE_THRESHOLD):
+    """Fusionne les chunks quasi-identiques (MinHash-LSH) et affiche le gain."""
+    tokens_before = sum(c["tokens"] for c in chunks)
+    unique_chunks = deduplicate_chunks(chunks, threshold=threshold)
+    for chunk in unique_chunks:
+        chunk["tokens"] = count_tokens(chunk["content"])
+    tokens_after = sum(c["tokens"] for c in unique_chunks)
+
+    removed = len(chunks) - len(unique_chunks)
+    print(f"🧹 Dédoublonnage (Jaccard ≥ {threshold}) : {removed} chunks fusionnés "
+          f"({len(chunks)} → {len(unique_chunks)}), "
+          f"~{tokens_before - tokens_after} tokens économisés ({tokens_before} → {tokens_after})")
+    return unique_chunks
+
+
+def split_text(text, chunker="paragraph", target_tokens=DEFAULT_TARGET_TOKENS,
+               overlap_tokens=DEFAULT_OVERLAP_TOKENS):
+    """Découpe un texte nettoyé en chunks {content, tokens}."""
+    if chunker == "tokens":
+        return [
+            {"content": c["content"], "tokens": c["tokens"]}
+            for c in chunk_text(text, target_tokens, overlap_tokens)
+        ]
+    return [{"content": p, "tokens": count_tokens(p)} for p in split_into_paragraphs(text)]
+
+
+def build_index(dedup=True, threshold=NEAR_DUPLICATE_THRESHOLD, chunker="paragraph",
+                target_tokens=DEFAULT_TARGET_TOKENS, overlap_tokens=DEFAULT_OVERLAP_TOKENS):
+    """Construit l'index de recherche (découpage par paragraphes ou par tokens)."""
     chunks = []
 
     for txt_file in DATA_DIR.glob("*.txt"):
         raw_text = txt_file.read_text(encoding="utf-8")
         cleaned_text = clean_text(raw_text)
         
-        paragraphs = split_into_paragraphs(cleaned_text)
-        
-        for paragraph in paragraphs:
+        for chunk in split_text(cleaned_text, chunker, target_tokens, overlap_tokens):
             chunks.append({
                 "source": txt_file.name,
-                "content": paragraph
+                "content": chunk["content"],
+                "tokens": chunk["tokens"]
             })
 
+    if dedup:
+        chunks = deduplicate(chunks, threshold)
+
     # Sauvegarder dans chunks.json
     INDEX_FILE.write_text(json.dumps(chunks, ensure_ascii=False, indent=2), encoding="utf-8")
     
-    print(f"✅ Index créé avec succès ({len(chunks)} chunks)")
+    print(f"✅ Index créé avec succès ({len(chunks)} chunks, découpage '{chunker}')")
     print(f"📄 Fichiers traités : {len(list(DATA_DIR.glob('*.txt')))}")
     print(f"💾 Sauvegardé dans : {INDEX_FILE}")
 
 if __name__ == "__main__":
-    build_index()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Construit data/chunks.json")
+    parser.add_argument("--no-dedup", action="store_true", help="Désactiver la fusion des quasi-doublons")
+    parser.add_argument("--dedup-threshold", type=float, default=NEAR_DUPLICATE_THRESHOLD,
+                        help="Similarité Jaccard minimale pour fusionner deux chunks")
+    parser.add_argument("--chunker", choices=["paragraph", "tokens"], default="paragraph",
+                        help="Découpage par paragraphes (historique) ou par fenêtre de tokens")
+    parser.add_argument("--target-tokens", type=int, default=DEFAULT_TARGET_TOKENS,
+                        help="Taille cible d'un chunk en tokens (--chunker tokens)")
+    parser.add_argument("--overlap-tokens", type=int, default=DEFAULT_OVERLAP_TOKENS,
+                        help="Recouvrement entre chunks consécutifs en tokens (--chunker tokens)")
+    args = parser.parse_args()
+    build_index(dedup=not args.no_dedup, threshold=args.dedup_threshold, chunker=args.chunker,
+                target_tokens=args.target_tokens, overlap_tokens=args.overlap_tokens)
\ No newline at end of file
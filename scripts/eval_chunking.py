@@ -0,0 +1,96 @@
+# scripts/eval_chunking.py
+"""
+Compare le découpage par paragraphes et le découpage par tokens (app/chunking.py).
+
+Pour chaque question d'un jeu de référence, on lance la recherche lexicale
+(`search_documents`) avec chaque chunker et on mesure :
+- le rappel@k : la réponse attendue figure-t-elle dans les chunks retournés ?
+- la taille du prompt : tokens de contexte envoyés au LLM (moyenne et max)
+- la dispersion de la taille des chunks produits
+
+Usage :
+    python scripts/eval_chunking.py [--top-k 3] [--target-tokens 128] [--overlap-tokens 24]
+"""
+import argparse
+import statistics
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from app import simple_search
+from app.simple_search import extract_chunks, load_documents, search_documents
+
+# (question, extrait attendu dans le contexte retourné)
+GOLD_QUESTIONS = [
+    ("Quels sont les débouchés du bachelor numérique ?", "Technicien cloud"),
+    ("Où se situe l'Edulab ?", "Avenue Cheikh Anta Diop"),
+    ("Combien d'années dure le bachelor ?", "bachelor en 3 ans"),
+    ("Quelle est la durée du stage ?", "stage de 2 mois"),
+    ("Depuis quand l'IMT propose des formations à Dakar ?", "depuis 2019"),
+    ("Combien d'écoles d'ingénieurs regroupe l'Institut Mines-Télécom ?", "7 écoles d"),
+    ("Avec quelle université l'IMT a signé un partenariat en Afrique du Sud ?", "Université de Pretoria"),
+    ("Qu'est-ce que le Campus franco-sénégalais ?", "initiative inter-gouvernementale"),
+    ("Quelles sont les options du bachelor énergie et génie civil ?", "construction durable"),
+    ("Combien de filières propose l'IMT à Dakar ?", "3 filières"),
+    ("Comment se déroule la 3ème année ?", "alternance"),
+    ("Qui accueille l'Edulab ?", "apprenants des formations"),
+]
+
+# Surcoût du format de contexte ("[Source: ..., Score: ...]" + séparateurs)
+HEADER_TOKENS = 12
+
+
+def evaluate(chunker: str, documents: dict, top_k: int) -> dict:
+    hits, prompt_sizes, misses = 0, [], []
+    for question, expected in GOLD_QUESTIONS:
+        results = search_documents(question, documents, top_k=top_k, chunker=chunker)
+        context = "\n".join(r["content"] for r in results)
+        if expected.lower() in context.lower():
+            hits += 1
+        else:
+            misses.append(question)
+        prompt_sizes.append(sum(r["tokens"] + HEADER_TOKENS for r in results))
+
+    chunk_sizes = [c["tokens"] for text in documents.values() for c in extract_chunks(text, chunker)]
+    return {
+        "recall": hits / len(GOLD_QUESTIONS),
+        "prompt_mean": statistics.mean(prompt_sizes),
+        "prompt_max": max(prompt_sizes),
+        "chunks": len(chunk_sizes),
+        "chunk_min": min(chunk_sizes),
+        "chunk_max": max(chunk_sizes),
+        "chunk_stdev": statistics.pstdev(chunk_sizes),
+        "misses": misses,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Évaluation des chunkers")
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--target-tokens", type=int, default=simple_search.SEARCH_CHUNK_TOKENS)
+    parser.add_argument("--overlap-tokens", type=int, default=simple_search.SEARCH_CHUNK_OVERLAP)
+    args = parser.parse_args()
+
+    simple_search.SEARCH_CHUNK_TOKENS = args.target_tokens
+    simple_search.SEARCH_CHUNK_OVERLAP = args.overlap_tokens
+    documents = load_documents()
+
+    print(f"{'chunker':<10} {'rappel@' + str(args.top_k):>9} {'prompt moy':>11} {'prompt max':>11} "
+          f"{'chunks':>7} {'min':>5} {'max':>5} {'écart-type':>11}")
+    reports = {}
+    for chunker in ("paragraph", "tokens"):
+        r = evaluate(chunker, documents, args.top_k)
+        reports[chunker] = r
+        print(f"{chunker:<10} {r['recall']:>9.0%} {r['prompt_mean']:>11.0f} {r['prompt_max']:>11} "
+              f"{r['chunks']:>7} {r['chunk_min']:>5} {r['chunk_max']:>5} {r['chunk_stdev']:>11.1f}")
+
+    for chunker, r in reports.items():
+        for question in r["misses"]:
+            print(f"  ✗ [{chunker}] {question}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,399 @@
+# scripts/ingest_pipeline.py
+"""
+Pipeline d'ingestion en flux : pages → nettoyage → chunks → embeddings → index.
+
+Remplace l'enchaînement manuel scrape_imt.py → build_index.py → build_vector_index.py.
+Chaque étape tourne dans son propre thread et reçoit ses éléments par une file
+bornée (`queue.Queue(maxsize=...)`) : une page est nettoyée pendant que la suivante
+est téléchargée, et une étape lente freine les précédentes au lieu d'accumuler
+tout le site en mémoire.
+
+Le résultat est écrit dans un nouveau répertoire versionné `data/index/<version>/`
+(pages/, chunks.json, contact_entities.json, faiss.index, embeddings.pkl,
+manifest.json). Le pointeur `data/index/CURRENT` n'est basculé qu'une fois tout
+écrit (voir app/index_store.py) : VectorSearch et la recherche lexicale prennent
+la nouvelle version sans redémarrage. En cas d'erreur dans une étape, rien n'est
+publié.
+
+Usage :
+    python scripts/ingest_pipeline.py                   # scraping du site
+    python scripts/ingest_pipeline.py --source data     # réindexe data/*.txt
+    python scripts/ingest_pipeline.py --no-embeddings   # index lexical seulement
+"""
+import argparse
+import hashlib
+import json
+import pickle
+import queue
+import shutil
+import sys
+import threading
+import time
+from pathlib import Path
+
+import requests
+
+# Permet `from app...` quand le script est lancé depuis la racine du projet
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from app import index_store
+from app.chunking import DEFAULT_OVERLAP_TOKENS, DEFAULT_TARGET_TOKENS
+from app.contacts import CONTACTS_FILE, ContactTable, page_contacts
+from app.dedup import NEAR_DUPLICATE_THRESHOLD, ChunkDeduplicator
+from scripts.build_index import clean_text, split_text
+from app.html_extract import extract_page, format_content
+from scripts.scrape_imt import PAGES
+
+try:
+    import faiss
+    import numpy as np
+    from sentence_transformers import SentenceTransformer
+    EMBEDDINGS_AVAILABLE = True
+except ImportError:
+    EMBEDDINGS_AVAILABLE = False
+
+EMBEDDING_MODEL_NAME = "paraphrase-multilingual-MiniLM-L12-v2"
+DEFAULT_QUEUE_SIZE = 8
+DEFAULT_BATCH_SIZE = 32
+
+# Marque de fin de flux, propagée d'étape en étape
+_DONE = object()
+
+
+class PipelineAborted(Exception):
+    """Une étape a échoué : le pipeline s'arrête sans publier."""
+
+
+class Pipeline:
+    """Enchaîne des étapes (threads) reliées par des files bornées."""
+
+    def __init__(self, queue_size: int = DEFAULT_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self.abort = threading.Event()
+        self.errors = []
+        self._threads = []
+        self._queues = []
+
+    def _put(self, q: queue.Queue, item):
+        # put() bloquant mais interruptible si une autre étape a échoué
+        while not self.abort.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def _get(self, q: queue.Queue):
+        while not self.abort.is_set():
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return _DONE
+
+    def _run(self, name, func, inbox, outbox):
+        try:
+            if inbox is None:
+                items = func()
+            else:
+                items = self._drain(inbox, func)
+            for out in items:
+                if self.abort.is_set():
+                    break
+                if outbox is not None:
+                    self._put(outbox, out)
+        except Exception as e:
+            self.errors.append(f"{name}: {e}")
+            print(f"❌ Étape '{name}' en échec : {e}")
+            self.abort.set()
+        finally:
+            if outbox is not None:
+                self._put(outbox, _DONE)
+
+    def _drain(self, inbox, func):
+        while True:
+            item = self._get(inbox)
+            if item is _DONE:
+                break
+            yield from func(item)
+        # Une étape peut garder des éléments en tampon (lot d'embeddings)
+        flush = getattr(func, "flush", None)
+        if flush is not None:
+            yield from flush()
+
+    def stage(self, name: str, func):
+        """Ajoute une étape.
+
+        La première étape est un générateur sans argument ; les suivantes sont des
+        fonctions `item -> itérable d'éléments` pour l'étape suivante.
+        """
+        inbox = self._queues[-1] if self._queues else None
+        outbox = queue.Queue(maxsize=self.queue_size)
+        self._queues.append(outbox)
+        self._threads.append(
+            threading.Thread(target=self._run, args=(name, func, inbox, outbox), name=name, daemon=True)
+        )
+        return self
+
+    def run(self) -> list:
+        """Lance toutes les étapes et retourne les éléments sortis de la dernière."""
+        for thread in self._threads:
+            thread.start()
+        results = []
+        while True:
+            item = self._get(self._queues[-1])
+            if item is _DONE:
+                break
+            results.append(item)
+        for thread in self._threads:
+            thread.join()
+        if self.errors:
+            raise PipelineAborted("; ".join(self.errors))
+        return results
+
+
+class WebSource:
+    """Télécharge les pages du site : (nom, url, html).
+
+    Une page inaccessible (réseau, HTTP 4xx/5xx) est signalée puis sautée sans
+    interrompre l'ingestion ; elle est listée dans `failed` (et dans le manifest).
+    """
+
+    def __init__(self, pages: dict = None, session=None, delay: float = 0.0):
+        self.pages = pages or PAGES
+        self.session = session
+        self.delay = delay
+        self.failed = []
+
+    def __call__(self):
+        http = self.session or requests.Session()
+        for name, url in self.pages.items():
+            try:
+                response = http.get(url, timeout=15)
+                response.raise_for_status()
+            except requests.RequestException as e:
+                print(f"⚠️ Page '{name}' ignorée ({url}) : {e}")
+                self.failed.append({"name": name, "url": url, "error": str(e)})
+                continue
+            yield name, url, response.text
+            if self.delay:
+                time.sleep(self.delay)
+
+
+def web_source(pages: dict = None, session=None, delay: float = 0.0) -> WebSource:
+    """Source du pipeline : pages du site (voir WebSource)."""
+    return WebSource(pages, session, delay)
+
+
+def data_source(data_dir: Path = index_store.DATA_DIR):
+    """Relit les pages déjà scrapées (data/*.txt) : (nom, None, texte)."""
+    def produce():
+        for txt_file in sorted(data_dir.glob("*.txt")):
+            yield txt_file.stem, None, txt_file.read_text(encoding="utf-8")
+    return produce
+
+
+class CleanStage:
+    """Extrait le texte utile et l'écrit dans pages/<nom>.txt de la version.
+
+    Les coordonnées (téléphones, emails, adresses) alimentent au passage la table
+    de contacts de la version.
+    """
+
+    def __init__(self, version_dir: Path):
+        self.pages_dir = version_dir / index_store.PAGES_DIR
+        self.pages = []
+        self.contacts = ContactTable()
+
+    def __call__(self, item):
+        name, url, body = item
+        if url:
+            page = extract_page(body)
+            self.contacts.add_page(name, **page_contacts(page))
+            text = "\n\n".join(format_content(page))
+        else:
+            self.contacts.add_text(name, body)
+            text = body
+        text = clean_text(text)
+        if not text:
+            print(f"⚠️ Aucun contenu trouvé pour {name}")
+            return
+        (self.pages_dir / f"{name}.txt").write_text(text, encoding="utf-8")
+        self.pages.append({
+            "name": name,
+            "url": url,
+            "sha1": hashlib.sha1(text.encode("utf-8")).hexdigest(),
+        })
+        yield f"{name}.txt", text
+
+
+class ChunkStage:
+    """Découpe chaque page et écarte au fil de l'eau les quasi-doublons."""
+
+    def __init__(self, chunker: str, target_tokens: int, overlap_tokens: int,
+                 dedup: bool = True, threshold: float = NEAR_DUPLICATE_THRESHOLD):
+        self.chunker = chunker
+        self.target_tokens = target_tokens
+        self.overlap_tokens = overlap_tokens
+        # Le contenu d'un chunk déjà émis ne doit plus changer (son embedding est calculé)
+        self.dedup = ChunkDeduplicator(threshold=threshold, keep_longest=False) if dedup else None
+        self.total = 0
+
+    def __call__(self, item):
+        source, text = item
+        for chunk in split_text(text, self.chunker, self.target_tokens, self.overlap_tokens):
+            self.total += 1
+            chunk = {"source": source, "content": chunk["content"], "tokens": chunk["tokens"]}
+            if self.dedup is not None:
+                chunk = self.dedup.add(chunk)
+            if chunk is not None:
+                yield chunk
+
+
+class EmbedStage:
+    """Calcule les embeddings par lots : (chunk, vecteur ou None)."""
+
+    def __init__(self, enabled: bool = True, batch_size: int = DEFAULT_BATCH_SIZE):
+        self.enabled = enabled and EMBEDDINGS_AVAILABLE
+        self.batch_size = batch_size
+        self._batch = []
+        self._model = None
+
+    def __call__(self, chunk):
+        if not self.enabled:
+            yield chunk, None
+            return
+        self._batch.append(chunk)
+        if len(self._batch) >= self.batch_size:
+            yield from self.flush()
+
+    def flush(self):
+        if not self._batch:
+            return
+        if self._model is None:
+            self._model = SentenceTransformer(EMBEDDING_MODEL_NAME, device="cpu")
+        batch, self._batch = self._batch, []
+        vectors = self._model.encode(
+            [c["content"] for c in batch], convert_to_numpy=True, show_progress_bar=False
+        ).astype("float32")
+        yield from zip(batch, vectors)
+
+
+def write_index(version_dir: Path, items: list) -> dict:
+    """Écrit chunks.json (et l'index FAISS si les embeddings sont présents)."""
+    chunks = [chunk for chunk, _ in items]
+    (version_dir / "chunks.json").write_text(
+        json.dumps(chunks, ensure_ascii=False, indent=2), encoding="utf-8"
+    )
+    vectors = [vector for _, vector in items if vector is not None]
+    if not vectors or len(vectors) != len(chunks):
+        return {"faiss": False}
+
+    embeddings = np.vstack(vectors).astype("float32")
+    faiss.normalize_L2(embeddings)
+    index = faiss.IndexFlatIP(embeddings.shape[1])
+    index.add(embeddings)
+    faiss.write_index(index, str(version_dir / "faiss.index"))
+    with open(version_dir / "embeddings.pkl", "wb") as f:
+        pickle.dump({"chunks": chunks, "model_name": EMBEDDING_MODEL_NAME}, f)
+    return {"faiss": True, "dimension": int(embeddings.shape[1]), "model_name": EMBEDDING_MODEL_NAME}
+
+
+def run_pipeline(source, chunker: str = "tokens", target_tokens: int = DEFAULT_TARGET_TOKENS,
+                 overlap_tokens: int = DEFAULT_OVERLAP_TOKENS, dedup: bool = True,
+                 threshold: float = NEAR_DUPLICATE_THRESHOLD, embeddings: bool = True,
+                 queue_size: int = DEFAULT_QUEUE_SIZE, batch_size: int = DEFAULT_BATCH_SIZE,
+                 root: Path = None, publish: bool = True) -> dict:
+    """Exécute le pipeline complet et publie la nouvelle version.
+
+    Returns:
+        Le manifest de la version écrite.
+    """
+    started = time.time()
+    version_dir = index_store.new_version_dir(root)
+    clean = CleanStage(version_dir)
+    chunk = ChunkStage(chunker, target_tokens, overlap_tokens, dedup, threshold)
+    embed = EmbedStage(embeddings, batch_size)
+
+    pipeline = (
+        Pipeline(queue_size)
+        .stage("fetch", source)
+        .stage("clean", clean)
+        .stage("chunk", chunk)
+        .stage("embed", embed)
+    )
+    failed = getattr(source, "failed", [])
+    try:
+        items = pipeline.run()
+        if failed and not clean.pages:
+            raise PipelineAborted(f"aucune page téléchargée ({len(failed)} en échec)")
+    except PipelineAborted:
+        print(f"⛔ Pipeline interrompu, version {version_dir.name} non publiée")
+        shutil.rmtree(version_dir, ignore_errors=True)
+        raise
+
+    index_info = write_index(version_dir, items)
+    clean.contacts.save(version_dir / CONTACTS_FILE.name)
+    manifest = {
+        "version": version_dir.name,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "duration_s": round(time.time() - started, 2),
+        "chunker": chunker,
+        "target_tokens": target_tokens,
+        "overlap_tokens": overlap_tokens,
+        "dedup_threshold": threshold if dedup else None,
+        "pages": sorted(clean.pages, key=lambda p: p["name"]),
+        "failed_pages": failed,
+        "chunks": len(items),
+        "chunks_before_dedup": chunk.total,
+        "tokens": sum(c["tokens"] for c, _ in items),
+        "contacts": len(clean.contacts.entities()),
+        **index_info,
+    }
+    index_store.write_manifest(version_dir, manifest)
+
+    if publish:
+        index_store.publish(version_dir, root)
+        print(f"✅ Version {version_dir.name} publiée : {len(clean.pages)} pages, "
+              f"{len(failed)} en échec, {len(items)} chunks ({chunk.total} avant dédoublonnage), "
+              f"FAISS {'oui' if index_info['faiss'] else 'non'}")
+    return manifest
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pipeline d'ingestion (scraping → index versionné)")
+    parser.add_argument("--source", choices=["web", "data"], default="web",
+                        help="Scraper le site (web) ou réindexer data/*.txt (data)")
+    parser.add_argument("--chunker", choices=["paragraph", "tokens"], default="tokens")
+    parser.add_argument("--target-tokens", type=int, default=DEFAULT_TARGET_TOKENS)
+    parser.add_argument("--overlap-tokens", type=int, default=DEFAULT_OVERLAP_TOKENS)
+    parser.add_argument("--no-dedup", action="store_true", help="Désactiver la fusion des quasi-doublons")
+    parser.add_argument("--dedup-threshold", type=float, default=NEAR_DUPLICATE_THRESHOLD)
+    parser.add_argument("--no-embeddings", action="store_true", help="Ne pas construire l'index FAISS")
+    parser.add_argument("--queue-size", type=int, default=DEFAULT_QUEUE_SIZE,
+                        help="Taille des files entre étapes")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                        help="Taille des lots d'embeddings")
+    parser.add_argument("--delay", type=float, default=0.0, help="Pause entre deux pages (web)")
+    args = parser.parse_args(argv)
+
+    if not args.no_embeddings and not EMBEDDINGS_AVAILABLE:
+        print("⚠️ faiss/sentence-transformers absents : index lexical seulement")
+
+    source = data_source() if args.source == "data" else web_source(delay=args.delay)
+    try:
+        run_pipeline(
+            source, chunker=args.chunker, target_tokens=args.target_tokens,
+            overlap_tokens=args.overlap_tokens, dedup=not args.no_dedup,
+            threshold=args.dedup_threshold, embeddings=not args.no_embeddings,
+            queue_size=args.queue_size, batch_size=args.batch_size,
+        )
+    except PipelineAborted:
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
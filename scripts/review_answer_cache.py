@@ -0,0 +1,83 @@
+# scripts/review_answer_cache.py
+"""
+Statistiques de relecture du cache sémantique des réponses (app/answer_cache.py).
+
+Le cache journalise une fraction (ANSWER_CACHE_REVIEW_RATE) des réponses qu'il sert
+dans data/answer_cache_review.jsonl, avec la question posée, la question en cache et
+leur similarité. Le relecteur renseigne le champ `correct` de chaque ligne :
+    true  : la réponse en cache convient à la nouvelle question
+    false : faux positif (la question était différente)
+
+Le script affiche le taux de faux positifs par tranche de similarité et le seuil
+le plus bas au-dessus duquel le taux de faux positifs reste sous --max-fp-rate.
+
+Usage :
+    python scripts/review_answer_cache.py [--file data/answer_cache_review.jsonl] [--max-fp-rate 0.02]
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from app.answer_cache import REVIEW_FILE, SIMILARITY_BUCKETS
+
+
+def band_of(similarity: float) -> float:
+    """Borne basse de la tranche de similarité."""
+    lower = 0.0
+    for bound in SIMILARITY_BUCKETS:
+        if similarity < bound:
+            break
+        lower = bound
+    return lower
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Faux positifs du cache sémantique des réponses")
+    parser.add_argument("--file", type=Path, default=REVIEW_FILE)
+    parser.add_argument("--max-fp-rate", type=float, default=0.02)
+    args = parser.parse_args()
+
+    if not args.file.exists():
+        print(f"Aucun échantillon ({args.file} absent)")
+        return
+    rows = [json.loads(line) for line in args.file.read_text(encoding="utf-8").splitlines() if line.strip()]
+    labelled = [r for r in rows if r.get("correct") is not None]
+    false_positives = [r for r in labelled if r["correct"] is False]
+    print(f"{len(rows)} échantillons, {len(labelled)} relus, {len(false_positives)} faux positifs")
+    if not labelled:
+        return
+
+    bands = {}
+    for r in labelled:
+        stats = bands.setdefault(band_of(r["similarity"]), [0, 0])
+        stats[0] += 1
+        stats[1] += r["correct"] is False
+    print(f"  {'similarité':<12}{'relus':>7}{'faux pos.':>11}{'taux':>8}")
+    for lower in sorted(bands):
+        total, fp = bands[lower]
+        print(f"  >= {lower:<9.2f}{total:>7}{fp:>11}{fp / total:>8.0%}")
+
+    # Seuil : plus basse tranche à partir de laquelle le taux cumulé reste acceptable
+    suggestion, total, fp = None, 0, 0
+    for lower in sorted(bands, reverse=True):
+        total += bands[lower][0]
+        fp += bands[lower][1]
+        if fp / total > args.max_fp_rate:
+            break
+        suggestion = lower
+    if suggestion is None:
+        print(f"Aucune tranche sous {args.max_fp_rate:.0%} de faux positifs : relever ANSWER_CACHE_THRESHOLD")
+    else:
+        print(f"Seuil suggéré : ANSWER_CACHE_THRESHOLD={suggestion:g} (faux positifs <= {args.max_fp_rate:.0%})")
+
+    for r in false_positives[-5:]:
+        print(f"\n  [{r['similarity']:.3f}] « {r['question']} » servi par « {r['cached_question']} »")
+
+
+if __name__ == "__main__":
+    main()
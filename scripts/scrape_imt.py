@@ -1,9 +1,26 @@
 #scripts/scrape_imt.py
+import argparse
+import hashlib
+import json
+import sys
+import time
+import xml.etree.ElementTree as ET
+from collections import deque
+from urllib.parse import parse_qsl, urldefrag, urlencode, urljoin, urlsplit, urlunsplit
+
 import requests
-from bs4 import BeautifulSoup
 from pathlib import Path
 import re
 
+# Permet `from app...` quand le script est lancé depuis la racine du projet
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from app.contacts import CONTACTS_FILE, ContactTable, page_contacts
+from app.dedup import SimHashIndex, simhash
+from app.html_extract import extract_page, format_content
+
 BASE_URL = "https://www.imt.sn"
 PAGES = {
     "accueil": BASE_URL,
@@ -18,99 +35,423 @@ PAGES = {
 DATA_DIR = Path("data")
 DATA_DIR.mkdir(exist_ok=True)
 
+
+def save_page(name: str, final_content: list, data_dir: Path = DATA_DIR) -> bool:
+    """Sauvegarde les blocs d'une page dans data/<name>.txt."""
+    if not final_content:
+        print(f"⚠️ Aucun contenu trouvé pour {name}")
+        return False
+    file_path = data_dir / f"{name}.txt"
+    file_path.write_text("\n\n".join(final_content), encoding="utf-8")
+    print(f"✅ {name}.txt sauvegardé ({len(final_content)} blocs)")
+    return True
+
+
 def scrape_page(name, url):
-    """Scraping optimisé - extrait contenu informatif + données structurées (adresse, email, tel)."""
+    """Scraping optimisé - extrait contenu informatif + données structurées (adresse, email, tel).
+
+    Returns:
+        Les champs de contact de la page (voir `app.contacts.page_contacts`), ou None
+    """
     print(f"🚀 Scraping {name}...")
     try:
         response = requests.get(url, timeout=15)
         response.raise_for_status()
-        soup = BeautifulSoup(response.text, "html.parser")
-
-        # 1. Nettoyage : supprimer les éléments parasites
-        for tag in soup(["script", "style", "nav", "footer", "header", "aside", "noscript"]):
-            tag.decompose()
-
-        # 2. Extraction de données structurées (emails, téléphones, adresses)
-        structured_data = []
-        
-        # Extraire emails
-        emails = re.findall(r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}', str(soup))
-        if emails:
-            structured_data.append(f"📧 Contact : {', '.join(set(emails))}")
-        
-        # Extraire téléphones (format international et local)
-        phones = re.findall(r'(?:\+221|00221)?\s*\d{2}[\s.-]?\d{3}[\s.-]?\d{2}[\s.-]?\d{2}', str(soup))
-        if phones:
-            structured_data.append(f"📞 Téléphone : {', '.join(set(phones))}")
-        
-        # Extraire adresses (recherche de patterns communs au Sénégal)
-        address_patterns = [
-            r'(?i)(rue|avenue|boulevard|route|quartier|zone|immeuble)[^<>]{5,100}(?:dakar|sénégal|senegal)',
-            r'(?i)(?:dakar|sénégal|senegal)[^<>]{5,100}(?:rue|avenue|boulevard|quartier)',
-        ]
-        for pattern in address_patterns:
-            addresses = re.findall(pattern, str(soup))
-            if addresses:
-                structured_data.append(f"📍 Adresse : {addresses[0]}")
-                break
-        
-        # 3. Extraction de contenu textuel
-        text_blocks = []
-        for tag in soup.find_all(['h1', 'h2', 'h3', 'h4', 'p', 'li', 'address', 'span']):
-            text = tag.get_text().strip()
-            # Garder le texte significatif (> 10 chars pour capturer plus d'infos)
-            if len(text) > 10:
-                text_blocks.append(text)
-
-        # 4. Filtrage du bruit critique (blacklist améliorée)
-        BLACKLIST = [
-            "accepter les cookies", "refuser les cookies", "politique de confidentialité",
-            "google analytics", "google recaptcha", "combien font", "captcha",
-            "pistage dans votre navigateur", "réglages des polices google", 
-            "intégrations de vidéo", "page mentions légales", "cookies et paramètres",
-            "nous utilisons des cookies", "bloquer les cookies", "effacer les cookies",
-            "services externes", "google webfonts", "google maps", "hébergeurs de vidéo",
-            "adresse ip", "fai sont susceptibles", "rechargement de la page"
-        ]
-        
-        def is_noise(line: str) -> bool:
-            l = line.lower()
-            return any(word in l for word in BLACKLIST) or len(line) < 15
-        
-        cleaned_blocks = [block for block in text_blocks if not is_noise(block)]
-        
-        # 5. Dédoublonnage (garder uniquement les blocs uniques)
-        unique_blocks = []
-        seen = set()
-        for block in cleaned_blocks:
-            normalized = re.sub(r'\s+', ' ', block.lower())  # Normaliser les espaces
-            if normalized not in seen:
-                seen.add(normalized)
-                unique_blocks.append(block)
-
-        # 6. Combiner données structurées + contenu
-        final_content = structured_data + unique_blocks
-
-        # 7. Sauvegarde
-        if final_content:
-            file_path = DATA_DIR / f"{name}.txt"
-            file_path.write_text("\n\n".join(final_content), encoding="utf-8")
-            print(f"✅ {name}.txt sauvegardé ({len(final_content)} blocs, dont {len(structured_data)} données structurées)")
-        else:
-            print(f"⚠️ Aucun contenu trouvé pour {name}")
-
+        page = extract_page(response.text)
+        save_page(name, format_content(page))
+        return page_contacts(page)
     except Exception as e:
         print(f"❌ Erreur sur {name}: {e}")
+        return None
 
 
-if __name__ == "__main__":
+def save_contacts(table: ContactTable, data_dir: Path = DATA_DIR):
+    """Écrit la table des coordonnées (data/contact_entities.json)."""
+    path = table.save(data_dir / CONTACTS_FILE.name)
+    print(f"📇 {len(table.entities())} coordonnées validées → {path}")
+
+
+# =========================================================
+# Mode crawler : suivi de liens + sitemap + quasi-doublons
+# =========================================================
+
+CRAWL_STATE_FILE = DATA_DIR / "crawl_state.json"
+
+# Paramètres de tracking retirés lors de la canonicalisation
+TRACKING_PARAMS = {"fbclid", "gclid", "dclid", "msclkid", "mc_cid", "mc_eid", "_ga", "ref", "share"}
+TRACKING_PREFIXES = ("utm_",)
+
+# Liens qui ne sont pas des pages HTML
+SKIPPED_EXTENSIONS = (
+    ".pdf", ".jpg", ".jpeg", ".png", ".gif", ".webp", ".svg", ".zip", ".doc", ".docx",
+    ".xls", ".xlsx", ".ppt", ".pptx", ".mp4", ".mp3", ".css", ".js", ".xml", ".ico",
+)
+SKIPPED_PATH_PREFIXES = ("/wp-admin", "/wp-json", "/wp-content", "/feed", "/wp-login")
+
+# Intervalle de revisite adaptatif (en secondes)
+MIN_RECRAWL_INTERVAL = 24 * 3600
+MAX_RECRAWL_INTERVAL = 30 * 24 * 3600
+DEFAULT_RECRAWL_INTERVAL = 7 * 24 * 3600
+CHANGEFREQ_INTERVALS = {
+    "always": MIN_RECRAWL_INTERVAL,
+    "hourly": MIN_RECRAWL_INTERVAL,
+    "daily": MIN_RECRAWL_INTERVAL,
+    "weekly": 7 * 24 * 3600,
+    "monthly": MAX_RECRAWL_INTERVAL,
+    "yearly": MAX_RECRAWL_INTERVAL,
+    "never": MAX_RECRAWL_INTERVAL,
+}
+
+
+def _site_host(url: str) -> str:
+    """Domaine sans le préfixe www (imt.sn == www.imt.sn)."""
+    host = urlsplit(url).hostname or ""
+    return host[4:] if host.startswith("www.") else host
+
+
+def canonicalize_url(url: str, base: str = BASE_URL):
+    """Normalise une URL pour que deux liens vers la même page soient identiques.
+
+    - résolution relative par rapport à `base`, suppression du fragment
+    - schéma/hôte en minuscules, port par défaut retiré
+    - paramètres de tracking (utm_*, fbclid...) retirés, autres paramètres triés
+    - slash final ajouté aux chemins de type "dossier" (convention WordPress)
+
+    Returns:
+        L'URL canonique, ou None si le lien n'est pas une page HTTP(S) crawlable.
+    """
+    if not url:
+        return None
+    url = url.strip()
+    if url.startswith(("mailto:", "tel:", "javascript:", "data:")):
+        return None
+
+    url, _ = urldefrag(urljoin(base, url))
+    parts = urlsplit(url)
+    scheme = parts.scheme.lower()
+    if scheme not in ("http", "https"):
+        return None
+
+    host = (parts.hostname or "").lower()
+    if not host:
+        return None
+    netloc = host
+    if parts.port and not ((scheme == "http" and parts.port == 80) or (scheme == "https" and parts.port == 443)):
+        netloc = f"{host}:{parts.port}"
+
+    path = re.sub(r"/{2,}", "/", parts.path or "/")
+    if path.lower().endswith(SKIPPED_EXTENSIONS):
+        return None
+    last_segment = path.rsplit("/", 1)[-1]
+    if last_segment and "." not in last_segment:
+        path += "/"
+
+    query = [
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if k.lower() not in TRACKING_PARAMS and not k.lower().startswith(TRACKING_PREFIXES)
+    ]
+    query.sort()
+
+    return urlunsplit((scheme, netloc, path, urlencode(query), ""))
+
+
+def is_same_site(url: str, base: str = BASE_URL) -> bool:
+    """Vrai si l'URL appartient au même domaine que le site de base."""
+    return _site_host(url) == _site_host(base)
+
+
+def page_name_for_url(url: str) -> str:
+    """Nom de fichier data/<nom>.txt d'une URL (réutilise les noms historiques de PAGES)."""
+    for name, page_url in PAGES.items():
+        if canonicalize_url(page_url) == url:
+            return name
+    parts = urlsplit(url)
+    slug = re.sub(r"[^a-zA-Z0-9]+", "_", parts.path).strip("_").lower()
+    if parts.query:
+        slug += "_" + hashlib.sha1(parts.query.encode("utf-8")).hexdigest()[:8]
+    return slug or "accueil"
+
+
+def extract_links(html: str, page_url: str, anchors: list = None) -> list:
+    """Liens sortants canoniques (même domaine) d'une page, dans l'ordre du document.
+
+    `anchors` (href déjà extraits par `extract_page`) évite de reparser la page.
+    """
+    if anchors is None:
+        anchors = extract_page(html)["anchors"]
+    links = []
+    seen = set()
+    for href in anchors:
+        link = canonicalize_url(href, base=page_url)
+        if not link or link in seen or not is_same_site(link, page_url):
+            continue
+        if urlsplit(link).path.startswith(SKIPPED_PATH_PREFIXES):
+            continue
+        seen.add(link)
+        links.append(link)
+    return links
+
+
+def parse_sitemap(xml_text: str) -> tuple:
+    """Parse un sitemap (urlset ou sitemapindex).
+
+    Returns:
+        (pages, sous_sitemaps) où pages = [(url, changefreq ou None)]
+    """
+    pages, sitemaps = [], []
+    try:
+        root = ET.fromstring(xml_text.encode("utf-8") if isinstance(xml_text, str) else xml_text)
+    except ET.ParseError:
+        return pages, sitemaps
+
+    def local(tag):
+        return tag.rsplit("}", 1)[-1]
+
+    is_index = local(root.tag) == "sitemapindex"
+    for entry in root:
+        fields = {local(child.tag): (child.text or "").strip() for child in entry}
+        loc = fields.get("loc")
+        if not loc:
+            continue
+        if is_index:
+            sitemaps.append(loc)
+        else:
+            pages.append((loc, fields.get("changefreq") or None))
+    return pages, sitemaps
+
+
+def load_crawl_state(state_file: Path = CRAWL_STATE_FILE) -> dict:
+    """Charge la frontière persistée (URL -> métadonnées de crawl)."""
+    if state_file.exists():
+        try:
+            return json.loads(state_file.read_text(encoding="utf-8"))
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Frontière illisible ({e}), recrawl complet")
+    return {"pages": {}}
+
+
+def save_crawl_state(state: dict, state_file: Path = CRAWL_STATE_FILE):
+    """Sauvegarde la frontière (écriture atomique via fichier temporaire)."""
+    tmp = state_file.with_suffix(".tmp")
+    tmp.write_text(json.dumps(state, ensure_ascii=False, indent=2), encoding="utf-8")
+    tmp.replace(state_file)
+
+
+def next_interval(entry: dict, changed: bool) -> int:
+    """Intervalle de revisite : divisé par 2 si la page a changé, doublé sinon."""
+    interval = entry.get("interval", DEFAULT_RECRAWL_INTERVAL)
+    interval = interval // 2 if changed else interval * 2
+    return max(MIN_RECRAWL_INTERVAL, min(MAX_RECRAWL_INTERVAL, interval))
+
+
+def is_due(entry: dict, now: float) -> bool:
+    """Vrai si la page n'a jamais été crawlée ou si son intervalle est écoulé."""
+    last = entry.get("last_crawled")
+    if not last:
+        return True
+    return now >= last + entry.get("interval", DEFAULT_RECRAWL_INTERVAL)
+
+
+class Crawler:
+    """Crawler same-domain en largeur avec limite de profondeur.
+
+    - démarre de la racine du site et/ou du sitemap
+    - canonicalise les URLs (fragments, tracking, slash final)
+    - ignore les pages quasi-identiques (SimHash) à une page déjà stockée
+    - persiste la frontière pour des recrawls incrémentaux selon la fréquence de changement
+    """
+
+    def __init__(self, base_url: str = BASE_URL, max_depth: int = 2, max_pages: int = 200,
+                 delay: float = 0.5, data_dir: Path = DATA_DIR, state_file: Path = None,
+                 session=None, seeds: list = None):
+        self.base_url = canonicalize_url(base_url)
+        self.seeds = list(PAGES.values()) if seeds is None else seeds
+        self.max_depth = max_depth
+        self.max_pages = max_pages
+        self.delay = delay
+        self.data_dir = data_dir
+        self.state_file = state_file or data_dir / CRAWL_STATE_FILE.name
+        self.session = session or requests.Session()
+        self.state = load_crawl_state(self.state_file)
+        self.pages = self.state.setdefault("pages", {})
+        self.index = SimHashIndex()
+        for url, entry in self.pages.items():
+            if entry.get("status") == "stored" and entry.get("simhash"):
+                self.index.add(url, int(entry["simhash"], 16))
+        self.stats = {"fetched": 0, "stored": 0, "unchanged": 0, "duplicates": 0, "errors": 0, "skipped": 0}
+
+    def _get(self, url: str):
+        response = self.session.get(url, timeout=15)
+        response.raise_for_status()
+        return response
+
+    def sitemap_urls(self) -> list:
+        """URLs (canoniques) annoncées par le sitemap, avec leur changefreq."""
+        to_visit = [urljoin(self.base_url, path) for path in ("/sitemap.xml", "/wp-sitemap.xml")]
+        seen_sitemaps, found = set(), []
+        while to_visit:
+            sitemap_url = to_visit.pop(0)
+            if sitemap_url in seen_sitemaps:
+                continue
+            seen_sitemaps.add(sitemap_url)
+            try:
+                pages, children = parse_sitemap(self._get(sitemap_url).text)
+            except Exception:
+                continue
+            to_visit.extend(children)
+            for loc, changefreq in pages:
+                url = canonicalize_url(loc)
+                if url and is_same_site(url, self.base_url):
+                    found.append((url, changefreq))
+        return found
+
+    def _seed(self, use_sitemap: bool) -> deque:
+        frontier = deque([(self.base_url, 0)])
+        for url in self.seeds:
+            frontier.append((canonicalize_url(url), 1))
+        if use_sitemap:
+            for url, changefreq in self.sitemap_urls():
+                entry = self.pages.setdefault(url, {"depth": 1})
+                if changefreq in CHANGEFREQ_INTERVALS and "last_crawled" not in entry:
+                    entry["interval"] = CHANGEFREQ_INTERVALS[changefreq]
+                frontier.append((url, 1))
+        # Revisiter aussi les pages déjà connues de la frontière persistée
+        for url, entry in self.pages.items():
+            frontier.append((url, entry.get("depth", 1)))
+        return frontier
+
+    def crawl(self, use_sitemap: bool = True, force: bool = False) -> dict:
+        """Lance le crawl et retourne les statistiques."""
+        frontier = self._seed(use_sitemap)
+        visited = set()
+        now = time.time()
+
+        while frontier and self.stats["fetched"] < self.max_pages:
+            url, depth = frontier.popleft()
+            if url in visited or depth > self.max_depth:
+                continue
+            visited.add(url)
+
+            entry = self.pages.setdefault(url, {})
+            entry["depth"] = min(depth, entry.get("depth", depth))
+            if not force and not is_due(entry, now):
+                self.stats["skipped"] += 1
+                for link in entry.get("links", []):
+                    frontier.append((link, depth + 1))
+                continue
+
+            links = self._visit(url, entry, now)
+            for link in links:
+                if link not in visited:
+                    frontier.append((link, depth + 1))
+            if self.delay:
+                time.sleep(self.delay)
+
+        save_crawl_state(self.state, self.state_file)
+        save_contacts(self.contact_table(), self.data_dir)
+        return self.stats
+
+    def contact_table(self) -> ContactTable:
+        """Coordonnées de toutes les pages stockées (y compris celles non revisitées)."""
+        table = ContactTable()
+        for url, entry in self.pages.items():
+            if entry.get("status") == "stored" and entry.get("contacts"):
+                table.add_page(entry.get("name") or page_name_for_url(url), **entry["contacts"])
+        return table
+
+    def _visit(self, url: str, entry: dict, now: float) -> list:
+        """Télécharge une page, la stocke si elle est nouvelle et retourne ses liens."""
+        print(f"🕷️  {url}")
+        self.stats["fetched"] += 1
+        try:
+            response = self._get(url)
+        except Exception as e:
+            print(f"❌ Erreur sur {url}: {e}")
+            entry.update({"status": "error", "error": str(e)[:200], "last_crawled": now})
+            self.stats["errors"] += 1
+            return []
+
+        if "html" not in response.headers.get("Content-Type", "text/html"):
+            entry.update({"status": "not_html", "last_crawled": now})
+            return []
+
+        html = response.text
+        # Un seul passage sur le HTML : liens et contenu
+        page = extract_page(html)
+        links = extract_links(html, url, anchors=page["anchors"])
+        content = format_content(page)
+        text = "\n\n".join(content)
+        content_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        changed = content_hash != entry.get("content_hash")
+
+        entry.update({
+            "links": links,
+            "last_crawled": now,
+            "interval": next_interval(entry, changed) if "content_hash" in entry else entry.get("interval", DEFAULT_RECRAWL_INTERVAL),
+            "content_hash": content_hash,
+            "contacts": page_contacts(page),
+        })
+        if changed:
+            entry["last_changed"] = now
+
+        if not changed and entry.get("status") == "stored":
+            self.stats["unchanged"] += 1
+            return links
+
+        fingerprint = simhash(text)
+        duplicate_of = self.index.find_near_duplicate(fingerprint, exclude=url)
+        if duplicate_of:
+            print(f"   ↳ quasi-doublon de {duplicate_of}, ignoré")
+            self.index.remove(url)
+            entry.update({"status": "duplicate", "duplicate_of": duplicate_of})
+            self.stats["duplicates"] += 1
+            return links
+
+        name = entry.get("name") or page_name_for_url(url)
+        if save_page(name, content, self.data_dir):
+            self.index.add(url, fingerprint)
+            entry.update({"status": "stored", "name": name, "simhash": f"{fingerprint:016x}"})
+            entry.pop("duplicate_of", None)
+            self.stats["stored"] += 1
+        else:
+            entry["status"] = "empty"
+        return links
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Scraping du site IMT Dakar")
+    parser.add_argument("--crawl", action="store_true",
+                        help="Suivre les liens du site au lieu des pages listées dans PAGES")
+    parser.add_argument("--depth", type=int, default=2, help="Profondeur maximale du crawl")
+    parser.add_argument("--max-pages", type=int, default=200, help="Nombre maximal de pages téléchargées")
+    parser.add_argument("--delay", type=float, default=0.5, help="Pause entre deux requêtes (secondes)")
+    parser.add_argument("--no-sitemap", action="store_true", help="Ne pas lire le sitemap")
+    parser.add_argument("--force", action="store_true",
+                        help="Revisiter toutes les pages, même si leur intervalle de recrawl n'est pas écoulé")
+    args = parser.parse_args(argv)
+
     print("=" * 60)
     print("🔍 SCRAPING IMT DAKAR - Version Optimisée")
     print("=" * 60)
-    
-    for name, url in PAGES.items():
-        scrape_page(name, url)
+
+    if args.crawl:
+        crawler = Crawler(max_depth=args.depth, max_pages=args.max_pages, delay=args.delay)
+        stats = crawler.crawl(use_sitemap=not args.no_sitemap, force=args.force)
+        print(f"\n📊 {stats['fetched']} pages téléchargées, {stats['stored']} stockées, "
+              f"{stats['unchanged']} inchangées, {stats['duplicates']} quasi-doublons, "
+              f"{stats['skipped']} non dues, {stats['errors']} erreurs")
+    else:
+        contacts = ContactTable()
+        for name, url in PAGES.items():
+            fields = scrape_page(name, url)
+            if fields:
+                contacts.add_page(name, **fields)
+        save_contacts(contacts)
     
     print("\n" + "=" * 60)
     print("✅ Scraping terminé ! Relancez build_index.py pour reconstruire l'index.")
-    print("=" * 60)
\ No newline at end of file
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+# scripts/train_intent_classifier.py
+"""
+Entraîne le classifieur d'intention local (app/intent_classifier.py) et l'écrit dans
+data/intent_model.json, chargé au démarrage de l'agent.
+
+Données :
+- data/intent_seed.jsonl : exemples annotés à la main (prioritaires) ;
+- avec --from-mysql : les messages journalisés dans la table `Step` (DATABASE_URL),
+  étiquetés d'après la réponse de l'assistant qui les suit dans le même fil :
+      "EMAIL ENVOYÉ...", "EMAIL NON ENVOYÉ (simulation)", "EMAIL PROGRAMMÉ" -> EMAIL
+      "Formulaire de contact soumis...", erreurs du formulaire           -> FORM
+      salutations / remerciements (heuristique)                          -> SMALLTALK
+      coordonnées, mémoire, refus (traités avant le routage)             -> ignorés
+      autres réponses                                                    -> SEARCH
+  Ces étiquettes reflètent les décisions passées du routeur : corriger les erreurs
+  en ajoutant l'exemple au fichier d'amorce, qui l'emporte sur le journal.
+
+Affiche la précision en validation croisée et la latence d'une prédiction.
+
+Usage :
+    python scripts/train_intent_classifier.py [--from-mysql] [--folds 5]
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from dotenv import load_dotenv
+
+from app.intent_classifier import (
+    INTENTS, MODEL_FILE, SEED_FILE, SMALLTALK_RE, IntentClassifier, load_seed, normalize,
+)
+
+# Réponses produites avant le routage : le message ne dit rien de l'intention
+SKIPPED_REPLIES = (
+    "Voici les coordonnées", "Enchanté", "J'ai bien noté", "Désolé", "Je ne peux pas",
+    "Politique de neutralité", "Message important", "Veuillez poser",
+)
+
+
+def label_from_reply(question: str, reply: str):
+    """Étiquette faible d'un message d'après la réponse de l'assistant (None : ignoré)."""
+    reply = (reply or "").lstrip("*# \n")
+    if SMALLTALK_RE.match(normalize(question).strip()):
+        return "SMALLTALK"
+    if reply.startswith("EMAIL ") or reply.startswith("Erreur : le contenu de l'email") \
+            or reply.startswith("Erreur : le sujet de l'email") or reply.startswith("Erreur SMTP"):
+        return "EMAIL"
+    if "formulaire" in reply.split("\n", 1)[0].lower():
+        return "FORM"
+    if reply.startswith(SKIPPED_REPLIES):
+        return None
+    return "SEARCH"
+
+
+async def fetch_logged_examples():
+    """Paires (message, étiquette faible) depuis la table Step."""
+    from app.mysql_data_layer import MySQLDataLayer
+
+    layer = MySQLDataLayer.from_env()
+    rows = await layer.execute(
+        "SELECT threadId, type, output FROM Step "
+        "WHERE type IN ('user_message', 'assistant_message') ORDER BY threadId, createdAt"
+    )
+    layer.pool.close()
+    await layer.pool.wait_closed()
+
+    examples, pending = [], {}
+    for row in rows:
+        text = (row["output"] or "").strip()
+        if row["type"] == "user_message":
+            pending[row["threadId"]] = text
+        elif row["threadId"] in pending:
+            question = pending.pop(row["threadId"])
+            label = label_from_reply(question, text)
+            if question and label:
+                examples.append((question, label))
+    return examples
+
+
+def merge(seed, logged):
+    """Exemples uniques ; le fichier d'amorce l'emporte sur le journal."""
+    merged = {}
+    for text, label in logged + seed:
+        merged[normalize(text).strip()] = (text, label)
+    return list(merged.values())
+
+
+def cross_validate(examples, folds: int, seed: int = 13) -> float:
+    data = list(examples)
+    random.Random(seed).shuffle(data)
+    correct = 0
+    for k in range(folds):
+        test = data[k::folds]
+        train = [ex for i, ex in enumerate(data) if i % folds != k]
+        model = IntentClassifier.train(train)
+        correct += sum(1 for text, label in test if model.predict(text)[0] == label)
+    return correct / len(data)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Entraîne le classifieur d'intention local")
+    parser.add_argument("--from-mysql", action="store_true", help="ajoute les messages de la table Step")
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--output", type=Path, default=MODEL_FILE)
+    args = parser.parse_args()
+    load_dotenv()
+
+    seed = load_seed(SEED_FILE)
+    logged = asyncio.run(fetch_logged_examples()) if args.from_mysql else []
+    examples = merge(seed, logged)
+    counts = {label: sum(1 for _, y in examples if y == label) for label in INTENTS}
+    print(f"{len(examples)} exemples ({len(seed)} annotés, {len(logged)} journalisés) : {counts}")
+
+    print(f"Précision en validation croisée ({args.folds} plis) : {cross_validate(examples, args.folds):.1%}")
+
+    model = IntentClassifier.train(examples)
+    model.save(args.output)
+    features = sum(len(w) for w in model.weights.values())
+    print(f"Modèle écrit dans {args.output} ({len(model.idf)} features, {features} poids)")
+
+    texts = [text for text, _ in examples]
+    timings = []
+    for text in texts * 5:
+        start = time.perf_counter()
+        model.predict(text)
+        timings.append((time.perf_counter() - start) * 1e6)
+    timings.sort()
+    print(f"Latence d'une prédiction : médiane {statistics.median(timings):.0f} µs, "
+          f"p99 {timings[int(len(timings) * 0.99)]:.0f} µs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,12 @@
+# tests/conftest.py
+"""Aides partagées par les tests."""
+
+
+class FakeClock:
+    """Horloge injectable (time.monotonic / time.time) avancée à la main via `now`."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
@@ -1,12 +1,21 @@
+import asyncio
+import json
+import httpx
 import pytest
 import sys
+import time
 from pathlib import Path
-from unittest.mock import patch, MagicMock
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch, MagicMock
 
 # Ajouter le répertoire parent au PYTHONPATH
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from app.agent import agent, _call_gemini, reformulate_answer
+from app import agent as agent_module
+from app import metrics
+from app.agent import agent, agent_async, _call_gemini, _call_gemini_async, reformulate_answer
+from app.agent import reformulate_answer_stream
+from app.circuit_breaker import CircuitBreaker
 
 
 class TestAgent:
@@ -47,6 +56,7 @@ class TestAgent:
         assert isinstance(result_email, str)
         assert "email" in result_email.lower() or "simulation" in result_email.lower()
     
+    @patch('app.agent.intent_classifier', None)
     @patch('app.agent._call_gemini')
     def test_agent_with_gemini_search_decision(self, mock_gemini):
         """Test agent quand Gemini décide SEARCH"""
@@ -55,6 +65,7 @@ class TestAgent:
         assert isinstance(result, str)
         mock_gemini.assert_called()
     
+    @patch('app.agent.intent_classifier', None)
     @patch('app.agent._call_gemini')
     def test_agent_with_gemini_email_decision(self, mock_gemini):
         """Test agent quand Gemini décide EMAIL"""
@@ -197,5 +208,292 @@ class TestHeuristics:
             assert len(result) > 0
 
 
+
+class TestPersonalInfo:
+    """Tests de l'extraction des informations personnelles"""
+
+    def test_extracts_entities(self):
+        assert agent_module._extract_personal_info("retiens que je m'appelle awa diop") == {'name': 'Awa Diop'}
+        assert agent_module._extract_personal_info("mon email est awa@example.com") == {'email': 'awa@example.com'}
+        assert agent_module._extract_personal_info("Je suis une étudiante en master.") == {
+            'profile': 'étudiante en master'}
+        assert agent_module._extract_personal_info("Comment je m'appelle ?") == {}
+        assert agent_module._extract_personal_info("Quelles formations propose l'IMT ?") == {}
+
+    def test_entities_loaded_only_for_personal_questions(self):
+        """Un message courant ne déclenche pas de lecture des entités en mémoire"""
+        memory = MagicMock()
+        memory.get_all_entities.return_value = {'name': 'Awa'}
+        with patch('app.agent.lookup_contact', return_value=None):
+            answer, _ = agent_module._prepare_question("Les frais de scolarité ?", memory, "s1")
+            assert answer is None
+            memory.get_all_entities.assert_not_called()
+            answer, _ = agent_module._prepare_question("Qui suis-je ?", memory, "s1")
+        assert answer == "Vous vous appelez **Awa**."
+
+
+class TestAsyncAgent:
+    """Tests de la chaîne LLM asynchrone et de agent_async()"""
+    
+    @patch('app.agent.GENAI_AVAILABLE', True)
+    @patch('app.agent.GROK_AVAILABLE', True)
+    @patch('app.agent.OPENAI_AVAILABLE', True)
+    def test_async_chain_keeps_fallback_order(self):
+        """Gemini en échec : Grok répond, OpenAI n'est pas appelé"""
+        with patch('app.agent.gemini_breaker', CircuitBreaker("gemini")), \
+                patch('app.agent.grok_breaker', CircuitBreaker("grok")), \
+                patch('app.agent.openai_breaker', CircuitBreaker("openai")), \
+                patch('app.agent._call_gemini_direct_async', AsyncMock(return_value=None)) as gemini, \
+                patch('app.agent._call_grok_async', AsyncMock(return_value="SEARCH")) as grok, \
+                patch('app.agent._call_openai_async', AsyncMock(return_value="EMAIL")) as openai:
+            assert asyncio.run(_call_gemini_async("prompt")) == "SEARCH"
+        gemini.assert_awaited_once()
+        grok.assert_awaited_once()
+        openai.assert_not_awaited()
+    
+    @patch('app.agent._call_gemini_async', new_callable=AsyncMock)
+    def test_agent_async_email_decision(self, mock_chain):
+        """Décision EMAIL via la chaîne asynchrone"""
+        mock_chain.return_value = "EMAIL"
+        result = asyncio.run(agent_async("Contactez l'IMT"))
+        assert "email" in result.lower() or "envoyé" in result.lower() or "simulation" in result.lower()
+    
+    def test_conversations_run_concurrently(self):
+        """Deux conversations dont le LLM est lent ne s'attendent pas l'une l'autre"""
+        async def slow_llm(prompt):
+            await asyncio.sleep(0.3)
+            return "EMAIL"
+        
+        async def two_conversations():
+            return await asyncio.gather(
+                agent_async("Envoyer un message au directeur"),
+                agent_async("Envoyer un email à la scolarité"),
+            )
+        
+        with patch('app.agent._call_gemini_async', side_effect=slow_llm), \
+                patch('app.agent.send_email', return_value="Email envoyé"):
+            start = time.perf_counter()
+            results = asyncio.run(two_conversations())
+            elapsed = time.perf_counter() - start
+        assert results == ["Email envoyé", "Email envoyé"]
+        assert elapsed < 0.55
+    
+    def test_memory_calls_leave_event_loop(self):
+        """Les écritures Redis de la mémoire ne tournent pas sur la boucle d'événements"""
+        import threading
+        threads = []
+        memory = MagicMock()
+        memory.set_entity.side_effect = lambda *args: threads.append(threading.current_thread())
+        result = asyncio.run(agent_async("Je m'appelle Awa", memory_manager=memory, session_id="s1"))
+        assert "Awa" in result
+        assert threads and threading.main_thread() not in threads
+
+
+class TestHedging:
+    """Tests de la couverture (hedging) des appels LLM asynchrones"""
+    
+    def _chain(self, gemini_delay, grok_delay, cancelled):
+        def provider(name, delay):
+            async def call():
+                try:
+                    await asyncio.sleep(delay)
+                except asyncio.CancelledError:
+                    cancelled.append(name)
+                    raise
+                return f"réponse {name}"
+            return (name, CircuitBreaker(name), call)
+        return [provider("Gemini", gemini_delay), provider("Grok", grok_delay)]
+    
+    @patch('app.agent.HEDGE_DEFAULT_DELAY', 0.05)
+    def test_slow_primary_is_hedged(self):
+        """Gemini lent : Grok part après le délai, répond le premier, Gemini est annulé"""
+        cancelled = []
+        start = time.perf_counter()
+        result = asyncio.run(agent_module._run_hedged(self._chain(2.0, 0.05, cancelled)))
+        assert result == "réponse Grok"
+        assert time.perf_counter() - start < 1.0
+        assert cancelled == ["Gemini"]
+    
+    @patch('app.agent.HEDGE_DEFAULT_DELAY', 0.2)
+    def test_fast_primary_not_hedged(self):
+        """Gemini répond avant le délai : Grok n'est jamais appelé"""
+        cancelled = []
+        chain = self._chain(0.01, 0.01, cancelled)
+        grok_call = AsyncMock(return_value="réponse Grok")
+        chain[1] = (chain[1][0], chain[1][1], grok_call)
+        assert asyncio.run(agent_module._run_hedged(chain)) == "réponse Gemini"
+        grok_call.assert_not_called()
+    
+    def test_hedge_delay_follows_latency_percentile(self):
+        """Le délai suit le p95 des latences récentes, borné"""
+        hist = agent_module._latency("Test-hedge")
+        assert agent_module.hedge_delay("Test-hedge") == agent_module.HEDGE_DEFAULT_DELAY
+        for i in range(100):
+            hist.observe(0.5 + i / 100)
+        assert agent_module.hedge_delay("Test-hedge") == 1.44
+        for _ in range(500):
+            hist.observe(60.0)
+        assert agent_module.hedge_delay("Test-hedge") == agent_module.HEDGE_MAX_DELAY
+
+
+class TestRoutingModes:
+    """Tests des modes de routage (AGENT_ROUTING_MODE)"""
+    
+    @patch('app.agent.intent_classifier', None)
+    @patch('app.agent.AGENT_ROUTING_MODE', 'single')
+    @patch('app.agent.GENAI_AVAILABLE', True)
+    @patch('app.agent.search_imt', return_value="L'IMT Dakar propose des formations en data et en développement web.")
+    @patch('app.agent._call_gemini')
+    def test_single_call_search(self, mock_gemini, mock_search):
+        """Mode single : un seul appel LLM, à sortie JSON, donne décision et réponse"""
+        mock_gemini.return_value = '```json\n{"intent": "SEARCH", "answer": "Formations en data."}\n```'
+        result = agent("Quelles formations ?")
+        assert result == "Formations en data."
+        mock_gemini.assert_called_once()
+        assert mock_gemini.call_args.kwargs["json_output"] is True
+    
+    @patch('app.agent.intent_classifier', None)
+    @patch('app.agent.AGENT_ROUTING_MODE', 'single')
+    @patch('app.agent.GENAI_AVAILABLE', True)
+    @patch('app.agent.send_email', return_value="Email envoyé")
+    @patch('app.agent._call_gemini', return_value='{"intent": "EMAIL", "answer": ""}')
+    def test_single_call_email(self, mock_gemini, mock_send):
+        """Mode single : l'intention EMAIL déclenche l'envoi"""
+        assert agent("Transmettez ma candidature à l'école") == "Email envoyé"
+        mock_send.assert_called_once()
+    
+    @patch('app.agent.intent_classifier', None)
+    @patch('app.agent.AGENT_ROUTING_MODE', 'single')
+    @patch('app.agent.GENAI_AVAILABLE', True)
+    @patch('app.agent.search_imt', return_value="Les formations courtes durent de trois à six mois selon le programme choisi.")
+    @patch('app.agent._call_gemini', return_value="Les formations durent 3 mois.")
+    def test_single_call_unparseable_output(self, mock_gemini, mock_search):
+        """Sortie non JSON : heuristique locale et réponse extractive, sans second appel"""
+        result = agent("Quelle est la durée des formations ?")
+        assert "trois à six mois" in result
+        mock_gemini.assert_called_once()
+    
+    @patch('app.agent.AGENT_ROUTING_MODE', 'local')
+    @patch('app.agent.send_email', return_value="Email envoyé")
+    @patch('app.agent._call_gemini')
+    def test_local_routing_skips_llm_decision(self, mock_gemini, mock_send):
+        """Mode local : la décision ne coûte aucun appel LLM"""
+        assert agent("Envoyer un email au directeur") == "Email envoyé"
+        mock_gemini.assert_not_called()
+    
+    @patch('app.agent.send_email')
+    @patch('app.agent._call_gemini')
+    def test_confident_classifier_skips_llm(self, mock_gemini, mock_send):
+        """Classifieur sûr de lui : aucun appel LLM, même en mode llm"""
+        assert agent("Bonjour") == agent_module.smalltalk_answer("Bonjour")
+        mock_gemini.assert_not_called()
+        mock_send.assert_not_called()
+
+
+CONTEXT = "L'IMT Dakar propose des formations courtes en développement web, data et cybersécurité."
+
+
+class TestStreaming:
+    """Tests des réponses en flux (streamGenerateContent / stream_token)"""
+    
+    def _gemini_client(self, status, chunks=()):
+        def handler(request):
+            assert request.url.path.endswith(":streamGenerateContent")
+            body = "".join(
+                "data: " + json.dumps({"candidates": [{"content": {"parts": [{"text": c}]}}]}) + "\r\n\r\n"
+                for c in chunks
+            )
+            return httpx.Response(status, text=body, headers={"content-type": "text/event-stream"})
+        return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    
+    def _run(self, client, **providers):
+        tokens = []
+        
+        async def on_token(token):
+            tokens.append(token)
+        
+        async def scenario():
+            async with client:
+                return await reformulate_answer_stream("Quelles formations ?", CONTEXT, on_token)
+        
+        with patch('app.agent.GENAI_AVAILABLE', True), patch('app.agent.API_KEY', "test"), \
+                patch('app.agent.GROK_AVAILABLE', providers.get("grok") is not None), \
+                patch('app.agent.OPENAI_AVAILABLE', False), \
+                patch('app.agent.gemini_breaker', CircuitBreaker("gemini")), \
+                patch('app.agent.grok_breaker', CircuitBreaker("grok")), \
+                patch('app.agent._get_grok_async_client', return_value=providers.get("grok")), \
+                patch('app.agent.get_async_http_client', return_value=client):
+            return asyncio.run(scenario()), tokens
+    
+    def test_tokens_forwarded_as_they_arrive(self):
+        """Chaque fragment SSE de Gemini est transmis, le TTFT est mesuré"""
+        ttft = metrics.histogram("llm_ttft_seconds", provider="Gemini")
+        before = ttft.snapshot()["count"]
+        result, tokens = self._run(self._gemini_client(200, ["L'IMT propose ", "des formations ", "en data."]))
+        assert tokens == ["L'IMT propose ", "des formations ", "en data."]
+        assert result == "L'IMT propose des formations en data."
+        assert ttft.snapshot()["count"] == before + 1
+    
+    def test_failure_before_first_token_falls_back(self):
+        """Gemini en échec avant le premier token : Grok prend le relais"""
+        async def grok_stream():
+            for text in ("Formations ", "en data."):
+                yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text))])
+        grok = MagicMock()
+        grok.chat.completions.create = AsyncMock(return_value=grok_stream())
+        result, tokens = self._run(self._gemini_client(500), grok=grok)
+        assert tokens == ["Formations ", "en data."]
+        assert result == "Formations en data."
+    
+    def test_extractive_fallback_without_tokens(self):
+        """Aucun token reçu : réponse extractive, rien n'a été transmis"""
+        result, tokens = self._run(self._gemini_client(500))
+        assert tokens == []
+        assert "formations courtes" in result
+
+
+class TestProviderWarmUp:
+    """Vérification des fournisseurs au démarrage"""
+    
+    def test_warm_up_runs_once_per_process(self):
+        health = MagicMock()
+        with patch.object(agent_module, '_providers_warmed', agent_module.threading.Event()), \
+                patch.object(agent_module, 'GENAI_AVAILABLE', True), \
+                patch.object(agent_module, 'gemini_health', health):
+            agent_module.warm_up_providers()
+            agent_module.warm_up_providers()
+        health.is_available.assert_called_once()
+
+
+class TestMemoryTenant:
+    """Locataire des sessions mémoire (quotas) dans l'interface Chainlit"""
+    
+    def test_authenticated_user_then_visitor_cookie(self):
+        session = {"user": SimpleNamespace(identifier="awa@imt.sn"), "id": "ws-1"}
+        context = SimpleNamespace(session=SimpleNamespace(environ={"HTTP_COOKIE": "imt_visitor=v42; a=1"}))
+        with patch.object(agent_module.cl, 'user_session', MagicMock(get=session.get)), \
+                patch.object(agent_module.cl, 'context', context):
+            assert agent_module._memory_user_id() == "awa@imt.sn"
+            session["user"] = None
+            # Même visiteur après rechargement (nouvelle connexion, même cookie)
+            assert agent_module._memory_user_id() == "visiteur:v42"
+            session["id"] = "ws-2"
+            assert agent_module._memory_user_id() == "visiteur:v42"
+            context.session.environ = {}
+            assert agent_module._memory_user_id() == "visiteur:ws-2"
+    
+    def test_visitor_cookie_is_set_once(self):
+        from starlette.applications import Starlette
+        from starlette.middleware.base import BaseHTTPMiddleware
+        from starlette.responses import PlainTextResponse
+        from starlette.routing import Route
+        from starlette.testclient import TestClient
+        app = Starlette(routes=[Route("/", lambda request: PlainTextResponse("ok"))])
+        app.add_middleware(BaseHTTPMiddleware, dispatch=agent_module._visitor_cookie)
+        client = TestClient(app)
+        visitor = client.get("/").cookies.get(agent_module.VISITOR_COOKIE)
+        assert visitor
+        assert agent_module.VISITOR_COOKIE not in client.get("/").cookies
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
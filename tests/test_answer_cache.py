@@ -0,0 +1,78 @@
+import json
+import sys
+from pathlib import Path
+from unittest.mock import patch
+
+# Ajouter le répertoire parent au PYTHONPATH
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.answer_cache import AnswerCache, HashedEmbedder
+from app.agent import reformulate_answer
+from conftest import FakeClock
+
+CONTEXT = "L'IMT Dakar propose des formations courtes en développement web, data et cybersécurité."
+
+
+def make_cache(tmp_path, version=None, **kwargs):
+    state = {"version": version}
+    cache = AnswerCache(HashedEmbedder(), review_file=tmp_path / "review.jsonl",
+                        version_fn=lambda: state["version"], **kwargs)
+    return cache, state
+
+
+def fill(cache, question, context, answer):
+    cache.store(cache.lookup(question, context), question, answer)
+
+
+class TestAnswerCache:
+    """Tests du cache sémantique des réponses"""
+
+    def test_near_duplicate_hits_only_with_same_context(self, tmp_path):
+        """Quasi-copie de la question : réponse servie, mais pas sur un autre contexte"""
+        cache, _ = make_cache(tmp_path, review_rate=0)
+        fill(cache, "Quelles formations propose l'IMT ?", CONTEXT, "Web, data et cybersécurité.")
+        hit = cache.lookup("quelles formations propose l'IMT", CONTEXT)
+        assert hit.answer == "Web, data et cybersécurité."
+        assert hit.similarity > 0.99
+        assert cache.lookup("Quelles formations propose l'IMT ?", CONTEXT + " Nouveau.").answer is None
+        assert cache.lookup("Quels sont les frais de scolarité ?", CONTEXT).answer is None
+
+    def test_ttl_and_index_version(self, tmp_path):
+        """Les entrées expirent et sont toutes invalidées à la publication d'un index"""
+        clock = FakeClock()
+        cache, state = make_cache(tmp_path, version="v1", ttl=60, clock=clock, review_rate=0)
+        fill(cache, "Quelles formations ?", CONTEXT, "Réponse")
+        clock.now = 61
+        assert cache.lookup("Quelles formations ?", CONTEXT).answer is None
+        assert len(cache) == 0
+
+        fill(cache, "Quelles formations ?", CONTEXT, "Réponse")
+        state["version"] = "v2"
+        assert cache.lookup("Quelles formations ?", CONTEXT).answer is None
+        assert len(cache) == 0
+
+    def test_lru_eviction(self, tmp_path):
+        cache, _ = make_cache(tmp_path, max_entries=2, review_rate=0)
+        for i in range(3):
+            fill(cache, f"Question numéro {i} sur les formations", f"{CONTEXT} {i}", f"Réponse {i}")
+        assert len(cache) == 2
+        assert cache.lookup("Question numéro 0 sur les formations", f"{CONTEXT} 0").answer is None
+
+    def test_hits_sampled_for_review(self, tmp_path):
+        """Les réponses servies sont journalisées pour relecture des faux positifs"""
+        cache, _ = make_cache(tmp_path, review_rate=1.0)
+        fill(cache, "Quelles formations propose l'IMT ?", CONTEXT, "Web et data.")
+        cache.lookup("Quelles formations propose l'IMT ?!", CONTEXT)
+        rows = [json.loads(l) for l in (tmp_path / "review.jsonl").read_text(encoding="utf-8").splitlines()]
+        assert rows[0]["cached_question"] == "Quelles formations propose l'IMT ?"
+        assert rows[0]["correct"] is None
+
+    @patch('app.agent.GENAI_AVAILABLE', True)
+    @patch('app.agent._call_gemini', return_value="Web, data et cybersécurité.")
+    def test_reformulate_answer_uses_cache(self, mock_gemini, tmp_path):
+        """La seconde question identique ne rappelle pas le LLM"""
+        cache, _ = make_cache(tmp_path, review_rate=0)
+        with patch('app.agent.get_answer_cache', return_value=cache):
+            assert reformulate_answer("Quelles formations ?", CONTEXT) == "Web, data et cybersécurité."
+            assert reformulate_answer("Quelles formations ?", CONTEXT) == "Web, data et cybersécurité."
+        mock_gemini.assert_called_once()
@@ -0,0 +1,96 @@
+"""
+Tests pour le chunker par tokens (app/chunking.py).
+"""
+import sys
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app import simple_search
+from app.chunking import chunk_text, split_sentences
+from app.simple_search import extract_chunks
+from app.tokens import count_tokens
+
+
+DOC = """Bachelor Sciences et Ingénierie du Numérique
+
+Ce bachelor en 3 ans s'adresse aux bacheliers de série Scientifique. Il forme aux réseaux, au cloud et à la cybersécurité. La troisième année se déroule en apprentissage dans une entreprise partenaire.
+
+De nombreux débouchés
+
+Le programme permet une intégration rapide dans les métiers suivants :
+
+Développeur d'applications web et mobile
+
+Technicien cloud
+
+Gestionnaire de parc informatique"""
+
+
+class TestSplitSentences:
+    """Tests du découpage en phrases."""
+
+    def test_splits_on_terminal_punctuation(self):
+        assert split_sentences("Bonjour. Comment allez-vous ? Très bien !") == [
+            "Bonjour.", "Comment allez-vous ?", "Très bien !"
+        ]
+
+    def test_does_not_split_decimals(self):
+        assert split_sentences("Le coût est de 3.5 millions. Merci.") == ["Le coût est de 3.5 millions.", "Merci."]
+
+
+class TestChunkText:
+    """Tests du chunker à fenêtre glissante."""
+
+    def test_chunks_carry_token_counts_and_respect_target(self):
+        chunks = chunk_text(DOC * 3, target_tokens=40, overlap_tokens=8)
+        assert chunks
+        for chunk in chunks:
+            assert chunk["tokens"] == count_tokens(chunk["content"])
+            assert chunk["tokens"] <= 40
+
+    def test_chunks_never_cross_headings(self):
+        chunks = chunk_text(DOC, target_tokens=200, overlap_tokens=10)
+        assert [c["heading"] for c in chunks] == [
+            "Bachelor Sciences et Ingénierie du Numérique", "De nombreux débouchés"
+        ]
+        # Les éléments de liste restent groupés sous leur titre, un par ligne
+        assert "Technicien cloud\nGestionnaire de parc informatique" in chunks[1]["content"]
+
+    def test_overlap_repeats_last_sentences(self):
+        text = " ".join(f"Phrase numéro {i}." for i in range(20))
+        chunks = chunk_text(text, target_tokens=24, overlap_tokens=6)
+        for previous, following in zip(chunks, chunks[1:]):
+            last_sentence = previous["content"].split(". ")[-1]
+            assert following["content"].startswith(last_sentence)
+
+    def test_long_sentence_is_split_by_words(self):
+        long_sentence = " ".join(["mot"] * 200) + "."
+        chunks = chunk_text(long_sentence, target_tokens=50, overlap_tokens=0)
+        assert len(chunks) > 1
+        assert all(c["tokens"] <= 50 for c in chunks)
+
+    def test_overlap_must_be_smaller_than_target(self):
+        with pytest.raises(ValueError):
+            chunk_text(DOC, target_tokens=10, overlap_tokens=10)
+
+    def test_search_extract_chunks_drops_cookie_blocks(self):
+        text = DOC + "\n\nCe site utilise des cookies pour mesurer l'audience."
+        chunks = extract_chunks(text, chunker="tokens")
+        assert chunks
+        assert not any("cookies" in c["content"] for c in chunks)
+        assert extract_chunks(text, chunker="paragraph")[0]["tokens"] > 0
+
+    def test_search_chunks_are_cached_per_text_and_settings(self, monkeypatch):
+        with patch.object(simple_search, "chunk_text", wraps=simple_search.chunk_text) as chunker:
+            text = DOC + "\n\nTexte propre à ce test de cache."
+            first = extract_chunks(text, chunker="tokens")
+            first[0]["content"] = "modifié par l'appelant"
+            assert extract_chunks("".join(text), chunker="tokens")[0]["content"] != "modifié par l'appelant"
+            assert chunker.call_count == 1
+            monkeypatch.setattr(simple_search, "SEARCH_CHUNK_TOKENS", 40)
+            extract_chunks(text, chunker="tokens")
+            assert chunker.call_count == 2
@@ -0,0 +1,114 @@
+"""
+Tests des disjoncteurs par fournisseur (app/circuit_breaker.py)
+"""
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app import metrics
+from app.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+from app.provider_health import ProviderHealth
+
+
+def _wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return condition()
+
+
+class TestCircuitBreaker:
+    """Tests des transitions fermé / ouvert / semi-ouvert"""
+
+    def test_opens_on_failure_rate(self):
+        """Au-delà du taux d'échecs sur la fenêtre, les appels sont refusés"""
+        breaker = CircuitBreaker("t-fail", min_calls=4, failure_rate=0.5, open_seconds=60)
+        for ok in (True, False, True, False):
+            assert breaker.allow_request()
+            breaker.record_success() if ok else breaker.record_failure()
+        assert breaker.state == OPEN
+        assert not breaker.allow_request()
+
+    def test_opens_on_slow_calls(self):
+        """Des réponses valides mais trop lentes ouvrent aussi le disjoncteur"""
+        breaker = CircuitBreaker("t-slow", min_calls=3, slow_call_seconds=1, slow_call_rate=0.6)
+        for duration in (5, 0.2, 5):
+            breaker.record_success(duration)
+        assert breaker.state == OPEN
+
+    def test_half_open_trial_without_probe(self):
+        """Sans sonde : un seul appel d'essai après la période ouverte, qui referme"""
+        breaker = CircuitBreaker("t-trial", min_calls=1, open_seconds=0.05)
+        breaker.record_failure()
+        assert not breaker.allow_request()
+        time.sleep(0.06)
+        assert breaker.allow_request()
+        assert breaker.state == HALF_OPEN
+        assert not breaker.allow_request()
+        breaker.record_success()
+        assert breaker.state == CLOSED
+        assert breaker.snapshot()["calls"] == 0
+
+    def test_failed_trial_reopens(self):
+        """Un essai en échec rouvre le disjoncteur pour une nouvelle période"""
+        breaker = CircuitBreaker("t-reopen", min_calls=1, open_seconds=0.05)
+        breaker.record_failure()
+        time.sleep(0.06)
+        assert breaker.allow_request()
+        breaker.record_failure()
+        assert breaker.state == OPEN
+        assert not breaker.allow_request()
+
+    def test_probe_gates_recovery(self):
+        """La sonde doit réussir avant l'essai réel ; son échec prolonge l'ouverture"""
+        up = {"value": False}
+        health = ProviderHealth("t-probe", lambda: up["value"])
+        breaker = CircuitBreaker("t-probe", health, min_calls=1, open_seconds=0.05)
+        breaker.record_failure()
+        time.sleep(0.06)
+        # Sonde lancée en arrière-plan, refus en attendant son résultat
+        assert not breaker.allow_request()
+        assert _wait_for(lambda: health.available is False)
+        assert not breaker.allow_request()
+        assert breaker.state == OPEN
+        up["value"] = True
+        time.sleep(0.06)
+        assert not breaker.allow_request()
+        assert _wait_for(lambda: health.available is True)
+        assert breaker.allow_request()
+        assert breaker.state == HALF_OPEN
+
+    def test_failed_check_counts_once_in_window(self):
+        """Une vérification en échec compte comme un appel en échec, sans ouvrir seule"""
+        health = ProviderHealth("t-check", lambda: False, failure_ttl=60)
+        health.refresh()
+        breaker = CircuitBreaker("t-check", health, min_calls=3, failure_rate=0.5)
+        assert breaker.allow_request()
+        assert breaker.allow_request()
+        assert breaker.snapshot()["failures"] == 1
+        breaker.record_failure()
+        assert breaker.state == CLOSED
+        breaker.record_failure()
+        assert breaker.state == OPEN
+
+    def test_expired_failed_check_is_ignored(self):
+        health = ProviderHealth("t-stale", lambda: True, failure_ttl=0.05)
+        health.available, health.checked_at = False, time.monotonic()
+        time.sleep(0.06)
+        breaker = CircuitBreaker("t-stale", health, min_calls=1)
+        assert breaker.allow_request()
+        assert breaker.snapshot()["failures"] == 0
+
+    def test_state_exported_as_metrics(self):
+        """État et transitions visibles dans l'export Prometheus"""
+        breaker = CircuitBreaker("t-metrics", min_calls=1, open_seconds=60)
+        breaker.record_failure()
+        breaker.allow_request()
+        text = metrics.render_prometheus()
+        assert 'llm_circuit_state{provider="t-metrics"} 2' in text
+        assert 'llm_circuit_transitions_total{provider="t-metrics",state="open"} 1' in text
+        assert 'llm_circuit_rejected_total{provider="t-metrics"} 1' in text
@@ -0,0 +1,107 @@
+"""
+Tests pour la table des coordonnées (app/contacts.py) et la réponse directe
+`lookup_contact` (app/tools.py).
+"""
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app import contacts, index_store
+from app.contacts import ContactTable, normalize_email, normalize_phone
+from app.tools import lookup_contact
+
+
+SCRAPED_CONTACT_PAGE = (
+    "📧 Contact : logo-eurecom@2x.png, logo-tsp@2x.webp\n\n"
+    "📞 Téléphone : 177035865, +221774959685, 214760535, 18.048 18.24\n\n"
+    "Laissez-nous un message ci-dessous :"
+)
+SCRAPED_EDULAB_PAGE = (
+    "L’EduLab se situe Avenue Cheikh Anta Diop, au 2ème étage de l’immeuble Campus France.\n\n"
+    "Pour toute question : edulab@imt.sn ou +221 77 495 96 85."
+)
+
+
+@pytest.fixture
+def contact_table(tmp_path, monkeypatch):
+    table = ContactTable()
+    table.add_text("contact", SCRAPED_CONTACT_PAGE)
+    table.add_text("Edulab", SCRAPED_EDULAB_PAGE)
+    path = table.save(tmp_path / "contact_entities.json")
+    monkeypatch.setattr(contacts, "CONTACTS_FILE", path)
+    monkeypatch.setattr(index_store, "INDEX_ROOT", tmp_path / "index")
+    return table
+
+
+class TestContactTable:
+    """Tests de la validation et du dédoublonnage des coordonnées."""
+
+    def test_normalization_rejects_scraping_noise(self):
+        assert normalize_email("logo-eurecom@2x.png") is None
+        assert normalize_email(" Contact@IMT.sn.") == "contact@imt.sn"
+        assert normalize_phone("+221 77 495 96 85") == "+221774959685"
+        assert normalize_phone("00221 33 869 00 00") == "+221338690000"
+        assert normalize_phone("177035865") is None
+        assert normalize_phone("771234567", require_prefix=True) is None
+
+    def test_entities_are_deduplicated_with_sources(self, contact_table):
+        entities = {(e["type"], e["value"]): e for e in contact_table.entities()}
+        assert set(entities) == {
+            ("phone", "+221774959685"),
+            ("email", "edulab@imt.sn"),
+            ("address", "Avenue Cheikh Anta Diop, au 2ème étage de l’immeuble Campus France"),
+        }
+        assert entities[("phone", "+221774959685")]["sources"] == ["contact", "Edulab"]
+        assert entities[("phone", "+221774959685")]["display"] == "+221 77 495 96 85"
+
+
+class TestLookupContact:
+    """Tests des réponses directes aux questions de contact."""
+
+    def test_answers_contact_intents(self, contact_table):
+        answer = lookup_contact("Quel est le numéro de téléphone de l'IMT ?")
+        assert "+221 77 495 96 85" in answer and "(page contact)" in answer
+        assert "+221 77 495 96 85" in lookup_contact("Comment vous appeler ?")
+        assert "+221 77 495 96 85" in lookup_contact("Donne-moi le numéro de l'IMT")
+        assert "+221 77 495 96 85" in lookup_contact("Téléphone de l'IMT ?")
+        assert "edulab@imt.sn" in lookup_contact("Quel est l'email de l'Edulab ?")
+        answer = lookup_contact("Où se trouve l'Edulab ?")
+        assert "Avenue Cheikh Anta Diop" in answer and "📞" not in answer
+        assert "page Edulab" in answer and "IMT Dakar" not in answer
+
+    def test_only_contact_page_is_attributed_to_the_school(self, contact_table):
+        """Les coordonnées de l'Edulab ne sont pas celles de l'IMT Dakar"""
+        assert lookup_contact("Quelle est l'adresse mail de l'école ?") is None
+        assert lookup_contact("Où se trouve l'école ?") is None
+        answer = lookup_contact("Quelles sont les coordonnées de l'IMT ?")
+        assert "+221 77 495 96 85" in answer
+        assert "edulab@imt.sn" not in answer and "Avenue Cheikh Anta Diop" not in answer
+
+    def test_ignores_other_questions(self, contact_table):
+        assert lookup_contact("Quelles formations proposez-vous ?") is None
+        assert lookup_contact("Quel est mon numéro ?") is None
+        assert lookup_contact("Envoie un email au directeur") is None
+
+    @pytest.mark.parametrize("question", [
+        "Un tel diplôme est-il reconnu ?",
+        "Quel est le numéro de la formation cybersécurité ?",
+        "Quel est le numéro d'inscription au bac ?",
+        "Qui est le contact pour les stages ?",
+        "Quelles formations sont situées à Dakar ?",
+        "Je veux venir à la journée portes ouvertes",
+        "Les cours commencent à la rentrée ou est-ce en octobre ?",
+        "Où est-ce que je peux m'inscrire ?",
+        "Peut-on appeler l'école le samedi ?",
+        "Le numéro de téléphone de l'IMT a-t-il changé depuis 2020 ?",
+        "Est-ce que vous avez un numéro WhatsApp ?",
+    ])
+    def test_questions_mentioning_contact_words_are_not_hijacked(self, contact_table, question):
+        assert lookup_contact(question) is None
+
+    def test_no_table_falls_through(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(contacts, "CONTACTS_FILE", tmp_path / "absent.json")
+        monkeypatch.setattr(index_store, "INDEX_ROOT", tmp_path / "index")
+        assert lookup_contact("Quel est le numéro de l'IMT ?") is None
@@ -0,0 +1,71 @@
+import sys
+from pathlib import Path
+from unittest.mock import patch
+
+# Ajouter le répertoire parent au PYTHONPATH
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.agent import reformulate_answer
+from app.context_packer import pack_context, parse_context
+from app.tokens import count_tokens
+
+FORMATIONS = ("L'IMT Dakar propose des formations courtes en développement web. "
+              "Les sessions durent de trois à six mois. "
+              "Les cours ont lieu en présentiel au campus de Dakar.")
+FRAIS = "Les frais de scolarité sont payables en trois versements."
+BOURSES = "Des bourses partielles sont accordées sur dossier."
+
+
+def search_context(*chunks):
+    """Contexte au format de `search_imt`."""
+    return "\n\n===\n\n".join(f"[Source: {source}, Score: {score:.2f}]\n{content}"
+                              for source, score, content in chunks)
+
+
+class TestPackContext:
+    """Tests du packing du contexte sous budget de tokens"""
+
+    def test_parse_search_format(self):
+        chunks = parse_context(search_context(("Formations.txt", 0.82, FORMATIONS), ("Frais.txt", 0.4, FRAIS)))
+        assert [(c.source, c.score) for c in chunks] == [("Formations.txt", 0.82), ("Frais.txt", 0.4)]
+        assert chunks[0].content == FORMATIONS
+
+    def test_ordered_by_score_without_headers(self):
+        """Les en-têtes disparaissent, les chunks trop faibles sont écartés"""
+        context = search_context(("Frais.txt", 0.5, FRAIS), ("Formations.txt", 0.9, FORMATIONS),
+                                 ("Bourses.txt", 0.1, BOURSES))
+        packed = pack_context(context, budget=1000, min_relative_score=0.3)
+        assert packed.text == f"{FORMATIONS}\n\n{FRAIS}"
+        assert (packed.used, packed.dropped, packed.trimmed) == (2, 1, 0)
+        assert packed.tokens < packed.retrieved_tokens
+
+    def test_overlapping_sentences_sent_once(self):
+        """Le recouvrement entre chunks voisins n'est envoyé qu'une fois"""
+        overlap = "Les cours ont lieu en présentiel au campus de Dakar. " + FRAIS
+        packed = pack_context(search_context(("a.txt", 0.9, FORMATIONS), ("b.txt", 0.8, overlap)), budget=1000)
+        assert packed.text.count("présentiel") == 1
+        assert packed.text.endswith(FRAIS)
+
+    def test_budget_trims_at_sentence_boundary(self):
+        budget = count_tokens(FORMATIONS) + 30
+        context = search_context(("a.txt", 0.9, FORMATIONS), ("b.txt", 0.8, f"{FRAIS} {BOURSES} {FORMATIONS[::-1]}"),
+                                 ("c.txt", 0.7, BOURSES + " Autre phrase."))
+        packed = pack_context(context, budget=budget)
+        assert packed.tokens <= budget
+        assert packed.trimmed == 1
+        assert packed.text == f"{FORMATIONS}\n\n{FRAIS}"
+
+    def test_unformatted_context_kept_in_order(self):
+        packed = pack_context(f"{FRAIS}\n\n===\n\n{BOURSES}", budget=1000)
+        assert packed.text == f"{FRAIS}\n\n{BOURSES}"
+
+    @patch('app.agent.GENAI_AVAILABLE', True)
+    @patch('app.agent._call_gemini', return_value="Réponse")
+    @patch('app.context_packer.CONTEXT_TOKEN_BUDGET', 60)
+    def test_reformulation_prompt_within_budget(self, mock_gemini):
+        long_chunk = " ".join(f"Phrase numéro {i} sur les formations de l'IMT." for i in range(200))
+        reformulate_answer("Quelles formations ?", search_context(("a.txt", 0.9, long_chunk)))
+        prompt = mock_gemini.call_args[0][0]
+        assert "Phrase numéro 0 " in prompt
+        assert "Phrase numéro 199" not in prompt
+        assert "Score:" not in prompt
@@ -0,0 +1,178 @@
+"""
+Tests pour le mode crawler de scripts/scrape_imt.py et la détection de quasi-doublons.
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.dedup import SimHashIndex, hamming_distance, simhash
+from scripts.scrape_imt import (
+    DEFAULT_RECRAWL_INTERVAL,
+    MIN_RECRAWL_INTERVAL,
+    Crawler,
+    canonicalize_url,
+    extract_links,
+    is_due,
+    next_interval,
+    page_name_for_url,
+    parse_sitemap,
+)
+
+
+LOREM = (
+    "L'Institut Mines-Télécom Dakar propose des formations d'ingénieurs en sciences du numérique, "
+    "en cybersécurité, en cloud computing et en internet des objets pour les étudiants du Sénégal "
+    "et de toute l'Afrique de l'Ouest, avec des enseignants issus des grandes écoles françaises."
+)
+
+
+class FakeResponse:
+    def __init__(self, text, content_type="text/html; charset=utf-8"):
+        self.text = text
+        self.headers = {"Content-Type": content_type}
+
+    def raise_for_status(self):
+        pass
+
+
+class FakeSession:
+    """Session HTTP simulée : dict URL -> HTML."""
+
+    def __init__(self, pages):
+        self.pages = pages
+        self.calls = []
+
+    def get(self, url, timeout=None):
+        self.calls.append(url)
+        if url not in self.pages:
+            raise ConnectionError(f"404 {url}")
+        return FakeResponse(self.pages[url])
+
+
+def _html(body, links=()):
+    anchors = "".join(f'<a href="{href}">lien</a>' for href in links)
+    return f"<html><body><p>{body}</p>{anchors}</body></html>"
+
+
+class TestCanonicalizeUrl:
+    """Tests de canonicalisation d'URL."""
+
+    def test_drops_fragment_and_tracking_params(self):
+        url = canonicalize_url("https://www.imt.sn/contact/?utm_source=fb&fbclid=abc#form")
+        assert url == "https://www.imt.sn/contact/"
+
+    def test_adds_trailing_slash_and_lowercases_host(self):
+        assert canonicalize_url("HTTPS://WWW.IMT.SN/contact") == "https://www.imt.sn/contact/"
+        assert canonicalize_url("https://www.imt.sn") == "https://www.imt.sn/"
+
+    def test_keeps_and_sorts_real_query_params(self):
+        url = canonicalize_url("https://www.imt.sn/?s=bachelor&p=2&utm_medium=x")
+        assert url == "https://www.imt.sn/?p=2&s=bachelor"
+
+    def test_resolves_relative_links(self):
+        url = canonicalize_url("../espace-edulab", base="https://www.imt.sn/qui-sommes-nous/page/")
+        assert url == "https://www.imt.sn/qui-sommes-nous/espace-edulab/"
+
+    def test_rejects_non_html_links(self):
+        assert canonicalize_url("mailto:contact@imt.sn") is None
+        assert canonicalize_url("https://www.imt.sn/brochure.pdf") is None
+        assert canonicalize_url("javascript:void(0)") is None
+
+    def test_extract_links_same_domain_only(self):
+        html = _html("x", ["/contact/#top", "https://imt.sn/contact", "https://google.com/", "/logo.png"])
+        links = extract_links(html, "https://www.imt.sn/")
+        assert links == ["https://www.imt.sn/contact/", "https://imt.sn/contact/"]
+
+    def test_page_name_reuses_historic_names(self):
+        assert page_name_for_url("https://www.imt.sn/contact/") == "contact"
+        assert page_name_for_url("https://www.imt.sn/actualites/rentree-2025/") == "actualites_rentree_2025"
+
+
+class TestSimHash:
+    """Tests de l'empreinte SimHash."""
+
+    def test_near_duplicate_texts_are_close(self):
+        a = simhash(LOREM + " Contactez-nous.")
+        b = simhash(LOREM + " Contactez nous !")
+        c = simhash("Le laboratoire Edulab accueille des projets de recherche et d'innovation pédagogique.")
+        assert hamming_distance(a, b) <= 6
+        assert hamming_distance(a, c) > 6
+
+    def test_index_finds_near_duplicate(self):
+        index = SimHashIndex()
+        index.add("page-a", simhash(LOREM))
+        assert index.find_near_duplicate(simhash(LOREM + " Bienvenue.")) == "page-a"
+        assert index.find_near_duplicate(simhash(LOREM), exclude="page-a") is None
+        index.remove("page-a")
+        assert index.find_near_duplicate(simhash(LOREM)) is None
+
+
+class TestRecrawlScheduling:
+    """Tests de la frontière persistée et de la fréquence de revisite."""
+
+    def test_interval_adapts_to_changes(self):
+        entry = {"interval": DEFAULT_RECRAWL_INTERVAL}
+        assert next_interval(entry, changed=True) == DEFAULT_RECRAWL_INTERVAL // 2
+        assert next_interval(entry, changed=False) == DEFAULT_RECRAWL_INTERVAL * 2
+        assert next_interval({"interval": MIN_RECRAWL_INTERVAL}, changed=True) == MIN_RECRAWL_INTERVAL
+
+    def test_is_due(self):
+        assert is_due({}, now=1000)
+        assert not is_due({"last_crawled": 1000, "interval": 500}, now=1200)
+        assert is_due({"last_crawled": 1000, "interval": 500}, now=1600)
+
+    def test_parse_sitemap(self):
+        xml = (
+            '<?xml version="1.0"?><urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+            "<url><loc>https://www.imt.sn/contact/</loc><changefreq>monthly</changefreq></url>"
+            "<url><loc>https://www.imt.sn/actualites/</loc></url></urlset>"
+        )
+        pages, children = parse_sitemap(xml)
+        assert pages == [("https://www.imt.sn/contact/", "monthly"), ("https://www.imt.sn/actualites/", None)]
+        assert children == []
+
+
+class TestCrawler:
+    """Tests du crawl complet avec une session simulée."""
+
+    def _crawler(self, tmp_path, pages, **kwargs):
+        session = FakeSession(pages)
+        crawler = Crawler(base_url="https://www.imt.sn/", delay=0, data_dir=tmp_path,
+                          session=session, seeds=[], **kwargs)
+        return crawler, session
+
+    def test_crawl_follows_links_and_drops_near_duplicates(self, tmp_path):
+        pages = {
+            "https://www.imt.sn/": _html(LOREM, ["/page-a/", "/page-a-copie/?utm_source=x", "/profond/"]),
+            "https://www.imt.sn/page-a/": _html("Le laboratoire Edulab accueille des projets de recherche, "
+                                                "d'innovation pédagogique et des startups étudiantes à Dakar."),
+            "https://www.imt.sn/page-a-copie/": _html(LOREM + " Bienvenue."),
+            "https://www.imt.sn/profond/": _html("Page intermédiaire de navigation vers les archives du site",
+                                                 ["/trop-profond/"]),
+            "https://www.imt.sn/trop-profond/": _html("Cette page ne doit jamais être téléchargée par le crawler"),
+        }
+        crawler, session = self._crawler(tmp_path, pages, max_depth=1)
+        stats = crawler.crawl(use_sitemap=False)
+
+        assert "https://www.imt.sn/trop-profond/" not in session.calls
+        assert stats["duplicates"] == 1
+        assert crawler.pages["https://www.imt.sn/page-a-copie/"]["duplicate_of"] == "https://www.imt.sn/"
+        assert (tmp_path / "accueil.txt").exists()
+        assert (tmp_path / "page_a.txt").exists()
+        assert not (tmp_path / "page_a_copie.txt").exists()
+        assert (tmp_path / "crawl_state.json").exists()
+
+    def test_incremental_recrawl_skips_pages_not_due(self, tmp_path):
+        pages = {"https://www.imt.sn/": _html(LOREM)}
+        crawler, _ = self._crawler(tmp_path, pages, max_depth=0)
+        crawler.crawl(use_sitemap=False)
+
+        recrawler, session = self._crawler(tmp_path, pages, max_depth=0)
+        stats = recrawler.crawl(use_sitemap=False)
+        assert session.calls == []
+        assert stats["skipped"] == 1
+
+        stats = recrawler.crawl(use_sitemap=False, force=True)
+        assert stats["unchanged"] == 1
+        assert recrawler.pages["https://www.imt.sn/"]["interval"] == DEFAULT_RECRAWL_INTERVAL * 2
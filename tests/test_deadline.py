@@ -0,0 +1,54 @@
+import asyncio
+import sys
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+# Ajouter le répertoire parent au PYTHONPATH
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app import deadline as deadline_module
+from app.agent import agent
+from app.circuit_breaker import CircuitBreaker
+from app.deadline import Deadline, request_deadline, stage
+from conftest import FakeClock
+
+
+class TestDeadline:
+    """Tests du budget de temps d'une requête"""
+
+    def test_timeouts_follow_remaining_budget(self):
+        clock = FakeClock()
+        deadline = Deadline(10, clock=clock)
+        assert deadline.timeout(30) == 10
+        with deadline.stage("routing"):
+            clock.now = 8
+        assert deadline.timeout(30) == 2
+        assert deadline.allows(2) and not deadline.allows(2.5)
+        clock.now = 12
+        assert deadline.expired()
+        assert deadline.timeout(30) == deadline_module.MIN_TIMEOUT
+        assert "routing 8.00s" in deadline.report()
+
+    def test_context_propagates_to_threads_and_nested_scopes(self):
+        """Les appels en profondeur (threads compris) voient l'échéance de la requête"""
+        assert deadline_module.timeout(30) == 30
+        with request_deadline(5) as outer:
+            with request_deadline(60) as inner:
+                assert inner is outer
+            assert asyncio.run(asyncio.to_thread(deadline_module.timeout, 30)) <= 5
+            with stage("search"):
+                pass
+        assert [name for name, _ in outer.stages] == ["search"]
+        assert deadline_module.current() is None
+
+    @patch('app.agent.GENAI_AVAILABLE', True)
+    @patch('app.agent.GROK_AVAILABLE', False)
+    @patch('app.agent.OPENAI_AVAILABLE', False)
+    @patch('app.agent.gemini_breaker', CircuitBreaker("gemini"))
+    def test_agent_skips_llm_when_budget_is_spent(self):
+        """Sous DEADLINE_MIN_LLM_SECONDS restantes : heuristique et réponse extractive"""
+        gemini = MagicMock(return_value="Réponse du LLM")
+        with patch('app.agent._call_gemini_direct', gemini), patch('app.agent.intent_classifier', None):
+            answer = agent("Quelles formations propose l'IMT ?", deadline=deadline_module.MIN_LLM_SECONDS / 2)
+        gemini.assert_not_called()
+        assert answer != "Réponse du LLM"
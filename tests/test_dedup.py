@@ -0,0 +1,86 @@
+"""
+Tests pour le dédoublonnage MinHash-LSH des chunks (app/dedup.py).
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.dedup import MinHasher, char_shingles, deduplicate_chunks, estimated_jaccard
+from app.tokens import count_tokens
+
+
+COOKIES = (
+    "Ce site utilise des cookies. Vous avez la possibilité d'accepter ou de refuser leur utilisation "
+    "sur nos sites Web et les services que nous sommes en mesure d'offrir."
+)
+
+
+class TestMinHash:
+    """Tests des signatures MinHash."""
+
+    def test_identical_texts_have_identical_signatures(self):
+        hasher = MinHasher()
+        sig = hasher.signature(char_shingles(COOKIES))
+        assert estimated_jaccard(sig, hasher.signature(char_shingles(COOKIES))) == 1.0
+
+    def test_similarity_tracks_text_overlap(self):
+        hasher = MinHasher()
+        base = hasher.signature(char_shingles(COOKIES))
+        close = hasher.signature(char_shingles(COOKIES.replace("Web", "web")))
+        far = hasher.signature(char_shingles("Le bachelor IoT forme des ingénieurs en cybersécurité et cloud."))
+        assert estimated_jaccard(base, close) > 0.9
+        assert estimated_jaccard(base, far) < 0.2
+
+
+class TestDeduplicateChunks:
+    """Tests de la fusion des chunks quasi-identiques."""
+
+    def test_merges_across_files_and_keeps_provenance(self):
+        chunks = [
+            {"source": "accueil.txt", "content": COOKIES},
+            {"source": "contact.txt", "content": "L'IMT Dakar est situé sur l'avenue Cheikh Anta Diop à Dakar."},
+            {"source": "contact.txt", "content": COOKIES + " Merci."},
+            {"source": "formations.txt", "content": COOKIES},
+        ]
+        result = deduplicate_chunks(chunks)
+
+        assert len(result) == 2
+        cookies = result[0]
+        assert cookies["sources"] == ["accueil.txt", "contact.txt", "formations.txt"]
+        # Le chunk le plus complet du groupe est conservé, avec sa source
+        assert cookies["content"] == COOKIES + " Merci."
+        assert cookies["source"] == "contact.txt"
+        assert result[1]["sources"] == ["contact.txt"]
+
+    def test_threshold_controls_merging(self):
+        chunks = [
+            {"source": "a.txt", "content": COOKIES},
+            {"source": "b.txt", "content": COOKIES.replace("possibilité", "liberté")},
+        ]
+        assert len(deduplicate_chunks(chunks, threshold=0.99)) == 2
+        assert len(deduplicate_chunks(chunks, threshold=0.8)) == 1
+
+    def test_longest_chunk_signature_is_used_for_later_matches(self):
+        """Après remplacement, un chunk proche du contenu conservé (mais pas du premier)
+        est bien fusionné"""
+        longer = COOKIES + " Merci de votre visite."
+        longest = longer + " Gérer vos préférences."
+        chunks = [
+            {"source": "a.txt", "content": COOKIES, "tokens": count_tokens(COOKIES)},
+            {"source": "b.txt", "content": longer, "tokens": count_tokens(longer)},
+            {"source": "c.txt", "content": longest, "tokens": count_tokens(longest)},
+        ]
+        hasher = MinHasher()
+        first, _, last = (hasher.signature(char_shingles(c["content"])) for c in chunks)
+        assert estimated_jaccard(first, last) < 0.8
+
+        result = deduplicate_chunks(chunks, threshold=0.8)
+        assert len(result) == 1
+        assert result[0]["sources"] == ["a.txt", "b.txt", "c.txt"]
+        assert (result[0]["source"], result[0]["tokens"]) == ("c.txt", count_tokens(longest))
+
+    def test_count_tokens(self):
+        assert count_tokens("") == 0
+        assert count_tokens("IMT Dakar") == 3
+        assert count_tokens("Bonjour !") == 3
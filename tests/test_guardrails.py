@@ -0,0 +1,46 @@
+import sys
+import time
+from pathlib import Path
+
+# Ajouter le répertoire parent au PYTHONPATH
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.agent import _detect_inappropriate_content
+from app.guardrails import COMPARISON, INSULT, OFFENSIVE, TOO_LONG, GuardrailEngine, detect
+
+
+class TestGuardrails:
+    """Tests du filtre de contenu compilé"""
+
+    def test_categories_in_priority_order(self):
+        assert detect("IMT est meilleure que ESP") == (COMPARISON, "imt_vs_autre")
+        assert detect("Comparez IMT avec l'EPT")[0] == COMPARISON
+        assert detect("Votre école est nulle")[0] == INSULT
+        assert detect("ferme ta gueule") == (OFFENSIVE, "ferme")
+        assert detect("ok tg") == (OFFENSIVE, "abreviation")
+        # Comparaison prioritaire sur l'insulte
+        assert detect("c'est nul, l'imt vaut mieux que l'ucad")[0] == COMPARISON
+        assert detect("Quelles sont les formations disponibles ?") is None
+        assert detect("Je m'appelle Maliki") is None
+
+    def test_sequence_rules_stay_within_a_line(self):
+        """Comme `.*`, l'ordre des termes compte et un retour à la ligne les sépare"""
+        assert detect("ucad plus imt")[0] == COMPARISON
+        assert detect("imt\nplus esp") is None
+        assert detect("esp imt plus") is None
+
+    def test_length_cap(self):
+        engine = GuardrailEngine(max_chars=100)
+        assert engine.check("a" * 101) == (TOO_LONG, "longueur")
+        assert engine.check("a" * 100) is None
+
+    def test_worst_case_input_is_linear(self):
+        """Texte collé qui amorce une comparaison sans la compléter"""
+        text = ("imt plus " * 500)[:4000]
+        start = time.perf_counter()
+        assert detect(text) is None
+        assert time.perf_counter() - start < 0.05
+
+    def test_agent_refusal_message(self):
+        assert "Politique de neutralité" in _detect_inappropriate_content("IMT est meilleure que ESP")
+        assert _detect_inappropriate_content("Comment s'inscrire à l'IMT ?") is None
@@ -0,0 +1,53 @@
+"""
+Tests pour l'extraction HTML en un seul passage (app/html_extract.py).
+"""
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.html_extract import LXML_AVAILABLE, extract_content, extract_page
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures" / "html"
+PARSERS = ["html.parser"] + (["lxml"] if LXML_AVAILABLE else [])
+
+
+@pytest.mark.parametrize("parser", PARSERS)
+class TestExtractPage:
+    """Tests de l'extraction des blocs et des champs structurés."""
+
+    def test_structured_fields_come_from_visible_text(self, parser):
+        page = extract_page((FIXTURES_DIR / "contact.html").read_text(encoding="utf-8"), parser)
+        assert page["emails"] == ["contact@imt.sn"]
+        assert "+221774959685" in page["phones"]
+        assert page["addresses"] == ["Avenue Cheikh Anta Diop, km1, Dakar, Sénégal"]
+        # Les noms de fichiers d'images (logo@2x.png) ne sont plus pris pour des emails
+        assert not any(e.endswith(".png") for e in page["emails"])
+
+    def test_span_inside_block_is_not_duplicated(self, parser):
+        html = (
+            "<html><body><header><a href='/formations/'>Formations</a></header>"
+            "<p><span>Le bachelor dure</span> <b>trois ans à Dakar.</b></p>"
+            "<span>Bloc autonome hors paragraphe</span>"
+            "<script>var x = 'Texte de script à ignorer';</script></body></html>"
+        )
+        page = extract_page(html, parser)
+        assert page["blocks"] == ["Le bachelor dure trois ans à Dakar.", "Bloc autonome hors paragraphe"]
+        # Les liens des menus restent disponibles pour le crawler
+        assert page["anchors"] == ["/formations/"]
+
+    def test_noise_filtered_and_blocks_unique(self, parser):
+        html = (
+            "<p>Nous utilisons des cookies pour mesurer l'audience.</p>"
+            "<li>Technicien cloud et réseaux</li><li>Technicien  cloud et réseaux</li><p>Court</p>"
+        )
+        assert extract_content(html, parser) == ["Technicien cloud et réseaux"]
+
+
+@pytest.mark.skipif(not LXML_AVAILABLE, reason="lxml non installé")
+def test_parsers_agree_on_fixtures():
+    for fixture in sorted(FIXTURES_DIR.glob("*.html")):
+        html = fixture.read_text(encoding="utf-8")
+        assert extract_content(html, "lxml") == extract_content(html, "html.parser"), fixture.name
@@ -0,0 +1,72 @@
+"""
+Tests du client HTTP partagé (app/http_client.py)
+"""
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app import http_client
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        body = b'{"ok": true}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class _CountingServer(ThreadingHTTPServer):
+    daemon_threads = True
+    connections = 0
+
+    def get_request(self):
+        self.connections += 1
+        return super().get_request()
+
+
+class TestHttpClient:
+    """Tests du pool de connexions"""
+
+    def teardown_method(self):
+        http_client.close_http_client()
+
+    def test_singleton(self):
+        """Le même client est réutilisé jusqu'à sa fermeture"""
+        client = http_client.get_http_client()
+        assert http_client.get_http_client() is client
+        http_client.close_http_client()
+        assert http_client.get_http_client() is not client
+
+    def test_pool_limits_from_settings(self, monkeypatch):
+        """Les limites du pool suivent la configuration"""
+        monkeypatch.setattr(http_client, "HTTP_POOL_MAX_CONNECTIONS", 7)
+        monkeypatch.setattr(http_client, "HTTP_POOL_MAX_KEEPALIVE", 3)
+        limits = http_client.pool_limits()
+        assert limits.max_connections == 7
+        assert limits.max_keepalive_connections == 3
+
+    def test_connection_reused(self):
+        """Plusieurs appels successifs passent par une seule connexion"""
+        server = _CountingServer(("127.0.0.1", 0), _Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            client = http_client.build_http_client()
+            url = f"http://127.0.0.1:{server.server_port}/"
+            for _ in range(5):
+                assert client.post(url, json={"q": "test"}).json() == {"ok": True}
+            client.close()
+            assert server.connections == 1
+        finally:
+            server.shutdown()
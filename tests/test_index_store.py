@@ -0,0 +1,128 @@
+"""
+Tests pour l'index versionné (app/index_store.py) et le pipeline d'ingestion.
+"""
+import json
+import sys
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import pytest
+import requests
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app import index_store, simple_search
+from scripts.ingest_pipeline import PipelineAborted, data_source, run_pipeline, web_source
+
+
+PAGE = (
+    "Bachelor numérique\n\n"
+    "Le bachelor en sciences et ingénierie du numérique se déroule en 3 ans à Dakar. "
+    "La 3ème année se fait en alternance avec un stage de 2 mois en entreprise.\n\n"
+    "Débouchés\n\n"
+    "Les diplômés deviennent technicien cloud, analyste cybersécurité ou développeur IoT."
+)
+
+
+@pytest.fixture
+def corpus(tmp_path):
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    (data_dir / "formations.txt").write_text(PAGE, encoding="utf-8")
+    (data_dir / "copie.txt").write_text(PAGE, encoding="utf-8")
+    return data_dir
+
+
+class TestIndexStore:
+    """Tests de la publication atomique des versions."""
+
+    def test_publish_switches_pointer_and_prunes(self, tmp_path):
+        root = tmp_path / "index"
+        assert index_store.current_version(root) is None
+
+        versions = []
+        for _ in range(4):
+            version_dir = index_store.new_version_dir(root)
+            index_store.write_manifest(version_dir, {"version": version_dir.name})
+            index_store.publish(version_dir, root, keep=2)
+            versions.append(version_dir.name)
+            assert index_store.current_version(root) == version_dir.name
+
+        remaining = sorted(p.name for p in root.iterdir() if p.is_dir())
+        assert remaining == versions[-2:]
+        assert index_store.read_manifest(index_store.current_index_dir(root))["version"] == versions[-1]
+
+    def test_publish_requires_manifest(self, tmp_path):
+        root = tmp_path / "index"
+        version_dir = index_store.new_version_dir(root)
+        with pytest.raises(FileNotFoundError):
+            index_store.publish(version_dir, root)
+        assert index_store.current_version(root) is None
+
+
+class TestIngestPipeline:
+    """Tests du pipeline en flux (source data/, sans embeddings)."""
+
+    def test_pipeline_writes_and_publishes_version(self, tmp_path, corpus):
+        root = tmp_path / "index"
+        manifest = run_pipeline(data_source(corpus), embeddings=False, root=root, queue_size=1)
+
+        version_dir = index_store.current_index_dir(root)
+        assert version_dir.name == manifest["version"]
+        assert sorted(p.name for p in (version_dir / "pages").iterdir()) == ["copie.txt", "formations.txt"]
+
+        chunks = json.loads((version_dir / "chunks.json").read_text(encoding="utf-8"))
+        assert len(chunks) == manifest["chunks"]
+        # La page dupliquée est fusionnée au fil de l'eau
+        assert manifest["chunks_before_dedup"] == 2 * manifest["chunks"]
+        assert all(c["sources"] == ["copie.txt", "formations.txt"] for c in chunks)
+        assert manifest["faiss"] is False
+
+    def test_failed_stage_publishes_nothing(self, tmp_path):
+        root = tmp_path / "index"
+
+        def broken_source():
+            yield "formations", None, PAGE
+            raise ConnectionError("site injoignable")
+
+        with pytest.raises(PipelineAborted):
+            run_pipeline(broken_source, embeddings=False, root=root)
+        assert index_store.current_version(root) is None
+        assert not any(p.is_dir() for p in root.iterdir())
+
+    def test_unreachable_page_is_reported_and_skipped(self, tmp_path):
+        root = tmp_path / "index"
+        html = "<html><body>" + "".join(f"<p>{p}</p>" for p in PAGE.split("\n\n")) + "</body></html>"
+
+        def get(url, timeout):
+            if "absente" in url:
+                raise requests.HTTPError("404 Client Error")
+            return MagicMock(text=html)
+
+        source = web_source({"absente": "https://imt.sn/absente", "formations": "https://imt.sn/formations"},
+                            session=MagicMock(get=get))
+        manifest = run_pipeline(source, embeddings=False, root=root)
+        assert [p["name"] for p in manifest["pages"]] == ["formations"]
+        assert manifest["failed_pages"] == [
+            {"name": "absente", "url": "https://imt.sn/absente", "error": "404 Client Error"}
+        ]
+        assert index_store.current_version(root) == manifest["version"]
+
+    def test_no_page_downloaded_publishes_nothing(self, tmp_path):
+        root = tmp_path / "index"
+        session = MagicMock(get=MagicMock(side_effect=requests.ConnectionError("site injoignable")))
+        with pytest.raises(PipelineAborted):
+            run_pipeline(web_source({"formations": "https://imt.sn/formations"}, session=session),
+                         embeddings=False, root=root)
+        assert index_store.current_version(root) is None
+
+    def test_lexical_search_picks_up_new_version(self, tmp_path, corpus, monkeypatch):
+        root = tmp_path / "index"
+        monkeypatch.setattr(index_store, "INDEX_ROOT", root)
+        monkeypatch.setattr(simple_search, "DATA_DIR", corpus)
+        assert set(simple_search.load_documents()) == {"copie.txt", "formations.txt"}
+
+        (corpus / "copie.txt").unlink()
+        run_pipeline(data_source(corpus), embeddings=False, root=root)
+        assert set(simple_search.load_documents()) == {"formations.txt"}
+        assert simple_search.documents_dir().parent == index_store.current_index_dir()
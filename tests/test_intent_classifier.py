@@ -0,0 +1,61 @@
+import pytest
+import sys
+import time
+from pathlib import Path
+
+# Ajouter le répertoire parent au PYTHONPATH
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.intent_classifier import IntentClassifier, classify, keyword_intent, load_classifier, load_seed
+
+
+class TestKeywordIntent:
+    """Tests de l'heuristique de repli partagée par l'agent et chainlit_app"""
+
+    def test_intents(self):
+        assert keyword_intent("Envoie un mail au directeur") == "EMAIL"
+        assert keyword_intent("Remplis le formulaire de contact") == "FORM"
+        assert keyword_intent("Merci beaucoup !") == "SMALLTALK"
+        assert keyword_intent("Quelles formations ?") == "SEARCH"
+
+    def test_question_about_contact_is_search(self):
+        """Une question sur le moyen de contacter n'est pas une demande d'envoi"""
+        assert keyword_intent("Comment contacter l'IMT ?") == "SEARCH"
+
+
+class TestIntentClassifier:
+    """Tests du classifieur TF-IDF + régression logistique"""
+
+    def test_train_predict_and_reload(self, tmp_path):
+        """Le modèle entraîné sur l'amorce reconnaît de nouvelles formulations"""
+        model = IntentClassifier.train(load_seed())
+        assert model.predict("Peux-tu envoyer un email à la scolarité ?")[0] == "EMAIL"
+        assert model.predict("Quels sont les tarifs du bootcamp ?")[0] == "SEARCH"
+        path = model.save(tmp_path / "model.json")
+        reloaded = IntentClassifier.load(path)
+        assert reloaded.probabilities("Bonjour") == model.probabilities("Bonjour")
+
+    def test_low_confidence_defers(self):
+        """Sous le seuil ou sans modèle : pas de décision locale"""
+        model = load_classifier()
+        assert model is not None
+        assert classify("Bonjour", model)[0] == "SMALLTALK"
+        assert classify("Bonjour", model, threshold=1.01)[0] is None
+        assert classify("Bonjour", None) == (None, 0.0)
+
+    @pytest.mark.parametrize("question", [
+        "ok merci, et les débouchés ?",
+        "merci, et le logement ?",
+        "d'accord, et les frais ?",
+    ])
+    def test_thanks_followed_by_question_is_not_smalltalk(self, question):
+        """Un remerciement suivi d'une question n'obtient pas de réponse de politesse"""
+        assert classify(question, load_classifier())[0] != "SMALLTALK"
+        assert classify("Ok merci", load_classifier())[0] == "SMALLTALK"
+
+    def test_prediction_under_a_millisecond(self):
+        model = load_classifier()
+        start = time.perf_counter()
+        for _ in range(100):
+            model.predict("Je voudrais envoyer un message au directeur pour un stage")
+        assert (time.perf_counter() - start) / 100 < 0.001
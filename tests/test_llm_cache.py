@@ -0,0 +1,75 @@
+import asyncio
+import sys
+from pathlib import Path
+from unittest.mock import AsyncMock, MagicMock, patch
+
+# Ajouter le répertoire parent au PYTHONPATH
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app import agent as agent_module
+from app.circuit_breaker import CircuitBreaker
+from app.llm_cache import LLMCache, SQLiteBackend, bypass, cache_key
+
+
+class TestSQLiteBackend:
+    """Tests du stockage SQLite du cache LLM"""
+
+    def test_key_depends_on_provider_model_and_config(self):
+        base = cache_key("Gemini", "gemini-2.5-flash", {"temperature": 0.3}, "prompt")
+        assert base == cache_key("Gemini", "gemini-2.5-flash", {"temperature": 0.3}, "prompt")
+        assert base != cache_key("Grok", "gemini-2.5-flash", {"temperature": 0.3}, "prompt")
+        assert base != cache_key("Gemini", "gemini-2.5-flash", {"temperature": 0.7}, "prompt")
+        assert base != cache_key("Gemini", "gemini-2.5-flash", {"temperature": 0.3}, "prompt ")
+
+    def test_ttl_and_persistence(self, tmp_path):
+        """Les entrées survivent à la réouverture du fichier et expirent après leur TTL"""
+        path = tmp_path / "cache.sqlite3"
+        LLMCache(SQLiteBackend(path), ttl=60).set("a", "SEARCH")
+        LLMCache(SQLiteBackend(path), ttl=-1).set("b", "EMAIL")
+        cache = LLMCache(SQLiteBackend(path))
+        assert cache.get_first(["b", "a"]) == (1, "SEARCH")
+
+    @patch('app.llm_cache.PRUNE_EVERY', 1)
+    def test_least_recently_read_evicted(self, tmp_path):
+        backend = SQLiteBackend(tmp_path / "cache.sqlite3", max_entries=2)
+        backend.set("a", "1", 60)
+        backend.set("b", "2", 60)
+        backend.get_many(["a"])
+        backend.set("c", "3", 60)
+        assert set(backend.get_many(["a", "b", "c"])) == {"a", "c"}
+
+
+class TestAgentLLMCache:
+    """Tests du cache autour de la chaîne de fournisseurs"""
+
+    def _patches(self, tmp_path):
+        cache = LLMCache(SQLiteBackend(tmp_path / "cache.sqlite3"))
+        return (patch('app.agent.get_llm_cache', return_value=cache),
+                patch('app.agent.GENAI_AVAILABLE', True),
+                patch('app.agent.GROK_AVAILABLE', False),
+                patch('app.agent.OPENAI_AVAILABLE', False),
+                patch('app.agent.gemini_breaker', CircuitBreaker("gemini")))
+
+    def test_repeated_prompt_served_locally(self, tmp_path):
+        """Même prompt : un seul appel ; bypass() force une génération fraîche qui remplace l'entrée"""
+        gemini = MagicMock(side_effect=["SEARCH", "EMAIL"])
+        p1, p2, p3, p4, p5 = self._patches(tmp_path)
+        with p1, p2, p3, p4, p5, patch('app.agent._call_gemini_direct', gemini):
+            assert agent_module._call_gemini("prompt de routage") == "SEARCH"
+            assert agent_module._call_gemini("prompt de routage") == "SEARCH"
+            assert gemini.call_count == 1
+            with bypass():
+                assert agent_module._call_gemini("prompt de routage") == "EMAIL"
+            assert agent_module._call_gemini("prompt de routage") == "EMAIL"
+        assert gemini.call_count == 2
+
+    def test_async_chain_shares_cache(self, tmp_path):
+        """Une réponse obtenue par la chaîne asynchrone sert aussi la chaîne synchrone"""
+        gemini_async = AsyncMock(return_value="SEARCH")
+        gemini_sync = MagicMock(return_value="EMAIL")
+        p1, p2, p3, p4, p5 = self._patches(tmp_path)
+        with p1, p2, p3, p4, p5, patch('app.agent._call_gemini_direct_async', gemini_async), \
+                patch('app.agent._call_gemini_direct', gemini_sync):
+            assert asyncio.run(agent_module._call_gemini_async("prompt")) == "SEARCH"
+            assert agent_module._call_gemini("prompt") == "SEARCH"
+        gemini_sync.assert_not_called()
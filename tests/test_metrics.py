@@ -0,0 +1,44 @@
+"""
+Tests des métriques en mémoire (app/metrics.py)
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app import metrics
+
+
+class TestHistogram:
+    """Tests de l'histogramme de latences"""
+
+    def setup_method(self):
+        metrics.reset()
+
+    def test_percentile_of_recent_samples(self):
+        """Les percentiles portent sur la fenêtre des dernières mesures"""
+        hist = metrics.Histogram("t", window=100)
+        for value in range(1, 101):
+            hist.observe(value / 100)
+        assert hist.percentile(0.5) == 0.5
+        assert hist.percentile(0.95) == 0.95
+        # Fenêtre glissante : les anciennes mesures sortent
+        for _ in range(100):
+            hist.observe(2.0)
+        assert hist.percentile(0.5) == 2.0
+        assert hist.count == 200
+
+    def test_empty_percentile(self):
+        """Sans mesure, pas de percentile"""
+        assert metrics.Histogram("t").percentile(0.95) is None
+
+    def test_registry_and_prometheus_export(self):
+        """Un histogramme par jeu de labels, exporté au format Prometheus"""
+        metrics.histogram("llm_latency_seconds", provider="Gemini").observe(0.3)
+        metrics.histogram("llm_latency_seconds", provider="Gemini").observe(1.2)
+        metrics.histogram("llm_latency_seconds", provider="Grok").observe(0.8)
+        text = metrics.render_prometheus()
+        assert text.count("# TYPE llm_latency_seconds histogram") == 1
+        assert 'llm_latency_seconds_bucket{provider="Gemini",le="0.5"} 1' in text
+        assert 'llm_latency_seconds_bucket{provider="Gemini",le="+Inf"} 2' in text
+        assert 'llm_latency_seconds_count{provider="Grok"} 1' in text
@@ -0,0 +1,64 @@
+"""
+Tests pour le suivi de disponibilité des fournisseurs LLM (app/provider_health.py)
+et l'import sans réseau de app.agent.
+"""
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.provider_health import ProviderHealth
+from scripts.bench_startup import measure_import
+
+
+def _wait_for(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not predicate() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return predicate()
+
+
+class TestProviderHealth:
+    """Tests de la vérification en arrière-plan."""
+
+    def test_background_refresh_runs_once_at_a_time(self):
+        calls = []
+        release = threading.Event()
+        health = ProviderHealth("test", lambda: calls.append(1) or release.wait(2))
+        # Jamais vérifié : l'état est inconnu, sans blocage
+        health.refresh_async()
+        health.refresh_async()
+        assert health.available is None
+        release.set()
+        assert _wait_for(lambda: health.available is True)
+        assert len(calls) == 1
+
+    def test_result_cached_until_ttl_expires(self):
+        calls = []
+        health = ProviderHealth("test", lambda: calls.append(1) or False, failure_ttl=0.05)
+        health.refresh()
+        assert health.is_available() is False
+        assert len(calls) == 1
+        # Échec expiré : plus pris en compte, nouvelle vérification en arrière-plan
+        time.sleep(0.06)
+        assert health.is_available() is True
+        assert _wait_for(lambda: len(calls) == 2)
+
+    def test_success_counts_as_fresh_check(self):
+        health = ProviderHealth("test", lambda: False, ttl=3600)
+        health.refresh()
+        health.mark_success()
+        assert health.is_available() is True
+
+    def test_check_exception_counts_as_unavailable(self):
+        def check():
+            raise ConnectionError("timeout")
+        health = ProviderHealth("test", check)
+        assert health.refresh() is False
+
+
+def test_agent_import_makes_no_network_call():
+    result = measure_import("app.agent")
+    assert result["network_calls"] == []
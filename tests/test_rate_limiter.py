@@ -0,0 +1,82 @@
+import asyncio
+import sys
+from pathlib import Path
+from unittest.mock import AsyncMock, MagicMock, patch
+
+# Ajouter le répertoire parent au PYTHONPATH
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app import agent as agent_module
+from app.circuit_breaker import CircuitBreaker
+from app.rate_limiter import DAY, MINUTE, LocalBackend, RateLimiter
+from conftest import FakeClock
+
+
+def make_limiter(quotas, max_wait=2.0):
+    clock = FakeClock()
+    return RateLimiter(LocalBackend(clock), quotas=quotas, max_wait=max_wait), clock
+
+
+class TestRateLimiter:
+    """Tests du seau à jetons (backend local)"""
+
+    def test_burst_then_queue_then_spill(self):
+        """15/min : 15 appels immédiats, puis file d'attente bornée par max_wait"""
+        limiter, _ = make_limiter({"Gemini": [(15, MINUTE)]}, max_wait=8.5)
+        assert [limiter.reserve("Gemini", "k") for _ in range(15)] == [0.0] * 15
+        assert limiter.reserve("Gemini", "k") == 4.0
+        assert limiter.reserve("Gemini", "k") == 8.0
+        assert limiter.reserve("Gemini", "k") is None
+
+    def test_refill_and_daily_quota(self):
+        limiter, clock = make_limiter({"Gemini": [(2, MINUTE), (3, DAY)]}, max_wait=0)
+        assert limiter.reserve("Gemini", "k") == 0.0
+        assert limiter.reserve("Gemini", "k") == 0.0
+        assert limiter.reserve("Gemini", "k") is None
+        clock.now = 60
+        assert limiter.reserve("Gemini", "k") == 0.0
+        # Quota journalier épuisé malgré le seau par minute plein
+        clock.now = 600
+        assert limiter.reserve("Gemini", "k") is None
+
+    def test_quota_per_key_and_unlimited_provider(self):
+        limiter, _ = make_limiter({"Gemini": [(1, MINUTE)]}, max_wait=0)
+        assert limiter.reserve("Gemini", "clé 1") == 0.0
+        assert limiter.reserve("Gemini", "clé 2") == 0.0
+        assert limiter.reserve("Gemini", "clé 1") is None
+        assert limiter.reserve("Grok", "k") == 0.0
+
+
+class TestAgentRateLimit:
+    """Bascule sur le fournisseur suivant quand le quota est atteint"""
+
+    def _patches(self, limiter):
+        return (patch('app.agent.get_rate_limiter', return_value=limiter),
+                patch('app.agent.GENAI_AVAILABLE', True),
+                patch('app.agent.GROK_AVAILABLE', True),
+                patch('app.agent.OPENAI_AVAILABLE', False),
+                patch('app.agent.gemini_breaker', CircuitBreaker("gemini")),
+                patch('app.agent.grok_breaker', CircuitBreaker("grok")))
+
+    def test_sync_chain_spills_to_grok(self):
+        limiter, _ = make_limiter({"Gemini": [(1, MINUTE)]}, max_wait=0.5)
+        gemini, grok = MagicMock(return_value="Gemini"), MagicMock(return_value="Grok")
+        p1, p2, p3, p4, p5, p6 = self._patches(limiter)
+        with p1, p2, p3, p4, p5, p6, patch('app.agent._call_gemini_direct', gemini), \
+                patch('app.agent._call_grok', grok):
+            assert agent_module._call_gemini("prompt") == "Gemini"
+            assert agent_module._call_gemini("prompt") == "Grok"
+        gemini.assert_called_once()
+        assert agent_module.gemini_breaker.snapshot()["failures"] == 0
+
+    def test_async_chain_waits_within_budget(self):
+        """Une attente sous le budget est respectée plutôt que de basculer"""
+        limiter, _ = make_limiter({"Gemini": [(1, 0.05)]}, max_wait=1)
+        gemini, grok = AsyncMock(return_value="Gemini"), AsyncMock(return_value="Grok")
+        p1, p2, p3, p4, p5, p6 = self._patches(limiter)
+        with p1, p2, p3, p4, p5, p6, patch('app.agent._call_gemini_direct_async', gemini), \
+                patch('app.agent._call_grok_async', grok):
+            assert asyncio.run(agent_module._call_gemini_async("prompt")) == "Gemini"
+            assert asyncio.run(agent_module._call_gemini_async("autre prompt")) == "Gemini"
+        assert gemini.await_count == 2
+        grok.assert_not_awaited()
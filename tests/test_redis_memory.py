@@ -0,0 +1,213 @@
+import sys
+from collections import OrderedDict
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+# Ajouter le répertoire parent au PYTHONPATH
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from memory.redis_memory import RedisMemory
+
+LIMITS = ("SESSIONS_PER_USER", "MAX_SESSIONS", "SESSION_MEMORY_LIMIT_MB", "SESSION_TTL")
+SCRIPTS = ("_create_session", "_add_message", "_set_entity", "_clear_history", "_delete_session",
+           "_switch_session", "_list_sessions")
+
+
+def make_memory():
+    """RedisMemory branchée sur un client Redis simulé."""
+    memory = RedisMemory.__new__(RedisMemory)
+    memory.r = MagicMock()
+    memory.redis_available = True
+    memory.current_session = None
+    for name in SCRIPTS:
+        setattr(memory, name, MagicMock(return_value=[]))
+    memory._create_session.return_value = [[], 1, 1]
+    memory._switch_session.return_value = [3500, 4]
+    memory._list_sessions.return_value = [["a", 3500, 4, "b", 10, 1], ["c"]]
+    return memory
+
+
+def make_ram_memory(**limits):
+    memory = RedisMemory.__new__(RedisMemory)
+    memory.redis_available = False
+    memory.memory = {}
+    memory.sessions_meta = OrderedDict()
+    memory.user_sessions = {}
+    memory.tenant_bytes = {}
+    memory.total_bytes = 0
+    memory.current_session = None
+    for name, value in limits.items():
+        setattr(memory, name, value)
+    return memory
+
+
+def make_lua_memory(**limits):
+    """RedisMemory sur un serveur fakeredis qui exécute réellement les scripts Lua."""
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+    server = fakeredis.FakeServer()
+    with patch("memory.redis_memory.redis.Redis",
+               lambda **kwargs: fakeredis.FakeRedis(server=server, decode_responses=True)):
+        memory = RedisMemory()
+    assert memory.redis_available
+    for name in LIMITS:
+        setattr(memory, name, limits.get(name, getattr(RedisMemory, name)))
+    return memory
+
+
+class Clock:
+    """Horloge qui avance d'une milliseconde à chaque lecture (ordre d'activité déterministe)"""
+
+    def __init__(self, start=1000.0, step=0.001):
+        self.now = start
+        self.step = step
+
+    def __call__(self):
+        self.now += self.step
+        return self.now
+
+
+class TestRedisRoundTrips:
+    """Un seul aller-retour Redis (un script) par méthode publique"""
+
+    def test_writes_are_scripted(self):
+        memory = make_memory()
+        memory.add_message("s1", "user", "Bonjour")
+        memory.set_entity("s1", "name", "Awa")
+        memory.clear_history("s1")
+        memory.delete_session("s1")
+        for name in ("_add_message", "_set_entity", "_clear_history", "_delete_session"):
+            getattr(memory, name).assert_called_once()
+        args = memory._add_message.call_args.kwargs["args"]
+        assert args[-2:] == ["s1", "user: Bonjour"]
+        # Aucune commande envoyée hors script
+        assert not memory.r.method_calls
+
+    def test_create_passes_quota_only_for_identified_users(self):
+        memory = make_memory()
+        memory.create_session("s1", user_id="awa@imt.sn")
+        assert memory._create_session.call_args.kwargs["args"][-4:-1] == \
+            [RedisMemory.SESSIONS_PER_USER, "s1", "awa@imt.sn"]
+        memory.create_session("s2")
+        assert memory._create_session.call_args.kwargs["args"][-4:-1] == [0, "s2", "anonymous"]
+
+    def test_list_and_switch(self):
+        memory = make_memory()
+        assert memory.switch_session("s1")["message_count"] == 4
+        memory.current_session = "c"
+        sessions = memory.list_sessions(user_id="awa@imt.sn", limit=5)
+        assert memory._list_sessions.call_args.kwargs["args"][-2:] == [5, "awa@imt.sn"]
+        assert [(s["session_id"], s["ttl_remaining"], s["message_count"]) for s in sessions] == \
+            [("a", 3500, 4), ("b", 10, 1)]
+        # Session courante expirée, supprimée par le script
+        assert memory.current_session is None
+        memory._switch_session.return_value = [-1]
+        assert memory.switch_session("inconnue")["status"] == "error"
+
+
+class TestRamSessions:
+    """Mode RAM : quotas par utilisateur, capacité globale LRU, mémoire par locataire"""
+
+    make = staticmethod(make_ram_memory)
+
+    @pytest.fixture(autouse=True)
+    def clock(self):
+        with patch("memory.redis_memory.time.time", Clock()) as clock:
+            yield clock
+
+    def test_visitors_do_not_evict_each_other(self):
+        memory = self.make(MAX_SESSIONS=100)
+        for i in range(10):
+            memory.create_session(f"visiteur-{i}")
+        assert len(memory.list_sessions()) == 10
+
+    def test_user_quota_evicts_own_least_recently_active(self):
+        memory = self.make(SESSIONS_PER_USER=2)
+        memory.create_session("a1", user_id="awa")
+        memory.create_session("b1", user_id="binta")
+        memory.create_session("a2", user_id="awa")
+        memory.add_message("a1", "user", "Toujours là")
+        result = memory.create_session("a3", user_id="awa")
+        assert result["user_sessions"] == 2
+        assert [s["session_id"] for s in memory.list_sessions(user_id="awa")] == ["a3", "a1"]
+        assert memory.switch_session("b1")["status"] == "success"
+
+    def test_global_capacity_is_lru(self):
+        memory = self.make(MAX_SESSIONS=3)
+        for sess_id in ("a", "b", "c"):
+            memory.create_session(sess_id)
+        memory.set_entity("a", "name", "Awa")
+        memory.create_session("d")
+        assert [s["session_id"] for s in memory.list_sessions()] == ["d", "a", "c"]
+
+    def test_memory_limit_and_usage_per_tenant(self):
+        memory = self.make(SESSION_MEMORY_LIMIT_MB=1 / 1024)  # 1 Ko
+        memory.create_session("a", user_id="awa")
+        memory.create_session("b", user_id="binta")
+        memory.add_message("a", "user", "x" * 600)
+        usage = memory.memory_usage()
+        assert list(usage["tenants"]) == ["awa", "binta"]
+        assert usage["bytes"] == sum(usage["tenants"].values())
+        # Dépassement : la session la moins récemment active ("b") est évincée
+        memory.add_message("a", "user", "y" * 600)
+        assert [s["session_id"] for s in memory.list_sessions()] == ["a"]
+        assert memory.memory_usage(user_id="binta") == {"sessions": 0, "bytes": 0, "limit_bytes": 1024}
+        memory.delete_session("a")
+        assert memory.memory_usage()["bytes"] == 0
+
+    def test_ttl_counts_from_last_activity(self):
+        memory = self.make()
+        with patch("memory.redis_memory.time.time", return_value=1000.0):
+            memory.create_session("a")
+        with patch("memory.redis_memory.time.time", return_value=1000.0 + RedisMemory.SESSION_TTL - 10):
+            memory.add_message("a", "user", "Bonjour")
+        with patch("memory.redis_memory.time.time", return_value=1000.0 + RedisMemory.SESSION_TTL + 10):
+            assert memory.list_sessions()[0]["ttl_remaining"] == RedisMemory.SESSION_TTL - 20
+
+    def test_bytes_follow_replacements_and_clears(self):
+        memory = self.make()
+        memory.create_session("a", user_id="awa")
+        created = memory.memory_usage()["bytes"]
+        memory.set_entity("a", "name", "Awa")
+        memory.set_entity("a", "name", "Awa Ndiaye")
+        memory.add_message("a", "user", "é" * 10)  # octets, pas caractères
+        assert memory.memory_usage(user_id="awa")["bytes"] == created + len("Awa Ndiaye") + len("user: ") + 20
+        memory.clear_history("a")
+        history = sum(len(entry.encode()) for entry in memory.get_history("a"))
+        assert memory.memory_usage()["bytes"] == len("Awa Ndiaye") + history
+
+
+class TestLuaSessions(TestRamSessions):
+    """Mêmes propriétés avec les scripts Lua exécutés par un serveur Redis (fakeredis)"""
+
+    make = staticmethod(make_lua_memory)
+
+    def test_expired_sessions_are_purged_with_their_keys_and_bytes(self, clock):
+        memory = self.make(SESSIONS_PER_USER=5)
+        memory.create_session("ancienne", user_id="awa")
+        memory.set_entity("ancienne", "name", "Awa")
+        clock.now += RedisMemory.SESSION_TTL + 1
+        memory.create_session("recente", user_id="awa")
+        assert [s["session_id"] for s in memory.list_sessions(user_id="awa")] == ["recente"]
+        assert memory.r.exists("chat_history:ancienne", "entities:ancienne") == 0
+        assert memory.r.smembers("user_sessions:awa") == {"recente"}
+        assert memory.memory_usage() == {
+            "sessions": 1, "bytes": len("system: Session recente créée".encode()),
+            "limit_bytes": memory._max_bytes(), "tenants": {"awa": len("system: Session recente créée".encode())},
+        }
+
+    def test_switch_reports_ttl_from_last_activity_then_expires(self, clock):
+        clock.step = 0
+        memory = self.make()
+        memory.create_session("a")
+        clock.now += RedisMemory.SESSION_TTL - 10
+        memory.add_message("a", "user", "Bonjour")
+        clock.now += 20
+        result = memory.switch_session("a")
+        assert (result["ttl_remaining"], result["message_count"]) == (RedisMemory.SESSION_TTL - 20, 2)
+        clock.now += RedisMemory.SESSION_TTL
+        assert memory.switch_session("a")["status"] == "error"
+        assert memory.memory_usage()["bytes"] == 0
+        assert memory.switch_session("a")["message"].endswith("Créez-la d'abord.")
@@ -0,0 +1,72 @@
+import sys
+import threading
+import time
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+# Ajouter le répertoire parent au PYTHONPATH
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app import agent as agent_module
+from app.telemetry import TelemetrySink
+
+
+class TestTelemetrySink:
+    """Tests de la file de télémétrie"""
+
+    def test_batches_are_sent_in_background(self):
+        batches = []
+        sink = TelemetrySink(batches.append, queue_size=100, batch_size=3, flush_interval=0.05)
+        for i in range(7):
+            assert sink.record({"name": f"e{i}"})
+        assert sink.flush(timeout=2)
+        assert [len(b) for b in batches] == [3, 3, 1]
+        assert [e["name"] for b in batches for e in b] == [f"e{i}" for i in range(7)]
+
+    def test_overflow_drops_without_blocking(self):
+        """File pleine pendant un envoi lent : l'événement est abandonné, sans attente"""
+        release = threading.Event()
+        sink = TelemetrySink(lambda batch: release.wait(2), queue_size=2, batch_size=1, flush_interval=0)
+        sink.record({"name": "en cours d'envoi"})
+        time.sleep(0.05)
+        assert sink.record({"name": "a"}) and sink.record({"name": "b"})
+        start = time.perf_counter()
+        assert sink.record({"name": "c"}) is False
+        assert time.perf_counter() - start < 0.05
+        release.set()
+        assert sink.flush(timeout=2)
+
+    def test_sampling_keeps_errors(self):
+        sink = TelemetrySink(MagicMock(), sample_rate=0.0)
+        assert sink.record({"name": "gemini_response"}) is False
+        assert sink.record({"name": "gemini_call_error"}, sampled=False) is True
+        assert sink.flush(timeout=2)
+
+    def test_send_failure_is_contained(self):
+        sink = TelemetrySink(MagicMock(side_effect=RuntimeError("réseau")), flush_interval=0)
+        sink.record({"name": "e"})
+        assert sink.flush(timeout=2)
+
+
+class TestAgentTelemetry:
+    """Traces des fournisseurs déposées dans la file"""
+
+    def test_grok_generation_and_error_are_queued(self):
+        sink = TelemetrySink(MagicMock(), flush_interval=0)
+        sink.record = MagicMock(return_value=True)
+        response = MagicMock()
+        response.choices[0].message.content = " Réponse "
+        response.usage.prompt_tokens, response.usage.completion_tokens = 1000, 200
+        client = MagicMock()
+        client.chat.completions.create.side_effect = [response, RuntimeError("timeout")]
+        with patch('app.telemetry.get_telemetry', return_value=sink), \
+                patch('app.agent.GROK_AVAILABLE', True), \
+                patch('app.agent._get_grok_client', return_value=client):
+            assert agent_module._call_grok("prompt") == "Réponse"
+            assert agent_module._call_grok("prompt") is None
+        (generation,), kwargs = sink.record.call_args_list[0]
+        assert generation["name"] == "grok_response"
+        assert generation["metadata"]["tokens_total"] == 1200
+        assert generation["metadata"]["cost_usd"] == 0.008
+        (error,), kwargs = sink.record.call_args_list[1]
+        assert error["name"] == "grok_call_error" and kwargs == {"sampled": False}